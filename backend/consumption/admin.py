@@ -1,9 +1,91 @@
 from django.contrib import admin
 
-from consumption.models import DailyIndexes
+from consumption.models import (
+    DailyBaseLoad,
+    DailyConsumption,
+    DailyIndexes,
+    DailyPowerPeak,
+    HourlyConsumption,
+    KwhPrice,
+    MinuteIndexSample,
+    PricingPeriod,
+    SubscriptionPrice,
+    TariffCalendarDay,
+)
 
 
 @admin.register(DailyIndexes)
 class DailyIndexesAdmin(admin.ModelAdmin):
-    list_display = ("date",)
+    list_display = (
+        "date",
+        "tarif_period_type",
+        "tempo_color",
+        "tarif_periods_complete",
+        "resolution",
+        "repair_count",
+        "finalized_version",
+    )
+    list_filter = (
+        "tarif_period_type",
+        "tempo_color",
+        "tarif_periods_complete",
+        "resolution",
+        "finalized_version",
+    )
     search_fields = ("date",)
+
+    @admin.display(description="Réparations")
+    def repair_count(self, obj):
+        return len(obj.index_repairs)
+
+
+@admin.register(MinuteIndexSample)
+class MinuteIndexSampleAdmin(admin.ModelAdmin):
+    list_display = ("date", "minute", "label", "index", "tarif_period_code")
+    list_filter = ("date", "label")
+
+
+@admin.register(HourlyConsumption)
+class HourlyConsumptionAdmin(admin.ModelAdmin):
+    list_display = ("date", "hour", "tarif_period", "wh", "euros")
+    list_filter = ("date", "tarif_period")
+
+
+@admin.register(DailyConsumption)
+class DailyConsumptionAdmin(admin.ModelAdmin):
+    list_display = ("date", "tarif_period", "wh", "euros")
+    list_filter = ("date", "tarif_period")
+
+
+@admin.register(DailyBaseLoad)
+class DailyBaseLoadAdmin(admin.ModelAdmin):
+    list_display = ("date", "base_load_watt", "measured_minutes", "step_change")
+    list_filter = ("step_change",)
+
+
+@admin.register(DailyPowerPeak)
+class DailyPowerPeakAdmin(admin.ModelAdmin):
+    list_display = ("date", "peak_va", "peak_intensity", "measured_minutes")
+    exclude = ("va_histogram", "intensity_histogram")
+
+
+class KwhPriceInline(admin.TabularInline):
+    model = KwhPrice
+    extra = 0
+
+
+class SubscriptionPriceInline(admin.TabularInline):
+    model = SubscriptionPrice
+    extra = 0
+
+
+@admin.register(PricingPeriod)
+class PricingPeriodAdmin(admin.ModelAdmin):
+    list_display = ("start_date", "label")
+    inlines = (KwhPriceInline, SubscriptionPriceInline)
+
+
+@admin.register(TariffCalendarDay)
+class TariffCalendarDayAdmin(admin.ModelAdmin):
+    list_display = ("date", "tarif_period_type", "color")
+    list_filter = ("tarif_period_type", "color")
@@ -0,0 +1,32 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from consumption.services.export import iter_csv_lines, iter_ndjson_lines
+
+
+class ConsumptionCSVRenderer(BaseRenderer):
+    """Renders consumption entries as CSV, see iter_csv_lines."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+    iter_lines = staticmethod(iter_csv_lines)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return "".join(self.iter_lines(data))
+
+
+class ConsumptionNDJSONRenderer(ConsumptionCSVRenderer):
+    """Renders consumption entries as NDJSON, see iter_ndjson_lines."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    iter_lines = staticmethod(iter_ndjson_lines)
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Plain JSON, selected with ?format=columnar: the view then answers with
+    parallel arrays instead of one object per entry.
+    """
+
+    format = "columnar"
@@ -1,6 +1,28 @@
 from rest_framework import serializers
 
-from consumption.constants import ALLOWED_CONSUMPTION_STEPS
+from consumption.constants import (
+    ALLOWED_CONSUMPTION_STEPS,
+    BASE_LOAD_PERCENTILE,
+    BILL_FORECAST_PROFILE_WEEKS,
+    DEFAULT_HEATMAP_WEEKS,
+    DEFAULT_POWER_CURVE_POINTS,
+    HEATMAP_PERCENTILE,
+    MAX_BASE_LOAD_RANGE_DAYS,
+    MAX_CONSUMPTION_RANGE_DAYS,
+    MAX_HEATMAP_WEEKS,
+    MAX_POWER_CURVE_POINTS,
+    MAX_POWER_CURVE_RANGE_DAYS,
+    MAX_POWER_PEAKS_RANGE_DAYS,
+    MAX_TARIFF_SIMULATION_RANGE_DAYS,
+    MIN_POWER_CURVE_POINTS,
+    MINUTES_PER_DAY,
+    ConsumptionBucket,
+    PowerCurveMode,
+    PowerPeakBucket,
+    TarifPeriodType,
+)
+from consumption.packing import minute_str_to_slot
+from consumption.services.tariff_simulator import parse_hc_schedule
 
 
 class DailyConsumptionQueryParamsSerializer(serializers.Serializer):
@@ -10,13 +32,35 @@ class DailyConsumptionQueryParamsSerializer(serializers.Serializer):
     step = serializers.IntegerField(
         required=False,
         default=1,
-        help_text="Time resolution in minutes. Accepted values: 1, 30, 60. Defaults to 1.",
+        help_text=(
+            "Time resolution in minutes, any divisor of 1440 (1, 5, 15, 30, 60...)."
+            " Defaults to 1."
+        ),
     )
+    since = serializers.CharField(
+        required=False,
+        help_text=(
+            "Delta mode (HH:MM): only returns the final 1-minute entries starting"
+            " at this minute, with the running totals."
+        ),
+    )
+
+    def validate_since(self, value):
+        try:
+            return minute_str_to_slot(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+
+    def validate(self, attrs):
+        if "since" in attrs and attrs.get("step", 1) != 1:
+            raise serializers.ValidationError("since can only be used with step=1.")
+        return attrs
 
     def validate_step(self, value):
         if value not in ALLOWED_CONSUMPTION_STEPS:
             raise serializers.ValidationError(
-                f"Step {value} is not allowed. Must be an integer in Allowed steps: {ALLOWED_CONSUMPTION_STEPS}."
+                f"Step {value} is not allowed. Must be an integer dividing "
+                f"{MINUTES_PER_DAY} minutes."
             )
         return value
 
@@ -53,7 +97,15 @@ class TotalByLabelSerializer(serializers.Serializer):
 
 class DailyConsumptionOutputSerializer(serializers.Serializer):
     date = serializers.DateField(help_text="Requested date of consumption.")
-    step = serializers.IntegerField(help_text="Time resolution in minutes.")
+    step = serializers.IntegerField(
+        help_text=(
+            "Time resolution in minutes, the requested step or, for a downsampled"
+            " day, the smallest multiple of it and of the stored resolution."
+        )
+    )
+    resolution = serializers.IntegerField(
+        help_text="Minutes between two stored indexes of the day (1 until downsampled)."
+    )
     data = DailyConsumptionElementSerializer(
         many=True, help_text="List of consumption entries."
     )
@@ -62,3 +114,480 @@ class DailyConsumptionOutputSerializer(serializers.Serializer):
         help_text="Totals per label with energy (Wh) and cost (Euros).",
         required=False,
     )
+
+
+class DailyConsumptionDeltaOutputSerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="Requested date of consumption.")
+    step = serializers.IntegerField(help_text="Time resolution in minutes (1).")
+    since = serializers.CharField(help_text="First minute requested (HH:MM).")
+    next_since = serializers.CharField(
+        help_text="Minute of the first entry not final yet, next since (HH:MM)."
+    )
+    data = DailyConsumptionElementSerializer(
+        many=True, help_text="Final entries starting at since."
+    )
+    totals = serializers.DictField(
+        child=TotalByLabelSerializer(),
+        help_text="Running totals per label with energy (Wh) and cost (Euros).",
+    )
+
+
+class ResampledConsumptionElementSerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="Date of the measurement.")
+    start_time = serializers.CharField(help_text="Start time of the bucket (HH:MM).")
+    end_time = serializers.CharField(help_text="End time of the bucket (HH:MM).")
+    wh = serializers.IntegerField(
+        allow_null=True,
+        help_text="Energy consumed during the known minutes of the bucket (Wh).",
+    )
+    average_watt = serializers.FloatField(
+        allow_null=True, help_text="Mean power over the known minutes, in watts."
+    )
+    peak_watt = serializers.FloatField(
+        allow_null=True, help_text="Highest one-minute mean power, in watts."
+    )
+    euros = serializers.FloatField(
+        allow_null=True, help_text="Cost in euros of the bucket."
+    )
+    interpolated_minutes = serializers.IntegerField(
+        help_text="Number of interpolated minutes in the bucket."
+    )
+    tarif_period = serializers.CharField(
+        allow_null=True, help_text="Tariff period covering most of the bucket."
+    )
+
+
+class ResampledConsumptionOutputSerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="Requested date of consumption.")
+    step = serializers.IntegerField(
+        help_text="Bucket size in minutes, a multiple of the stored resolution."
+    )
+    resolution = serializers.IntegerField(
+        help_text="Minutes between two stored indexes of the day (1 until downsampled)."
+    )
+    data = ResampledConsumptionElementSerializer(
+        many=True, help_text="Consumption per bucket."
+    )
+
+
+class RangeConsumptionQueryParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day of the range (YYYY-MM-DD).")
+    end = serializers.DateField(
+        help_text="Last day of the range (YYYY-MM-DD), included."
+    )
+    bucket = serializers.ChoiceField(
+        choices=[bucket.value for bucket in ConsumptionBucket],
+        required=False,
+        default=ConsumptionBucket.DAY,
+        help_text="Bucket size: hour, day, week or month. Defaults to day.",
+    )
+
+    def validate(self, attrs):
+        start, end = attrs["start"], attrs["end"]
+        if start > end:
+            raise serializers.ValidationError("start must be before or equal to end.")
+
+        bucket = ConsumptionBucket(attrs.get("bucket", ConsumptionBucket.DAY))
+        max_days = MAX_CONSUMPTION_RANGE_DAYS[bucket]
+        if (end - start).days + 1 > max_days:
+            raise serializers.ValidationError(
+                f"Range too long for {bucket} buckets: at most {max_days} days."
+            )
+        attrs["bucket"] = bucket
+        return attrs
+
+
+class ConsumptionExportQueryParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day of the export (YYYY-MM-DD).")
+    end = serializers.DateField(
+        help_text="Last day of the export (YYYY-MM-DD), included."
+    )
+    step = serializers.ChoiceField(
+        choices=ALLOWED_CONSUMPTION_STEPS,
+        required=False,
+        default=1,
+        help_text=(
+            "Time resolution in minutes, any divisor of 1440 (1, 5, 15, 30, 60...)."
+            " Defaults to 1."
+        ),
+    )
+
+    def validate(self, attrs):
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must be before or equal to end.")
+        return attrs
+
+
+class RangeConsumptionElementSerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="First day of the bucket in the range.")
+    hour = serializers.IntegerField(
+        allow_null=True, help_text="Hour of the bucket (hour buckets only)."
+    )
+    wh = serializers.IntegerField(
+        help_text="Energy consumed during the bucket, in watt-hours (Wh)."
+    )
+    euros = serializers.FloatField(help_text="Cost in euros of the bucket.")
+    interpolated_minutes = serializers.IntegerField(
+        help_text="Number of interpolated minutes in the bucket."
+    )
+    tarif_periods = serializers.DictField(
+        child=TotalByLabelSerializer(),
+        help_text="Energy (Wh) and cost (Euros) per tariff period.",
+    )
+
+
+class RangeConsumptionOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day of the range.")
+    end = serializers.DateField(help_text="Last day of the range, included.")
+    bucket = serializers.CharField(help_text="Bucket size.")
+    data = RangeConsumptionElementSerializer(
+        many=True, help_text="Consumption per bucket, buckets without data omitted."
+    )
+    totals = serializers.DictField(
+        child=TotalByLabelSerializer(),
+        help_text="Totals per label with energy (Wh) and cost (Euros).",
+    )
+    subscription_euros = serializers.FloatField(
+        help_text="Subscription (abonnement) cost in euros of the recorded days."
+    )
+    bill_euros = serializers.FloatField(
+        help_text="Consumption cost plus subscription cost, in euros."
+    )
+
+
+class PowerCurveQueryParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day of the curve (YYYY-MM-DD).")
+    end = serializers.DateField(
+        help_text="Last day of the curve (YYYY-MM-DD), included."
+    )
+    points = serializers.IntegerField(
+        required=False,
+        default=DEFAULT_POWER_CURVE_POINTS,
+        min_value=MIN_POWER_CURVE_POINTS,
+        max_value=MAX_POWER_CURVE_POINTS,
+        help_text="Number of points (LTTB) or buckets (minmax). Defaults to 1000.",
+    )
+    mode = serializers.ChoiceField(
+        choices=[mode.value for mode in PowerCurveMode],
+        required=False,
+        default=PowerCurveMode.LTTB,
+        help_text="lttb (actual points) or minmax (envelope). Defaults to lttb.",
+    )
+
+    def validate(self, attrs):
+        start, end = attrs["start"], attrs["end"]
+        if start > end:
+            raise serializers.ValidationError("start must be before or equal to end.")
+        if (end - start).days + 1 > MAX_POWER_CURVE_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"Range too long: at most {MAX_POWER_CURVE_RANGE_DAYS} days."
+            )
+        return attrs
+
+
+class PowerCurvePointSerializer(serializers.Serializer):
+    datetime = serializers.DateTimeField(
+        help_text="Minute of the point, or first minute of the bucket (minmax)."
+    )
+    watt = serializers.FloatField(required=False, help_text="Power (W), lttb only.")
+    min_watt = serializers.FloatField(
+        required=False, help_text="Lowest 1-minute power of the bucket, minmax only."
+    )
+    max_watt = serializers.FloatField(
+        required=False, help_text="Highest 1-minute power of the bucket, minmax only."
+    )
+    average_watt = serializers.FloatField(
+        required=False, help_text="Mean power of the bucket, minmax only."
+    )
+
+
+class PowerCurveOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day of the curve.")
+    end = serializers.DateField(help_text="Last day of the curve, included.")
+    mode = serializers.CharField(help_text="Downsampling mode.")
+    data = PowerCurvePointSerializer(many=True, help_text="Downsampled curve.")
+
+
+class TariffSimulationQueryParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day simulated (YYYY-MM-DD).")
+    end = serializers.DateField(help_text="Last day simulated (YYYY-MM-DD), included.")
+    options = serializers.CharField(
+        required=False,
+        default=",".join(TarifPeriodType),
+        help_text=(
+            "Comma-separated tariff options (TH, HC_HP, TEMPO, EJP). Defaults to all."
+        ),
+    )
+    hc_schedule = serializers.CharField(
+        required=False,
+        help_text=(
+            "HC schedule of the HC_HP option, e.g. 22:00-06:00 or"
+            " 01:30-07:30,12:30-14:30. Defaults to the recorded one."
+        ),
+    )
+
+    def validate_options(self, value):
+        options = []
+        for option in value.split(","):
+            try:
+                option = TarifPeriodType(option.strip())
+            except ValueError:
+                raise serializers.ValidationError(
+                    f"Unknown option {option!r}, must be among "
+                    f"{', '.join(TarifPeriodType)}."
+                )
+            if option not in options:
+                options.append(option)
+        return options
+
+    def validate_hc_schedule(self, value):
+        try:
+            return parse_hc_schedule(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+
+    def validate(self, attrs):
+        start, end = attrs["start"], attrs["end"]
+        if start > end:
+            raise serializers.ValidationError("start must be before or equal to end.")
+        if (end - start).days + 1 > MAX_TARIFF_SIMULATION_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"Range too long: at most {MAX_TARIFF_SIMULATION_RANGE_DAYS} days."
+            )
+        return attrs
+
+
+class TariffSimulationTarifPeriodSerializer(serializers.Serializer):
+    wh = serializers.IntegerField(help_text="Energy of the tarif period (Wh).")
+    euros = serializers.FloatField(help_text="Cost of that energy (euros).")
+
+
+class TariffSimulationResultSerializer(serializers.Serializer):
+    option = serializers.CharField(help_text="Tariff option (TH, HC_HP, TEMPO, EJP).")
+    wh = serializers.IntegerField(help_text="Energy of the period (Wh).")
+    energy_euros = serializers.FloatField(help_text="Cost of the energy (euros).")
+    subscription_euros = serializers.FloatField(
+        help_text="Subscription over the recorded days (euros)."
+    )
+    total_euros = serializers.FloatField(help_text="Energy plus subscription.")
+    tarif_periods = serializers.DictField(
+        child=TariffSimulationTarifPeriodSerializer(),
+        help_text="Energy and cost per readable tarif period.",
+    )
+    days = serializers.IntegerField(help_text="Number of recorded days priced.")
+    subscription_missing_days = serializers.IntegerField(
+        help_text="Days without a known subscription price, left out of it."
+    )
+    unknown_color_days = serializers.IntegerField(
+        help_text="Tempo days of unknown color, priced as blue days."
+    )
+
+
+class TariffSimulationOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day simulated.")
+    end = serializers.DateField(help_text="Last day simulated, included.")
+    hc_schedule = serializers.CharField(help_text="HC schedule of the HC_HP option.")
+    results = TariffSimulationResultSerializer(
+        many=True, help_text="One result per option, cheapest first."
+    )
+
+
+class BaseLoadQueryParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day (YYYY-MM-DD).")
+    end = serializers.DateField(help_text="Last day (YYYY-MM-DD), included.")
+
+    def validate(self, attrs):
+        start, end = attrs["start"], attrs["end"]
+        if start > end:
+            raise serializers.ValidationError("start must be before or equal to end.")
+        if (end - start).days + 1 > MAX_BASE_LOAD_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"Range too long: at most {MAX_BASE_LOAD_RANGE_DAYS} days."
+            )
+        return attrs
+
+
+class BaseLoadElementSerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="Day.")
+    base_load_watt = serializers.FloatField(
+        allow_null=True,
+        help_text=(
+            f"Base load (W): percentile {BASE_LOAD_PERCENTILE} of the measured"
+            " minute powers, null if too few minutes were measured."
+        ),
+    )
+    measured_minutes = serializers.IntegerField(
+        help_text="Minutes measured (not interpolated) that day."
+    )
+    step_change = serializers.BooleanField(
+        help_text="True on the first day of a lasting base load change."
+    )
+
+
+class BaseLoadOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day.")
+    end = serializers.DateField(help_text="Last day, included.")
+    data = BaseLoadElementSerializer(many=True, help_text="One element per day.")
+
+
+class SubscriptionReportQueryParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day (YYYY-MM-DD).")
+    end = serializers.DateField(help_text="Last day (YYYY-MM-DD), included.")
+
+    def validate(self, attrs):
+        start, end = attrs["start"], attrs["end"]
+        if start > end:
+            raise serializers.ValidationError("start must be before or equal to end.")
+        if (end - start).days + 1 > MAX_POWER_PEAKS_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"Range too long: at most {MAX_POWER_PEAKS_RANGE_DAYS} days."
+            )
+        return attrs
+
+
+class PowerPeaksQueryParamsSerializer(SubscriptionReportQueryParamsSerializer):
+    bucket = serializers.ChoiceField(
+        choices=[bucket.value for bucket in PowerPeakBucket],
+        required=False,
+        default=PowerPeakBucket.DAY,
+        help_text="day or month. Defaults to day.",
+    )
+
+
+class LoadDurationPointSerializer(serializers.Serializer):
+    va = serializers.IntegerField(help_text="Apparent power level (VA).")
+    minutes = serializers.IntegerField(
+        help_text="Minutes whose peak was at or above that level."
+    )
+
+
+class PowerPeakElementSerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="Day, or first day of the month.")
+    peak_va = serializers.IntegerField(help_text="Highest apparent power (VA).")
+    peak_at = serializers.DateTimeField(help_text="Minute of the highest power.")
+    peak_intensity = serializers.IntegerField(help_text="Highest intensity (A).")
+    measured_minutes = serializers.IntegerField(help_text="Minutes recorded.")
+    load_duration = LoadDurationPointSerializer(
+        many=True, help_text="Load-duration curve, highest level first."
+    )
+
+
+class PowerPeaksOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day.")
+    end = serializers.DateField(help_text="Last day, included.")
+    bucket = serializers.CharField(help_text="day or month.")
+    data = PowerPeakElementSerializer(many=True, help_text="One element per bucket.")
+
+
+class SubscriptionOptionSerializer(serializers.Serializer):
+    subscribed_intensity = serializers.IntegerField(help_text="ISOUSC (A).")
+    subscribed_power = serializers.IntegerField(help_text="Subscribed power (kVA).")
+    trip_minutes = serializers.IntegerField(
+        help_text="Minutes whose peak intensity was above it."
+    )
+    trip_days = serializers.IntegerField(help_text="Days with at least one of them.")
+    load_shedding_minutes = serializers.IntegerField(
+        help_text="Minutes where load shedding would have been triggered."
+    )
+
+
+class SubscriptionReportOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day.")
+    end = serializers.DateField(help_text="Last day, included.")
+    days = serializers.IntegerField(help_text="Days recorded.")
+    measured_minutes = serializers.IntegerField(help_text="Minutes recorded.")
+    peak_intensity = serializers.IntegerField(
+        allow_null=True, help_text="Highest intensity (A)."
+    )
+    subscribed_intensity = serializers.IntegerField(
+        allow_null=True, help_text="Current ISOUSC (A), the highest one recorded."
+    )
+    recommended_subscribed_intensity = serializers.IntegerField(
+        allow_null=True, help_text="Lowest ISOUSC never exceeded."
+    )
+    options = SubscriptionOptionSerializer(many=True, help_text="One per ISOUSC.")
+
+
+class BillPartSerializer(serializers.Serializer):
+    tarif_periods = serializers.DictField(
+        child=TotalByLabelSerializer(),
+        help_text="Energy (Wh) and cost (Euros) per tariff period.",
+    )
+    wh = serializers.IntegerField(help_text="Energy in watt-hours (Wh).")
+    euros = serializers.FloatField(help_text="Consumption cost in euros.")
+    subscription_euros = serializers.FloatField(
+        help_text="Subscription (abonnement) cost in euros."
+    )
+    bill_euros = serializers.FloatField(
+        help_text="Consumption cost plus subscription cost, in euros."
+    )
+
+
+class BillForecastOutputSerializer(serializers.Serializer):
+    month = serializers.DateField(help_text="First day of the current month.")
+    profile_days = serializers.IntegerField(
+        help_text=(
+            f"Days of the last {BILL_FORECAST_PROFILE_WEEKS} weeks the weekday"
+            " profiles were computed from."
+        )
+    )
+    month_to_date = BillPartSerializer(help_text="Recorded so far, today included.")
+    forecast = BillPartSerializer(
+        help_text=(
+            "Projected bill of the whole month: month to date plus the rest of"
+            " the month from same-weekday profiles."
+        )
+    )
+
+
+class HeatmapQueryParamsSerializer(serializers.Serializer):
+    weeks = serializers.IntegerField(
+        required=False,
+        default=DEFAULT_HEATMAP_WEEKS,
+        min_value=1,
+        max_value=MAX_HEATMAP_WEEKS,
+        help_text=(
+            f"Weeks before today covered by the heatmap. Defaults to"
+            f" {DEFAULT_HEATMAP_WEEKS}."
+        ),
+    )
+    by_tarif_period = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Also split each cell by tariff period. Defaults to false.",
+    )
+
+
+class HeatmapPowerSerializer(serializers.Serializer):
+    average_watt = serializers.FloatField(
+        allow_null=True, help_text="Average power (W) of the hour."
+    )
+    percentile_watt = serializers.FloatField(
+        allow_null=True,
+        help_text=f"Percentile {HEATMAP_PERCENTILE} of the power (W) of the hour.",
+    )
+
+
+class HeatmapCellSerializer(HeatmapPowerSerializer):
+    weekday = serializers.IntegerField(help_text="Day of the week, 0 = Monday.")
+    hour = serializers.IntegerField(help_text="Hour of the day, 0 to 23.")
+    hours = serializers.IntegerField(help_text="Recorded hours of the cell.")
+    tarif_periods = serializers.DictField(
+        child=HeatmapPowerSerializer(),
+        required=False,
+        help_text=(
+            "Powers per tariff period (by_tarif_period only), 0 W in the hours"
+            " of another tariff period."
+        ),
+    )
+
+
+class HeatmapOutputSerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="First day of the window.")
+    end = serializers.DateField(help_text="Last day of the window, included.")
+    weeks = serializers.IntegerField(help_text="Length of the window in weeks.")
+    percentile = serializers.IntegerField(help_text="Percentile of percentile_watt.")
+    days = serializers.IntegerField(help_text="Days of the window recorded.")
+    data = HeatmapCellSerializer(
+        many=True, help_text="The 168 hours of the week, Monday 00h first."
+    )
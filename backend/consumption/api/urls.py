@@ -1,7 +1,39 @@
 from django.urls import path
 
-from .views import DailyConsumptionView
+from .views import (
+    BaseLoadView,
+    BillForecastView,
+    ConsumptionExportView,
+    DailyConsumptionView,
+    HeatmapView,
+    PowerCurveView,
+    PowerPeaksView,
+    RangeConsumptionView,
+    ResampledConsumptionView,
+    SubscriptionReportView,
+    TariffSimulationView,
+)
 
 urlpatterns = [
     path("daily/", DailyConsumptionView.as_view(), name="daily-consumption"),
+    path(
+        "resampled/", ResampledConsumptionView.as_view(), name="resampled-consumption"
+    ),
+    path("range/", RangeConsumptionView.as_view(), name="range-consumption"),
+    path("power-curve/", PowerCurveView.as_view(), name="power-curve"),
+    path(
+        "tariff-simulation/",
+        TariffSimulationView.as_view(),
+        name="tariff-simulation",
+    ),
+    path("power-peaks/", PowerPeaksView.as_view(), name="power-peaks"),
+    path(
+        "subscription-report/",
+        SubscriptionReportView.as_view(),
+        name="subscription-report",
+    ),
+    path("bill-forecast/", BillForecastView.as_view(), name="bill-forecast"),
+    path("heatmap/", HeatmapView.as_view(), name="consumption-heatmap"),
+    path("base-load/", BaseLoadView.as_view(), name="base-load"),
+    path("export/", ConsumptionExportView.as_view(), name="consumption-export"),
 ]
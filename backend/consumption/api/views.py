@@ -1,20 +1,88 @@
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from consumption.models import DailyIndexes
-from consumption.utils import (
-    build_consumption_data,
-    compute_totals_for_a_day,
+from consumption.constants import HEATMAP_PERCENTILE
+from consumption.packing import SLOT_MINUTE_STRS
+from consumption.reconstruction import (
+    build_columnar_consumption,
+    build_consumption_data_from_series,
+    compute_day_totals,
 )
+from consumption.resampling import resample_consumption
+from consumption.selectors import get_daily_base_loads, get_day_indexes
+from consumption.services.bill_forecast import build_bill_forecast
+from consumption.services.consumption_cache import (
+    get_cached_day_response,
+    get_closed_day_cache_key,
+    get_etag,
+    set_cached_day_response,
+)
+from consumption.services.export import iter_consumption_rows
+from consumption.services.heatmap import get_heatmap
+from consumption.services.live_consumption import get_live_consumption
+from consumption.services.power_curve import build_power_curve
+from consumption.services.power_peaks import (
+    build_power_peaks,
+    build_subscription_report,
+)
+from consumption.services.retention import get_served_step
+from consumption.services.rollups import build_range_consumption
+from consumption.services.tariff_simulator import run_tariff_simulation
 
+from .renderers import (
+    ColumnarJSONRenderer,
+    ConsumptionCSVRenderer,
+    ConsumptionNDJSONRenderer,
+)
 from .serializers import (
+    BaseLoadOutputSerializer,
+    BaseLoadQueryParamsSerializer,
+    BillForecastOutputSerializer,
+    ConsumptionExportQueryParamsSerializer,
+    DailyConsumptionDeltaOutputSerializer,
     DailyConsumptionOutputSerializer,
     DailyConsumptionQueryParamsSerializer,
+    HeatmapOutputSerializer,
+    HeatmapQueryParamsSerializer,
+    PowerCurveOutputSerializer,
+    PowerCurveQueryParamsSerializer,
+    PowerPeaksOutputSerializer,
+    PowerPeaksQueryParamsSerializer,
+    RangeConsumptionOutputSerializer,
+    RangeConsumptionQueryParamsSerializer,
+    ResampledConsumptionOutputSerializer,
+    SubscriptionReportOutputSerializer,
+    SubscriptionReportQueryParamsSerializer,
+    TariffSimulationOutputSerializer,
+    TariffSimulationQueryParamsSerializer,
 )
 
 
 class DailyConsumptionView(APIView):
+    """
+    Consumption of one day. Responses of closed days are cached (see
+    consumption/services/consumption_cache.py) and sent with a strong ETag,
+    a matching If-None-Match is answered with 304 Not Modified.
+
+    With ?format=columnar, the entries are sent as parallel arrays (see
+    build_columnar_consumption) instead of one object per entry.
+
+    With ?since=HH:MM (delta mode, for the live chart), only the final
+    entries starting at that minute are sent, with the running totals (see
+    consumption/services/live_consumption.py).
+
+    Days downsampled by the retention policy are served at a step multiple
+    of their stored resolution, both being given in the response.
+    """
+
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer]
+
     def get(self, request):
 
         query_serializer = DailyConsumptionQueryParamsSerializer(
@@ -25,22 +93,342 @@ class DailyConsumptionView(APIView):
 
         requested_date = params.get("date")
         step = params.get("step", 1)
+        columnar = request.accepted_renderer.format == ColumnarJSONRenderer.format
+
+        if "since" in params:
+            return self.build_delta_response(requested_date, params["since"], columnar)
+
+        cache_key = get_closed_day_cache_key(requested_date, step, columnar)
+        if cache_key is None:
+            return self.build_response(requested_date, step, columnar)
 
-        try:
-            daily_indexes = DailyIndexes.objects.get(date=requested_date)
-        except DailyIndexes.DoesNotExist:
+        etag = get_etag(cache_key)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response_data = get_cached_day_response(cache_key)
+            if response_data is None:
+                response = self.build_response(requested_date, step, columnar)
+                set_cached_day_response(cache_key, response.data)
+            else:
+                response = Response(response_data, status=status.HTTP_200_OK)
+
+        response["ETag"] = etag
+        # Clients keep the response but revalidate it (cheap 304)
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @staticmethod
+    def build_response(requested_date, step, columnar=False) -> Response:
+        daily_indexes = get_day_indexes(requested_date)
+        if daily_indexes is None:
             return Response(
                 {"detail": f"No data found for the given date {requested_date}"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        step = get_served_step(step, daily_indexes.resolution)
+
+        if columnar:
+            # Already JSON-ready, no serializer loop over the entries
+            entries = build_consumption_data_from_series(
+                daily_indexes, requested_date, step
+            )
+            response_data = {
+                "date": requested_date.isoformat(),
+                "step": step,
+                "resolution": daily_indexes.resolution,
+                "format": ColumnarJSONRenderer.format,
+                **build_columnar_consumption(entries),
+                "totals": compute_day_totals(daily_indexes, requested_date),
+            }
+            return Response(response_data, status=status.HTTP_200_OK)
 
         response_data = {
             "date": requested_date,
             "step": step,
-            "data": build_consumption_data(daily_indexes, requested_date, step),
-            "totals": compute_totals_for_a_day(requested_date, daily_indexes.values),
+            "resolution": daily_indexes.resolution,
+            "data": build_consumption_data_from_series(
+                daily_indexes, requested_date, step
+            ),
+            "totals": compute_day_totals(daily_indexes, requested_date),
         }
 
         output_serializer = DailyConsumptionOutputSerializer(response_data)
 
         return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def build_delta_response(requested_date, since, columnar=False) -> Response:
+        live_consumption = get_live_consumption(requested_date, since)
+        if live_consumption is None:
+            return Response(
+                {"detail": f"No data found for the given date {requested_date}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response_data = {
+            "date": requested_date,
+            "step": 1,
+            "since": SLOT_MINUTE_STRS[since],
+            "next_since": SLOT_MINUTE_STRS[live_consumption["next_since"]],
+            "data": live_consumption["data"],
+            "totals": live_consumption["totals"],
+        }
+
+        if columnar:
+            response_data["date"] = requested_date.isoformat()
+            response_data["format"] = ColumnarJSONRenderer.format
+            response_data.update(build_columnar_consumption(response_data.pop("data")))
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        output_serializer = DailyConsumptionDeltaOutputSerializer(response_data)
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class ResampledConsumptionView(APIView):
+    """
+    Consumption of one day in buckets of any step dividing the day, with
+    mean/peak power and dominant tarif period (see consumption/resampling.py).
+    Like the daily endpoint, downsampled days are served at a step multiple
+    of their resolution.
+    """
+
+    def get(self, request):
+        query_serializer = DailyConsumptionQueryParamsSerializer(
+            data=request.query_params
+        )
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        requested_date = params["date"]
+        step = params["step"]
+
+        daily_indexes = get_day_indexes(requested_date)
+        if daily_indexes is None:
+            return Response(
+                {"detail": f"No data found for the given date {requested_date}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        step = get_served_step(step, daily_indexes.resolution)
+        output_serializer = ResampledConsumptionOutputSerializer(
+            {
+                "date": requested_date,
+                "step": step,
+                "resolution": daily_indexes.resolution,
+                "data": resample_consumption(daily_indexes, requested_date, step),
+            }
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class RangeConsumptionView(APIView):
+    """
+    Consumption of a date range per hour/day/week/month bucket, served from
+    the HourlyConsumption / DailyConsumption rollups in a single query.
+    """
+
+    def get(self, request):
+        query_serializer = RangeConsumptionQueryParamsSerializer(
+            data=request.query_params
+        )
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end, bucket = params["start"], params["end"], params["bucket"]
+
+        response_data = {
+            "start": start,
+            "end": end,
+            "bucket": bucket,
+            **build_range_consumption(start, end, bucket),
+        }
+
+        output_serializer = RangeConsumptionOutputSerializer(response_data)
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class ConsumptionExportView(APIView):
+    """
+    Reconstructed consumption of a date range, streamed as CSV (default,
+    ?format=csv) or NDJSON (?format=ndjson) one day at a time, see
+    consumption/services/export.py.
+    """
+
+    renderer_classes = [ConsumptionCSVRenderer, ConsumptionNDJSONRenderer]
+
+    def get(self, request):
+        query_serializer = ConsumptionExportQueryParamsSerializer(
+            data=request.query_params
+        )
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end, step = params["start"], params["end"], params["step"]
+        renderer = request.accepted_renderer
+
+        response = StreamingHttpResponse(
+            renderer.iter_lines(iter_consumption_rows(start, end, step)),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="consumption_{start}_{end}.{renderer.format}"'
+        )
+        return response
+
+    def handle_exception(self, exc):
+        # Errors are reported as JSON, whatever the requested export format
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+
+class PowerCurveView(APIView):
+    """
+    1-minute power curve of a date range, downsampled to a bounded number of
+    points without hiding short peaks (see consumption/downsampling.py).
+    """
+
+    def get(self, request):
+        query_serializer = PowerCurveQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end, mode = params["start"], params["end"], params["mode"]
+
+        output_serializer = PowerCurveOutputSerializer(
+            {
+                "start": start,
+                "end": end,
+                "mode": mode,
+                "data": build_power_curve(start, end, params["points"], mode),
+            }
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class TariffSimulationView(APIView):
+    """
+    Cost of the recorded consumption of a date range under each tariff
+    option (see consumption/services/tariff_simulator.py).
+    """
+
+    def get(self, request):
+        query_serializer = TariffSimulationQueryParamsSerializer(
+            data=request.query_params
+        )
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end = params["start"], params["end"]
+        simulation = run_tariff_simulation(
+            start, end, params["options"], params.get("hc_schedule")
+        )
+        output_serializer = TariffSimulationOutputSerializer(
+            {"start": start, "end": end, **simulation}
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class BaseLoadView(APIView):
+    """
+    Stored base load of each day of a date range, with its step changes
+    (see consumption/services/base_load.py).
+    """
+
+    def get(self, request):
+        query_serializer = BaseLoadQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end = params["start"], params["end"]
+        output_serializer = BaseLoadOutputSerializer(
+            {"start": start, "end": end, "data": get_daily_base_loads(start, end)}
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class BillForecastView(APIView):
+    """
+    Month-to-date cost and end-of-month bill forecast (see
+    consumption/services/bill_forecast.py).
+    """
+
+    def get(self, request):
+        output_serializer = BillForecastOutputSerializer(
+            build_bill_forecast(timezone.localtime())
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class HeatmapView(APIView):
+    """
+    Average and high percentile power of each hour of the week over the last
+    weeks (see consumption/services/heatmap.py).
+    """
+
+    def get(self, request):
+        query_serializer = HeatmapQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        weeks = params["weeks"]
+        heatmap = get_heatmap(timezone.localdate(), weeks, params["by_tarif_period"])
+        output_serializer = HeatmapOutputSerializer(
+            {"weeks": weeks, "percentile": HEATMAP_PERCENTILE, **heatmap}
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class PowerPeaksView(APIView):
+    """
+    Peak apparent power and load-duration curve of each day or month of a
+    date range (see consumption/services/power_peaks.py).
+    """
+
+    def get(self, request):
+        query_serializer = PowerPeaksQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end, bucket = params["start"], params["end"], params["bucket"]
+        output_serializer = PowerPeaksOutputSerializer(
+            {
+                "start": start,
+                "end": end,
+                "bucket": bucket,
+                "data": build_power_peaks(start, end, bucket),
+            }
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class SubscriptionReportView(APIView):
+    """
+    How often each subscribed intensity (ISOUSC) would have been exceeded
+    over a date range.
+    """
+
+    def get(self, request):
+        query_serializer = SubscriptionReportQueryParamsSerializer(
+            data=request.query_params
+        )
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+
+        start, end = params["start"], params["end"]
+        output_serializer = SubscriptionReportOutputSerializer(
+            {"start": start, "end": end, **build_subscription_report(start, end)}
+        )
+
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ConsumptionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consumption'
+
+    def ready(self):
+        # Edited prices must be recompiled into the price timeline
+        from consumption import signals  # noqa: F401
@@ -0,0 +1,443 @@
+"""
+Benchmark suite of the consumption pipeline, on a synthetic history.
+
+generate_synthetic_history fills DailyIndexes with a realistic multi-year
+history: an HC/HP contract switched to Tempo halfway through (colors drawn
+per day, red and white days in winter), a base load with appliance bursts
+and winter heating, short teleinfo gaps on most days and a long one now and
+then, the "24:00" index of the next midnight on most days, and some days
+whose tarif periods stop being recorded in the evening (filled from a
+reference day at read time).
+
+run_consumption_benchmarks then times, on days drawn from that history:
+
+  - both reconstruction engines, build_consumption_data (dicts) and
+    build_consumption_data_from_series, at 1, 30 and 60 minute steps, on
+    the same days,
+  - compute_totals_for_a_day,
+  - fill_missing_tarif_periods on days needing a reference day lookup,
+  - save_teleinfo_data (minute samples and incremental rollups),
+  - DailyConsumptionView end to end (query parsing, reconstruction,
+    serialization, rendering), on plain and finalized days, with a cold
+    response cache.
+
+Each case is timed `runs` times, its setup (loading the day, resetting the
+cache...) being left out of the timings. The benchmark_consumption command
+runs the suite in benchmark_environment, on a throwaway database and cache,
+and records the results as JSON, so that versions can be compared.
+"""
+
+import platform
+import random
+import statistics
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlencode
+
+import django
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+from django.utils import timezone
+
+from consumption.api.views import DailyConsumptionView
+from consumption.constants import DAY_MINUTE_SLOTS, MINUTES_PER_DAY
+from consumption.edf_pricing import invalidate_price_timeline
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.mutators import save_teleinfo_data
+from consumption.packing import (
+    pack_index_series,
+    pack_tarif_period_codes,
+    tarif_period_to_code,
+)
+from consumption.reconstruction import build_consumption_data_from_series
+from consumption.services.finalization import FINALIZED_FIELDS, finalize_day
+from consumption.utils import (
+    build_consumption_data,
+    compute_totals_for_a_day,
+    fill_missing_tarif_periods,
+)
+from teleinfo.constants import TarifPeriods, TeleinfoLabel
+from teleinfo.utils.cache_teleinfo_data import set_teleinfo_data_in_cache
+
+# Rows written per bulk_create by generate_synthetic_history
+SYNTHETIC_BATCH_DAYS = 200
+SYNTHETIC_SUBSCRIBED_POWER = 9
+
+HC_HP_PERIODS = {"HC": TarifPeriods.HC, "HP": TarifPeriods.HP}
+TEMPO_PERIODS = {
+    "B": {"HC": TarifPeriods.HCJB, "HP": TarifPeriods.HPJB},
+    "W": {"HC": TarifPeriods.HCJW, "HP": TarifPeriods.HPJW},
+    "R": {"HC": TarifPeriods.HCJR, "HP": TarifPeriods.HPJR},
+}
+INDEX_LABELS = {
+    TarifPeriods.HC: TeleinfoLabel.HCHC,
+    TarifPeriods.HP: TeleinfoLabel.HCHP,
+    TarifPeriods.HCJB: TeleinfoLabel.BBRHCJB,
+    TarifPeriods.HPJB: TeleinfoLabel.BBRHPJB,
+    TarifPeriods.HCJW: TeleinfoLabel.BBRHCJW,
+    TarifPeriods.HPJW: TeleinfoLabel.BBRHPJW,
+    TarifPeriods.HCJR: TeleinfoLabel.BBRHCJR,
+    TarifPeriods.HPJR: TeleinfoLabel.BBRHPJR,
+}
+HC_HP_LABELS = [TeleinfoLabel.HCHC, TeleinfoLabel.HCHP]
+TEMPO_LABELS = [
+    TeleinfoLabel.BBRHCJB,
+    TeleinfoLabel.BBRHPJB,
+    TeleinfoLabel.BBRHCJW,
+    TeleinfoLabel.BBRHPJW,
+    TeleinfoLabel.BBRHCJR,
+    TeleinfoLabel.BBRHPJR,
+]
+
+CONSUMPTION_STEPS = (1, 30, 60)
+
+
+def draw_tempo_color(rng: random.Random, day: date) -> str:
+    """Red and white days in winter weekdays only, white days now and then."""
+    if day.month in (11, 12, 1, 2, 3) and day.weekday() < 5:
+        return rng.choices("BWR", weights=(65, 20, 15))[0]
+    return rng.choices("BW", weights=(95, 5))[0]
+
+
+def draw_minute_watt_hours(rng: random.Random, day: date, minute: int) -> float:
+    """~150 W base load, appliance bursts, heating on winter nights and mornings."""
+    wh = 2.5 + rng.random()
+    if rng.random() < 0.08:
+        wh += rng.randint(10, 50)
+    if day.month in (11, 12, 1, 2, 3) and (minute < 480 or minute >= 1080):
+        wh += rng.randint(15, 40)
+    return wh
+
+
+def build_synthetic_day(
+    rng: random.Random, day: date, indexes: dict[str, float], tempo: bool
+) -> DailyIndexes:
+    """
+    One synthetic day (not saved), HC from 22:00 to 06:00, continuing from
+    `indexes` ({label: index}, updated to the next midnight's ones).
+    """
+    if tempo:
+        periods = TEMPO_PERIODS[draw_tempo_color(rng, day)]
+        labels = TEMPO_LABELS
+    else:
+        periods = HC_HP_PERIODS
+        labels = HC_HP_LABELS
+    for label in labels:
+        indexes.setdefault(label, rng.randint(1_000_000, 20_000_000))
+
+    index_series = {label: [None] * DAY_MINUTE_SLOTS for label in labels}
+    tarif_period_series = [None] * DAY_MINUTE_SLOTS
+    for slot in range(DAY_MINUTE_SLOTS):
+        tarif_period = periods["HC" if slot < 360 or slot >= 1320 else "HP"]
+        tarif_period_series[slot] = tarif_period
+        for label in labels:
+            index_series[label][slot] = int(indexes[label])
+        if slot < MINUTES_PER_DAY:
+            indexes[INDEX_LABELS[tarif_period]] += draw_minute_watt_hours(
+                rng, day, slot
+            )
+
+    gaps = [
+        (rng.randrange(1, 1425), rng.randint(1, 15)) for _ in range(rng.randint(0, 4))
+    ]
+    if rng.random() < 0.03:
+        gaps.append((rng.randrange(1, 1100), rng.randint(60, 300)))
+    for start, length in gaps:
+        for slot in range(start, min(start + length, MINUTES_PER_DAY)):
+            tarif_period_series[slot] = None
+            for label in labels:
+                index_series[label][slot] = None
+    # The next midnight's reading is missed now and then
+    if rng.random() < 0.05:
+        tarif_period_series[MINUTES_PER_DAY] = None
+        for label in labels:
+            index_series[label][MINUTES_PER_DAY] = None
+    # Tarif periods lost for the evening, indexes still recorded
+    if rng.random() < 0.1:
+        lost_from = rng.randrange(1080, 1380)
+        tarif_period_series[lost_from:] = [None] * (DAY_MINUTE_SLOTS - lost_from)
+
+    daily_indexes = DailyIndexes(
+        date=day,
+        packed_values=pack_index_series(index_series),
+        packed_tarif_periods=pack_tarif_period_codes(
+            bytes(tarif_period_to_code(period) for period in tarif_period_series)
+        ),
+        subscribed_power=SYNTHETIC_SUBSCRIBED_POWER,
+    )
+    daily_indexes.refresh_tarif_metadata()
+    return daily_indexes
+
+
+def generate_synthetic_history(start: date, end: date, seed: int = 0) -> int:
+    """
+    Replaces the DailyIndexes of [start, end] (both included) with a
+    synthetic history (see the module docstring), HC/HP in its first half
+    and Tempo in the second one.
+
+    Returns:
+        The number of days generated.
+    """
+    rng = random.Random(seed)
+    tempo_from = start + (end - start) / 2
+    DailyIndexes.objects.filter(date__gte=start, date__lte=end).delete()
+
+    batch: list[DailyIndexes] = []
+    indexes: dict[str, float] = {}
+    day = start
+    while day <= end:
+        batch.append(build_synthetic_day(rng, day, indexes, tempo=day >= tempo_from))
+        if len(batch) == SYNTHETIC_BATCH_DAYS:
+            DailyIndexes.objects.bulk_create(batch)
+            batch = []
+        day += timedelta(days=1)
+    DailyIndexes.objects.bulk_create(batch)
+
+    return (end - start).days + 1
+
+
+@contextmanager
+def benchmark_environment() -> Iterator[None]:
+    """
+    For the current thread, points the default database alias at a
+    temporary SQLite file, migrated on entry (which seeds the price grids)
+    and deleted on exit, and the default cache at a local memory one: the
+    suite writes, deletes and clears the cache freely, the real database
+    and cache are never touched.
+    """
+    real_connection = connections[DEFAULT_DB_ALIAS]
+    real_cache = caches[DEFAULT_CACHE_ALIAS]
+    with tempfile.TemporaryDirectory(prefix="consumption-benchmark-") as directory:
+        settings_dict = connections.configure_settings(
+            {
+                DEFAULT_DB_ALIAS: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": Path(directory) / "benchmark.sqlite3",
+                }
+            }
+        )[DEFAULT_DB_ALIAS]
+        benchmark_connection = load_backend(settings_dict["ENGINE"]).DatabaseWrapper(
+            settings_dict, DEFAULT_DB_ALIAS
+        )
+        connections[DEFAULT_DB_ALIAS] = benchmark_connection
+        caches[DEFAULT_CACHE_ALIAS] = LocMemCache("consumption-benchmark", {})
+        invalidate_price_timeline()
+        try:
+            call_command("migrate", verbosity=0, interactive=False)
+            yield
+        finally:
+            benchmark_connection.close()
+            connections[DEFAULT_DB_ALIAS] = real_connection
+            caches[DEFAULT_CACHE_ALIAS] = real_cache
+            # Both loaded from the benchmark database
+            invalidate_price_timeline()
+            ContentType.objects.clear_cache()
+
+
+def build_get_request(path: str, params: dict[str, object]) -> WSGIRequest:
+    """A bare GET request, such as the WSGI server hands to a view."""
+    return WSGIRequest(
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": urlencode(params),
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(),
+        }
+    )
+
+
+def measure(prepare: Callable[[], Callable[[], object]], runs: int) -> dict:
+    """
+    Times `runs` calls of the callables returned by `prepare`, whose own
+    duration isn't counted.
+
+    Returns:
+        {"runs", "median_ms", "p90_ms", "min_ms", "max_ms"}.
+    """
+    durations = []
+    for _ in range(runs):
+        call = prepare()
+        start = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(durations),
+        "p90_ms": durations[min(runs - 1, int(runs * 0.9))],
+        "min_ms": durations[0],
+        "max_ms": durations[-1],
+    }
+
+
+def _draw_days(rng: random.Random, days: list[date], runs: int) -> list[date]:
+    return [rng.choice(days) for _ in range(runs)]
+
+
+def run_consumption_benchmarks(
+    start: date, end: date, runs: int, seed: int = 0
+) -> dict[str, dict]:
+    """
+    Times each case of the suite (see the module docstring) on days of
+    [start, end], drawn with `seed`. The history must have been generated
+    (generate_synthetic_history), end being before today. Writes to the
+    database and clears the cache: run it in benchmark_environment.
+
+    Returns:
+        {case name: measure() result}, in running order.
+    """
+    rng = random.Random(seed)
+    days = list(
+        DailyIndexes.objects.filter(date__gte=start, date__lte=end)
+        .order_by("date")
+        .values_list("date", flat=True)
+    )
+    incomplete_days = list(
+        DailyIndexes.objects.filter(
+            date__gte=start, date__lte=end, tarif_periods_complete=False
+        ).values_list("date", flat=True)
+    )
+    results = {}
+
+    for step in CONSUMPTION_STEPS:
+        step_days = _draw_days(rng, days, runs)
+        for engine in (build_consumption_data, build_consumption_data_from_series):
+            pending_days = iter(step_days)
+
+            def prepare_build(engine=engine, step=step, pending_days=pending_days):
+                day = next(pending_days)
+                # Starts from the packed row every run, as a request does
+                daily_indexes = DailyIndexes.objects.get(date=day)
+                return lambda: engine(daily_indexes, day, step)
+
+            results[f"{engine.__name__}_step_{step}"] = measure(prepare_build, runs)
+
+    pending_days = iter(_draw_days(rng, days, runs))
+
+    def prepare_totals():
+        day = next(pending_days)
+        values = DailyIndexes.objects.get(date=day).values
+        return lambda: compute_totals_for_a_day(day, values)
+
+    results["compute_totals_for_a_day"] = measure(prepare_totals, runs)
+
+    if incomplete_days:
+        pending_incomplete_days = iter(_draw_days(rng, incomplete_days, runs))
+
+        def prepare_fill():
+            day = next(pending_incomplete_days)
+            tarif_periods = DailyIndexes.objects.get(date=day).tarif_periods
+            return lambda: fill_missing_tarif_periods(dict(tarif_periods), day)
+
+        results["fill_missing_tarif_periods"] = measure(prepare_fill, runs)
+
+    results["save_teleinfo_data"] = measure(_prepare_save_teleinfo_data(), runs)
+
+    view = DailyConsumptionView.as_view()
+    for finalized in (False, True):
+        pending_days = iter(_draw_days(rng, days, runs))
+
+        def prepare_view(finalized=finalized, pending_days=pending_days):
+            day = next(pending_days)
+            daily_indexes = DailyIndexes.objects.get(date=day)
+            if finalized:
+                finalize_day(daily_indexes)
+            else:
+                daily_indexes.finalized_version = None
+            DailyIndexes.objects.bulk_update([daily_indexes], FINALIZED_FIELDS)
+            cache.clear()
+            request = build_get_request(
+                "/api/consumption/daily/", {"date": day.isoformat(), "step": 30}
+            )
+            return lambda: view(request).render()
+
+        name = "daily_view_finalized" if finalized else "daily_view"
+        results[name] = measure(prepare_view, runs)
+
+    return results
+
+
+def _prepare_save_teleinfo_data() -> Callable[[], Callable[[], object]]:
+    """
+    prepare() of the save_teleinfo_data case: a fresh HC/HP frame in the
+    teleinfo cache, the previous minute recorded so that rollups get
+    incremented, the current minute not yet.
+    """
+    now = timezone.localtime().replace(second=0, microsecond=0)
+    previous = now - timedelta(minutes=1)
+    indexes = {TeleinfoLabel.HCHC: 6_711_346, TeleinfoLabel.HCHP: 1_547_338}
+    MinuteIndexSample.objects.filter(date__gte=previous.date()).delete()
+    MinuteIndexSample.objects.bulk_create(
+        MinuteIndexSample(
+            date=previous.date(),
+            minute=previous.hour * 60 + previous.minute,
+            label=label,
+            index=index - 20,
+            tarif_period_code=tarif_period_to_code(TarifPeriods.HC),
+        )
+        for label, index in indexes.items()
+    )
+
+    def prepare():
+        current = timezone.localtime()
+        MinuteIndexSample.objects.filter(
+            date=current.date(), minute=current.hour * 60 + current.minute
+        ).delete()
+        set_teleinfo_data_in_cache(
+            {
+                "OPTARIF": "HC..",
+                "ISOUSC": "45",
+                **{label: f"{index:09d}" for label, index in indexes.items()},
+                "PTEC": TarifPeriods.HC,
+                "IINST": "014",
+                "PAPP": "03260",
+                "last_read": timezone.now().isoformat(),
+            }
+        )
+        return save_teleinfo_data
+
+    return prepare
+
+
+def get_environment() -> dict[str, str]:
+    """Versions the results were measured with."""
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "machine": platform.machine(),
+    }
+
+
+def build_benchmark_report(
+    results: dict[str, dict],
+    start: date,
+    end: date,
+    seed: int,
+    label: str = "",
+) -> dict:
+    """The JSON document recorded by benchmark_consumption."""
+    return {
+        "label": label,
+        "measured_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "environment": get_environment(),
+        "history": {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": (end - start).days + 1,
+            "seed": seed,
+        },
+        "results": results,
+    }
@@ -2,12 +2,10 @@ from enum import StrEnum
 
 from teleinfo.constants import TarifPeriods
 
-ALLOWED_CONSUMPTION_STEPS = [1, 30, 60]
-
-# Deliberately narrow: only recent, common days are used as a reference.
-# Rare/unusual days (e.g. a Tempo red day) may simply go unfilled if none
-# occurred in this window — accepted trade-off to keep the lookup cheap.
-TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS = 3
+# Reference days are looked up through the indexed tarif metadata columns of
+# DailyIndexes (a single query whatever the window), so the window can cover
+# a whole season: rare days (e.g. a Tempo red day) still find a reference.
+TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS = 120
 
 
 class TarifPeriodType(StrEnum):
@@ -37,6 +35,164 @@ TEMPO_COLOR_LABELS: dict[str, list[str]] = {
     "R": [TarifPeriods.HCJR, TarifPeriods.HPJR],
 }
 
+# Reverse lookups of the two mappings above.
+TARIF_PERIOD_TYPE_BY_TARIF_PERIOD: dict[str, TarifPeriodType] = {
+    tarif_period: tarif_period_type
+    for tarif_period_type, labels in TARIF_PERIOD_TYPE_LABELS.items()
+    for tarif_period in labels
+}
+TEMPO_COLOR_BY_TARIF_PERIOD: dict[str, str] = {
+    tarif_period: color
+    for color, labels in TEMPO_COLOR_LABELS.items()
+    for tarif_period in labels
+}
+
+# One slot per minute of the day, "00:00" to "24:00" included.
+MINUTES_PER_DAY = 1440
+DAY_MINUTE_SLOTS = MINUTES_PER_DAY + 1
+
+# Any step dividing the day evenly (1, 5, 15, 30, 60... minutes), see
+# consumption/resampling.py.
+ALLOWED_CONSUMPTION_STEPS = [
+    step for step in range(1, MINUTES_PER_DAY + 1) if MINUTES_PER_DAY % step == 0
+]
+
+# Version byte written at the head of every packed DailyIndexes blob, bumped
+# whenever the binary layout changes (see consumption/packing.py).
+PACKED_FORMAT_VERSION = 1
+
+# Stored uint8 code of each tarif period. These codes are persisted (packed
+# tarif_periods, minute samples...): never renumber an existing entry, only
+# append new ones. 0 is reserved for "no known tarif period" (None).
+NO_TARIF_PERIOD_CODE = 0
+TARIF_PERIOD_CODES: dict[str, int] = {
+    TarifPeriods.TH: 1,
+    TarifPeriods.HC: 2,
+    TarifPeriods.HP: 3,
+    TarifPeriods.HN: 4,
+    TarifPeriods.PM: 5,
+    TarifPeriods.HCJB: 6,
+    TarifPeriods.HPJB: 7,
+    TarifPeriods.HCJW: 8,
+    TarifPeriods.HPJW: 9,
+    TarifPeriods.HCJR: 10,
+    TarifPeriods.HPJR: 11,
+}
+TARIF_PERIODS_BY_CODE: dict[int, str] = {
+    code: tarif_period for tarif_period, code in TARIF_PERIOD_CODES.items()
+}
+
+
+class ConsumptionBucket(StrEnum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+# Longest range (in days) served in one response for each bucket size, to
+# keep responses bounded: ~750 hourly buckets, ten years otherwise.
+MAX_CONSUMPTION_RANGE_DAYS: dict[ConsumptionBucket, int] = {
+    ConsumptionBucket.HOUR: 31,
+    ConsumptionBucket.DAY: 3660,
+    ConsumptionBucket.WEEK: 3660,
+    ConsumptionBucket.MONTH: 3660,
+}
+
+
+class PowerCurveMode(StrEnum):
+    # Largest-Triangle-Three-Buckets: a subset of the actual points
+    LTTB = "lttb"
+    # Min / max / mean of the power per bucket
+    MINMAX = "minmax"
+
+
+# Power curves are built from the 1-minute series of every day of the range
+MAX_POWER_CURVE_RANGE_DAYS = 31
+MIN_POWER_CURVE_POINTS = 3
+MAX_POWER_CURVE_POINTS = 5000
+DEFAULT_POWER_CURVE_POINTS = 1000
+
+# Tariff simulations work on half-hour profiles, two years stay cheap
+MAX_TARIFF_SIMULATION_RANGE_DAYS = 731
+
+# Base load (standby consumption) of a day: this percentile of its measured
+# minute powers, when at least BASE_LOAD_MIN_MEASURED_MINUTES were measured
+BASE_LOAD_PERCENTILE = 10
+BASE_LOAD_MIN_MEASURED_MINUTES = 360
+# A step change starts on a day when it and the following
+# BASE_LOAD_STEP_CONFIRMATION_DAYS - 1 days all move away from the median of
+# the BASE_LOAD_STEP_REFERENCE_DAYS days before it, in the same direction, by
+# at least BASE_LOAD_STEP_MIN_WATT and BASE_LOAD_STEP_MIN_RATIO of that median
+BASE_LOAD_STEP_REFERENCE_DAYS = 14
+BASE_LOAD_STEP_CONFIRMATION_DAYS = 3
+BASE_LOAD_STEP_MIN_WATT = 20
+BASE_LOAD_STEP_MIN_RATIO = 0.15
+MAX_BASE_LOAD_RANGE_DAYS = 3660
+
+# Width of the apparent power buckets of the daily load-duration histograms
+POWER_HISTOGRAM_BUCKET_VA = 100
+MAX_POWER_PEAKS_RANGE_DAYS = 3660
+
+
+class PowerPeakBucket(StrEnum):
+    DAY = "day"
+    MONTH = "month"
+
+
+class EnedisCsvKind(StrEnum):
+    LOAD_CURVE = "load-curve"  # Average power (W) of each interval
+    DAILY_INDEXES = "daily-indexes"  # Index (Wh) of each register, once a day
+
+
+# Interval of an Enedis load curve reading, when it can't be told from the
+# previous one (first reading, or after a gap longer than the max step)
+ENEDIS_LOAD_CURVE_DEFAULT_STEP_MINUTES = 30
+ENEDIS_LOAD_CURVE_MAX_STEP_MINUTES = 60
+# Days written per transaction by import_enedis_csv
+ENEDIS_IMPORT_BATCH_DAYS = 200
+
+# Tiered retention of DailyIndexes: see settings.CONSUMPTION_RETENTION_TIERS
+# Days rewritten per transaction by apply_retention_policy
+RETENTION_BATCH_DAYS = 200
+
+
+class IndexRepairKind(StrEnum):
+    RESET = "reset"  # The index drops and stays low (meter swap, counter reset)
+    REGRESSION = "regression"  # The index briefly goes back
+    JUMP = "jump"  # More energy than ISOUSC lets through in the elapsed time
+
+
+# Integrity scan of DailyIndexes (see consumption/services/integrity.py): an
+# interval is physically impossible above ISOUSC x DEFAULT_VOLTAGE x this
+# tolerance (the breaker lets short overloads through), ISOUSC being the one
+# of the day's subscribed power, the largest one when unknown.
+INTEGRITY_POWER_TOLERANCE = 1.5
+# An anomaly whose indexes come back in line within this many minutes is a
+# glitch (its readings are dropped), otherwise a lasting offset is repaired
+INTEGRITY_GLITCH_MAX_MINUTES = 60
+# Days rescanned per transaction by scan_consumption_integrity
+INTEGRITY_SCAN_BATCH_DAYS = 200
+
+# Version of the reconstruction frozen on closed days (interpolation, tarif
+# period filling, totals, see consumption/services/finalization.py). Bump it
+# whenever one of them changes: days finalized by an older version are
+# reconstructed on every read again until finalize_consumption_days runs.
+FINALIZATION_VERSION = 1
+# Days finalized per transaction by finalize_consumption_days
+FINALIZATION_BATCH_DAYS = 200
+
+# The bill forecast projects the rest of the month from the average
+# consumption of the same weekday (hour by hour for the rest of today) over
+# that many weeks before today
+BILL_FORECAST_PROFILE_WEEKS = 8
+
+# Hour-of-week heatmap (see consumption/services/heatmap.py): window in weeks
+# before today, and the high percentile given next to the average power
+DEFAULT_HEATMAP_WEEKS = 8
+MAX_HEATMAP_WEEKS = 156
+HEATMAP_PERCENTILE = 90
+
 
 STEP_30MIN_DICT = {
     "00:00": None,
@@ -0,0 +1,227 @@
+"""
+Interpolation of the gaps spanning midnight, from the neighbouring days.
+
+A day is reconstructed on its own (reconstruct_day): its gaps are only
+interpolated between two of its known indexes, so an outage from 23:10 to
+01:30 leaves the tail of the first day and the head of the next one
+unknown. Bridging such a gap only needs the edges of the neighbouring days,
+their first and last known index of each label (DayEdges): the gap is
+interpolated between the last index before it and the first one after it,
+exactly as interpolate_index_series would over a single series (slot 1440
+of a day being slot 0 of the next one), so both days agree on the indexes
+of the span.
+
+iter_bridged_days streams the reconstructed days of a range with one day of
+lookahead, each day being bridged from the edges of the days streamed next
+to it; only the edges of the two days just outside the range are loaded, in
+one batched query (load_day_edges), and cached for finalized days. Bridging
+applies to the range reads (export, power curve); day totals and rollups
+are per day and leave the bridged energy out, as before.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import replace
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from consumption.constants import FINALIZATION_VERSION, MINUTES_PER_DAY
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.reconstruction import ReconstructedDay, reconstruct_day
+from consumption.selectors import iter_day_indexes
+from consumption.utils import apply_minute_samples
+
+# A finalized day's edges only change with its fingerprint, part of the key
+DAY_EDGES_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# {label: (first known slot, its index, last known slot, its index)}
+DayEdges = dict[str, tuple[int, int, int, int]]
+
+
+def compute_day_edges(index_series: dict[str, list[int | None]]) -> DayEdges:
+    """First and last known index of each label of a day's series."""
+    edges = {}
+    for label, series in index_series.items():
+        known_slots = [slot for slot, index in enumerate(series) if index is not None]
+        if known_slots:
+            first_slot, last_slot = known_slots[0], known_slots[-1]
+            edges[label] = (
+                first_slot,
+                series[first_slot],
+                last_slot,
+                series[last_slot],
+            )
+    return edges
+
+
+def get_day_edges_cache_key(day: date, fingerprint: str) -> str:
+    return f"consumption_day_edges:{day.isoformat()}:{fingerprint}"
+
+
+def load_day_edges(days: Iterable[date]) -> dict[date, DayEdges]:
+    """
+    Edges of the recorded days among `days`: from the cache for the days
+    finalized by the current version, from their rows (merged with their
+    pending minute samples) loaded in one query otherwise.
+    """
+    days = set(days)
+    cache_keys = {
+        day: get_day_edges_cache_key(day, fingerprint)
+        for day, fingerprint in DailyIndexes.objects.filter(
+            date__in=days, finalized_version=FINALIZATION_VERSION
+        ).values_list("date", "finalized_fingerprint")
+    }
+    cached = cache.get_many(list(cache_keys.values()))
+    edges = {
+        day: cached[cache_key]
+        for day, cache_key in cache_keys.items()
+        if cache_key in cached
+    }
+
+    missing_days = days - edges.keys()
+    if not missing_days:
+        return edges
+
+    samples_by_day = defaultdict(list)
+    for sample in MinuteIndexSample.objects.filter(date__in=missing_days).order_by(
+        "date", "minute", "label"
+    ):
+        samples_by_day[sample.date].append(sample)
+    rows = {
+        daily_indexes.date: daily_indexes
+        for daily_indexes in DailyIndexes.objects.filter(date__in=missing_days)
+    }
+    for day in missing_days:
+        daily_indexes = rows.get(day)
+        if day in samples_by_day:
+            daily_indexes = apply_minute_samples(
+                daily_indexes or DailyIndexes(date=day), samples_by_day[day]
+            )
+        if daily_indexes is not None:
+            edges[day] = compute_day_edges(daily_indexes.get_index_series())
+
+    cache.set_many(
+        {
+            cache_key: edges[day]
+            for day, cache_key in cache_keys.items()
+            if cache_key not in cached and day not in samples_by_day
+        },
+        timeout=DAY_EDGES_CACHE_TIMEOUT,
+    )
+    return edges
+
+
+def _fill_span(
+    series: list[int | None],
+    interpolated: list[bool],
+    start: tuple[int, int],
+    end: tuple[int, int],
+) -> None:
+    """
+    Interpolates the unknown slots of `series` between two known (slot,
+    index) points, slots possibly outside the day (-1440 being the previous
+    day's "00:00"), as interpolate_index_series does.
+    """
+    (start_slot, start_index), (end_slot, end_index) = start, end
+    base_step, remainder = divmod(end_index - start_index, end_slot - start_slot)
+    for slot in range(max(start_slot, 0), min(end_slot, MINUTES_PER_DAY) + 1):
+        if series[slot] is not None:
+            continue
+        steps = slot - start_slot
+        series[slot] = start_index + steps * base_step + min(steps, remainder)
+        # The other day's edge itself is a reading, not an interpolation
+        interpolated[slot] = slot not in (start_slot, end_slot)
+
+
+def bridge_reconstructed_day(
+    reconstructed: ReconstructedDay,
+    previous_edges: DayEdges | None,
+    next_edges: DayEdges | None,
+) -> ReconstructedDay:
+    """
+    Fills the leading and trailing gaps of a reconstructed day from the
+    edges of the day before and after it (None when not recorded).
+
+    Returns:
+        A new ReconstructedDay, `reconstructed` itself when there is
+        nothing to bridge.
+    """
+    index_series = dict(reconstructed.index_series)
+    interpolated = dict(reconstructed.interpolated)
+    bridged = False
+    for label, (first_slot, first_index, last_slot, last_index) in compute_day_edges(
+        reconstructed.index_series
+    ).items():
+        previous = (previous_edges or {}).get(label)
+        bridge_head = first_slot > 0 and previous is not None
+        following = (next_edges or {}).get(label)
+        bridge_tail = last_slot < MINUTES_PER_DAY and following is not None
+        if not bridge_head and not bridge_tail:
+            continue
+        bridged = True
+
+        series = index_series[label] = list(index_series[label])
+        flags = interpolated[label] = list(interpolated[label])
+        if bridge_head:
+            _, _, previous_slot, previous_index = previous
+            _fill_span(
+                series,
+                flags,
+                (previous_slot - MINUTES_PER_DAY, previous_index),
+                (first_slot, first_index),
+            )
+        if bridge_tail:
+            next_slot, next_index, _, _ = following
+            _fill_span(
+                series,
+                flags,
+                (last_slot, last_index),
+                (next_slot + MINUTES_PER_DAY, next_index),
+            )
+
+    if not bridged:
+        return reconstructed
+    return replace(reconstructed, index_series=index_series, interpolated=interpolated)
+
+
+def iter_bridged_days(
+    start: date, end: date
+) -> Iterator[tuple[DailyIndexes, ReconstructedDay]]:
+    """
+    Yields (daily_indexes, reconstruction) for every recorded day of
+    [start, end] (both included), in date order, gaps spanning midnight
+    being bridged from the neighbouring days (see bridge_reconstructed_day).
+    Each day is held until the next one is read.
+    """
+    one_day = timedelta(days=1)
+    before, after = start - one_day, end + one_day
+    outer_edges = load_day_edges([before, after])
+
+    # (daily_indexes, reconstruction, edges of the day before) of the day held
+    held = None
+    previous_day, previous_edges = before, outer_edges.get(before)
+    for daily_indexes in iter_day_indexes(start, end):
+        day = daily_indexes.date
+        reconstructed = reconstruct_day(daily_indexes, day)
+        edges = compute_day_edges(reconstructed.index_series)
+        consecutive = day == previous_day + one_day
+        if held is not None:
+            yield _bridge_held_day(held, edges if consecutive else None)
+        held = (daily_indexes, reconstructed, previous_edges if consecutive else None)
+        previous_day, previous_edges = day, edges
+
+    if held is not None:
+        yield _bridge_held_day(
+            held, outer_edges.get(after) if previous_day == end else None
+        )
+
+
+def _bridge_held_day(
+    held: tuple[DailyIndexes, ReconstructedDay, DayEdges | None],
+    next_edges: DayEdges | None,
+) -> tuple[DailyIndexes, ReconstructedDay]:
+    daily_indexes, reconstructed, previous_edges = held
+    return daily_indexes, bridge_reconstructed_day(
+        reconstructed, previous_edges, next_edges
+    )
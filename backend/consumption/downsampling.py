@@ -0,0 +1,106 @@
+"""
+Shape-preserving downsampling of long power curves.
+
+Plotting every minute of a week (10k+ points) is wasteful, and plain
+averages over large buckets flatten short peaks. Two strategies bound the
+number of points while keeping the shape of the curve:
+
+  - lttb: Largest-Triangle-Three-Buckets (Steinarsson, 2013) keeps, in each
+    bucket, the actual point forming the largest triangle with the point
+    kept in the previous bucket and the average of the next one, so peaks
+    and dips survive;
+  - min_max_envelope: the min, max and mean of each bucket, to draw the
+    envelope of the curve (a peak always shows up as the bucket's max).
+
+Both work on plain (x, y) sequences, x increasing.
+"""
+
+from collections.abc import Sequence
+
+
+def lttb(
+    points: Sequence[tuple[float, float]], threshold: int
+) -> list[tuple[float, float]]:
+    """
+    Downsamples points to `threshold` points with Largest-Triangle-Three-Buckets.
+
+    Args:
+        points: The (x, y) points, ordered by x.
+        threshold: The number of points to keep, at least 3. The first and
+                   last points are always kept.
+
+    Returns:
+        The kept points, a subset of `points` in the same order (all of them
+        when there are no more than `threshold`).
+    """
+    if threshold < 3:
+        raise ValueError(f"LTTB needs a threshold of at least 3, got {threshold}.")
+
+    point_count = len(points)
+    if point_count <= threshold:
+        return list(points)
+
+    # The first and last points are kept, the others split into buckets
+    bucket_size = (point_count - 2) / (threshold - 2)
+    sampled = [points[0]]
+    selected = 0
+
+    for bucket in range(threshold - 2):
+        # Average of the next bucket (the last point for the last bucket)
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, point_count)
+        next_points = points[next_start:next_end]
+        average_x = sum(x for x, _ in next_points) / len(next_points)
+        average_y = sum(y for _, y in next_points) / len(next_points)
+
+        selected_x, selected_y = points[selected]
+        best_area = -1.0
+        best_index = next_start - 1
+        for index in range(int(bucket * bucket_size) + 1, next_start):
+            x, y = points[index]
+            # Twice the triangle area, enough to compare
+            area = abs(
+                (selected_x - average_x) * (y - selected_y)
+                - (selected_x - x) * (average_y - selected_y)
+            )
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        sampled.append(points[best_index])
+        selected = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def min_max_envelope(
+    values: Sequence[float | None], bucket_count: int
+) -> list[tuple[int, float, float, float]]:
+    """
+    Splits a regular series into `bucket_count` buckets of (almost) equal
+    size and returns the envelope of each.
+
+    Args:
+        values: The regularly spaced values, None where unknown.
+        bucket_count: The number of buckets, at least 1.
+
+    Returns:
+        A (start position, min, max, mean) tuple per bucket having at least
+        one known value, start position being the index of the bucket's
+        first value in `values`.
+    """
+    if bucket_count < 1:
+        raise ValueError(f"At least one bucket is needed, got {bucket_count}.")
+
+    value_count = len(values)
+    bucket_count = min(bucket_count, value_count)
+    envelope = []
+    for bucket in range(bucket_count):
+        start = bucket * value_count // bucket_count
+        end = (bucket + 1) * value_count // bucket_count
+        known = [value for value in values[start:end] if value is not None]
+        if known:
+            envelope.append((start, min(known), max(known), sum(known) / len(known)))
+
+    return envelope
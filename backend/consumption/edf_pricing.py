@@ -1,78 +1,167 @@
+"""
+EDF tariff engine.
+
+Price grids are stored in the database (PricingPeriod with its KwhPrice and
+SubscriptionPrice rows, edited in the admin) and compiled into an immutable
+PriceTimeline: start dates sorted once and looked up with bisect, kWh prices
+already converted to euros, one mapping per period. Pricing a minute, a day
+or a whole year then costs a binary search and dict lookups.
+
+The compiled timeline is kept in memory for PRICE_TIMELINE_TTL_SECONDS, and
+dropped right away when a price is edited in this process (see
+consumption/signals.py): other processes pick the change up within the TTL.
+"""
+
+import calendar
+import hashlib
+import time
+from bisect import bisect_right
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
 from datetime import date
+from types import MappingProxyType
 
-from teleinfo.constants import TarifPeriods
-
-pricing = {
-    date(2026, 6, 26): {
-        "kwh": {
-            TarifPeriods.TH: 0,
-            TarifPeriods.HC: 13.3692,
-            TarifPeriods.HP: 17.2572,
-            TarifPeriods.HN: 0,
-            TarifPeriods.PM: 0,
-            TarifPeriods.HCJB: 0,
-            TarifPeriods.HPJB: 0,
-            TarifPeriods.HCJW: 0,
-            TarifPeriods.HPJW: 0,
-            TarifPeriods.HCJR: 0,
-            TarifPeriods.HPJR: 0,
-        }
-    },
-    date(2025, 7, 10): {
-        "kwh": {
-            TarifPeriods.TH: 20.16,
-            TarifPeriods.HC: 14.1854,
-            TarifPeriods.HP: 17.8754,
-            TarifPeriods.HN: 0,
-            TarifPeriods.PM: 0,
-            TarifPeriods.HCJB: 12.88,
-            TarifPeriods.HPJB: 15.52,
-            TarifPeriods.HCJW: 14.47,
-            TarifPeriods.HPJW: 17.92,
-            TarifPeriods.HCJR: 15.18,
-            TarifPeriods.HPJR: 65.86,
-        }
-    },
-    date(2025, 2, 1): {
-        "kwh": {
-            TarifPeriods.TH: 20.16,
-            TarifPeriods.HC: 16.96,
-            TarifPeriods.HP: 21.46,
-            TarifPeriods.HN: 0,
-            TarifPeriods.PM: 0,
-            TarifPeriods.HCJB: 12.88,
-            TarifPeriods.HPJB: 15.52,
-            TarifPeriods.HCJW: 14.47,
-            TarifPeriods.HPJW: 17.92,
-            TarifPeriods.HCJR: 15.18,
-            TarifPeriods.HPJR: 65.86,
+from consumption.models import PricingPeriod
+
+PRICE_TIMELINE_TTL_SECONDS = 60
+
+_EMPTY_PRICES: Mapping = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class PriceTimeline:
+    """
+    Compiled price grids, ordered by start date.
+
+    kwh_prices[i] maps each tarif period to its price in euros per kWh,
+    subscription_prices[i] maps (tarif period type, subscribed power in kVA)
+    to the subscription price in euros per month, both applicable from
+    start_dates[i] until start_dates[i + 1].
+    """
+
+    start_dates: tuple[date, ...]
+    kwh_prices: tuple[Mapping[str, float], ...]
+    subscription_prices: tuple[Mapping[tuple[str, int], float], ...]
+    version: str
+
+    def _period_position(self, day: date) -> int:
+        # -1 when `day` is before the first known grid
+        return bisect_right(self.start_dates, day) - 1
+
+    def get_kwh_prices(self, day: date) -> Mapping[str, float]:
+        """Euros per kWh of every tarif period on `day`, empty if unknown."""
+        position = self._period_position(day)
+        return self.kwh_prices[position] if position >= 0 else _EMPTY_PRICES
+
+    def get_kwh_price(self, day: date, tarif_period: str) -> float:
+        """Euros per kWh of `tarif_period` on `day`, 0 if unknown."""
+        return self.get_kwh_prices(day).get(tarif_period, 0)
+
+    def get_price_vector(
+        self, day: date, tarif_periods: Iterable[str | None]
+    ) -> list[float]:
+        """
+        Euros per kWh of each entry of a day's tarif period series (e.g. one
+        per minute), 0 where the tarif period is unknown.
+        """
+        prices = self.get_kwh_prices(day)
+        return [prices.get(tarif_period, 0) for tarif_period in tarif_periods]
+
+    def get_daily_subscription_cost(
+        self,
+        day: date,
+        tarif_period_type: str | None,
+        subscribed_power: float | None,
+    ) -> float | None:
+        """
+        Share of the subscription (abonnement) for one day: the monthly
+        price spread evenly over the days of the year.
+
+        Returns:
+            The cost in euros, or None if the option, the subscribed power
+            or its price is unknown.
+        """
+        position = self._period_position(day)
+        if position < 0 or tarif_period_type is None or subscribed_power is None:
+            return None
+        euros_per_month = self.subscription_prices[position].get(
+            (tarif_period_type, round(subscribed_power))
+        )
+        if euros_per_month is None:
+            return None
+        days_in_year = 366 if calendar.isleap(day.year) else 365
+        return euros_per_month * 12 / days_in_year
+
+
+def compile_price_timeline() -> PriceTimeline:
+    """Loads every price grid from the database and compiles it."""
+    start_dates = []
+    kwh_prices = []
+    subscription_prices = []
+    fingerprint = hashlib.sha1()
+
+    pricing_periods = PricingPeriod.objects.order_by("start_date").prefetch_related(
+        "kwh_prices", "subscription_prices"
+    )
+    for pricing_period in pricing_periods:
+        period_kwh_prices = {
+            kwh_price.tarif_period: float(kwh_price.cents_per_kwh) / 100
+            for kwh_price in pricing_period.kwh_prices.all()
         }
-    },
-    date(2024, 2, 1): {
-        "kwh": {
-            TarifPeriods.TH: 0.1,
-            TarifPeriods.HC: 0.2,
-            TarifPeriods.HP: 0.3,
-            TarifPeriods.HN: 0.4,
-            TarifPeriods.PM: 0.5,
-            TarifPeriods.HCJB: 0.6,
-            TarifPeriods.HPJB: 0.7,
-            TarifPeriods.HCJW: 0.8,
-            TarifPeriods.HPJW: 0.9,
-            TarifPeriods.HCJR: 1.0,
-            TarifPeriods.HPJR: 1.1,
+        period_subscription_prices = {
+            (price.tarif_period_type, price.subscribed_power): float(
+                price.euros_per_month
+            )
+            for price in pricing_period.subscription_prices.all()
         }
-    },
-}
+        start_dates.append(pricing_period.start_date)
+        kwh_prices.append(MappingProxyType(period_kwh_prices))
+        subscription_prices.append(MappingProxyType(period_subscription_prices))
+        fingerprint.update(
+            repr(
+                (
+                    pricing_period.start_date,
+                    sorted(period_kwh_prices.items()),
+                    sorted(period_subscription_prices.items()),
+                )
+            ).encode()
+        )
+
+    return PriceTimeline(
+        start_dates=tuple(start_dates),
+        kwh_prices=tuple(kwh_prices),
+        subscription_prices=tuple(subscription_prices),
+        version=fingerprint.hexdigest()[:12],
+    )
+
+
+_compiled_timeline: PriceTimeline | None = None
+_compiled_at = 0.0
+
+
+def get_price_timeline() -> PriceTimeline:
+    """Returns the compiled price timeline, recompiled at most every TTL."""
+    global _compiled_timeline, _compiled_at
+    now = time.monotonic()
+    if _compiled_timeline is None or now - _compiled_at >= PRICE_TIMELINE_TTL_SECONDS:
+        _compiled_timeline = compile_price_timeline()
+        _compiled_at = now
+    return _compiled_timeline
+
+
+def invalidate_price_timeline() -> None:
+    """Forces the next get_price_timeline() call to recompile the grids."""
+    global _compiled_timeline
+    _compiled_timeline = None
 
 
 def get_kwh_price(date: date, tarif_period: str) -> float:
-    start_date_list = sorted(pricing.keys(), reverse=True)
-    if date < start_date_list[-1]:
-        return 0
-    for start_date in start_date_list:
-        if date >= start_date:
-            try:
-                return pricing[start_date]["kwh"][tarif_period] / 100
-            except KeyError:
-                return 0
+    return get_price_timeline().get_kwh_price(date, tarif_period)
+
+
+def get_pricing_version() -> str:
+    """
+    Short fingerprint of the price grids, changing whenever any price
+    does. Used to key cached consumption responses.
+    """
+    return get_price_timeline().version
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consumption.services.parquet_archive import archive_closed_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive l'historique reconstruit des journées closes finalisées dans "
+        "un jeu Parquet partitionné par mois, en ne réécrivant que les mois "
+        "ayant des journées nouvelles ou modifiées (nécessite pyarrow)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Dossier de l'archive Parquet")
+
+    def handle(self, *args, **options):
+        try:
+            written = archive_closed_days(Path(options["path"]))
+        except ImportError as error:
+            raise CommandError(
+                f"The Parquet archive needs pyarrow (pip install pyarrow): {error}"
+            )
+        except OSError as error:
+            raise CommandError(f"Cannot write {options['path']}: {error}")
+        self.stdout.write(
+            f"{written['days']} jours archivés "
+            f"({written['months']} mois, {written['rows']} lignes)"
+        )
@@ -0,0 +1,40 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from consumption.management.commands.backfill_consumption_rollups import parse_date
+from consumption.selectors import iter_day_indexes
+from consumption.services.base_load import refresh_step_changes, save_day_base_load
+from core.constants import LoggerLabel
+
+logger = logging.getLogger("django")
+
+
+class Command(BaseCommand):
+    help = (
+        "(Re)calcule la consommation de veille (DailyBaseLoad) de chaque jour à "
+        "partir des DailyIndexes, puis les ruptures de niveau."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_date, help="Premier jour inclus")
+        parser.add_argument("--end", type=parse_date, help="Dernier jour inclus")
+
+    def handle(self, *args, **options):
+        # One day in memory at a time, step changes detected once at the end
+        computed_days = 0
+        for daily_indexes in iter_day_indexes(options["start"], options["end"]):
+            # Downsampled days lost the minutes their base load was made of
+            if daily_indexes.resolution > 1:
+                continue
+            save_day_base_load(daily_indexes)
+            computed_days += 1
+        step_changes = refresh_step_changes()
+
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} Base load computed for {computed_days} days, "
+            f"{step_changes} step changes"
+        )
+        self.stdout.write(
+            f"{computed_days} jours recalculés, {step_changes} ruptures de niveau"
+        )
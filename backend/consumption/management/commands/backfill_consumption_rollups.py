@@ -0,0 +1,41 @@
+import logging
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consumption.selectors import iter_day_indexes
+from consumption.services.rollups import rebuild_day_rollups
+from core.constants import LoggerLabel
+
+logger = logging.getLogger("django")
+
+
+def parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = (
+        "(Re)calcule les agrégats horaires et journaliers de consommation "
+        "(HourlyConsumption / DailyConsumption) à partir des DailyIndexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_date, help="Premier jour inclus")
+        parser.add_argument("--end", type=parse_date, help="Dernier jour inclus")
+
+    def handle(self, *args, **options):
+        # One day in memory at a time
+        rebuilt_days = 0
+        for daily_indexes in iter_day_indexes(options["start"], options["end"]):
+            rebuild_day_rollups(daily_indexes)
+            rebuilt_days += 1
+
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} Consumption rollups rebuilt for "
+            f"{rebuilt_days} days"
+        )
+        self.stdout.write(f"{rebuilt_days} jours recalculés")
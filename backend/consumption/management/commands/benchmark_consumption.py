@@ -0,0 +1,62 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from consumption.benchmarking import (
+    benchmark_environment,
+    build_benchmark_report,
+    generate_synthetic_history,
+    run_consumption_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les performances du pipeline de consommation (reconstruction, "
+        "totaux, périodes tarifaires, enregistrement minute, endpoint "
+        "journalier) sur un historique synthétique de plusieurs années, généré "
+        "dans une base SQLite temporaire supprimée à la fin. Les résultats sont "
+        "écrits en JSON pour comparer les versions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--years", type=int, default=3, help="Années d'historique généré"
+        )
+        parser.add_argument(
+            "--runs", type=int, default=20, help="Mesures par cas (médiane, p90...)"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output", help="Fichier JSON des résultats (sortie standard sinon)"
+        )
+        parser.add_argument("--label", default="", help="Libellé de la version mesurée")
+
+    def handle(self, *args, **options):
+        end = timezone.localdate() - timedelta(days=1)
+        start = end - timedelta(days=365 * options["years"] - 1)
+
+        with benchmark_environment():
+            self.stderr.write(f"Génération de l'historique du {start} au {end}...")
+            generate_synthetic_history(start, end, options["seed"])
+            results = run_consumption_benchmarks(
+                start, end, options["runs"], options["seed"]
+            )
+
+        for name, result in results.items():
+            self.stderr.write(
+                f"{name:<36} médiane {result['median_ms']:8.2f} ms  "
+                f"p90 {result['p90_ms']:8.2f} ms"
+            )
+
+        report = build_benchmark_report(
+            results, start, end, options["seed"], options["label"]
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stderr.write(f"Résultats écrits dans {options['output']}")
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
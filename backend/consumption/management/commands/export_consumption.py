@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from consumption.constants import ALLOWED_CONSUMPTION_STEPS
+from consumption.management.commands.backfill_consumption_rollups import parse_date
+from consumption.services.export import (
+    iter_consumption_rows,
+    iter_csv_lines,
+    iter_ndjson_lines,
+)
+
+LINE_FORMATTERS = {"csv": iter_csv_lines, "ndjson": iter_ndjson_lines}
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte la consommation reconstruite d'une plage de dates en CSV ou "
+        "NDJSON, en flux (une seule journée en mémoire)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start", type=parse_date, required=True, help="Premier jour inclus"
+        )
+        parser.add_argument(
+            "--end", type=parse_date, required=True, help="Dernier jour inclus"
+        )
+        parser.add_argument(
+            "--step", type=int, choices=ALLOWED_CONSUMPTION_STEPS, default=1
+        )
+        parser.add_argument("--format", choices=list(LINE_FORMATTERS), default="csv")
+        parser.add_argument(
+            "--output", help="Fichier de sortie (sortie standard par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        rows = iter_consumption_rows(options["start"], options["end"], options["step"])
+        lines = LINE_FORMATTERS[options["format"]](rows)
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from consumption.constants import FINALIZATION_BATCH_DAYS
+from consumption.management.commands.backfill_consumption_rollups import parse_date
+from consumption.services.finalization import finalize_closed_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Fige la reconstruction (index interpolés, périodes tarifaires "
+        "complétées, totaux) des journées closes pas encore finalisées par la "
+        "version courante."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_date, help="Premier jour inclus")
+        parser.add_argument("--end", type=parse_date, help="Dernier jour inclus")
+        parser.add_argument(
+            "--recheck",
+            action="store_true",
+            help="Revérifie aussi les journées déjà finalisées",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=FINALIZATION_BATCH_DAYS,
+            help="Jours traités par transaction",
+        )
+
+    def handle(self, *args, **options):
+        finalized_days = finalize_closed_days(
+            options["start"],
+            options["end"],
+            options["recheck"],
+            options["batch_size"],
+        )
+        self.stdout.write(f"{finalized_days} jours finalisés")
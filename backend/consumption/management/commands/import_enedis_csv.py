@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from consumption.constants import ENEDIS_IMPORT_BATCH_DAYS, EnedisCsvKind
+from consumption.services.enedis_import import import_enedis_csv
+from consumption.services.tariff_simulator import parse_hc_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un export Enedis (courbe de charge ou index quotidiens) dans "
+        "les DailyIndexes, en flux et par lots, pour les périodes non "
+        "enregistrées par la teleinfo. Les minutes entre deux relevés Enedis "
+        "sont reconstruites par interpolation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier CSV exporté depuis l'espace Enedis")
+        parser.add_argument(
+            "--kind",
+            choices=list(EnedisCsvKind),
+            default=EnedisCsvKind.LOAD_CURVE,
+            help="Courbe de charge (W) ou index quotidiens (Wh)",
+        )
+        parser.add_argument(
+            "--hc-schedule",
+            help=(
+                "Plages HC, ex. 22:00-06:00 : répartit la consommation entre "
+                "HCHC et HCHP (BASE par défaut)"
+            ),
+        )
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Remplace les jours déjà enregistrés (ignorés par défaut)",
+        )
+        parser.add_argument("--batch-size", type=int, default=ENEDIS_IMPORT_BATCH_DAYS)
+
+    def handle(self, *args, **options):
+        hc_flags = None
+        if options["hc_schedule"]:
+            try:
+                hc_flags = parse_hc_schedule(options["hc_schedule"])
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as csv_file:
+                counts = import_enedis_csv(
+                    csv_file,
+                    EnedisCsvKind(options["kind"]),
+                    hc_flags,
+                    overwrite=options["overwrite"],
+                    batch_size=options["batch_size"],
+                )
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(
+            f"{counts['created']} jours importés, {counts['updated']} remplacés, "
+            f"{counts['skipped']} ignorés"
+        )
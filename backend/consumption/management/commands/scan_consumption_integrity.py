@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from consumption.constants import INTEGRITY_SCAN_BATCH_DAYS
+from consumption.management.commands.backfill_consumption_rollups import parse_date
+from consumption.services.integrity import scan_consumption_integrity
+
+
+class Command(BaseCommand):
+    help = (
+        "Recherche dans l'historique des DailyIndexes les remises à zéro de "
+        "compteur, les index qui reculent et les sauts impossibles vu l'ISOUSC, "
+        "et enregistre les réparations appliquées à la lecture."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_date, help="Premier jour inclus")
+        parser.add_argument("--end", type=parse_date, help="Dernier jour inclus")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=INTEGRITY_SCAN_BATCH_DAYS,
+            help="Jours traités par transaction",
+        )
+
+    def handle(self, *args, **options):
+        counts = scan_consumption_integrity(
+            options["start"], options["end"], options["batch_size"]
+        )
+        self.stdout.write(
+            f"{counts['scanned_days']} jours analysés, {counts['changed_days']} "
+            f"modifiés : {counts['reset']} remises à zéro, {counts['regression']} "
+            f"reculs, {counts['jump']} sauts"
+        )
@@ -0,0 +1,196 @@
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+
+# Frozen copy of the packed format version 1 (consumption/packing.py when
+# this migration was written): replaying it must write the blobs this
+# schema step expects, whatever the current PACKED_FORMAT_VERSION.
+PACKED_FORMAT_VERSION = 1
+DAY_MINUTE_SLOTS = 1441
+BITMAP_SIZE = (DAY_MINUTE_SLOTS + 7) // 8
+DELTAS_SIZE = DAY_MINUTE_SLOTS * 4
+SLOT_MINUTE_STRS = [
+    f"{slot // 60:02d}:{slot % 60:02d}" for slot in range(DAY_MINUTE_SLOTS)
+]
+SLOT_BY_MINUTE_STR = {
+    minute_str: slot for slot, minute_str in enumerate(SLOT_MINUTE_STRS)
+}
+TARIF_PERIOD_CODES = {
+    "TH..": 1,
+    "HC..": 2,
+    "HP..": 3,
+    "HN..": 4,
+    "PM..": 5,
+    "HCJB": 6,
+    "HPJB": 7,
+    "HCJW": 8,
+    "HPJW": 9,
+    "HCJR": 10,
+    "HPJR": 11,
+}
+TARIF_PERIODS_BY_CODE = {code: period for period, code in TARIF_PERIOD_CODES.items()}
+
+
+def decompress(blob):
+    raw = zlib.decompress(bytes(blob))
+    if raw[0] != PACKED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed format version {raw[0]}.")
+    return raw
+
+
+def pack_values(values):
+    index_series = {}
+    for label, time_series in values.items():
+        if isinstance(time_series, dict) and time_series:
+            series = [None] * DAY_MINUTE_SLOTS
+            for minute_str, value in time_series.items():
+                slot = SLOT_BY_MINUTE_STR.get(minute_str)
+                if slot is not None:
+                    series[slot] = value
+            index_series[label] = series
+    if not index_series:
+        return b""
+
+    chunks = [struct.pack("<BB", PACKED_FORMAT_VERSION, len(index_series))]
+    for label, series in index_series.items():
+        bitmap = bytearray(BITMAP_SIZE)
+        deltas = array("i", [0]) * DAY_MINUTE_SLOTS
+        previous_value = 0
+        for slot, value in enumerate(series):
+            if value is None:
+                continue
+            bitmap[slot >> 3] |= 1 << (slot & 7)
+            deltas[slot] = value - previous_value
+            previous_value = value
+        if sys.byteorder == "big":
+            deltas.byteswap()
+        encoded_label = str(label).encode("ascii")
+        chunks.append(struct.pack("<B", len(encoded_label)))
+        chunks.append(encoded_label)
+        chunks.append(bytes(bitmap))
+        chunks.append(deltas.tobytes())
+    return zlib.compress(b"".join(chunks))
+
+
+def unpack_values(blob):
+    if not blob:
+        return {}
+    raw = decompress(blob)
+    values = {}
+    offset = 2
+    for _ in range(raw[1]):
+        label_length = raw[offset]
+        offset += 1
+        label = raw[offset : offset + label_length].decode("ascii")
+        offset += label_length
+        bitmap = raw[offset : offset + BITMAP_SIZE]
+        offset += BITMAP_SIZE
+        deltas = array("i")
+        deltas.frombytes(raw[offset : offset + DELTAS_SIZE])
+        offset += DELTAS_SIZE
+        if sys.byteorder == "big":
+            deltas.byteswap()
+        validity = [bool(byte >> bit & 1) for byte in bitmap for bit in range(8)]
+        values[label] = {
+            minute_str: value if is_known else None
+            for minute_str, value, is_known in zip(
+                SLOT_MINUTE_STRS, accumulate(deltas), validity
+            )
+        }
+    return values
+
+
+def pack_tarif_periods(tarif_periods):
+    codes = bytearray(DAY_MINUTE_SLOTS)
+    for minute_str, tarif_period in tarif_periods.items():
+        slot = SLOT_BY_MINUTE_STR.get(minute_str)
+        if slot is not None:
+            # Unknown tarif periods are stored as None, as packing.py does
+            codes[slot] = TARIF_PERIOD_CODES.get(tarif_period, 0)
+    if not any(codes):
+        return b""
+    return zlib.compress(bytes([PACKED_FORMAT_VERSION]) + bytes(codes))
+
+
+def unpack_tarif_periods(blob):
+    if not blob:
+        return {}
+    codes = decompress(blob)[1:]
+    if not any(codes):
+        return {}
+    return {
+        minute_str: TARIF_PERIODS_BY_CODE.get(code)
+        for minute_str, code in zip(SLOT_MINUTE_STRS, codes)
+    }
+
+
+def rewrite_rows(DailyIndexes, rewrite, fields):
+    # Ids listed upfront, SQLite not isolating a query from the writes made
+    # while iterating it: no row is skipped nor visited twice
+    pks = list(DailyIndexes.objects.order_by("date").values_list("pk", flat=True))
+    for position in range(0, len(pks), BATCH_SIZE):
+        batch = list(
+            DailyIndexes.objects.filter(pk__in=pks[position : position + BATCH_SIZE])
+        )
+        for daily_indexes in batch:
+            rewrite(daily_indexes)
+        DailyIndexes.objects.bulk_update(batch, fields)
+
+
+def pack_row(daily_indexes):
+    daily_indexes.packed_values = pack_values(daily_indexes.values or {})
+    daily_indexes.packed_tarif_periods = pack_tarif_periods(
+        daily_indexes.tarif_periods or {}
+    )
+
+
+def unpack_row(daily_indexes):
+    daily_indexes.values = unpack_values(daily_indexes.packed_values)
+    daily_indexes.tarif_periods = unpack_tarif_periods(
+        daily_indexes.packed_tarif_periods
+    )
+
+
+def pack_existing_rows(apps, schema_editor):
+    DailyIndexes = apps.get_model("consumption", "DailyIndexes")
+    rewrite_rows(DailyIndexes, pack_row, ["packed_values", "packed_tarif_periods"])
+
+
+def unpack_existing_rows(apps, schema_editor):
+    DailyIndexes = apps.get_model("consumption", "DailyIndexes")
+    rewrite_rows(DailyIndexes, unpack_row, ["values", "tarif_periods"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumption', '0003_dailyindexes_subscribed_power'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyindexes',
+            name='packed_values',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name='dailyindexes',
+            name='packed_tarif_periods',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(pack_existing_rows, unpack_existing_rows),
+        migrations.RemoveField(
+            model_name='dailyindexes',
+            name='values',
+        ),
+        migrations.RemoveField(
+            model_name='dailyindexes',
+            name='tarif_periods',
+        ),
+    ]
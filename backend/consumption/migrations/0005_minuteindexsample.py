@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0004_pack_dailyindexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MinuteIndexSample",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("minute", models.PositiveSmallIntegerField()),
+                ("label", models.CharField(max_length=10)),
+                ("index", models.PositiveIntegerField()),
+                ("tarif_period_code", models.PositiveSmallIntegerField(default=0)),
+                ("subscribed_power", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "minute", "label"),
+                        name="unique_minute_index_sample",
+                    )
+                ],
+            },
+        ),
+    ]
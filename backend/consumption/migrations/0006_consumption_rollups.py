@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0005_minuteindexsample"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyConsumption",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("tarif_period", models.CharField(max_length=4)),
+                ("wh", models.IntegerField(default=0)),
+                ("euros", models.FloatField(default=0)),
+                ("interpolated_minutes", models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["date", "tarif_period"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "tarif_period"), name="unique_daily_consumption"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlyConsumption",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("hour", models.PositiveSmallIntegerField()),
+                ("tarif_period", models.CharField(max_length=4)),
+                ("wh", models.IntegerField(default=0)),
+                ("euros", models.FloatField(default=0)),
+                ("interpolated_minutes", models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["date", "hour", "tarif_period"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "hour", "tarif_period"),
+                        name="unique_hourly_consumption",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:38
+
+import zlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+METADATA_FIELDS = ["tarif_period_type", "tempo_color", "tarif_periods_complete"]
+
+# Frozen copies of the packed format version 1 and of the tarif period
+# tables (consumption/packing.py and constants.py when this migration was
+# written), so that replaying it doesn't depend on their current state.
+PACKED_FORMAT_VERSION = 1
+TARIF_PERIODS_BY_CODE = {
+    1: "TH..",
+    2: "HC..",
+    3: "HP..",
+    4: "HN..",
+    5: "PM..",
+    6: "HCJB",
+    7: "HPJB",
+    8: "HCJW",
+    9: "HPJW",
+    10: "HCJR",
+    11: "HPJR",
+}
+TARIF_PERIOD_TYPE_BY_TARIF_PERIOD = {
+    "TH..": "TH",
+    "HC..": "HC_HP",
+    "HP..": "HC_HP",
+    "HN..": "EJP",
+    "PM..": "EJP",
+    "HCJB": "TEMPO",
+    "HPJB": "TEMPO",
+    "HCJW": "TEMPO",
+    "HPJW": "TEMPO",
+    "HCJR": "TEMPO",
+    "HPJR": "TEMPO",
+}
+TEMPO_COLOR_BY_TARIF_PERIOD = {
+    "HCJB": "B",
+    "HPJB": "B",
+    "HCJW": "W",
+    "HPJW": "W",
+    "HCJR": "R",
+    "HPJR": "R",
+}
+
+
+def unpack_tarif_period_series(blob):
+    if not blob:
+        return []
+    raw = zlib.decompress(bytes(blob))
+    if raw[0] != PACKED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed format version {raw[0]}.")
+    codes = raw[1:]
+    if not any(codes):
+        return []
+    return [TARIF_PERIODS_BY_CODE.get(code) for code in codes]
+
+
+def first_match(series, mapping):
+    return next(
+        (mapping[tarif_period] for tarif_period in series if tarif_period in mapping),
+        None,
+    )
+
+
+def backfill_tarif_metadata(apps, schema_editor):
+    DailyIndexes = apps.get_model("consumption", "DailyIndexes")
+    # Ids listed upfront, SQLite not isolating a query from the writes made
+    # while iterating it: no row is skipped nor visited twice
+    pks = list(DailyIndexes.objects.order_by("date").values_list("pk", flat=True))
+    for position in range(0, len(pks), BATCH_SIZE):
+        batch = list(
+            DailyIndexes.objects.filter(
+                pk__in=pks[position : position + BATCH_SIZE]
+            ).only("packed_tarif_periods")
+        )
+        for daily_indexes in batch:
+            series = unpack_tarif_period_series(daily_indexes.packed_tarif_periods)
+            daily_indexes.tarif_period_type = first_match(
+                series, TARIF_PERIOD_TYPE_BY_TARIF_PERIOD
+            )
+            daily_indexes.tempo_color = first_match(series, TEMPO_COLOR_BY_TARIF_PERIOD)
+            daily_indexes.tarif_periods_complete = bool(series) and None not in series
+        DailyIndexes.objects.bulk_update(batch, METADATA_FIELDS)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0006_consumption_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="tarif_period_type",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("TH", "TH"),
+                    ("HC_HP", "HC_HP"),
+                    ("EJP", "EJP"),
+                    ("TEMPO", "TEMPO"),
+                ],
+                max_length=5,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="tarif_periods_complete",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="tempo_color",
+            field=models.CharField(blank=True, max_length=1, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="dailyindexes",
+            index=models.Index(
+                fields=[
+                    "tarif_period_type",
+                    "tarif_periods_complete",
+                    "tempo_color",
+                    "date",
+                ],
+                name="dailyindexes_ref_day_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_tarif_metadata, migrations.RunPython.noop),
+    ]
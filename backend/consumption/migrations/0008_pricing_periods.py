@@ -0,0 +1,250 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:41
+
+import datetime
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Grids hard-coded in consumption/edf_pricing.py until now, in c€/kWh.
+INITIAL_KWH_PRICES = {
+    datetime.date(2026, 6, 26): {
+        "kwh": {
+            "TH..": 0,
+            "HC..": 13.3692,
+            "HP..": 17.2572,
+            "HN..": 0,
+            "PM..": 0,
+            "HCJB": 0,
+            "HPJB": 0,
+            "HCJW": 0,
+            "HPJW": 0,
+            "HCJR": 0,
+            "HPJR": 0,
+        }
+    },
+    datetime.date(2025, 7, 10): {
+        "kwh": {
+            "TH..": 20.16,
+            "HC..": 14.1854,
+            "HP..": 17.8754,
+            "HN..": 0,
+            "PM..": 0,
+            "HCJB": 12.88,
+            "HPJB": 15.52,
+            "HCJW": 14.47,
+            "HPJW": 17.92,
+            "HCJR": 15.18,
+            "HPJR": 65.86,
+        }
+    },
+    datetime.date(2025, 2, 1): {
+        "kwh": {
+            "TH..": 20.16,
+            "HC..": 16.96,
+            "HP..": 21.46,
+            "HN..": 0,
+            "PM..": 0,
+            "HCJB": 12.88,
+            "HPJB": 15.52,
+            "HCJW": 14.47,
+            "HPJW": 17.92,
+            "HCJR": 15.18,
+            "HPJR": 65.86,
+        }
+    },
+    datetime.date(2024, 2, 1): {
+        "kwh": {
+            "TH..": 0.1,
+            "HC..": 0.2,
+            "HP..": 0.3,
+            "HN..": 0.4,
+            "PM..": 0.5,
+            "HCJB": 0.6,
+            "HPJB": 0.7,
+            "HCJW": 0.8,
+            "HPJW": 0.9,
+            "HCJR": 1.0,
+            "HPJR": 1.1,
+        }
+    },
+}
+
+
+def create_initial_pricing_periods(apps, schema_editor):
+    PricingPeriod = apps.get_model("consumption", "PricingPeriod")
+    KwhPrice = apps.get_model("consumption", "KwhPrice")
+    for start_date, grid in INITIAL_KWH_PRICES.items():
+        pricing_period = PricingPeriod.objects.create(start_date=start_date)
+        KwhPrice.objects.bulk_create(
+            KwhPrice(
+                pricing_period=pricing_period,
+                tarif_period=tarif_period,
+                cents_per_kwh=Decimal(str(cents_per_kwh)),
+            )
+            for tarif_period, cents_per_kwh in grid["kwh"].items()
+        )
+
+
+def delete_pricing_periods(apps, schema_editor):
+    apps.get_model("consumption", "PricingPeriod").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0007_dailyindexes_tarif_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PricingPeriod",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(unique=True, verbose_name="Date d'application"),
+                ),
+                (
+                    "label",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Libellé"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Grille tarifaire",
+                "verbose_name_plural": "Grilles tarifaires",
+                "ordering": ["-start_date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="KwhPrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tarif_period",
+                    models.CharField(
+                        choices=[
+                            ("TH..", "TH.."),
+                            ("HC..", "HC.."),
+                            ("HP..", "HP.."),
+                            ("HN..", "HN.."),
+                            ("PM..", "PM.."),
+                            ("HCJB", "HCJB"),
+                            ("HCJW", "HCJW"),
+                            ("HCJR", "HCJR"),
+                            ("HPJB", "HPJB"),
+                            ("HPJW", "HPJW"),
+                            ("HPJR", "HPJR"),
+                        ],
+                        max_length=4,
+                        verbose_name="Période tarifaire",
+                    ),
+                ),
+                (
+                    "cents_per_kwh",
+                    models.DecimalField(
+                        decimal_places=4, max_digits=8, verbose_name="Prix (c€/kWh)"
+                    ),
+                ),
+                (
+                    "pricing_period",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="kwh_prices",
+                        to="consumption.pricingperiod",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Prix du kWh",
+                "verbose_name_plural": "Prix du kWh",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("pricing_period", "tarif_period"),
+                        name="unique_kwh_price",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SubscriptionPrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tarif_period_type",
+                    models.CharField(
+                        choices=[
+                            ("TH", "TH"),
+                            ("HC_HP", "HC_HP"),
+                            ("EJP", "EJP"),
+                            ("TEMPO", "TEMPO"),
+                        ],
+                        max_length=5,
+                        verbose_name="Option tarifaire",
+                    ),
+                ),
+                (
+                    "subscribed_power",
+                    models.PositiveSmallIntegerField(
+                        verbose_name="Puissance souscrite (kVA)"
+                    ),
+                ),
+                (
+                    "euros_per_month",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=8,
+                        verbose_name="Abonnement (€/mois)",
+                    ),
+                ),
+                (
+                    "pricing_period",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subscription_prices",
+                        to="consumption.pricingperiod",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Prix de l'abonnement",
+                "verbose_name_plural": "Prix de l'abonnement",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "pricing_period",
+                            "tarif_period_type",
+                            "subscribed_power",
+                        ),
+                        name="unique_subscription_price",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_initial_pricing_periods, delete_pricing_periods),
+    ]
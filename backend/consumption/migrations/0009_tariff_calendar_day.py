@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0008_pricing_periods"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TariffCalendarDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "tarif_period_type",
+                    models.CharField(
+                        choices=[("TEMPO", "TEMPO"), ("EJP", "EJP")],
+                        max_length=5,
+                        verbose_name="Option tarifaire",
+                    ),
+                ),
+                (
+                    "color",
+                    models.CharField(
+                        choices=[
+                            ("B", "Bleu"),
+                            ("W", "Blanc"),
+                            ("R", "Rouge / pointe mobile"),
+                        ],
+                        max_length=1,
+                        verbose_name="Couleur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Jour du calendrier tarifaire",
+                "verbose_name_plural": "Calendrier tarifaire (Tempo / EJP)",
+                "ordering": ["-date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "tarif_period_type"),
+                        name="unique_tariff_calendar_day",
+                    )
+                ],
+            },
+        ),
+    ]
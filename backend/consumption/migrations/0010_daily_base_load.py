@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0009_tariff_calendar_day"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyBaseLoad",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("base_load_watt", models.FloatField(blank=True, null=True)),
+                ("measured_minutes", models.PositiveSmallIntegerField(default=0)),
+                ("step_change", models.BooleanField(default=False)),
+            ],
+            options={
+                "ordering": ["date"],
+            },
+        ),
+    ]
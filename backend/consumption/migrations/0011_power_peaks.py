@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0010_daily_base_load"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyPowerPeak",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("peak_va", models.PositiveIntegerField()),
+                ("peak_minute", models.PositiveSmallIntegerField()),
+                ("peak_intensity", models.PositiveSmallIntegerField()),
+                ("measured_minutes", models.PositiveSmallIntegerField()),
+                ("va_histogram", models.JSONField(default=list)),
+                ("intensity_histogram", models.JSONField(default=list)),
+                (
+                    "subscribed_intensity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+            ],
+            options={
+                "ordering": ["date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MinutePowerSample",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("minute", models.PositiveSmallIntegerField()),
+                ("peak_va", models.PositiveIntegerField()),
+                ("peak_intensity", models.PositiveSmallIntegerField()),
+                (
+                    "subscribed_intensity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "minute"), name="unique_minute_power_sample"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0011_power_peaks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="resolution",
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
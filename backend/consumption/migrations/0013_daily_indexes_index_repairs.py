@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0012_daily_indexes_resolution"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="index_repairs",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("consumption", "0013_daily_indexes_index_repairs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="finalized_fingerprint",
+            field=models.CharField(blank=True, max_length=8),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="finalized_totals",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="finalized_version",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="packed_filled_tarif_periods",
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="packed_interpolated",
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name="dailyindexes",
+            name="packed_reconstructed_values",
+            field=models.BinaryField(default=bytes),
+        ),
+    ]
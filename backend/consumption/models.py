@@ -1,11 +1,512 @@
+import json
+import zlib
+
 from django.db import models
 
+from consumption.constants import (
+    FINALIZATION_VERSION,
+    TARIF_PERIOD_TYPE_BY_TARIF_PERIOD,
+    TEMPO_COLOR_BY_TARIF_PERIOD,
+    TarifPeriodType,
+)
+from consumption.packing import (
+    codes_to_tarif_period_series,
+    index_dict_to_series,
+    pack_tarif_periods,
+    pack_values,
+    series_to_index_dict,
+    tarif_periods_to_codes,
+    unpack_index_series,
+    unpack_tarif_period_codes,
+    unpack_tarif_period_series,
+    unpack_tarif_periods,
+    unpack_values,
+)
+from consumption.repairs import apply_index_repairs
+from teleinfo.constants import TarifPeriods
+
 
 class DailyIndexes(models.Model):
+    """
+    Minute-by-minute teleinfo indexes and tarif periods of one day.
+
+    Both are stored in the compact binary format of consumption/packing.py.
+    `values` and `tarif_periods` expose them in the historical
+    {"HH:MM": ...} dict shape: decoded lazily on first access, they can be
+    modified in place and are packed back on save(). Read-only callers
+    should prefer get_index_series() / get_tarif_period_series(), which
+    decode straight into minute-indexed lists without building any dict.
+
+    `values` holds the indexes as recorded; get_index_series() and
+    get_repaired_values() apply the repairs of the integrity scan
+    (index_repairs, see consumption/repairs.py) on top of them.
+
+    Once the day is closed, its reconstruction is frozen on the row as well
+    (see consumption/services/finalization.py), and used by the readers as
+    long as is_finalized().
+
+    The tariff family, Tempo color and completeness of the tarif periods are
+    also denormalized into indexed columns, recomputed on every save(), so
+    that reference days can be looked up without decoding any blob.
+    """
+
     date = models.DateField(unique=True)
-    values = models.JSONField(default=dict)
-    tarif_periods = models.JSONField(default=dict)
+    packed_values = models.BinaryField(default=bytes)
+    packed_tarif_periods = models.BinaryField(default=bytes)
     subscribed_power = models.FloatField(null=True, blank=True)
+    tarif_period_type = models.CharField(
+        max_length=5,
+        choices=[(type_.value, type_.value) for type_ in TarifPeriodType],
+        null=True,
+        blank=True,
+    )
+    # "B", "W" or "R" for Tempo days, None otherwise
+    tempo_color = models.CharField(max_length=1, null=True, blank=True)
+    # True when every minute of the day has a known tarif period
+    tarif_periods_complete = models.BooleanField(default=False)
+    # Minutes between two stored indexes: 1 as recorded, coarser once
+    # downsampled by the retention policy (see consumption/services/retention.py)
+    resolution = models.PositiveSmallIntegerField(default=1)
+    # Repair annotations of the integrity scan, applied at read time (see
+    # consumption/repairs.py)
+    index_repairs = models.JSONField(default=list, blank=True)
+    # Reconstruction of the closed day: gap-filled indexes, filled tarif
+    # periods, interpolation masks and [[index label, Wh], ...] totals, see
+    # is_finalized() for when they are used
+    finalized_version = models.PositiveSmallIntegerField(null=True, blank=True)
+    finalized_fingerprint = models.CharField(max_length=8, blank=True)
+    packed_reconstructed_values = models.BinaryField(default=bytes)
+    packed_filled_tarif_periods = models.BinaryField(default=bytes)
+    packed_interpolated = models.BinaryField(default=bytes)
+    finalized_totals = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=[
+                    "tarif_period_type",
+                    "tarif_periods_complete",
+                    "tempo_color",
+                    "date",
+                ],
+                name="dailyindexes_ref_day_idx",
+            )
+        ]
+
+    def __init__(self, *args, **kwargs):
+        self._values = None
+        self._tarif_periods = None
+        super().__init__(*args, **kwargs)
 
     def __str__(self):
         return f"Indexes du {self.date}"
+
+    @property
+    def values(self) -> dict[str, dict[str, int | None]]:
+        if self._values is None:
+            self._values = unpack_values(self.packed_values)
+        return self._values
+
+    @values.setter
+    def values(self, values: dict[str, dict[str, int | None]]) -> None:
+        self._values = values
+
+    @property
+    def tarif_periods(self) -> dict[str, str | None]:
+        if self._tarif_periods is None:
+            self._tarif_periods = unpack_tarif_periods(self.packed_tarif_periods)
+        return self._tarif_periods
+
+    @tarif_periods.setter
+    def tarif_periods(self, tarif_periods: dict[str, str | None]) -> None:
+        self._tarif_periods = tarif_periods
+
+    def get_index_series(self, repaired: bool = True) -> dict[str, list[int | None]]:
+        """
+        Indexes as {label: minute-indexed list}, slot 0 = "00:00", with
+        index_repairs applied unless `repaired` is False.
+        """
+        if self._values is not None:
+            index_series = {
+                label: index_dict_to_series(time_series)
+                for label, time_series in self._values.items()
+                if isinstance(time_series, dict) and time_series
+            }
+        else:
+            index_series = unpack_index_series(self.packed_values)
+        if repaired and self.index_repairs:
+            apply_index_repairs(index_series, self.index_repairs)
+        return index_series
+
+    def get_repaired_values(self) -> dict[str, dict[str, int | None]]:
+        """
+        `values` with index_repairs applied, for the dict-based readers. The
+        same dict as `values` when there is nothing to repair, a copy
+        otherwise.
+        """
+        if not self.index_repairs:
+            return self.values
+        return {
+            label: series_to_index_dict(series)
+            for label, series in self.get_index_series().items()
+        }
+
+    def get_tarif_period_series(self) -> list[str | None]:
+        """Tarif periods as a minute-indexed list, [] if none was recorded."""
+        if self._tarif_periods is not None:
+            return codes_to_tarif_period_series(
+                tarif_periods_to_codes(self._tarif_periods)
+            )
+        return unpack_tarif_period_series(self.packed_tarif_periods)
+
+    def get_tarif_period_codes(self) -> bytes:
+        """Raw uint8 tarif period codes (see TARIF_PERIOD_CODES), b"" if empty."""
+        if self._tarif_periods is not None:
+            codes = tarif_periods_to_codes(self._tarif_periods)
+            return bytes(codes) if any(codes) else b""
+        return unpack_tarif_period_codes(self.packed_tarif_periods)
+
+    def get_source_fingerprint(self) -> str:
+        """
+        CRC32 of the saved data the reconstruction derives from: packed
+        indexes, packed tarif periods and repairs.
+        """
+        fingerprint = zlib.crc32(bytes(self.packed_values))
+        fingerprint = zlib.crc32(bytes(self.packed_tarif_periods), fingerprint)
+        fingerprint = zlib.crc32(
+            json.dumps(self.index_repairs, sort_keys=True).encode(), fingerprint
+        )
+        return f"{fingerprint:08x}"
+
+    def is_finalized(self) -> bool:
+        """
+        True when the frozen reconstruction can be used instead of a new
+        one: written by the current FINALIZATION_VERSION, from the data
+        saved on the row, whose `values` / `tarif_periods` dicts weren't
+        decoded since (they may have been modified in place).
+        """
+        return (
+            self.finalized_version == FINALIZATION_VERSION
+            and self._values is None
+            and self._tarif_periods is None
+            and self.finalized_fingerprint == self.get_source_fingerprint()
+        )
+
+    def refresh_tarif_metadata(self) -> None:
+        """
+        Recomputes tarif_period_type, tempo_color and tarif_periods_complete
+        from the tarif periods. Called by save(), to be called explicitly
+        before bulk_create / bulk_update.
+        """
+        series = self.get_tarif_period_series()
+        self.tarif_period_type = next(
+            (
+                TARIF_PERIOD_TYPE_BY_TARIF_PERIOD[tarif_period]
+                for tarif_period in series
+                if tarif_period in TARIF_PERIOD_TYPE_BY_TARIF_PERIOD
+            ),
+            None,
+        )
+        self.tempo_color = next(
+            (
+                TEMPO_COLOR_BY_TARIF_PERIOD[tarif_period]
+                for tarif_period in series
+                if tarif_period in TEMPO_COLOR_BY_TARIF_PERIOD
+            ),
+            None,
+        )
+        self.tarif_periods_complete = bool(series) and None not in series
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._values = None
+        self._tarif_periods = None
+
+    def save(self, *args, **kwargs):
+        if self._values is not None:
+            self.packed_values = pack_values(self._values)
+        if self._tarif_periods is not None:
+            self.packed_tarif_periods = pack_tarif_periods(self._tarif_periods)
+        self.refresh_tarif_metadata()
+        # The frozen reconstruction may not match anymore, the day is
+        # finalized again by finalize_closed_days
+        self.finalized_version = None
+        super().save(*args, **kwargs)
+
+
+class MinuteIndexSample(models.Model):
+    """
+    One teleinfo index reading (one label at one minute), as written every
+    minute by save_teleinfo_data.
+
+    Append-only hot write path: recording a minute is a single small insert
+    instead of rewriting the whole day's packed DailyIndexes row. Samples of
+    closed days are folded into DailyIndexes and deleted by
+    compact_minute_samples; samples of the current day are merged with its
+    DailyIndexes at read time (see get_day_indexes).
+    """
+
+    date = models.DateField()
+    # Slot of the minute in the day: 0 = "00:00", 1440 = "24:00".
+    minute = models.PositiveSmallIntegerField()
+    label = models.CharField(max_length=10)
+    index = models.PositiveIntegerField()
+    # See TARIF_PERIOD_CODES, 0 when the tarif period is unknown.
+    tarif_period_code = models.PositiveSmallIntegerField(default=0)
+    subscribed_power = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "minute", "label"],
+                name="unique_minute_index_sample",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.label} du {self.date} (minute {self.minute}) : {self.index}"
+
+
+class HourlyConsumption(models.Model):
+    """
+    Consumption of one hour of one day for one tarif period, kept up to date
+    minute by minute by save_teleinfo_data and rebuilt exactly from
+    DailyIndexes once the day is compacted (see consumption/services/rollups.py).
+    """
+
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    tarif_period = models.CharField(max_length=4)
+    wh = models.IntegerField(default=0)
+    euros = models.FloatField(default=0)
+    interpolated_minutes = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "hour", "tarif_period"],
+                name="unique_hourly_consumption",
+            )
+        ]
+        ordering = ["date", "hour", "tarif_period"]
+
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}h {self.tarif_period} : {self.wh} Wh"
+
+
+class DailyConsumption(models.Model):
+    """Consumption of one day for one tarif period, see HourlyConsumption."""
+
+    date = models.DateField()
+    tarif_period = models.CharField(max_length=4)
+    wh = models.IntegerField(default=0)
+    euros = models.FloatField(default=0)
+    interpolated_minutes = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "tarif_period"],
+                name="unique_daily_consumption",
+            )
+        ]
+        ordering = ["date", "tarif_period"]
+
+    def __str__(self):
+        return f"{self.date} {self.tarif_period} : {self.wh} Wh"
+
+
+class PricingPeriod(models.Model):
+    """
+    EDF price grid applicable from `start_date` until the next period starts:
+    kWh prices per tarif period and monthly subscription prices per option
+    and subscribed power. Edited in the admin, compiled into a PriceTimeline
+    (see consumption/edf_pricing.py).
+    """
+
+    start_date = models.DateField(unique=True, verbose_name="Date d'application")
+    label = models.CharField(max_length=100, blank=True, verbose_name="Libellé")
+
+    class Meta:
+        ordering = ["-start_date"]
+        verbose_name = "Grille tarifaire"
+        verbose_name_plural = "Grilles tarifaires"
+
+    def __str__(self):
+        return f"Tarifs au {self.start_date}" + (
+            f" ({self.label})" if self.label else ""
+        )
+
+
+class KwhPrice(models.Model):
+    pricing_period = models.ForeignKey(
+        PricingPeriod, on_delete=models.CASCADE, related_name="kwh_prices"
+    )
+    tarif_period = models.CharField(
+        max_length=4,
+        choices=[
+            (tarif_period.value, tarif_period.value) for tarif_period in TarifPeriods
+        ],
+        verbose_name="Période tarifaire",
+    )
+    cents_per_kwh = models.DecimalField(
+        max_digits=8, decimal_places=4, verbose_name="Prix (c€/kWh)"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pricing_period", "tarif_period"], name="unique_kwh_price"
+            )
+        ]
+        verbose_name = "Prix du kWh"
+        verbose_name_plural = "Prix du kWh"
+
+    def __str__(self):
+        return f"{self.tarif_period} : {self.cents_per_kwh} c€/kWh"
+
+
+class SubscriptionPrice(models.Model):
+    pricing_period = models.ForeignKey(
+        PricingPeriod, on_delete=models.CASCADE, related_name="subscription_prices"
+    )
+    tarif_period_type = models.CharField(
+        max_length=5,
+        choices=[(type_.value, type_.value) for type_ in TarifPeriodType],
+        verbose_name="Option tarifaire",
+    )
+    subscribed_power = models.PositiveSmallIntegerField(
+        verbose_name="Puissance souscrite (kVA)"
+    )
+    euros_per_month = models.DecimalField(
+        max_digits=8, decimal_places=2, verbose_name="Abonnement (€/mois)"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pricing_period", "tarif_period_type", "subscribed_power"],
+                name="unique_subscription_price",
+            )
+        ]
+        verbose_name = "Prix de l'abonnement"
+        verbose_name_plural = "Prix de l'abonnement"
+
+    def __str__(self):
+        return (
+            f"{self.tarif_period_type} {self.subscribed_power} kVA : "
+            f"{self.euros_per_month} €/mois"
+        )
+
+
+class TariffCalendarDay(models.Model):
+    """
+    Special day of a tariff option calendar, used to simulate that option
+    (see consumption/services/tariff_simulator.py): the color of a Tempo
+    day ("B", "W" or "R"), or an EJP "pointe mobile" day (recorded as "R").
+    Days not listed are blue (Tempo) or normal (EJP) days.
+    """
+
+    date = models.DateField()
+    tarif_period_type = models.CharField(
+        max_length=5,
+        choices=[
+            (TarifPeriodType.TEMPO.value, TarifPeriodType.TEMPO.value),
+            (TarifPeriodType.EJP.value, TarifPeriodType.EJP.value),
+        ],
+        verbose_name="Option tarifaire",
+    )
+    color = models.CharField(
+        max_length=1,
+        choices=[("B", "Bleu"), ("W", "Blanc"), ("R", "Rouge / pointe mobile")],
+        verbose_name="Couleur",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "tarif_period_type"], name="unique_tariff_calendar_day"
+            )
+        ]
+        ordering = ["-date"]
+        verbose_name = "Jour du calendrier tarifaire"
+        verbose_name_plural = "Calendrier tarifaire (Tempo / EJP)"
+
+    def __str__(self):
+        return f"{self.tarif_period_type} {self.date} : {self.color}"
+
+
+class DailyBaseLoad(models.Model):
+    """
+    Base load (standby, always-on consumption) of one day, computed once the
+    day is compacted (see consumption/services/base_load.py).
+
+    `step_change` is set on the first day of a lasting change of the base
+    load, e.g. a new appliance left on.
+    """
+
+    date = models.DateField(unique=True)
+    base_load_watt = models.FloatField(null=True, blank=True)
+    measured_minutes = models.PositiveSmallIntegerField(default=0)
+    step_change = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date} : {self.base_load_watt} W"
+
+
+class MinutePowerSample(models.Model):
+    """
+    Highest apparent power and intensity of one minute, over every teleinfo
+    frame of that minute (see update_power_peaks), written every minute by
+    save_teleinfo_data. Folded into DailyPowerPeak and deleted once the day
+    is closed, like MinuteIndexSample.
+    """
+
+    date = models.DateField()
+    # Slot of the minute in the day: 0 = "00:00"
+    minute = models.PositiveSmallIntegerField()
+    peak_va = models.PositiveIntegerField()
+    peak_intensity = models.PositiveSmallIntegerField()
+    # ISOUSC (A)
+    subscribed_intensity = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "minute"], name="unique_minute_power_sample"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.date} (minute {self.minute}) : {self.peak_va} VA"
+
+
+class DailyPowerPeak(models.Model):
+    """
+    Peak demand of one day (see consumption/services/power_peaks.py).
+
+    va_histogram[i] is the number of minutes whose peak apparent power was
+    within [i * POWER_HISTOGRAM_BUCKET_VA, (i + 1) * POWER_HISTOGRAM_BUCKET_VA[,
+    intensity_histogram[i] the number of minutes whose peak intensity was i
+    amps: the load-duration curve and the minutes above any intensity are
+    derived from them.
+    """
+
+    date = models.DateField(unique=True)
+    peak_va = models.PositiveIntegerField()
+    peak_minute = models.PositiveSmallIntegerField()
+    peak_intensity = models.PositiveSmallIntegerField()
+    measured_minutes = models.PositiveSmallIntegerField()
+    va_histogram = models.JSONField(default=list)
+    intensity_histogram = models.JSONField(default=list)
+    # Highest ISOUSC (A) seen that day
+    subscribed_intensity = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date} : {self.peak_va} VA"
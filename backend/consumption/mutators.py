@@ -1,17 +1,29 @@
 import logging
 from datetime import timedelta
 
+from django.db import transaction
 from django.utils import timezone
 
-from consumption.models import DailyIndexes
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.services.base_load import refresh_step_changes, save_day_base_load
+from consumption.services.finalization import finalize_closed_days
+from consumption.services.integrity import scan_day
+from consumption.services.power_peaks import compact_power_samples, record_power_sample
+from consumption.services.retention import apply_retention_policy
+from consumption.services.rollups import add_samples_to_rollups, rebuild_day_rollups
 from consumption.utils import (
-    add_new_tarif_period,
-    add_new_values,
+    apply_minute_samples,
+    build_minute_samples,
     get_indexes_in_teleinfo,
+    get_subscribed_intensity,
     get_subscribed_power,
     get_tarif_period,
 )
-from teleinfo.utils.cache_teleinfo_data import get_teleinfo_data_in_cache_if_up_to_date
+from core.constants import LoggerLabel
+from teleinfo.utils.cache_teleinfo_data import (
+    get_power_peaks_in_cache,
+    get_teleinfo_data_in_cache_if_up_to_date,
+)
 
 logger = logging.getLogger("django")
 
@@ -30,47 +42,100 @@ def save_teleinfo_data():
     tarif_period = get_tarif_period(cache_teleinfo_data)
     subscribed_power = get_subscribed_power(cache_teleinfo_data)
 
-    # Update current day
-    bdd_today_indexes, _ = DailyIndexes.objects.get_or_create(
-        date=now_date,
-        defaults={
-            "values": {},
-            "tarif_periods": {},
-            "subscribed_power": None,
-        },
+    # Current day
+    samples = build_minute_samples(
+        now_date, now_minute_str, indexes_in_teleinfo, tarif_period, subscribed_power
     )
 
-    bdd_today_indexes.subscribed_power = subscribed_power
-    bdd_today_indexes.tarif_periods = add_new_tarif_period(
-        bdd_today_indexes.tarif_periods, now_minute_str, tarif_period
+    # If it's midnight, also record "24:00" of the previous day
+    if now_minute_str == "00:00":
+        samples += build_minute_samples(
+            now_date - timedelta(days=1),
+            "24:00",
+            indexes_in_teleinfo,
+            tarif_period,
+            subscribed_power,
+        )
+
+    # Hourly/daily rollups are incremented from the previous samples, so
+    # before the new ones are inserted.
+    add_samples_to_rollups(samples)
+
+    # Single small insert: DailyIndexes rows are only rewritten by
+    # compact_minute_samples, once per closed day. A minute recorded twice
+    # (overlapping runs) keeps its latest reading, as before.
+    MinuteIndexSample.objects.bulk_create(
+        samples,
+        update_conflicts=True,
+        unique_fields=["date", "minute", "label"],
+        update_fields=["index", "tarif_period_code", "subscribed_power"],
     )
 
-    bdd_today_indexes = add_new_values(
-        bdd_today_indexes, indexes_in_teleinfo, now_minute_str
+    # Peaks of the minute just over, tracked by the listener from every frame
+    record_power_sample(
+        get_power_peaks_in_cache(), get_subscribed_intensity(cache_teleinfo_data)
     )
 
-    bdd_today_indexes.save()
 
-    # If it's midnight, update "24:00" of the previous day
-    if now_minute_str == "00:00":
-        previous_day = now_date - timedelta(days=1)
-
-        bdd_previous_day_indexes, _ = DailyIndexes.objects.get_or_create(
-            date=previous_day,
-            defaults={
-                "values": {},
-                "tarif_periods": {},
-                "subscribed_power": None,
-            },
-        )
+def compact_minute_samples() -> int:
+    """
+    Folds the minute samples of every closed day (before today) into its
+    DailyIndexes row, then deletes them. The completed day is scanned for
+    index anomalies (see consumption/services/integrity.py) before its
+    rollups are rebuilt, and finalized once the retention policy applied
+    (see consumption/services/finalization.py).
+
+    Runs every periodic cycle but only has work to do once a day, right
+    after the midnight write that closes the previous day ("24:00"): the
+    rest of the time it's a single indexed existence query.
+
+    Returns:
+        The number of days compacted.
+    """
+    today = timezone.localdate()
+    closed_days = (
+        MinuteIndexSample.objects.filter(date__lt=today)
+        .values_list("date", flat=True)
+        .distinct()
+        .order_by("date")
+    )
 
-        bdd_previous_day_indexes.subscribed_power = subscribed_power
-        bdd_previous_day_indexes.tarif_periods = add_new_tarif_period(
-            bdd_previous_day_indexes.tarif_periods, "24:00", tarif_period
+    compacted_days = 0
+    for day in list(closed_days):
+        with transaction.atomic():
+            samples = list(
+                MinuteIndexSample.objects.filter(date=day).order_by("minute", "label")
+            )
+            if not samples:
+                continue
+
+            daily_indexes, _ = DailyIndexes.objects.get_or_create(date=day)
+            apply_minute_samples(daily_indexes, samples)
+            daily_indexes.index_repairs = scan_day(daily_indexes)
+            daily_indexes.save()
+            rebuild_day_rollups(daily_indexes)
+            save_day_base_load(daily_indexes)
+
+            # Only delete what was folded, should a late sample of that day
+            # be inserted meanwhile it will be picked up next cycle.
+            last_pk = max(sample.pk for sample in samples)
+            MinuteIndexSample.objects.filter(date=day, pk__lte=last_pk).delete()
+
+        compacted_days += 1
+        if daily_indexes.index_repairs:
+            logger.warning(
+                f"{LoggerLabel.CONSUMPTION} {len(daily_indexes.index_repairs)} index "
+                f"anomalies repaired on {day}"
+            )
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} {len(samples)} minute samples of {day} "
+            "compacted"
         )
 
-        bdd_previous_day_indexes = add_new_values(
-            bdd_previous_day_indexes, indexes_in_teleinfo, "24:00"
-        )
+    if compacted_days:
+        refresh_step_changes()
+        apply_retention_policy()
+        finalize_closed_days()
+    compact_power_samples()
 
-        bdd_previous_day_indexes.save()
+    return compacted_days
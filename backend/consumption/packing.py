@@ -0,0 +1,329 @@
+"""
+Compact binary storage format of DailyIndexes.
+
+A day is stored as minute-indexed arrays (slot 0 = "00:00", slot 1440 =
+"24:00") instead of "HH:MM"-keyed JSON dicts:
+
+  - values: for each index label, a validity bitmap (1 bit per slot, set
+    when the minute is known) followed by an int32 array of deltas. A known
+    slot stores the difference with the previous known slot (the first one
+    stores its absolute value), an unknown slot stores 0 — so a running sum
+    over the array gives back every known index directly.
+  - tarif_periods: one uint8 code per slot (see TARIF_PERIOD_CODES, 0 for
+    None).
+  - flags (interpolation masks of finalized days): for each index label, a
+    bitmap of 1 bit per slot.
+
+Both blobs start with a PACKED_FORMAT_VERSION byte and are zlib-compressed:
+consecutive deltas are small and repetitive, a full HC/HP day shrinks from
+~60 KB of JSON to well under 2 KB. An empty day is stored as b"".
+"""
+
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+from consumption.constants import (
+    DAY_MINUTE_SLOTS,
+    NO_TARIF_PERIOD_CODE,
+    PACKED_FORMAT_VERSION,
+    STEP_1MIN_DICT,
+    TARIF_PERIOD_CODES,
+    TARIF_PERIODS_BY_CODE,
+)
+from core.constants import LoggerLabel
+
+logger = logging.getLogger("django")
+
+# Canonical "HH:MM" string of each slot, and the reverse lookup.
+SLOT_MINUTE_STRS: list[str] = list(STEP_1MIN_DICT)
+SLOT_BY_MINUTE_STR: dict[str, int] = {
+    minute_str: slot for slot, minute_str in enumerate(SLOT_MINUTE_STRS)
+}
+
+_BITMAP_SIZE = (DAY_MINUTE_SLOTS + 7) // 8
+_DELTAS_SIZE = DAY_MINUTE_SLOTS * 4
+# Bits of every possible byte value, least significant bit first.
+_BYTE_TO_BITS = [
+    tuple(bool(byte >> bit & 1) for bit in range(8)) for byte in range(256)
+]
+
+
+def minute_str_to_slot(minute_str: str) -> int:
+    """
+    Converts a "HH:MM" time string into its slot in a day's arrays
+    ("00:00" -> 0, "24:00" -> 1440).
+
+    Raises:
+        ValueError: if `minute_str` isn't a valid minute of the day.
+    """
+    try:
+        return SLOT_BY_MINUTE_STR[minute_str]
+    except (KeyError, TypeError):
+        raise ValueError(f"Invalid minute {minute_str!r}, expected HH:MM.")
+
+
+def index_dict_to_series(time_series: dict[str, int | None]) -> list[int | None]:
+    """
+    Converts a {"HH:MM": index} dict into a minute-indexed list of
+    DAY_MINUTE_SLOTS values (None where the minute is missing).
+    Keys that aren't a valid minute of the day are ignored.
+    """
+    series: list[int | None] = [None] * DAY_MINUTE_SLOTS
+    for minute_str, value in time_series.items():
+        slot = SLOT_BY_MINUTE_STR.get(minute_str)
+        if slot is not None:
+            series[slot] = value
+    return series
+
+
+def series_to_index_dict(series: list) -> dict[str, int | None]:
+    """Converts a minute-indexed list back into a full {"HH:MM": value} dict."""
+    return dict(zip(SLOT_MINUTE_STRS, series))
+
+
+def _to_bytes(blob: bytes | memoryview | None) -> bytes:
+    # BinaryField values come back as memoryview on some database backends.
+    return bytes(blob) if blob else b""
+
+
+def _check_version(raw: bytes) -> None:
+    if raw[0] != PACKED_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported packed format version {raw[0]} "
+            f"(expected {PACKED_FORMAT_VERSION})."
+        )
+
+
+def pack_index_series(index_series: dict[str, list[int | None]]) -> bytes:
+    """
+    Packs a day's indexes, given as {label: minute-indexed list}, into the
+    compact binary format. Empty or missing label series are skipped.
+
+    Args:
+        index_series: Each label maps to a list of DAY_MINUTE_SLOTS values
+                      (int or None).
+
+    Returns:
+        The compressed blob, or b"" if there is nothing to store.
+    """
+    labels = [label for label, series in index_series.items() if series]
+    if not labels:
+        return b""
+
+    chunks = [struct.pack("<BB", PACKED_FORMAT_VERSION, len(labels))]
+    for label in labels:
+        bitmap = bytearray(_BITMAP_SIZE)
+        deltas = array("i", [0]) * DAY_MINUTE_SLOTS
+        previous_value = 0
+        for slot, value in enumerate(index_series[label]):
+            if value is None:
+                continue
+            bitmap[slot >> 3] |= 1 << (slot & 7)
+            deltas[slot] = value - previous_value
+            previous_value = value
+        if sys.byteorder == "big":
+            deltas.byteswap()
+
+        encoded_label = str(label).encode("ascii")
+        chunks.append(struct.pack("<B", len(encoded_label)))
+        chunks.append(encoded_label)
+        chunks.append(bytes(bitmap))
+        chunks.append(deltas.tobytes())
+
+    return zlib.compress(b"".join(chunks))
+
+
+def unpack_index_series(blob: bytes | memoryview | None) -> dict[str, list[int | None]]:
+    """
+    Unpacks a blob produced by pack_index_series into
+    {label: minute-indexed list of DAY_MINUTE_SLOTS values}.
+
+    Raises:
+        ValueError: if the blob was written with another format version.
+    """
+    raw = _to_bytes(blob)
+    if not raw:
+        return {}
+    raw = zlib.decompress(raw)
+    _check_version(raw)
+
+    index_series: dict[str, list[int | None]] = {}
+    label_count = raw[1]
+    offset = 2
+    for _ in range(label_count):
+        label_length = raw[offset]
+        offset += 1
+        label = raw[offset : offset + label_length].decode("ascii")
+        offset += label_length
+
+        bitmap = raw[offset : offset + _BITMAP_SIZE]
+        offset += _BITMAP_SIZE
+        deltas = array("i")
+        deltas.frombytes(raw[offset : offset + _DELTAS_SIZE])
+        offset += _DELTAS_SIZE
+        if sys.byteorder == "big":
+            deltas.byteswap()
+
+        validity = [bit for byte in bitmap for bit in _BYTE_TO_BITS[byte]]
+        index_series[label] = [
+            value if is_known else None
+            for value, is_known in zip(accumulate(deltas), validity)
+        ]
+
+    return index_series
+
+
+def pack_values(values: dict[str, dict[str, int | None] | None]) -> bytes:
+    """Packs a {label: {"HH:MM": index}} dict (legacy JSON shape)."""
+    return pack_index_series(
+        {
+            label: index_dict_to_series(time_series)
+            for label, time_series in values.items()
+            if isinstance(time_series, dict) and time_series
+        }
+    )
+
+
+def unpack_values(blob: bytes | memoryview | None) -> dict[str, dict[str, int | None]]:
+    """Unpacks a values blob into the legacy {label: {"HH:MM": index}} shape."""
+    return {
+        label: series_to_index_dict(series)
+        for label, series in unpack_index_series(blob).items()
+    }
+
+
+def pack_flag_series(flag_series: dict[str, list[bool]]) -> bytes:
+    """
+    Packs {label: minute-indexed list of flags} into per-label bitmaps, b""
+    if there is no label.
+    """
+    if not flag_series:
+        return b""
+
+    chunks = [struct.pack("<BB", PACKED_FORMAT_VERSION, len(flag_series))]
+    for label, flags in flag_series.items():
+        bitmap = bytearray(_BITMAP_SIZE)
+        for slot, flag in enumerate(flags):
+            if flag:
+                bitmap[slot >> 3] |= 1 << (slot & 7)
+        encoded_label = str(label).encode("ascii")
+        chunks.append(struct.pack("<B", len(encoded_label)))
+        chunks.append(encoded_label)
+        chunks.append(bytes(bitmap))
+
+    return zlib.compress(b"".join(chunks))
+
+
+def unpack_flag_series(blob: bytes | memoryview | None) -> dict[str, list[bool]]:
+    """
+    Unpacks a blob produced by pack_flag_series into {label: minute-indexed
+    list of DAY_MINUTE_SLOTS flags}.
+
+    Raises:
+        ValueError: if the blob was written with another format version.
+    """
+    raw = _to_bytes(blob)
+    if not raw:
+        return {}
+    raw = zlib.decompress(raw)
+    _check_version(raw)
+
+    flag_series: dict[str, list[bool]] = {}
+    offset = 2
+    for _ in range(raw[1]):
+        label_length = raw[offset]
+        offset += 1
+        label = raw[offset : offset + label_length].decode("ascii")
+        offset += label_length
+        bitmap = raw[offset : offset + _BITMAP_SIZE]
+        offset += _BITMAP_SIZE
+        flag_series[label] = [bit for byte in bitmap for bit in _BYTE_TO_BITS[byte]][
+            :DAY_MINUTE_SLOTS
+        ]
+
+    return flag_series
+
+
+def tarif_period_to_code(tarif_period: str | None) -> int:
+    """
+    Returns the stored uint8 code of a tarif period (NO_TARIF_PERIOD_CODE for
+    None). An unknown tarif period can't be stored: it is logged and stored
+    as None.
+    """
+    if tarif_period is None:
+        return NO_TARIF_PERIOD_CODE
+    try:
+        return TARIF_PERIOD_CODES[tarif_period]
+    except KeyError:
+        logger.warning(
+            f"{LoggerLabel.CONSUMPTION} Unknown tarif period {tarif_period!r} "
+            "stored as None"
+        )
+        return NO_TARIF_PERIOD_CODE
+
+
+def pack_tarif_period_codes(codes: bytes | bytearray) -> bytes:
+    """Packs DAY_MINUTE_SLOTS tarif period codes, b"" if none is known."""
+    if not any(codes):
+        return b""
+    return zlib.compress(bytes([PACKED_FORMAT_VERSION]) + bytes(codes))
+
+
+def unpack_tarif_period_codes(blob: bytes | memoryview | None) -> bytes:
+    """
+    Unpacks a tarif_periods blob into its DAY_MINUTE_SLOTS raw uint8 codes,
+    or b"" for an empty day.
+    """
+    raw = _to_bytes(blob)
+    if not raw:
+        return b""
+    raw = zlib.decompress(raw)
+    _check_version(raw)
+    return raw[1:]
+
+
+def tarif_periods_to_codes(tarif_periods: dict[str, str | None]) -> bytearray:
+    """
+    Converts a {"HH:MM": tarif period} dict (legacy JSON shape) into
+    DAY_MINUTE_SLOTS uint8 codes. Keys that aren't a valid minute of the day
+    are ignored.
+    """
+    codes = bytearray(DAY_MINUTE_SLOTS)
+    for minute_str, tarif_period in tarif_periods.items():
+        slot = SLOT_BY_MINUTE_STR.get(minute_str)
+        if slot is not None:
+            codes[slot] = tarif_period_to_code(tarif_period)
+    return codes
+
+
+def codes_to_tarif_period_series(codes: bytes | bytearray) -> list[str | None]:
+    """
+    Converts uint8 codes into a minute-indexed list of tarif period strings
+    (None where unknown), or [] if no tarif period is known at all.
+    """
+    if not any(codes):
+        return []
+    return [TARIF_PERIODS_BY_CODE.get(code) for code in codes]
+
+
+def pack_tarif_periods(tarif_periods: dict[str, str | None]) -> bytes:
+    """Packs a {"HH:MM": tarif period} dict (legacy JSON shape)."""
+    return pack_tarif_period_codes(tarif_periods_to_codes(tarif_periods))
+
+
+def unpack_tarif_period_series(blob: bytes | memoryview | None) -> list[str | None]:
+    """
+    Unpacks a tarif_periods blob into a minute-indexed list of tarif period
+    strings (None where unknown), or [] for an empty day.
+    """
+    return codes_to_tarif_period_series(unpack_tarif_period_codes(blob))
+
+
+def unpack_tarif_periods(blob: bytes | memoryview | None) -> dict[str, str | None]:
+    """Unpacks a tarif_periods blob into the legacy {"HH:MM": tarif period} shape."""
+    series = unpack_tarif_period_series(blob)
+    return series_to_index_dict(series) if series else {}
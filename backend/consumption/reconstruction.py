@@ -0,0 +1,275 @@
+"""
+Array-based consumption reconstruction engine.
+
+Produces exactly the same entries as consumption.utils.build_consumption_data
+but works on a day's minute series (DailyIndexes.get_index_series /
+get_tarif_period_series) instead of {"HH:MM": ...} dicts:
+
+  - gaps are interpolated per label in one pass (interpolate_index_series),
+  - downsampling is a plain slice (series[::step]),
+  - the per-bucket Wh of every label are computed as whole columns, then
+    picked per bucket through the tarif period of its start minute,
+  - everything that only depends on the tarif period (index label, kWh
+    price, readable label) is resolved once per period instead of once per
+    minute.
+
+No NumPy here: the backend runs on a Raspberry Pi without it, and at 1441
+slots per day list-level passes are already well under the cost of the
+dict-based pipeline (see the build_consumption_data cases of benchmark_consumption).
+
+The interpolated series, interpolation flags and filled tarif periods of a
+day are gathered by reconstruct_day, which reads them back from the row
+once the day is finalized (see consumption/services/finalization.py)
+instead of recomputing them.
+"""
+
+import base64
+from dataclasses import dataclass
+from datetime import date
+
+from consumption.constants import DAY_MINUTE_SLOTS, MINUTES_PER_DAY, TarifPeriodType
+from consumption.edf_pricing import get_price_timeline
+from consumption.models import DailyIndexes
+from consumption.packing import (
+    SLOT_MINUTE_STRS,
+    minute_str_to_slot,
+    unpack_flag_series,
+    unpack_index_series,
+    unpack_tarif_period_series,
+)
+from consumption.utils import (
+    compute_totals_for_a_day,
+    detect_tarif_period_type,
+    detect_tempo_color,
+    get_hc_hp_ref_day_series,
+    get_human_readable_tarif_period,
+    get_index_label,
+    get_tempo_ref_day_series,
+    interpolate_index_series,
+    price_day_totals,
+)
+from teleinfo.constants import TarifPeriods
+
+
+def fill_missing_tarif_period_series(
+    tarif_period_series: list[str | None],
+    current_day: date,
+) -> list[str | None]:
+    """
+    Minute-series counterpart of fill_missing_tarif_periods, with the same
+    strategy per tariff family (see its docstring).
+
+    Args:
+        tarif_period_series: The day's minute-indexed tarif periods, [] if
+                             none was recorded.
+        current_day: The date of the day being reconstructed.
+
+    Returns:
+        A minute-indexed list with gaps filled whenever possible.
+    """
+    if current_day == date.today() or None not in tarif_period_series:
+        return tarif_period_series
+
+    match detect_tarif_period_type(tarif_period_series):
+        case TarifPeriodType.TH:
+            return [TarifPeriods.TH] * len(tarif_period_series)
+        case TarifPeriodType.HC_HP:
+            return get_hc_hp_ref_day_series(current_day) or tarif_period_series
+        case TarifPeriodType.TEMPO:
+            color = detect_tempo_color(tarif_period_series)
+            return get_tempo_ref_day_series(current_day, color) or tarif_period_series
+        case _:
+            return tarif_period_series
+
+
+@dataclass(frozen=True)
+class ReconstructedDay:
+    # {label: minute-indexed indexes, bordered gaps interpolated}
+    index_series: dict[str, list[int | None]]
+    # {label: minute-indexed flags, True where the index was interpolated}
+    interpolated: dict[str, list[bool]]
+    # Minute-indexed tarif periods, gaps filled whenever possible ([] if
+    # none was recorded)
+    tarif_period_series: list[str | None]
+
+
+def compute_reconstructed_day(
+    daily_indexes: DailyIndexes, day: date
+) -> ReconstructedDay:
+    """Reconstructs a day from its (repaired) indexes and tarif periods."""
+    index_series, interpolated = {}, {}
+    for label, series in daily_indexes.get_index_series().items():
+        index_series[label], interpolated[label] = interpolate_index_series(series)
+    return ReconstructedDay(
+        index_series,
+        interpolated,
+        fill_missing_tarif_period_series(daily_indexes.get_tarif_period_series(), day),
+    )
+
+
+def reconstruct_day(daily_indexes: DailyIndexes, day: date) -> ReconstructedDay:
+    """
+    The frozen reconstruction of a finalized day, decoded without any
+    interpolation or reference day lookup, a new one otherwise.
+    """
+    if daily_indexes.is_finalized():
+        return ReconstructedDay(
+            unpack_index_series(daily_indexes.packed_reconstructed_values),
+            unpack_flag_series(daily_indexes.packed_interpolated),
+            unpack_tarif_period_series(daily_indexes.packed_filled_tarif_periods),
+        )
+    return compute_reconstructed_day(daily_indexes, day)
+
+
+def compute_day_totals(
+    daily_indexes: DailyIndexes, day: date
+) -> dict[str, dict[str, int | float | None]]:
+    """
+    compute_totals_for_a_day of the (repaired) indexes of a day, only
+    priced from the frozen Wh of each label once the day is finalized.
+    """
+    if daily_indexes.is_finalized():
+        return price_day_totals(day, daily_indexes.finalized_totals)
+    return compute_totals_for_a_day(day, daily_indexes.get_repaired_values())
+
+
+def compute_bucket_watt_hours(
+    series: list[int | None],
+    step: int,
+) -> list[int | None]:
+    """
+    Wh of each `step`-minute bucket of a (gap-filled) index series: the
+    difference between the indexes bordering the bucket, None when either
+    is unknown.
+    """
+    sampled = series[::step]
+    return [
+        next_index - current_index
+        if current_index is not None and next_index is not None
+        else None
+        for current_index, next_index in zip(sampled, sampled[1:])
+    ]
+
+
+def build_consumption_data_from_series(
+    daily_indexes: DailyIndexes,
+    day: date,
+    step: int,
+    reconstructed: ReconstructedDay | None = None,
+) -> list[dict[str, str | int | float | None | bool]]:
+    """
+    Builds the same consumption entries as build_consumption_data (same
+    keys, values and float results), from the day's minute series.
+
+    Unlike build_consumption_data, daily_indexes is left untouched, and a
+    day without any recorded tarif period yields entries with None values
+    instead of failing.
+
+    Args:
+        daily_indexes: The DailyIndexes of the day.
+        day: The date of the day.
+        step: The step size in minutes, must divide MINUTES_PER_DAY.
+        reconstructed: The reconstruction of the day, reconstruct_day's by
+                       default (see consumption/cross_midnight.py).
+
+    Returns:
+        A list of consumption entries, see build_consumption_data.
+    """
+    if MINUTES_PER_DAY % step:
+        raise ValueError(f"Step {step} must divide {MINUTES_PER_DAY} minutes.")
+
+    reconstructed = reconstructed or reconstruct_day(daily_indexes, day)
+    bucket_watt_hours = {
+        label: compute_bucket_watt_hours(filled, step)
+        for label, filled in reconstructed.index_series.items()
+    }
+    interpolated_starts = {
+        label: interpolated[::step]
+        for label, interpolated in reconstructed.interpolated.items()
+    }
+
+    tarif_period_series = reconstructed.tarif_period_series or [None] * DAY_MINUTE_SLOTS
+    bucket_tarif_periods = tarif_period_series[:-1:step]
+    minute_strs = SLOT_MINUTE_STRS[::step]
+
+    # Everything depending only on the tarif period, resolved once per period
+    kwh_prices = get_price_timeline().get_kwh_prices(day)
+    period_details = {}
+    for tarif_period in set(bucket_tarif_periods):
+        index_label = get_index_label(tarif_period)
+        period_details[tarif_period] = (
+            bucket_watt_hours.get(index_label),
+            interpolated_starts.get(index_label) if step == 1 else None,
+            kwh_prices.get(tarif_period, 0),
+            get_human_readable_tarif_period(tarif_period),
+        )
+
+    duration_hours = step / 60
+    data = []
+    for bucket, tarif_period in enumerate(bucket_tarif_periods):
+        watt_hours, interpolated, price_per_kwh, readable_tarif_period = period_details[
+            tarif_period
+        ]
+        wh = watt_hours[bucket] if watt_hours is not None else None
+        data.append(
+            {
+                "date": day,
+                "start_time": minute_strs[bucket],
+                "end_time": minute_strs[bucket + 1],
+                "wh": wh,
+                "average_watt": wh / duration_hours if wh is not None else None,
+                "euros": (
+                    wh / 1000 * price_per_kwh if wh is not None and wh >= 0 else None
+                ),
+                "interpolated": (
+                    interpolated[bucket] if interpolated is not None else False
+                ),
+                "tarif_period": readable_tarif_period,
+            }
+        )
+
+    return data
+
+
+def build_columnar_consumption(
+    entries: list[dict[str, str | int | float | None | bool]],
+) -> dict[str, list | str]:
+    """
+    Turns consumption entries (see build_consumption_data) into parallel
+    arrays, so that the day is rendered without any per-entry serializer
+    and without repeating keys, dates and tarif period labels.
+
+    Returns:
+        {"start_minutes": [...], "wh": [...], "average_watt": [...],
+        "euros": [...], "interpolated": ..., "tarif_period_codes": [...],
+        "tarif_periods": [...]}, where start_minutes are minutes since
+        midnight, interpolated is a base64 bitmap (bit i, least significant
+        bit first, set when entry i is interpolated) and tarif_period_codes
+        index the tarif_periods lookup table (None when unknown).
+    """
+    bitmap = bytearray((len(entries) + 7) // 8)
+    tarif_periods: list[str] = []
+    code_by_tarif_period: dict[str, int] = {}
+    tarif_period_codes: list[int | None] = []
+
+    for position, entry in enumerate(entries):
+        if entry["interpolated"]:
+            bitmap[position >> 3] |= 1 << (position & 7)
+        tarif_period = entry["tarif_period"]
+        if tarif_period is None:
+            tarif_period_codes.append(None)
+            continue
+        if tarif_period not in code_by_tarif_period:
+            code_by_tarif_period[tarif_period] = len(tarif_periods)
+            tarif_periods.append(tarif_period)
+        tarif_period_codes.append(code_by_tarif_period[tarif_period])
+
+    return {
+        "start_minutes": [minute_str_to_slot(entry["start_time"]) for entry in entries],
+        "wh": [entry["wh"] for entry in entries],
+        "average_watt": [entry["average_watt"] for entry in entries],
+        "euros": [entry["euros"] for entry in entries],
+        "interpolated": base64.b64encode(bitmap).decode("ascii"),
+        "tarif_period_codes": tarif_period_codes,
+        "tarif_periods": tarif_periods,
+    }
@@ -0,0 +1,43 @@
+"""
+Read-time repairs of recorded indexes.
+
+The integrity scan (consumption/services/integrity.py) never rewrites the
+recorded indexes of a day, it stores repair annotations next to them
+(DailyIndexes.index_repairs), applied whenever the day is read. Each one
+is a dict:
+
+  - "label": the index label repaired (e.g. "HCHC"),
+  - "kind": an IndexRepairKind value, informative only,
+  - "minute": first slot repaired,
+  - "dropped_minutes": slots from "minute" whose readings are discarded
+    (glitches), the reconstruction interpolating them like any gap,
+  - "offset": Wh added to every index from "minute" on (lasting resets or
+    jumps), so that the index keeps counting from where it was.
+"""
+
+
+def apply_index_repairs(
+    index_series: dict[str, list[int | None]], repairs: list[dict]
+) -> dict[str, list[int | None]]:
+    """
+    Applies repair annotations to minute-indexed index series, in place.
+
+    Args:
+        index_series: {label: minute-indexed list}, as get_index_series.
+        repairs: The repair annotations of the day, by increasing minute.
+
+    Returns:
+        index_series, repaired.
+    """
+    for repair in repairs:
+        series = index_series.get(repair["label"])
+        if series is None:
+            continue
+        start = repair["minute"]
+        kept = start + repair["dropped_minutes"]
+        series[start:kept] = [None] * len(series[start:kept])
+        if offset := repair["offset"]:
+            series[kept:] = [
+                index + offset if index is not None else None for index in series[kept:]
+            ]
+    return index_series
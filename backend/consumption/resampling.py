@@ -0,0 +1,124 @@
+"""
+Generic resampling of a day's minute series into `step`-minute buckets.
+
+Any step dividing MINUTES_PER_DAY is derived from the minute series (e.g.
+15 minutes, the granularity of the Linky load curve), without any
+precomputed structure: the per-minute energy and cost of the whole day are
+computed in one pass over the index series, then each bucket is a slice of
+them.
+
+The energy of a minute interval [m, m+1) is attributed to the tarif period
+of its index label, as in the rollups (consumption/services/rollups.py), so
+a bucket straddling a tarif period change is priced exactly.
+"""
+
+from collections import Counter
+from datetime import date
+
+from consumption.constants import MINUTES_PER_DAY
+from consumption.edf_pricing import get_price_timeline
+from consumption.models import DailyIndexes
+from consumption.packing import SLOT_MINUTE_STRS
+from consumption.reconstruction import ReconstructedDay, reconstruct_day
+from consumption.utils import (
+    get_human_readable_tarif_period,
+    get_tarif_period_label_from_index_label,
+)
+
+
+def compute_minute_consumption(
+    daily_indexes: DailyIndexes,
+    day: date,
+    reconstructed: ReconstructedDay | None = None,
+) -> tuple[list[int | None], list[float], list[bool]]:
+    """
+    Energy, cost and interpolation flag of each minute interval of a day,
+    all labels combined, from its reconstruction (reconstruct_day unless
+    already given).
+
+    Returns:
+        A (watt_hours, euros, interpolated) tuple of MINUTES_PER_DAY-long
+        lists: watt_hours[m] is None when no label has both indexes of the
+        interval, interpolated[m] is True when the start index of a label
+        was interpolated.
+    """
+    kwh_prices = get_price_timeline().get_kwh_prices(day)
+    watt_hours: list[int | None] = [None] * MINUTES_PER_DAY
+    euros = [0.0] * MINUTES_PER_DAY
+    interpolated = [False] * MINUTES_PER_DAY
+
+    reconstructed = reconstructed or reconstruct_day(daily_indexes, day)
+    for label, filled in reconstructed.index_series.items():
+        label_interpolated = reconstructed.interpolated[label]
+        price_per_wh = (
+            kwh_prices.get(get_tarif_period_label_from_index_label(label), 0) / 1000
+        )
+        for minute, (current_index, next_index) in enumerate(zip(filled, filled[1:])):
+            if current_index is None or next_index is None:
+                continue
+            wh = next_index - current_index
+            watt_hours[minute] = (watt_hours[minute] or 0) + wh
+            if wh > 0:
+                euros[minute] += wh * price_per_wh
+            if label_interpolated[minute]:
+                interpolated[minute] = True
+
+    return watt_hours, euros, interpolated
+
+
+def resample_consumption(
+    daily_indexes: DailyIndexes,
+    day: date,
+    step: int,
+) -> list[dict[str, str | int | float | None]]:
+    """
+    Resamples a day's consumption into `step`-minute buckets.
+
+    Args:
+        daily_indexes: The DailyIndexes of the day.
+        day: The date of the day.
+        step: The bucket size in minutes, must divide MINUTES_PER_DAY.
+
+    Returns:
+        One entry per bucket with its "start_time", "end_time", "wh" (sum of
+        the known minutes, None if none is known), "average_watt" (mean
+        power over the known minutes), "peak_watt" (highest minute power),
+        "euros", "interpolated_minutes" and "tarif_period" (the readable
+        tarif period covering most of the bucket).
+    """
+    if MINUTES_PER_DAY % step:
+        raise ValueError(f"Step {step} must divide {MINUTES_PER_DAY} minutes.")
+
+    reconstructed = reconstruct_day(daily_indexes, day)
+    watt_hours, euros, interpolated = compute_minute_consumption(
+        daily_indexes, day, reconstructed
+    )
+    tarif_period_series = reconstructed.tarif_period_series or [None] * MINUTES_PER_DAY
+
+    data = []
+    for start in range(0, MINUTES_PER_DAY, step):
+        end = start + step
+        known_watt_hours = [wh for wh in watt_hours[start:end] if wh is not None]
+        # Most common first, earliest first on ties
+        [(dominant_tarif_period, _)] = Counter(
+            tarif_period_series[start:end]
+        ).most_common(1)
+
+        wh = sum(known_watt_hours) if known_watt_hours else None
+        data.append(
+            {
+                "date": day,
+                "start_time": SLOT_MINUTE_STRS[start],
+                "end_time": SLOT_MINUTE_STRS[end],
+                "wh": wh,
+                "average_watt": (
+                    wh * 60 / len(known_watt_hours) if wh is not None else None
+                ),
+                "peak_watt": max(known_watt_hours) * 60 if known_watt_hours else None,
+                "euros": sum(euros[start:end]) if wh is not None else None,
+                "interpolated_minutes": sum(interpolated[start:end]),
+                "tarif_period": get_human_readable_tarif_period(dominant_tarif_period),
+            }
+        )
+
+    return data
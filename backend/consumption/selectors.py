@@ -1,9 +1,155 @@
+from collections.abc import Iterator
 from datetime import date
 
-from consumption.models import DailyIndexes
+from django.db.models import F, QuerySet, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from consumption.constants import ConsumptionBucket
+from consumption.models import (
+    DailyBaseLoad,
+    DailyConsumption,
+    DailyIndexes,
+    HourlyConsumption,
+    MinuteIndexSample,
+)
+from consumption.utils import apply_minute_samples
 
 
 def get_daily_indexes(start: date, end: date) -> list[DailyIndexes]:
     return list(
         DailyIndexes.objects.filter(date__gte=start, date__lt=end).order_by("date")
     )
+
+
+def get_day_indexes(day: date) -> DailyIndexes | None:
+    """
+    Returns the full indexes of a day: its compacted DailyIndexes row merged
+    with the minute samples not compacted yet (the tail of the current day,
+    or a closed day whose compaction hasn't run yet).
+
+    The merge happens in memory only, nothing is written back.
+
+    Returns:
+        The (possibly unsaved) DailyIndexes of the day, or None if nothing
+        was ever recorded for it.
+    """
+    daily_indexes = DailyIndexes.objects.filter(date=day).first()
+    samples = MinuteIndexSample.objects.filter(date=day).order_by("minute", "label")
+
+    if daily_indexes is None:
+        if not samples.exists():
+            return None
+        daily_indexes = DailyIndexes(date=day)
+
+    return apply_minute_samples(daily_indexes, samples)
+
+
+def iter_day_indexes(
+    start: date | None = None, end: date | None = None
+) -> Iterator[DailyIndexes]:
+    """
+    Yields the full indexes of every recorded day of [start, end] (both
+    included, unbounded when None) in date order, as get_day_indexes would
+    return them, holding a single day in memory at a time.
+
+    DailyIndexes rows are streamed one by one from a single query; days
+    still having minute samples are merged with them, and days recorded
+    only as minute samples so far (e.g. today) are built from them.
+    """
+    date_filters = {}
+    if start is not None:
+        date_filters["date__gte"] = start
+    if end is not None:
+        date_filters["date__lte"] = end
+
+    sample_days = sorted(
+        MinuteIndexSample.objects.filter(**date_filters)
+        .values_list("date", flat=True)
+        .distinct()
+    )
+    sample_days_set = set(sample_days)
+    pending_sample_days = iter(sample_days)
+    next_sample_day = next(pending_sample_days, None)
+
+    # A packed row weighs a few kB, fetch them one at a time
+    rows = DailyIndexes.objects.filter(**date_filters).order_by("date")
+    for daily_indexes in rows.iterator(chunk_size=1):
+        while next_sample_day is not None and next_sample_day <= daily_indexes.date:
+            if next_sample_day < daily_indexes.date:
+                yield get_day_indexes(next_sample_day)
+            next_sample_day = next(pending_sample_days, None)
+
+        if daily_indexes.date in sample_days_set:
+            apply_minute_samples(
+                daily_indexes,
+                MinuteIndexSample.objects.filter(date=daily_indexes.date).order_by(
+                    "minute", "label"
+                ),
+            )
+        yield daily_indexes
+
+    while next_sample_day is not None:
+        yield get_day_indexes(next_sample_day)
+        next_sample_day = next(pending_sample_days, None)
+
+
+def get_daily_subscriptions(
+    start: date, end: date
+) -> list[tuple[date, str | None, float | None]]:
+    """
+    (date, tarif_period_type, subscribed_power) of the recorded days of
+    [start, end] (both included), without loading any packed blob.
+    """
+    return list(
+        DailyIndexes.objects.filter(date__gte=start, date__lte=end)
+        .order_by("date")
+        .values_list("date", "tarif_period_type", "subscribed_power")
+    )
+
+
+def get_daily_base_loads(start: date, end: date) -> QuerySet[DailyBaseLoad]:
+    """Stored base loads of [start, end] (both included), in date order."""
+    return DailyBaseLoad.objects.filter(date__gte=start, date__lte=end).order_by("date")
+
+
+BUCKET_DATE_EXPRESSIONS = {
+    ConsumptionBucket.HOUR: F("date"),
+    ConsumptionBucket.DAY: F("date"),
+    ConsumptionBucket.WEEK: TruncWeek("date"),
+    ConsumptionBucket.MONTH: TruncMonth("date"),
+}
+
+
+def get_bucketed_rollups(
+    start: date, end: date, bucket: ConsumptionBucket
+) -> QuerySet[dict]:
+    """
+    Sums the stored consumption rollups of [start, end] (both included) per
+    bucket and tarif period, in the database.
+
+    Hourly buckets read HourlyConsumption, the other ones DailyConsumption
+    (weeks start on Monday, months on the 1st).
+
+    Returns:
+        Dicts with "bucket_date", "hour" (hourly buckets only),
+        "tarif_period", "total_wh", "total_euros" and
+        "total_interpolated_minutes", ordered by bucket.
+    """
+    if bucket == ConsumptionBucket.HOUR:
+        model = HourlyConsumption
+        group_fields = ["bucket_date", "hour", "tarif_period"]
+    else:
+        model = DailyConsumption
+        group_fields = ["bucket_date", "tarif_period"]
+
+    return (
+        model.objects.filter(date__gte=start, date__lte=end)
+        .annotate(bucket_date=BUCKET_DATE_EXPRESSIONS[bucket])
+        .values(*group_fields)
+        .annotate(
+            total_wh=Sum("wh"),
+            total_euros=Sum("euros"),
+            total_interpolated_minutes=Sum("interpolated_minutes"),
+        )
+        .order_by(*group_fields)
+    )
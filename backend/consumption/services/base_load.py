@@ -0,0 +1,157 @@
+"""
+Base load (standby, always-on consumption) of each day and its step changes.
+
+The base load of a day is a low percentile (BASE_LOAD_PERCENTILE) of the
+power of its measured minutes, every index label combined. A minute is
+measured when both its indexes were recorded for every label: interpolated
+minutes are left out, a gap would otherwise show up as a flat and possibly
+low power. The percentile is taken with a bounded heap over the day's
+minutes, a single pass over the packed series.
+
+Base loads are persisted per day in DailyBaseLoad once the day is compacted
+(see compact_minute_samples), the dashboard then reads one row per day. The
+step_change flags are recomputed from these rows only (never from the raw
+series): a step change starts on a day whose base load and the next
+BASE_LOAD_STEP_CONFIRMATION_DAYS - 1 ones all move away, in the same
+direction, from the median of the BASE_LOAD_STEP_REFERENCE_DAYS days before
+it, while the day before it was still in line with that median. Only days
+with a base load count.
+"""
+
+import heapq
+import math
+from collections.abc import Iterator
+from datetime import date
+from statistics import median
+
+from consumption.constants import (
+    BASE_LOAD_MIN_MEASURED_MINUTES,
+    BASE_LOAD_PERCENTILE,
+    BASE_LOAD_STEP_CONFIRMATION_DAYS,
+    BASE_LOAD_STEP_MIN_RATIO,
+    BASE_LOAD_STEP_MIN_WATT,
+    BASE_LOAD_STEP_REFERENCE_DAYS,
+    MINUTES_PER_DAY,
+)
+from consumption.models import DailyBaseLoad, DailyIndexes
+
+
+def iter_measured_minute_powers(daily_indexes: DailyIndexes) -> Iterator[int]:
+    """
+    Yields the power (W) of every measured minute of a day, every label
+    combined. Minutes with a missing index (interpolated once the gaps are
+    filled) or a decreasing one are skipped.
+    """
+    index_series = list(daily_indexes.get_index_series().values())
+    if not index_series:
+        return
+    for minute_indexes in zip(*(zip(series, series[1:]) for series in index_series)):
+        wh = 0
+        for start, end in minute_indexes:
+            if start is None or end is None or end < start:
+                break
+            wh += end - start
+        else:
+            yield wh * 60
+
+
+def compute_base_load(daily_indexes: DailyIndexes) -> tuple[float | None, int]:
+    """
+    Base load of a day.
+
+    Returns:
+        A (base load in W, measured minutes) tuple, the base load being None
+        when fewer than BASE_LOAD_MIN_MEASURED_MINUTES minutes were measured.
+    """
+    # The lowest powers of the day that the percentile can fall on, negated
+    # so that the heap root is the highest of them
+    max_rank = math.ceil(BASE_LOAD_PERCENTILE / 100 * MINUTES_PER_DAY)
+    lowest: list[int] = []
+    measured_minutes = 0
+    for power in iter_measured_minute_powers(daily_indexes):
+        measured_minutes += 1
+        if len(lowest) < max_rank:
+            heapq.heappush(lowest, -power)
+        elif power < -lowest[0]:
+            heapq.heapreplace(lowest, -power)
+
+    if measured_minutes < BASE_LOAD_MIN_MEASURED_MINUTES:
+        return None, measured_minutes
+    # Nearest-rank percentile over the measured minutes
+    rank = math.ceil(BASE_LOAD_PERCENTILE / 100 * measured_minutes)
+    return float(sorted(-power for power in lowest)[rank - 1]), measured_minutes
+
+
+def save_day_base_load(daily_indexes: DailyIndexes) -> DailyBaseLoad:
+    """Computes and stores the base load of a day, step_change left as is."""
+    base_load_watt, measured_minutes = compute_base_load(daily_indexes)
+    daily_base_load, _ = DailyBaseLoad.objects.update_or_create(
+        date=daily_indexes.date,
+        defaults={
+            "base_load_watt": base_load_watt,
+            "measured_minutes": measured_minutes,
+        },
+    )
+    return daily_base_load
+
+
+def detect_step_changes(base_loads: list[tuple[date, float | None]]) -> set[date]:
+    """
+    Days starting a step change (see the module docstring).
+
+    Args:
+        base_loads: (date, base load) pairs in date order.
+
+    Returns:
+        The dates of the first day of each step change.
+    """
+    known = [(day, watt) for day, watt in base_loads if watt is not None]
+    step_days = set()
+    for position in range(
+        BASE_LOAD_STEP_REFERENCE_DAYS,
+        len(known) - BASE_LOAD_STEP_CONFIRMATION_DAYS + 1,
+    ):
+        reference = median(
+            watt
+            for _, watt in known[position - BASE_LOAD_STEP_REFERENCE_DAYS : position]
+        )
+        threshold = max(BASE_LOAD_STEP_MIN_WATT, BASE_LOAD_STEP_MIN_RATIO * reference)
+        if abs(known[position - 1][1] - reference) >= threshold:
+            continue
+        deviations = [
+            watt - reference
+            for _, watt in known[position : position + BASE_LOAD_STEP_CONFIRMATION_DAYS]
+        ]
+        if all(deviation >= threshold for deviation in deviations) or all(
+            deviation <= -threshold for deviation in deviations
+        ):
+            step_days.add(known[position][0])
+    return step_days
+
+
+def refresh_step_changes() -> int:
+    """
+    Recomputes the step_change flag of every DailyBaseLoad, from the stored
+    base loads only (a few thousand rows at most), and writes the flags
+    that changed.
+
+    Returns:
+        The number of step changes.
+    """
+    rows = list(
+        DailyBaseLoad.objects.order_by("date").values_list(
+            "date", "base_load_watt", "step_change"
+        )
+    )
+    step_days = detect_step_changes([(day, watt) for day, watt, _ in rows])
+
+    flagged = {day for day, _, step_change in rows if step_change}
+    if step_days - flagged:
+        DailyBaseLoad.objects.filter(date__in=step_days - flagged).update(
+            step_change=True
+        )
+    if flagged - step_days:
+        DailyBaseLoad.objects.filter(date__in=flagged - step_days).update(
+            step_change=False
+        )
+    return len(step_days)
@@ -0,0 +1,210 @@
+"""
+Month-to-date bill and end-of-month forecast, from the rollups only.
+
+The month-to-date part is the sum of the month's DailyConsumption rows,
+today's included (incremented every minute by save_teleinfo_data), plus the
+subscription share of its recorded days. The rest of the month is projected
+from same-weekday profiles: the average Wh per hour and tarif period of each
+weekday over the BILL_FORECAST_PROFILE_WEEKS weeks before today, read from
+HourlyConsumption. Every remaining day gets the profile of its weekday,
+today the share of its profile still ahead (the current hour prorated), all
+priced at the kWh prices of the projected day; the remaining days are
+subscribed like the last recorded one.
+
+Nothing is reconstructed: once the profiles of the day are cached, a
+forecast costs a handful of small queries on the rollups and DailyIndexes
+metadata, cheap enough to be refreshed every minute.
+"""
+
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from consumption.constants import BILL_FORECAST_PROFILE_WEEKS
+from consumption.edf_pricing import get_price_timeline
+from consumption.models import DailyConsumption, DailyIndexes, HourlyConsumption
+from consumption.selectors import get_daily_subscriptions
+from consumption.services.rollups import compute_subscription_cost
+from consumption.utils import get_human_readable_tarif_period
+
+# The profiles only change when a day's rollups are rebuilt (compaction,
+# integrity scan, import), an hour of staleness doesn't show in a forecast
+BILL_FORECAST_PROFILE_CACHE_TIMEOUT = 60 * 60
+
+# {weekday: {hour: {tarif_period: average Wh}}}
+WeekdayProfiles = dict[int, dict[int, dict[str, float]]]
+
+
+def get_profile_cache_key(today: date) -> str:
+    return f"bill_forecast_profiles:{today.isoformat()}:{BILL_FORECAST_PROFILE_WEEKS}"
+
+
+def compute_weekday_profiles(today: date) -> tuple[WeekdayProfiles, int]:
+    """
+    Average Wh of each hour and tarif period of each weekday (0 = Monday)
+    over the BILL_FORECAST_PROFILE_WEEKS weeks before today, a weekday's
+    average being taken over its days having hourly rollups.
+
+    Returns:
+        The profiles and the number of days they were computed from.
+    """
+    totals: WeekdayProfiles = defaultdict(
+        lambda: defaultdict(lambda: defaultdict(float))
+    )
+    days_per_weekday: dict[int, set[date]] = defaultdict(set)
+
+    rows = HourlyConsumption.objects.filter(
+        date__gte=today - timedelta(weeks=BILL_FORECAST_PROFILE_WEEKS),
+        date__lt=today,
+    ).values_list("date", "hour", "tarif_period", "wh")
+    for day, hour, tarif_period, wh in rows:
+        weekday = day.weekday()
+        totals[weekday][hour][tarif_period] += wh
+        days_per_weekday[weekday].add(day)
+
+    profiles = {
+        weekday: {
+            hour: {
+                tarif_period: wh / len(days_per_weekday[weekday])
+                for tarif_period, wh in hour_totals.items()
+            }
+            for hour, hour_totals in weekday_totals.items()
+        }
+        for weekday, weekday_totals in totals.items()
+    }
+    return profiles, sum(len(days) for days in days_per_weekday.values())
+
+
+def get_weekday_profiles(today: date) -> tuple[WeekdayProfiles, int]:
+    """compute_weekday_profiles, cached for the day."""
+    cache_key = get_profile_cache_key(today)
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = compute_weekday_profiles(today)
+        cache.set(cache_key, cached, timeout=BILL_FORECAST_PROFILE_CACHE_TIMEOUT)
+    return cached
+
+
+def project_remaining_watt_hours(
+    profiles: WeekdayProfiles, now: datetime, month_end: date
+) -> dict[date, dict[str, float]]:
+    """
+    Projected Wh per tarif period of the rest of today (from `now`, the
+    current hour prorated) and of every day until month_end, included.
+    """
+    today = now.date()
+    projection: dict[date, dict[str, float]] = {}
+
+    day = today
+    while day <= month_end:
+        day_projection: dict[str, float] = defaultdict(float)
+        for hour, hour_profile in profiles.get(day.weekday(), {}).items():
+            if day == today:
+                if hour < now.hour:
+                    continue
+                share = 1 - now.minute / 60 if hour == now.hour else 1
+            else:
+                share = 1
+            for tarif_period, wh in hour_profile.items():
+                day_projection[tarif_period] += wh * share
+        projection[day] = dict(day_projection)
+        day += timedelta(days=1)
+
+    return projection
+
+
+def _add_to_totals(
+    totals: dict[str, dict[str, float]], tarif_period: str, wh: float, euros: float
+) -> None:
+    readable_label = get_human_readable_tarif_period(tarif_period) or tarif_period
+    label_totals = totals.setdefault(readable_label, {"wh": 0, "euros": 0})
+    label_totals["wh"] += wh
+    label_totals["euros"] += euros
+
+
+def _summarize(
+    tarif_periods: dict[str, dict[str, float]], subscription_euros: float
+) -> dict:
+    # Projected Wh are averages, rounded once summed
+    tarif_periods = {
+        label: {"wh": round(totals["wh"]), "euros": totals["euros"]}
+        for label, totals in tarif_periods.items()
+    }
+    euros = sum(totals["euros"] for totals in tarif_periods.values())
+    return {
+        "tarif_periods": tarif_periods,
+        "wh": sum(totals["wh"] for totals in tarif_periods.values()),
+        "euros": euros,
+        "subscription_euros": subscription_euros,
+        "bill_euros": euros + subscription_euros,
+    }
+
+
+def build_bill_forecast(now: datetime) -> dict:
+    """
+    Month-to-date cost and end-of-month forecast of the month of `now`
+    (local time).
+
+    Returns:
+        {"month", "profile_days", "month_to_date", "forecast"}, both parts
+        holding a "tarif_periods" breakdown ({readable tarif period: {"wh",
+        "euros"}}) and their "wh", "euros", "subscription_euros" and
+        "bill_euros" (consumption plus subscription). The forecast covers
+        the whole month, month_to_date included.
+    """
+    today = now.date()
+    month_start = today.replace(day=1)
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    timeline = get_price_timeline()
+
+    month_to_date: dict[str, dict[str, float]] = {}
+    rows = (
+        DailyConsumption.objects.filter(date__gte=month_start, date__lte=today)
+        .values("tarif_period")
+        .annotate(total_wh=Sum("wh"), total_euros=Sum("euros"))
+        .order_by("tarif_period")
+    )
+    for row in rows:
+        _add_to_totals(
+            month_to_date, row["tarif_period"], row["total_wh"], row["total_euros"]
+        )
+    subscription_to_date = compute_subscription_cost(month_start, today)
+
+    forecast = {
+        label: dict(label_totals) for label, label_totals in month_to_date.items()
+    }
+    profiles, profile_days = get_weekday_profiles(today)
+    projection = project_remaining_watt_hours(profiles, now, month_end)
+    for day, day_projection in projection.items():
+        for tarif_period, wh in day_projection.items():
+            euros = wh / 1000 * timeline.get_kwh_price(day, tarif_period)
+            _add_to_totals(forecast, tarif_period, wh, euros)
+
+    # Days not recorded yet (today until compaction) are subscribed like the
+    # last recorded one
+    recorded_days = {day for day, _, _ in get_daily_subscriptions(today, month_end)}
+    last_subscription = (
+        DailyIndexes.objects.filter(date__lte=today)
+        .exclude(tarif_period_type=None)
+        .exclude(subscribed_power=None)
+        .order_by("-date")
+        .values_list("tarif_period_type", "subscribed_power")
+        .first()
+    )
+    subscription_forecast = subscription_to_date
+    if last_subscription is not None:
+        subscription_forecast += sum(
+            timeline.get_daily_subscription_cost(day, *last_subscription) or 0
+            for day in projection
+            if day not in recorded_days
+        )
+
+    return {
+        "month": month_start,
+        "profile_days": profile_days,
+        "month_to_date": _summarize(month_to_date, subscription_to_date),
+        "forecast": _summarize(forecast, subscription_forecast),
+    }
@@ -0,0 +1,76 @@
+"""
+Response cache of closed days for the daily consumption endpoint.
+
+Only finalized days are cached (see consumption/services/finalization.py):
+their reconstruction is frozen on their row, whereas a day reconstructed on
+read also depends on other days (tarif periods filled from reference days).
+A finalized day's rendered response is cached under a key made of the date,
+the step, the pricing version, the finalization version and fingerprint of
+the row, and its subscribed power. Any change to the row resets its
+finalization (no caching until it is finalized again, with a new
+fingerprint) and any pricing change yields a new key (and a new ETag), so
+entries never need to be invalidated explicitly — stale ones just expire.
+"""
+
+import hashlib
+from datetime import date
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from consumption.constants import FINALIZATION_VERSION
+from consumption.edf_pricing import get_pricing_version
+from consumption.models import DailyIndexes, MinuteIndexSample
+
+CONSUMPTION_DAY_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 days
+
+
+def get_closed_day_cache_key(
+    day: date, step: int, columnar: bool = False
+) -> str | None:
+    """
+    Returns the cache key of a day's consumption response (row or columnar
+    layout), or None if the day isn't closed yet (today or later, minute
+    samples not compacted yet), was never recorded or isn't finalized (see
+    DailyIndexes.is_finalized): such responses aren't cached.
+    """
+    if day >= timezone.localdate():
+        return None
+    if MinuteIndexSample.objects.filter(date=day).exists():
+        return None
+
+    daily_indexes = (
+        DailyIndexes.objects.filter(date=day)
+        .only(
+            "date",
+            "packed_values",
+            "packed_tarif_periods",
+            "index_repairs",
+            "subscribed_power",
+            "finalized_version",
+            "finalized_fingerprint",
+        )
+        .first()
+    )
+    if daily_indexes is None or not daily_indexes.is_finalized():
+        return None
+
+    layout = "columnar" if columnar else "rows"
+    return (
+        f"consumption_day:{day.isoformat()}:{step}:{layout}:"
+        f"{get_pricing_version()}:{FINALIZATION_VERSION}:"
+        f"{daily_indexes.finalized_fingerprint}:{daily_indexes.subscribed_power}"
+    )
+
+
+def get_etag(cache_key: str) -> str:
+    """Strong ETag of a cached response, derived from its cache key only."""
+    return f'"{hashlib.sha1(cache_key.encode()).hexdigest()[:20]}"'
+
+
+def get_cached_day_response(cache_key: str) -> dict | None:
+    return cache.get(cache_key)
+
+
+def set_cached_day_response(cache_key: str, response_data: dict) -> None:
+    cache.set(cache_key, response_data, timeout=CONSUMPTION_DAY_CACHE_TIMEOUT)
@@ -0,0 +1,404 @@
+"""
+Import of Enedis exports (Linky load curve or daily indexes) into
+DailyIndexes, for the periods the teleinfo didn't record (the Pi was down,
+HouseBrain wasn't installed yet...).
+
+Enedis only gives the average power of each interval (load curve, in W) or
+one reading per register and day (daily indexes, in Wh). Both are turned
+into cumulative indexes written at the Enedis timestamps only: the minutes
+in between are left unknown, so that the reconstruction fills them by
+linear interpolation and flags them as interpolated, like any other gap,
+and the days get the resolution of the export (see
+consumption/services/retention.py): the interval between the readings of
+each load curve day (get_load_curve_day_resolution), a day for daily
+indexes. A load curve carries no tariff information: its energy goes to
+BASE, or to HCHC / HCHP along an HC schedule, starting from the last index
+recorded before the imported period (0 if none).
+
+The file is read line by line and each day is built as soon as it is
+complete; days are then written ENEDIS_IMPORT_BATCH_DAYS at a time, in one
+transaction per batch (bulk_create of the new days, bulk_update of the
+replaced ones). Memory stays bounded by one batch whatever the length of
+the export.
+"""
+
+import csv
+import logging
+import math
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timedelta
+from itertools import chain, pairwise
+
+from django.db import transaction
+from django.utils import timezone
+
+from consumption.constants import (
+    DAY_MINUTE_SLOTS,
+    ENEDIS_IMPORT_BATCH_DAYS,
+    ENEDIS_LOAD_CURVE_DEFAULT_STEP_MINUTES,
+    ENEDIS_LOAD_CURVE_MAX_STEP_MINUTES,
+    MINUTES_PER_DAY,
+    TARIF_PERIOD_CODES,
+    EnedisCsvKind,
+)
+from consumption.models import DailyIndexes
+from consumption.packing import pack_index_series, pack_tarif_period_codes
+from consumption.services.rollups import rebuild_rollups
+from consumption.services.tariff_simulator import HALF_HOUR_MINUTES
+from core.constants import LoggerLabel
+from teleinfo.constants import TarifPeriods, TeleinfoLabel
+
+logger = logging.getLogger("django")
+
+# First cell of the header row of the readings, after the export's metadata
+ENEDIS_TIMESTAMP_HEADER = "Horodate"
+
+IMPORTED_DAY_FIELDS = [
+    "packed_values",
+    "packed_tarif_periods",
+    "tarif_period_type",
+    "tempo_color",
+    "tarif_periods_complete",
+    "resolution",
+    # Reset: repairs and frozen reconstruction were made from the replaced data
+    "index_repairs",
+    "finalized_version",
+]
+
+
+def get_imported_labels(hc_flags: tuple[bool, ...] | None) -> list[str]:
+    """Index labels written by an import, BASE without an HC schedule."""
+    if hc_flags is None:
+        return [TeleinfoLabel.BASE]
+    return [TeleinfoLabel.HCHC, TeleinfoLabel.HCHP]
+
+
+def get_imported_tarif_period_codes(hc_flags: tuple[bool, ...] | None) -> bytes:
+    """Tarif period code of every slot of an imported day."""
+    if hc_flags is None:
+        return bytes([TARIF_PERIOD_CODES[TarifPeriods.TH]]) * DAY_MINUTE_SLOTS
+    return bytes(
+        TARIF_PERIOD_CODES[
+            TarifPeriods.HC
+            if hc_flags[slot % MINUTES_PER_DAY // HALF_HOUR_MINUTES]
+            else TarifPeriods.HP
+        ]
+        for slot in range(DAY_MINUTE_SLOTS)
+    )
+
+
+def _parse_timestamp(value: str) -> datetime:
+    moment = datetime.fromisoformat(value.strip())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_number(value: str) -> float | None:
+    value = value.strip().replace(",", ".")
+    return float(value) if value else None
+
+
+def iter_enedis_readings(
+    lines: Iterable[str],
+) -> Iterator[tuple[datetime, list[float | None]]]:
+    """
+    Yields the readings of an Enedis CSV export (";"-separated), skipping
+    its metadata lines up to the "Horodate;..." header row.
+
+    Returns:
+        (aware datetime, [value of each column, None if empty]) tuples, in
+        file order. Naive timestamps are taken as local time.
+
+    Raises:
+        ValueError: if there is no header row or a reading is malformed.
+    """
+    reader = csv.reader(lines, delimiter=";")
+    for row in reader:
+        if row and row[0].strip() == ENEDIS_TIMESTAMP_HEADER:
+            break
+    else:
+        raise ValueError(f'No "{ENEDIS_TIMESTAMP_HEADER};..." header row found.')
+
+    for row in reader:
+        if not row or not row[0].strip():
+            continue
+        try:
+            reading = _parse_timestamp(row[0]), [_parse_number(v) for v in row[1:]]
+        except ValueError:
+            raise ValueError(
+                f"Invalid reading on line {reader.line_num}: {';'.join(row)!r}."
+            )
+        yield reading
+
+
+def _check_chronological_order(moment: datetime, previous: datetime | None) -> None:
+    if previous is not None and moment <= previous:
+        raise ValueError(f"Readings aren't in chronological order at {moment}.")
+
+
+def iter_load_curve_indexes(
+    readings: Iterable[tuple[datetime, list[float | None]]],
+    hc_flags: tuple[bool, ...] | None,
+    start_indexes: dict[str, int],
+) -> Iterator[tuple[datetime, dict[str, int]]]:
+    """
+    Turns load curve readings, the average power (W) of the interval ending
+    at their timestamp, into cumulative indexes (Wh) at these timestamps.
+
+    An interval lasts since the previous reading, or
+    ENEDIS_LOAD_CURVE_DEFAULT_STEP_MINUTES for the first reading and after
+    a gap longer than ENEDIS_LOAD_CURVE_MAX_STEP_MINUTES: its start is then
+    yielded too, with the indexes left as they were (the energy of a gap is
+    unknown). Empty readings are skipped.
+    """
+    labels = get_imported_labels(hc_flags)
+    indexes = {label: float(start_indexes.get(label, 0)) for label in labels}
+    local_timezone = timezone.get_current_timezone()
+    previous = None
+    for moment, values in readings:
+        watts = values[0] if values else None
+        if watts is None:
+            continue
+        _check_chronological_order(moment, previous)
+
+        step = (moment - previous) / timedelta(minutes=1) if previous else None
+        if step is None or step > ENEDIS_LOAD_CURVE_MAX_STEP_MINUTES:
+            step = ENEDIS_LOAD_CURVE_DEFAULT_STEP_MINUTES
+            yield (
+                moment - timedelta(minutes=step),
+                {label: round(index) for label, index in indexes.items()},
+            )
+
+        label = labels[0]
+        if hc_flags is not None:
+            start = (moment - timedelta(minutes=step)).astimezone(local_timezone)
+            hc = hc_flags[(start.hour * 60 + start.minute) // HALF_HOUR_MINUTES]
+            label = TeleinfoLabel.HCHC if hc else TeleinfoLabel.HCHP
+        indexes[label] += watts * step / 60
+        yield moment, {label: round(index) for label, index in indexes.items()}
+        previous = moment
+
+
+def iter_daily_index_points(
+    readings: Iterable[tuple[datetime, list[float | None]]], labels: list[str]
+) -> Iterator[tuple[datetime, dict[str, int]]]:
+    """
+    Maps the register columns of daily index readings (Wh), in order, to
+    `labels`. Empty registers are skipped.
+    """
+    previous = None
+    for moment, values in readings:
+        if len(values) < len(labels):
+            raise ValueError(
+                f"Expected {len(labels)} register columns ({', '.join(labels)}) "
+                f"at {moment}."
+            )
+        indexes = {
+            label: round(value)
+            for label, value in zip(labels, values)
+            if value is not None
+        }
+        if not indexes:
+            continue
+        _check_chronological_order(moment, previous)
+        yield moment, indexes
+        previous = moment
+
+
+def iter_imported_days(
+    points: Iterable[tuple[datetime, dict[str, int]]],
+) -> Iterator[tuple[date, dict[str, list[int | None]]]]:
+    """
+    Groups chronological index points into per-day minute series of local
+    time, a point at midnight also being the "24:00" slot of the day before
+    (as everywhere else, DST changes aren't handled: the repeated hour of
+    October overwrites its slots, energy included). Days are
+    yielded as soon as they are complete; the ones with less than two known
+    slots for every label (nothing to consume) are left out.
+    """
+    pending: dict[date, dict[str, list[int | None]]] = {}
+    local_timezone = timezone.get_current_timezone()
+
+    def iter_days_before(day: date | None):
+        for pending_day in sorted(pending):
+            if day is not None and pending_day >= day:
+                break
+            index_series = pending.pop(pending_day)
+            if any(
+                sum(index is not None for index in series) > 1
+                for series in index_series.values()
+            ):
+                yield pending_day, index_series
+
+    for moment, indexes in points:
+        local_moment = moment.astimezone(local_timezone)
+        day = local_moment.date()
+        slot = local_moment.hour * 60 + local_moment.minute
+        targets = [(day, slot)]
+        if slot == 0:
+            targets.append((day - timedelta(days=1), MINUTES_PER_DAY))
+        for target_day, target_slot in targets:
+            index_series = pending.setdefault(target_day, {})
+            for label, index in indexes.items():
+                if label not in index_series:
+                    index_series[label] = [None] * DAY_MINUTE_SLOTS
+                index_series[label][target_slot] = index
+        yield from iter_days_before(day)
+
+    yield from iter_days_before(None)
+
+
+def get_last_recorded_indexes(before: date) -> dict[str, int]:
+    """Last known index of each label on the latest day recorded before `before`."""
+    daily_indexes = (
+        DailyIndexes.objects.filter(date__lt=before).order_by("-date").first()
+    )
+    if daily_indexes is None:
+        return {}
+    last_indexes = {}
+    for label, series in daily_indexes.get_index_series().items():
+        known = [index for index in series if index is not None]
+        if known:
+            last_indexes[label] = known[-1]
+    return last_indexes
+
+
+def get_load_curve_day_resolution(index_series: dict[str, list[int | None]]) -> int:
+    """
+    Resolution of an imported load curve day: the interval most often seen
+    between its known slots (so that a gap or the start of the export
+    doesn't count), reduced to its largest divisor dividing the day, so that
+    the readings stay on the served grid (see get_served_step).
+    """
+    slots = sorted(
+        {
+            slot
+            for series in index_series.values()
+            for slot, index in enumerate(series)
+            if index is not None
+        }
+    )
+    intervals = Counter(end - start for start, end in pairwise(slots))
+    [(interval, _)] = intervals.most_common(1)
+    return math.gcd(interval, MINUTES_PER_DAY)
+
+
+def build_imported_day(
+    day: date,
+    index_series: dict[str, list[int | None]],
+    tarif_period_codes: bytes,
+    resolution: int,
+) -> DailyIndexes:
+    """An unsaved DailyIndexes of imported indexes, tarif metadata included."""
+    daily_indexes = DailyIndexes(
+        date=day,
+        packed_values=pack_index_series(index_series),
+        packed_tarif_periods=pack_tarif_period_codes(tarif_period_codes),
+        resolution=resolution,
+    )
+    daily_indexes.refresh_tarif_metadata()
+    return daily_indexes
+
+
+def save_imported_days(days: list[DailyIndexes], overwrite: bool) -> Counter[str]:
+    """
+    Writes a batch of imported days in one transaction, then rebuilds their
+    rollups. Days already recorded are only replaced when `overwrite` is
+    set, today and later never (the teleinfo is recording them).
+
+    Returns:
+        The number of "created", "updated" and "skipped" days.
+    """
+    counts: Counter[str] = Counter()
+    today = timezone.localdate()
+    with transaction.atomic():
+        existing = dict(
+            DailyIndexes.objects.filter(
+                date__in=[daily_indexes.date for daily_indexes in days]
+            ).values_list("date", "pk")
+        )
+        to_create, to_update = [], []
+        for daily_indexes in days:
+            if daily_indexes.date >= today or (
+                daily_indexes.date in existing and not overwrite
+            ):
+                counts["skipped"] += 1
+            elif daily_indexes.date in existing:
+                daily_indexes.pk = existing[daily_indexes.date]
+                to_update.append(daily_indexes)
+            else:
+                to_create.append(daily_indexes)
+
+        DailyIndexes.objects.bulk_create(to_create)
+        DailyIndexes.objects.bulk_update(to_update, IMPORTED_DAY_FIELDS)
+        rebuild_rollups(to_create + to_update)
+
+    counts["created"] += len(to_create)
+    counts["updated"] += len(to_update)
+    return counts
+
+
+def import_enedis_csv(
+    lines: Iterable[str],
+    kind: EnedisCsvKind,
+    hc_flags: tuple[bool, ...] | None = None,
+    overwrite: bool = False,
+    batch_size: int = ENEDIS_IMPORT_BATCH_DAYS,
+) -> dict[str, int]:
+    """
+    Imports an Enedis CSV export (see the module docstring).
+
+    Args:
+        lines: The lines of the export, read lazily.
+        kind: Load curve or daily indexes.
+        hc_flags: HC schedule (see parse_hc_schedule) splitting the
+                  consumption into HCHC / HCHP, BASE when None. For daily
+                  indexes, the first two registers are then HC and HP.
+        overwrite: Whether days already recorded are replaced.
+        batch_size: Days written per transaction.
+
+    Returns:
+        The number of "created", "updated" and "skipped" days.
+
+    Raises:
+        ValueError: if the export is malformed. Batches already written
+                    stay imported.
+    """
+    readings = iter_enedis_readings(lines)
+    labels = get_imported_labels(hc_flags)
+    if kind == EnedisCsvKind.LOAD_CURVE:
+        first = next(readings, None)
+        start_indexes = (
+            get_last_recorded_indexes(timezone.localdate(first[0])) if first else {}
+        )
+        points = iter_load_curve_indexes(
+            chain([first] if first else [], readings), hc_flags, start_indexes
+        )
+    else:
+        points = iter_daily_index_points(readings, labels)
+
+    tarif_period_codes = get_imported_tarif_period_codes(hc_flags)
+    counts: Counter[str] = Counter(created=0, updated=0, skipped=0)
+    batch: list[DailyIndexes] = []
+    for day, index_series in iter_imported_days(points):
+        resolution = (
+            get_load_curve_day_resolution(index_series)
+            if kind == EnedisCsvKind.LOAD_CURVE
+            else MINUTES_PER_DAY
+        )
+        batch.append(
+            build_imported_day(day, index_series, tarif_period_codes, resolution)
+        )
+        if len(batch) >= batch_size:
+            counts.update(save_imported_days(batch, overwrite))
+            batch = []
+    if batch:
+        counts.update(save_imported_days(batch, overwrite))
+
+    logger.info(
+        f"{LoggerLabel.CONSUMPTION} Enedis {kind} imported: {counts['created']} "
+        f"days created, {counts['updated']} updated, {counts['skipped']} skipped"
+    )
+    return dict(counts)
@@ -0,0 +1,69 @@
+"""
+Streaming export of reconstructed consumption over a date range.
+
+Rows are produced by generators, day after day (iter_bridged_days streams
+the reconstructed days, gaps spanning midnight bridged, and
+build_consumption_data_from_series turns one day at a time into entries),
+then formatted line by line as CSV or NDJSON. Memory use therefore stays
+the same whatever the length of the range: a year of 1-minute rows (~525k
+lines) never holds more than two days.
+"""
+
+import csv
+import json
+from collections.abc import Iterable, Iterator
+from datetime import date
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from consumption.cross_midnight import iter_bridged_days
+from consumption.reconstruction import build_consumption_data_from_series
+
+EXPORT_FIELDS = [
+    "date",
+    "start_time",
+    "end_time",
+    "wh",
+    "average_watt",
+    "euros",
+    "interpolated",
+    "tarif_period",
+]
+
+
+def iter_consumption_rows(start: date, end: date, step: int) -> Iterator[dict]:
+    """
+    Yields the consumption entries of every recorded day of [start, end]
+    (both included), in chronological order, see build_consumption_data.
+    Gaps spanning midnight are interpolated (see consumption/cross_midnight.py).
+    """
+    for daily_indexes, reconstructed in iter_bridged_days(start, end):
+        yield from build_consumption_data_from_series(
+            daily_indexes, daily_indexes.date, step, reconstructed
+        )
+
+
+class _LineBuffer:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    """CSV lines of consumption entries, header first."""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def iter_ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    """One JSON object per line and per consumption entry."""
+    for row in rows:
+        yield (
+            json.dumps(
+                {field: row[field] for field in EXPORT_FIELDS}, cls=DjangoJSONEncoder
+            )
+            + "\n"
+        )
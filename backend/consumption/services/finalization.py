@@ -0,0 +1,130 @@
+"""
+End-of-day finalization: the reconstruction of a closed day, frozen on its
+DailyIndexes row.
+
+A closed day never changes again, yet every read of it interpolated its
+gaps, filled its tarif periods (reference day lookups included) and
+recomputed its totals. finalize_day stores them once on the row instead:
+the interpolated index series, the interpolation flags, the filled tarif
+periods (in the packed formats of consumption/packing.py) and the Wh of
+each index label, along with FINALIZATION_VERSION and a fingerprint of the
+recorded data they derive from. reconstruct_day and compute_day_totals
+(consumption/reconstruction.py) then only decode them; prices are still
+applied at read time, so that pricing changes keep applying.
+
+Every save() of a row resets its finalized_version, as do the bulk writers
+(retention policy, integrity scan, Enedis import); the fingerprint guards
+reads against any other write. finalize_closed_days finalizes the closed
+days whose finalized_version isn't the current one: it runs after each
+compaction (which also catches up with the whole history once
+FINALIZATION_VERSION is bumped), and through the finalize_consumption_days
+command.
+"""
+
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from consumption.constants import FINALIZATION_BATCH_DAYS, FINALIZATION_VERSION
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.packing import (
+    pack_flag_series,
+    pack_index_series,
+    pack_tarif_period_codes,
+    tarif_period_to_code,
+)
+from consumption.reconstruction import compute_reconstructed_day
+from consumption.utils import compute_index_label_watt_hours
+from core.constants import LoggerLabel
+
+logger = logging.getLogger("django")
+
+FINALIZED_FIELDS = [
+    "finalized_version",
+    "finalized_fingerprint",
+    "packed_reconstructed_values",
+    "packed_filled_tarif_periods",
+    "packed_interpolated",
+    "finalized_totals",
+]
+
+
+def finalize_day(daily_indexes: DailyIndexes) -> None:
+    """
+    Freezes the reconstruction of a closed day on its row (not saved), from
+    the data saved on it.
+    """
+    reconstructed = compute_reconstructed_day(daily_indexes, daily_indexes.date)
+    daily_indexes.packed_reconstructed_values = pack_index_series(
+        reconstructed.index_series
+    )
+    daily_indexes.packed_interpolated = pack_flag_series(reconstructed.interpolated)
+    daily_indexes.packed_filled_tarif_periods = pack_tarif_period_codes(
+        bytes(
+            tarif_period_to_code(tarif_period)
+            for tarif_period in reconstructed.tarif_period_series
+        )
+    )
+    daily_indexes.finalized_totals = [
+        [index_label, wh]
+        for index_label, wh in compute_index_label_watt_hours(
+            daily_indexes.get_repaired_values()
+        )
+    ]
+    daily_indexes.finalized_version = FINALIZATION_VERSION
+    daily_indexes.finalized_fingerprint = daily_indexes.get_source_fingerprint()
+
+
+def finalize_closed_days(
+    start: date | None = None,
+    end: date | None = None,
+    recheck: bool = False,
+    batch_size: int = FINALIZATION_BATCH_DAYS,
+) -> int:
+    """
+    Finalizes the closed days of [start, end] (both included, unbounded when
+    None) not finalized by the current FINALIZATION_VERSION, batch_size
+    days per transaction. A day is closed once before today and compacted.
+
+    Args:
+        recheck: Also checks the days already finalized by the current
+                 version, and finalizes again those whose recorded data
+                 changed since (see DailyIndexes.is_finalized).
+
+    Returns:
+        The number of days finalized.
+    """
+    days = DailyIndexes.objects.filter(date__lt=timezone.localdate()).exclude(
+        date__in=MinuteIndexSample.objects.values("date")
+    )
+    if not recheck:
+        days = days.exclude(finalized_version=FINALIZATION_VERSION)
+    if start is not None:
+        days = days.filter(date__gte=start)
+    if end is not None:
+        days = days.filter(date__lte=end)
+    # Ids listed upfront, SQLite not isolating a query from the writes made
+    # while iterating it
+    pks = list(days.order_by("date").values_list("pk", flat=True))
+
+    finalized_days = 0
+    for position in range(0, len(pks), batch_size):
+        batch = [
+            daily_indexes
+            for daily_indexes in DailyIndexes.objects.filter(
+                pk__in=pks[position : position + batch_size]
+            )
+            if not daily_indexes.is_finalized()
+        ]
+        for daily_indexes in batch:
+            finalize_day(daily_indexes)
+        with transaction.atomic():
+            DailyIndexes.objects.bulk_update(batch, FINALIZED_FIELDS)
+        finalized_days += len(batch)
+
+    if finalized_days:
+        logger.info(f"{LoggerLabel.CONSUMPTION} {finalized_days} days finalized")
+
+    return finalized_days
@@ -0,0 +1,116 @@
+"""
+Hour-of-week heatmap: the average and HEATMAP_PERCENTILE power of each of
+the 168 hours of the week (Monday 00h to Sunday 23h) over a window of weeks.
+
+Built from the rollups only: the HourlyConsumption rows of the window are
+read in one query and folded in a single pass into one list of hourly Wh
+per cell (an hour's Wh being its average power in W), optionally split by
+tarif period. A year of history is ~9k hours, nothing is reconstructed.
+The result only changes when a day of the window is rolled up again, it is
+cached per window for the day.
+"""
+
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from consumption.constants import HEATMAP_PERCENTILE
+from consumption.models import HourlyConsumption
+from consumption.utils import get_human_readable_tarif_period
+
+# See BILL_FORECAST_PROFILE_CACHE_TIMEOUT, same rollups
+HEATMAP_CACHE_TIMEOUT = 60 * 60
+
+HOURS_PER_WEEK = 7 * 24
+
+
+def get_heatmap_cache_key(today: date, weeks: int, by_tarif_period: bool) -> str:
+    return f"consumption_heatmap:{today.isoformat()}:{weeks}:{int(by_tarif_period)}"
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """Nearest-rank percentile of `values`, None when empty."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return float(sorted(values)[rank - 1])
+
+
+def _summarize_cell(watts: list[float]) -> dict[str, float | None]:
+    return {
+        "average_watt": sum(watts) / len(watts) if watts else None,
+        "percentile_watt": percentile(watts, HEATMAP_PERCENTILE),
+    }
+
+
+def compute_heatmap(today: date, weeks: int, by_tarif_period: bool) -> dict:
+    """
+    Hour-of-week heatmap of the `weeks` weeks before today.
+
+    Args:
+        today: The first day left out of the window.
+        weeks: The length of the window.
+        by_tarif_period: Also splits each cell by tarif period. The power of
+                         a tarif period counts 0 W in the hours of the cell
+                         it doesn't appear in, so that the split averages add
+                         up to the cell's average.
+
+    Returns:
+        {"start", "end", "days", "data"}: the window (both included), the
+        number of its days having hourly rollups, and the 168 cells by
+        weekday (0 = Monday) and hour. A cell without any recorded hour has
+        None powers.
+    """
+    start, end = today - timedelta(weeks=weeks), today - timedelta(days=1)
+
+    # {(day, hour): {tarif_period: Wh}}
+    hours: dict[tuple[date, int], dict[str, int]] = defaultdict(dict)
+    rows = (
+        HourlyConsumption.objects.filter(date__gte=start, date__lte=end)
+        .order_by()
+        .values_list("date", "hour", "tarif_period", "wh")
+    )
+    for day, hour, tarif_period, wh in rows:
+        hours[day, hour][tarif_period] = wh
+
+    cells: list[list[dict[str, int]]] = [[] for _ in range(HOURS_PER_WEEK)]
+    for (day, hour), watt_hours in hours.items():
+        cells[day.weekday() * 24 + hour].append(watt_hours)
+
+    data = []
+    for cell_number, cell in enumerate(cells):
+        element = {
+            "weekday": cell_number // 24,
+            "hour": cell_number % 24,
+            "hours": len(cell),
+            **_summarize_cell([sum(watt_hours.values()) for watt_hours in cell]),
+        }
+        if by_tarif_period:
+            element["tarif_periods"] = {}
+            for tarif_period in sorted(set().union(*cell)):
+                readable_label = (
+                    get_human_readable_tarif_period(tarif_period) or tarif_period
+                )
+                element["tarif_periods"][readable_label] = _summarize_cell(
+                    [watt_hours.get(tarif_period, 0) for watt_hours in cell]
+                )
+        data.append(element)
+
+    return {
+        "start": start,
+        "end": end,
+        "days": len({day for day, _ in hours}),
+        "data": data,
+    }
+
+
+def get_heatmap(today: date, weeks: int, by_tarif_period: bool) -> dict:
+    """compute_heatmap, cached per window for the day."""
+    cache_key = get_heatmap_cache_key(today, weeks, by_tarif_period)
+    heatmap = cache.get(cache_key)
+    if heatmap is None:
+        heatmap = compute_heatmap(today, weeks, by_tarif_period)
+        cache.set(cache_key, heatmap, timeout=HEATMAP_CACHE_TIMEOUT)
+    return heatmap
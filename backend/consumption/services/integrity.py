@@ -0,0 +1,228 @@
+"""
+Integrity scan of the recorded indexes: counter resets, regressions and
+physically impossible jumps.
+
+The reconstruction takes the difference of consecutive indexes as is, so
+a meter swap or a corrupted reading that passed the teleinfo checksum
+shows up as a negative or huge consumption. scan_index_series checks every
+interval between two known indexes of a label: the index may neither go
+back nor grow faster than ISOUSC lets through (get_max_wh_per_minute).
+Clean days, nearly all of them, cost a single pass of comparisons over
+their known indexes; an anomaly is then followed up:
+
+  - the indexes come back in line with the last sound one within
+    INTEGRITY_GLITCH_MAX_MINUTES: a glitch (REGRESSION or JUMP), the
+    readings in between are dropped and get interpolated,
+  - otherwise a lasting discontinuity (RESET or JUMP): the following
+    indexes are offset to continue from the last sound one, the interval
+    itself counting for nothing.
+
+Repairs are annotations stored on the day (DailyIndexes.index_repairs) and
+applied at read time (see consumption/repairs.py): the recorded indexes
+are never rewritten, a rescan always starts from them again. Days are
+scanned when compacted (compact_minute_samples), the whole history by
+scan_consumption_integrity (management command of the same name).
+"""
+
+import logging
+from collections import Counter
+from datetime import date
+
+from django.db import transaction
+
+from consumption.constants import (
+    INTEGRITY_GLITCH_MAX_MINUTES,
+    INTEGRITY_POWER_TOLERANCE,
+    INTEGRITY_SCAN_BATCH_DAYS,
+    IndexRepairKind,
+)
+from consumption.models import DailyIndexes
+from consumption.services.base_load import refresh_step_changes, save_day_base_load
+from consumption.services.rollups import rebuild_rollups
+from core.constants import DEFAULT_VOLTAGE, LoggerLabel
+from teleinfo.constants import ISOUC_TO_SUBSCRIBED_POWER
+
+logger = logging.getLogger("django")
+
+# Subscribed intensity (ISOUSC, in A) of each subscribed power (kVA)
+SUBSCRIBED_INTENSITIES: dict[float, int] = {
+    subscribed_power: int(isousc)
+    for isousc, subscribed_power in ISOUC_TO_SUBSCRIBED_POWER.items()
+}
+
+
+def get_max_wh_per_minute(subscribed_power: float | None) -> float:
+    """
+    Most energy (Wh) the installation can draw in a minute, given its
+    subscribed power in kVA (the largest subscription when unknown).
+    """
+    intensity = SUBSCRIBED_INTENSITIES.get(
+        subscribed_power, max(SUBSCRIBED_INTENSITIES.values())
+    )
+    return intensity * DEFAULT_VOLTAGE * INTEGRITY_POWER_TOLERANCE / 60
+
+
+def _is_sound(elapsed_minutes: int, wh: int, max_wh_per_minute: float) -> bool:
+    # Indexes are rounded to the Wh, hence the extra one
+    return 0 <= wh <= elapsed_minutes * max_wh_per_minute + 1
+
+
+def _find_recovery(
+    known: list[tuple[int, int]],
+    position: int,
+    offset: int,
+    sound_slot: int,
+    sound_index: int,
+    max_wh_per_minute: float,
+) -> int | None:
+    """
+    Position of the first known index after `position` in line again with
+    the last sound one once offset, within INTEGRITY_GLITCH_MAX_MINUTES, or
+    None.
+    """
+    first_slot = known[position][0]
+    for later in range(position + 1, len(known)):
+        slot, index = known[later]
+        if slot - first_slot > INTEGRITY_GLITCH_MAX_MINUTES:
+            return None
+        if _is_sound(
+            slot - sound_slot, index + offset - sound_index, max_wh_per_minute
+        ):
+            return later
+    return None
+
+
+def scan_index_series(
+    label: str, series: list[int | None], max_wh_per_minute: float
+) -> list[dict]:
+    """
+    Finds the anomalies of one label's minute-indexed series.
+
+    Args:
+        label: The index label, recorded in the repairs.
+        series: The recorded indexes, slot 0 = "00:00".
+        max_wh_per_minute: See get_max_wh_per_minute.
+
+    Returns:
+        The repair annotations of the series by increasing minute (see
+        consumption/repairs.py), [] when it's sound.
+    """
+    known = [(slot, index) for slot, index in enumerate(series) if index is not None]
+    if all(
+        _is_sound(slot - previous_slot, index - previous_index, max_wh_per_minute)
+        for (previous_slot, previous_index), (slot, index) in zip(known, known[1:])
+    ):
+        return []
+
+    repairs = []
+    offset = 0
+    sound_slot, sound_index = known[0]
+    position = 1
+    while position < len(known):
+        slot, index = known[position]
+        index += offset
+        if _is_sound(slot - sound_slot, index - sound_index, max_wh_per_minute):
+            sound_slot, sound_index = slot, index
+            position += 1
+            continue
+
+        went_back = index < sound_index
+        recovery = _find_recovery(
+            known, position, offset, sound_slot, sound_index, max_wh_per_minute
+        )
+        if recovery is not None:
+            kind = IndexRepairKind.REGRESSION if went_back else IndexRepairKind.JUMP
+            dropped_minutes, repair_offset = known[recovery][0] - slot, 0
+            position = recovery
+        else:
+            kind = IndexRepairKind.RESET if went_back else IndexRepairKind.JUMP
+            dropped_minutes, repair_offset = 0, sound_index - index
+            offset += repair_offset
+            sound_slot = slot
+            position += 1
+        repairs.append(
+            {
+                "label": label,
+                "kind": kind.value,
+                "minute": slot,
+                "dropped_minutes": dropped_minutes,
+                "offset": repair_offset,
+            }
+        )
+
+    return repairs
+
+
+def scan_day(daily_indexes: DailyIndexes) -> list[dict]:
+    """Repair annotations of a day, from its recorded indexes."""
+    max_wh_per_minute = get_max_wh_per_minute(daily_indexes.subscribed_power)
+    return [
+        repair
+        for label, series in daily_indexes.get_index_series(repaired=False).items()
+        for repair in scan_index_series(label, series, max_wh_per_minute)
+    ]
+
+
+def scan_consumption_integrity(
+    start: date | None = None,
+    end: date | None = None,
+    batch_size: int = INTEGRITY_SCAN_BATCH_DAYS,
+) -> dict[str, int]:
+    """
+    Rescans the stored days of [start, end] (both included, unbounded when
+    None) and stores their repairs, batch_size days per transaction. The
+    rollups and base loads (still recorded every minute) of the days whose
+    repairs changed are rebuilt.
+
+    Returns:
+        {"scanned_days", "changed_days"} and the number of repairs of each
+        IndexRepairKind found.
+    """
+    date_filters = {}
+    if start is not None:
+        date_filters["date__gte"] = start
+    if end is not None:
+        date_filters["date__lte"] = end
+    # Ids listed upfront, SQLite not isolating a query from the writes made
+    # while iterating it
+    pks = list(
+        DailyIndexes.objects.filter(**date_filters)
+        .order_by("date")
+        .values_list("pk", flat=True)
+    )
+
+    counts = Counter(dict.fromkeys(IndexRepairKind, 0))
+    changed_days = 0
+    for position in range(0, len(pks), batch_size):
+        batch = []
+        for daily_indexes in DailyIndexes.objects.filter(
+            pk__in=pks[position : position + batch_size]
+        ):
+            repairs = scan_day(daily_indexes)
+            counts.update(repair["kind"] for repair in repairs)
+            if repairs != daily_indexes.index_repairs:
+                daily_indexes.index_repairs = repairs
+                daily_indexes.finalized_version = None
+                batch.append(daily_indexes)
+
+        with transaction.atomic():
+            DailyIndexes.objects.bulk_update(
+                batch, ["index_repairs", "finalized_version"]
+            )
+            rebuild_rollups(batch)
+            for daily_indexes in batch:
+                if daily_indexes.resolution == 1:
+                    save_day_base_load(daily_indexes)
+        changed_days += len(batch)
+
+    if changed_days:
+        refresh_step_changes()
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} Index repairs changed on {changed_days} days"
+        )
+
+    return {
+        "scanned_days": len(pks),
+        "changed_days": changed_days,
+        **{kind.value: counts[kind] for kind in IndexRepairKind},
+    }
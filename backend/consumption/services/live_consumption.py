@@ -0,0 +1,259 @@
+"""
+Incremental ("since minute X") consumption of the current day, for the live
+chart.
+
+The last state computed for a day is kept in the cache: the last minute at
+which every index label has a recorded value (the "final" minute, whose
+entries can no longer change) with those indexes, the tarif period of that
+minute and the first index of each label. A refresh then only reads the
+minute samples recorded since the final minute, rebuilds the 1-minute
+entries up to the new final minute and moves the state forward: its cost
+depends on the number of new minutes, not on the length of the day.
+
+Entries are exactly the step=1 entries of build_consumption_data_from_series
+for the same minutes: both ends of the rebuilt window are known for every
+label, so the gaps inside it are interpolated the same way. Whenever the
+state can't be used (none cached yet, `since` before the final minute, a new
+index label), the whole day is rebuilt once and the state reset from it.
+"""
+
+from datetime import date
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from consumption.constants import TARIF_PERIODS_BY_CODE
+from consumption.edf_pricing import get_price_timeline
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.packing import SLOT_MINUTE_STRS
+from consumption.reconstruction import (
+    build_consumption_data_from_series,
+    compute_day_totals,
+)
+from consumption.selectors import get_day_indexes
+from consumption.utils import (
+    compute_totals_for_a_day,
+    get_human_readable_tarif_period,
+    get_index_label,
+    interpolate_index_series,
+)
+
+LIVE_STATE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_live_state_cache_key(day: date) -> str:
+    return f"consumption_live:{day.isoformat()}"
+
+
+def build_live_state(daily_indexes: DailyIndexes) -> dict | None:
+    """
+    Builds the live state of a day from its full indexes.
+
+    Returns:
+        {"final_slot", "indexes", "tarif_period", "first_indexes"} (see the
+        module docstring), or None while no minute is known for every label.
+    """
+    index_series = daily_indexes.get_index_series()
+    if not index_series:
+        return None
+
+    final_slot = next(
+        (
+            slot
+            for slot in range(len(next(iter(index_series.values()))) - 1, -1, -1)
+            if all(series[slot] is not None for series in index_series.values())
+        ),
+        None,
+    )
+    if final_slot is None:
+        return None
+
+    tarif_period_series = daily_indexes.get_tarif_period_series()
+    return {
+        "final_slot": final_slot,
+        "indexes": {
+            label: series[final_slot] for label, series in index_series.items()
+        },
+        "tarif_period": (
+            tarif_period_series[final_slot] if tarif_period_series else None
+        ),
+        "first_indexes": {
+            label: next(
+                (slot, index) for slot, index in enumerate(series) if index is not None
+            )
+            for label, series in index_series.items()
+        },
+    }
+
+
+def compute_live_totals(
+    day: date,
+    first_indexes: dict[str, tuple[int, int]],
+    last_indexes: dict[str, tuple[int, int]],
+) -> dict[str, dict[str, int | float | None]]:
+    """
+    Totals of compute_totals_for_a_day, from the first and last recorded
+    (slot, index) of each label only.
+    """
+    return compute_totals_for_a_day(
+        day,
+        {
+            label: {
+                SLOT_MINUTE_STRS[first_slot]: first_index,
+                SLOT_MINUTE_STRS[last_indexes[label][0]]: last_indexes[label][1],
+            }
+            for label, (first_slot, first_index) in first_indexes.items()
+        },
+    )
+
+
+def advance_live_state(day: date, state: dict) -> tuple[list[dict], dict, dict] | None:
+    """
+    Moves a live state forward with the minute samples recorded since its
+    final minute.
+
+    Returns:
+        A (new entries, new state, totals) tuple, or None if the samples
+        don't fit the state (a new index label showed up).
+    """
+    final_slot = state["final_slot"]
+    labels = state["indexes"].keys()
+
+    indexes_by_slot: dict[int, dict[str, int]] = {}
+    tarif_periods_by_slot: dict[int, str | None] = {}
+    last_indexes = {
+        label: (final_slot, index) for label, index in state["indexes"].items()
+    }
+    samples = MinuteIndexSample.objects.filter(
+        date=day, minute__gte=final_slot
+    ).order_by("minute", "label")
+    for sample in samples:
+        if sample.label not in labels:
+            return None
+        indexes_by_slot.setdefault(sample.minute, {})[sample.label] = sample.index
+        tarif_periods_by_slot.setdefault(
+            sample.minute, TARIF_PERIODS_BY_CODE.get(sample.tarif_period_code)
+        )
+        last_indexes[sample.label] = (sample.minute, sample.index)
+
+    new_final_slot = max(
+        (
+            slot
+            for slot, indexes in indexes_by_slot.items()
+            if len(indexes) == len(labels)
+        ),
+        default=final_slot,
+    )
+    totals = compute_live_totals(day, state["first_indexes"], last_indexes)
+    if new_final_slot == final_slot:
+        return [], state, totals
+
+    # Tarif periods of the window, with the same on-the-hour correction as
+    # add_new_tarif_period
+    window_slots = range(final_slot, new_final_slot + 1)
+    tarif_periods = {final_slot: state["tarif_period"]}
+    for slot in window_slots:
+        if slot not in tarif_periods_by_slot:
+            tarif_periods.setdefault(slot, None)
+            continue
+        tarif_periods[slot] = tarif_periods_by_slot[slot]
+        if (
+            slot % 60 == 1
+            and slot > final_slot
+            and tarif_periods[slot] is not None
+            and tarif_periods[slot] != tarif_periods[slot - 1]
+        ):
+            tarif_periods[slot - 1] = tarif_periods[slot]
+
+    window_series = {}
+    for label in labels:
+        series = [indexes_by_slot.get(slot, {}).get(label) for slot in window_slots]
+        series[0] = state["indexes"][label]
+        window_series[label] = interpolate_index_series(series)
+
+    kwh_prices = get_price_timeline().get_kwh_prices(day)
+    # Same float operations as build_consumption_data_from_series
+    duration_hours = 1 / 60
+    entries = []
+    for offset, slot in enumerate(window_slots[:-1]):
+        tarif_period = tarif_periods[slot]
+        filled, interpolated = window_series.get(
+            get_index_label(tarif_period), (None, None)
+        )
+        wh = filled[offset + 1] - filled[offset] if filled is not None else None
+        entries.append(
+            {
+                "date": day,
+                "start_time": SLOT_MINUTE_STRS[slot],
+                "end_time": SLOT_MINUTE_STRS[slot + 1],
+                "wh": wh,
+                "average_watt": wh / duration_hours if wh is not None else None,
+                "euros": (
+                    wh / 1000 * kwh_prices.get(tarif_period, 0)
+                    if wh is not None and wh >= 0
+                    else None
+                ),
+                "interpolated": (
+                    interpolated[offset] if interpolated is not None else False
+                ),
+                "tarif_period": get_human_readable_tarif_period(tarif_period),
+            }
+        )
+
+    new_state = {
+        "final_slot": new_final_slot,
+        "indexes": {label: filled[-1] for label, (filled, _) in window_series.items()},
+        "tarif_period": tarif_periods[new_final_slot],
+        "first_indexes": state["first_indexes"],
+    }
+    return entries, new_state, totals
+
+
+def get_live_consumption(day: date, since: int) -> dict | None:
+    """
+    Final 1-minute consumption entries of a day starting at slot `since`,
+    with the day's running totals.
+
+    The state of the current day is read from and written back to the cache
+    (see the module docstring); other days are always rebuilt in full.
+
+    Returns:
+        {"data": [...], "totals": {...}, "next_since": slot}, next_since
+        being the slot of the first entry not final yet (to be sent as the
+        next `since`), or None if nothing was ever recorded for the day.
+    """
+    is_today = day == timezone.localdate()
+    cache_key = get_live_state_cache_key(day)
+    state = cache.get(cache_key) if is_today else None
+
+    if state is not None and since >= state["final_slot"]:
+        advanced = advance_live_state(day, state)
+        if advanced is not None:
+            entries, new_state, totals = advanced
+            if new_state is not state:
+                cache.set(cache_key, new_state, timeout=LIVE_STATE_CACHE_TIMEOUT)
+            return {
+                "data": [
+                    entry
+                    for entry in entries
+                    if entry["start_time"] >= SLOT_MINUTE_STRS[since]
+                ],
+                "totals": totals,
+                "next_since": max(new_state["final_slot"], since),
+            }
+
+    daily_indexes = get_day_indexes(day)
+    if daily_indexes is None:
+        return None
+
+    state = build_live_state(daily_indexes)
+    final_slot = state["final_slot"] if state is not None else 0
+    if is_today and state is not None:
+        cache.set(cache_key, state, timeout=LIVE_STATE_CACHE_TIMEOUT)
+
+    entries = build_consumption_data_from_series(daily_indexes, day, 1)
+    return {
+        "data": entries[since:final_slot],
+        "totals": compute_day_totals(daily_indexes, day),
+        "next_since": max(final_slot, since),
+    }
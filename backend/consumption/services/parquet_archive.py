@@ -0,0 +1,252 @@
+"""
+Parquet archive of the reconstructed history, for offline analytics.
+
+Year-scale reads through the ORM decode thousands of per-day blobs; the
+archive keeps the same data columnar instead, in a month-partitioned
+dataset (hive layout, readable as is by pyarrow or duckdb):
+
+    <root>/month=2025-06/data.parquet
+
+with one row per (date, minute, label) of every finalized day: the
+reconstructed index at the start of the minute, the Wh of the minute, its
+interpolation flag and its tarif period (ARCHIVE_COLUMNS).
+
+archive_closed_days is incremental: <root>/_archive_state.json records the
+finalization version and fingerprint each archived day was exported with,
+and only the months holding a new or changed finalized day are rewritten,
+from the database (a month is at most a few hundred thousand rows). Open
+days and the days not finalized yet are left for a later run.
+
+pyarrow is an optional dependency, only needed where the archive is written
+or read (a workstation, rarely the Pi): it is imported by the functions
+using it, which raise ImportError when it isn't installed.
+"""
+
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.utils import timezone
+
+from consumption.constants import FINALIZATION_VERSION, MINUTES_PER_DAY
+from consumption.models import DailyIndexes
+from consumption.reconstruction import reconstruct_day
+from core.constants import LoggerLabel
+
+logger = logging.getLogger("django")
+
+ARCHIVE_STATE_FILENAME = "_archive_state.json"
+ARCHIVE_PARTITION_FILENAME = "data.parquet"
+
+# (column, pyarrow type name), see get_archive_schema
+ARCHIVE_COLUMNS = [
+    ("date", "date32"),
+    ("minute", "int16"),
+    ("label", "string"),
+    ("index", "int64"),
+    ("wh", "int32"),
+    ("interpolated", "bool_"),
+    ("tarif_period", "string"),
+]
+
+
+def get_archive_schema():
+    """pyarrow schema of the archive, see ARCHIVE_COLUMNS."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [(column, getattr(pa, type_name)()) for column, type_name in ARCHIVE_COLUMNS]
+    )
+
+
+def get_partition_path(root: Path, month: date) -> Path:
+    return root / f"month={month:%Y-%m}" / ARCHIVE_PARTITION_FILENAME
+
+
+def build_day_columns(daily_indexes: DailyIndexes) -> dict[str, list]:
+    """
+    Archive rows of a day, as {column: values}: the 1440 minutes of each of
+    its index labels, by label then minute.
+    """
+    day = daily_indexes.date
+    reconstructed = reconstruct_day(daily_indexes, day)
+    tarif_periods = reconstructed.tarif_period_series or [None] * MINUTES_PER_DAY
+
+    columns = {column: [] for column, _ in ARCHIVE_COLUMNS}
+    for label in sorted(reconstructed.index_series):
+        series = reconstructed.index_series[label]
+        interpolated = reconstructed.interpolated[label]
+        for minute in range(MINUTES_PER_DAY):
+            index, next_index = series[minute], series[minute + 1]
+            columns["date"].append(day)
+            columns["minute"].append(minute)
+            columns["label"].append(label)
+            columns["index"].append(index)
+            columns["wh"].append(
+                next_index - index
+                if index is not None and next_index is not None
+                else None
+            )
+            columns["interpolated"].append(interpolated[minute])
+            columns["tarif_period"].append(tarif_periods[minute])
+    return columns
+
+
+def read_archive_state(root: Path) -> dict[str, str]:
+    """{ISO date: archive version} of the archived days, {} when none."""
+    state_path = root / ARCHIVE_STATE_FILENAME
+    if not state_path.exists():
+        return {}
+    return json.loads(state_path.read_text(encoding="utf-8"))["days"]
+
+
+def _write_archive_state(root: Path, days: dict[str, str]) -> None:
+    state_path = root / ARCHIVE_STATE_FILENAME
+    temporary_path = state_path.with_suffix(".tmp")
+    temporary_path.write_text(
+        json.dumps({"days": dict(sorted(days.items()))}), encoding="utf-8"
+    )
+    os.replace(temporary_path, state_path)
+
+
+def find_months_to_archive(
+    archived_days: dict[str, str], today: date
+) -> dict[date, dict[str, str]]:
+    """
+    Months holding a closed day finalized by the current version that is
+    new to the archive or changed since it was archived.
+
+    Returns:
+        {first day of the month: {ISO date: archive version}} of the
+        finalized closed days of each of those months.
+    """
+    finalized_days = DailyIndexes.objects.filter(
+        date__lt=today, finalized_version=FINALIZATION_VERSION
+    ).values_list("date", "finalized_version", "finalized_fingerprint")
+
+    days_by_month: dict[date, dict[str, str]] = defaultdict(dict)
+    months_to_archive = set()
+    for day, version, fingerprint in finalized_days:
+        month = day.replace(day=1)
+        archive_version = f"{version}:{fingerprint}"
+        days_by_month[month][day.isoformat()] = archive_version
+        if archived_days.get(day.isoformat()) != archive_version:
+            months_to_archive.add(month)
+
+    return {month: days_by_month[month] for month in sorted(months_to_archive)}
+
+
+def write_month(root: Path, month: date, days: list[str]) -> int:
+    """
+    (Re)writes the partition of a month from the finalized days `days`
+    (ISO dates).
+
+    Returns:
+        The number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = {column: [] for column, _ in ARCHIVE_COLUMNS}
+    for daily_indexes in DailyIndexes.objects.filter(date__in=days).order_by("date"):
+        for column, values in build_day_columns(daily_indexes).items():
+            columns[column].extend(values)
+
+    table = pa.table(columns, schema=get_archive_schema())
+    partition_path = get_partition_path(root, month)
+    partition_path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside then moved, a reader never sees a partial partition
+    temporary_path = partition_path.with_suffix(".tmp")
+    pq.write_table(table, temporary_path, compression="zstd")
+    os.replace(temporary_path, partition_path)
+    return table.num_rows
+
+
+def archive_closed_days(root: Path, today: date | None = None) -> dict[str, int]:
+    """
+    Brings the archive under `root` up to date (see the module docstring),
+    the state being saved after each month so that an interrupted run
+    resumes where it stopped.
+
+    Returns:
+        {"months", "days", "rows"} written.
+
+    Raises:
+        ImportError: pyarrow isn't installed.
+    """
+    # Fails before anything is written
+    import pyarrow  # noqa: F401
+
+    today = today or timezone.localdate()
+    root.mkdir(parents=True, exist_ok=True)
+    archived_days = read_archive_state(root)
+
+    written = {"months": 0, "days": 0, "rows": 0}
+    for month, days in find_months_to_archive(archived_days, today).items():
+        written["rows"] += write_month(root, month, list(days))
+        written["months"] += 1
+        written["days"] += sum(
+            archived_days.get(day) != version for day, version in days.items()
+        )
+        # The days of the month not finalized anymore were left out of it
+        month_prefix = f"{month:%Y-%m}-"
+        archived_days = {
+            day: version
+            for day, version in archived_days.items()
+            if not day.startswith(month_prefix)
+        }
+        archived_days.update(days)
+        _write_archive_state(root, archived_days)
+
+    if written["months"]:
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} {written['days']} days archived to {root}"
+        )
+    return written
+
+
+def read_archive(root: Path, start: date, end: date, columns: list[str] | None = None):
+    """
+    Archived rows of [start, end] (both included), only reading the
+    partitions of the months in the range.
+
+    Args:
+        root: The archive directory.
+        start: The first day.
+        end: The last day.
+        columns: The columns to read, all of them (ARCHIVE_COLUMNS) by default.
+
+    Returns:
+        A pyarrow.Table ordered by date, label and minute, empty when
+        nothing of the range was archived.
+
+    Raises:
+        ImportError: pyarrow isn't installed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = get_archive_schema()
+    if columns is not None:
+        schema = pa.schema([schema.field(column) for column in columns])
+
+    tables = []
+    month = start.replace(day=1)
+    while month <= end:
+        partition_path = get_partition_path(root, month)
+        if partition_path.exists():
+            tables.append(
+                pq.read_table(
+                    partition_path,
+                    columns=schema.names,
+                    filters=[("date", ">=", start), ("date", "<=", end)],
+                )
+            )
+        month = (month + timedelta(days=31)).replace(day=1)
+
+    if not tables:
+        return schema.empty_table()
+    return pa.concat_tables(tables)
@@ -0,0 +1,71 @@
+"""
+Downsampled power curves over a date range (see consumption/downsampling.py).
+
+The 1-minute power of every day of the range is computed from its minute
+series (all index labels combined, see compute_minute_consumption), one day
+at a time, gaps spanning midnight being bridged (see
+consumption/cross_midnight.py), then reduced to a bounded number of points.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from consumption.constants import MINUTES_PER_DAY, PowerCurveMode
+from consumption.cross_midnight import iter_bridged_days
+from consumption.downsampling import lttb, min_max_envelope
+from consumption.resampling import compute_minute_consumption
+
+
+def get_minute_power_series(start: date, end: date) -> list[float | None]:
+    """
+    Mean power (W) of each minute of [start, end] (both included), None
+    where unknown, the first item being start at 00:00.
+    """
+    powers: list[float | None] = []
+    expected_day = start
+    for daily_indexes, reconstructed in iter_bridged_days(start, end):
+        missing_days = (daily_indexes.date - expected_day).days
+        powers.extend([None] * (missing_days * MINUTES_PER_DAY))
+        watt_hours, _, _ = compute_minute_consumption(
+            daily_indexes, daily_indexes.date, reconstructed
+        )
+        powers.extend(wh * 60 if wh is not None else None for wh in watt_hours)
+        expected_day = daily_indexes.date + timedelta(days=1)
+
+    powers.extend([None] * ((end - expected_day).days + 1) * MINUTES_PER_DAY)
+    return powers
+
+
+def build_power_curve(
+    start: date, end: date, points: int, mode: PowerCurveMode
+) -> list[dict[str, datetime | float]]:
+    """
+    Builds the power curve of [start, end] (both included), reduced to at
+    most `points` points.
+
+    Returns:
+        In LTTB mode, the kept minutes as {"datetime", "watt"}; in min/max
+        mode, one {"datetime", "min_watt", "max_watt", "average_watt"} per
+        bucket, datetime being the bucket's first minute. Unknown minutes
+        are left out.
+    """
+    origin = datetime.combine(start, time())
+    powers = get_minute_power_series(start, end)
+
+    if mode == PowerCurveMode.LTTB:
+        known_points = [
+            (minute, watt) for minute, watt in enumerate(powers) if watt is not None
+        ]
+        return [
+            {"datetime": origin + timedelta(minutes=minute), "watt": watt}
+            for minute, watt in lttb(known_points, points)
+        ]
+
+    return [
+        {
+            "datetime": origin + timedelta(minutes=minute),
+            "min_watt": min_watt,
+            "max_watt": max_watt,
+            "average_watt": average_watt,
+        }
+        for minute, min_watt, max_watt, average_watt in min_max_envelope(powers, points)
+    ]
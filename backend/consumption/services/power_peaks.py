@@ -0,0 +1,349 @@
+"""
+Peak demand tracking: peak apparent power per day and per month,
+load-duration curves and subscribed power (ISOUSC) sizing.
+
+The teleinfo cache only holds the last frame, so peaks are tracked from the
+listener stream itself: update_power_peaks keeps the highest PAPP and IINST
+of every frame of the current minute, save_teleinfo_data records those of
+the minute just over as a MinutePowerSample (record_power_sample). Once a
+day is closed, its samples are folded into a DailyPowerPeak row holding the
+day's peaks and its per-minute histograms (compact_power_samples), then
+deleted.
+
+Reports read the DailyPowerPeak rows one at a time, the days not compacted
+yet (today) being aggregated from their samples on the fly: memory stays
+bounded by one month of histograms whatever the length of the history.
+"""
+
+import heapq
+import logging
+from collections import Counter
+from collections.abc import Iterator
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+from operator import attrgetter, itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from actuators.constants import POWER_SAFETY_MARGIN
+from consumption.constants import POWER_HISTOGRAM_BUCKET_VA, PowerPeakBucket
+from consumption.models import DailyPowerPeak, MinutePowerSample
+from core.constants import DEFAULT_VOLTAGE, LoggerLabel
+from teleinfo.constants import ISOUC_TO_SUBSCRIBED_POWER
+
+logger = logging.getLogger("django")
+
+DAY_PEAK_FIELDS = [
+    "peak_va",
+    "peak_minute",
+    "peak_intensity",
+    "measured_minutes",
+    "va_histogram",
+    "intensity_histogram",
+    "subscribed_intensity",
+]
+
+
+def record_power_sample(
+    peaks: dict, subscribed_intensity: int | None
+) -> MinutePowerSample | None:
+    """
+    Records the peaks of the last complete minute tracked by the listener
+    (see update_power_peaks). Recording the same minute again overwrites it.
+
+    Returns:
+        The sample, or None if no minute is complete yet.
+    """
+    previous = peaks.get("previous")
+    if not previous:
+        return None
+    minute = timezone.localtime(datetime.fromisoformat(previous["minute"]))
+    sample = MinutePowerSample(
+        date=minute.date(),
+        minute=minute.hour * 60 + minute.minute,
+        peak_va=previous["papp"],
+        peak_intensity=previous["iinst"],
+        subscribed_intensity=subscribed_intensity,
+    )
+    MinutePowerSample.objects.bulk_create(
+        [sample],
+        update_conflicts=True,
+        unique_fields=["date", "minute"],
+        update_fields=["peak_va", "peak_intensity", "subscribed_intensity"],
+    )
+    return sample
+
+
+def _new_day_peak(day: date) -> dict:
+    return {
+        "date": day,
+        "peak_date": day,
+        "peak_va": 0,
+        "peak_minute": 0,
+        "peak_intensity": 0,
+        "measured_minutes": 0,
+        "va_histogram": [],
+        "intensity_histogram": [],
+        "subscribed_intensity": None,
+    }
+
+
+def _add_to_histogram(histogram: list[int], position: int, count: int = 1) -> None:
+    if position >= len(histogram):
+        histogram.extend([0] * (position + 1 - len(histogram)))
+    histogram[position] += count
+
+
+def _max_or_none(*values: int | None) -> int | None:
+    return max((value for value in values if value is not None), default=None)
+
+
+def add_power_sample(day_peak: dict, sample: MinutePowerSample) -> None:
+    """Adds one minute to the peaks of its day (or month)."""
+    if not day_peak["measured_minutes"] or sample.peak_va > day_peak["peak_va"]:
+        day_peak["peak_va"] = sample.peak_va
+        day_peak["peak_date"] = sample.date
+        day_peak["peak_minute"] = sample.minute
+    day_peak["peak_intensity"] = max(day_peak["peak_intensity"], sample.peak_intensity)
+    day_peak["measured_minutes"] += 1
+    _add_to_histogram(
+        day_peak["va_histogram"], sample.peak_va // POWER_HISTOGRAM_BUCKET_VA
+    )
+    _add_to_histogram(day_peak["intensity_histogram"], sample.peak_intensity)
+    day_peak["subscribed_intensity"] = _max_or_none(
+        day_peak["subscribed_intensity"], sample.subscribed_intensity
+    )
+
+
+def merge_power_peaks(total: dict, other: dict) -> None:
+    """Adds the peaks and histograms of `other` to `total`."""
+    if not other["measured_minutes"]:
+        return
+    if not total["measured_minutes"] or other["peak_va"] > total["peak_va"]:
+        total["peak_va"] = other["peak_va"]
+        total["peak_date"] = other["peak_date"]
+        total["peak_minute"] = other["peak_minute"]
+    total["peak_intensity"] = max(total["peak_intensity"], other["peak_intensity"])
+    total["measured_minutes"] += other["measured_minutes"]
+    for field in ("va_histogram", "intensity_histogram"):
+        for position, count in enumerate(other[field]):
+            if count:
+                _add_to_histogram(total[field], position, count)
+    total["subscribed_intensity"] = _max_or_none(
+        total["subscribed_intensity"], other["subscribed_intensity"]
+    )
+
+
+def _stored_day_peak(daily_power_peak: DailyPowerPeak) -> dict:
+    return {
+        "date": daily_power_peak.date,
+        "peak_date": daily_power_peak.date,
+        **{field: getattr(daily_power_peak, field) for field in DAY_PEAK_FIELDS},
+    }
+
+
+def _iter_sample_day_peaks(start: date, end: date) -> Iterator[dict]:
+    samples = (
+        MinutePowerSample.objects.filter(date__gte=start, date__lte=end)
+        .order_by("date", "minute")
+        .iterator()
+    )
+    for day, day_samples in groupby(samples, key=attrgetter("date")):
+        day_peak = _new_day_peak(day)
+        for sample in day_samples:
+            add_power_sample(day_peak, sample)
+        yield day_peak
+
+
+def iter_day_power_peaks(start: date, end: date) -> Iterator[dict]:
+    """
+    Yields the peaks of every recorded day of [start, end] (both included)
+    in date order: the stored DailyPowerPeak rows, merged with the minute
+    samples not compacted yet, one day in memory at a time.
+    """
+    stored = (
+        _stored_day_peak(daily_power_peak)
+        for daily_power_peak in DailyPowerPeak.objects.filter(
+            date__gte=start, date__lte=end
+        )
+        .order_by("date")
+        .iterator()
+    )
+    merged = heapq.merge(
+        stored, _iter_sample_day_peaks(start, end), key=itemgetter("date")
+    )
+    for _, day_peaks in groupby(merged, key=itemgetter("date")):
+        total = next(day_peaks)
+        for day_peak in day_peaks:
+            merge_power_peaks(total, day_peak)
+        yield total
+
+
+def compact_power_samples() -> int:
+    """
+    Folds the minute power samples of every closed day into its
+    DailyPowerPeak row, then deletes them (see compact_minute_samples).
+
+    Returns:
+        The number of days compacted.
+    """
+    today = timezone.localdate()
+    closed_days = (
+        MinutePowerSample.objects.filter(date__lt=today)
+        .values_list("date", flat=True)
+        .distinct()
+        .order_by("date")
+    )
+
+    compacted_days = 0
+    for day in list(closed_days):
+        with transaction.atomic():
+            samples = list(
+                MinutePowerSample.objects.filter(date=day).order_by("minute")
+            )
+            if not samples:
+                continue
+
+            day_peak = _new_day_peak(day)
+            for sample in samples:
+                add_power_sample(day_peak, sample)
+            existing = DailyPowerPeak.objects.filter(date=day).first()
+            if existing is not None:
+                merge_power_peaks(day_peak, _stored_day_peak(existing))
+            DailyPowerPeak.objects.update_or_create(
+                date=day, defaults={field: day_peak[field] for field in DAY_PEAK_FIELDS}
+            )
+
+            last_pk = max(sample.pk for sample in samples)
+            MinutePowerSample.objects.filter(date=day, pk__lte=last_pk).delete()
+
+        compacted_days += 1
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} {len(samples)} power samples of {day} compacted"
+        )
+
+    return compacted_days
+
+
+def build_load_duration_curve(va_histogram: list[int]) -> list[dict[str, int]]:
+    """
+    Load-duration curve of a histogram: for each apparent power level
+    reached, the number of minutes spent at or above it, highest level
+    first.
+    """
+    curve = []
+    minutes = 0
+    for bucket in range(len(va_histogram) - 1, -1, -1):
+        if va_histogram[bucket]:
+            minutes += va_histogram[bucket]
+            curve.append({"va": bucket * POWER_HISTOGRAM_BUCKET_VA, "minutes": minutes})
+    return curve
+
+
+def build_power_peaks(
+    start: date, end: date, bucket: PowerPeakBucket
+) -> list[dict[str, date | datetime | int | list]]:
+    """
+    Peak demand of each day or month of [start, end] (both included).
+
+    Returns:
+        One {"date" (first day of the bucket), "peak_va", "peak_at",
+        "peak_intensity", "measured_minutes", "load_duration"} per bucket
+        with recorded minutes, in date order.
+    """
+    day_peaks = iter_day_power_peaks(start, end)
+    if bucket == PowerPeakBucket.MONTH:
+        grouped = groupby(
+            day_peaks, key=lambda day_peak: day_peak["date"].replace(day=1)
+        )
+    else:
+        grouped = groupby(day_peaks, key=itemgetter("date"))
+
+    data = []
+    for bucket_date, bucket_day_peaks in grouped:
+        total = _new_day_peak(bucket_date)
+        for day_peak in bucket_day_peaks:
+            merge_power_peaks(total, day_peak)
+        data.append(
+            {
+                "date": bucket_date,
+                "peak_va": total["peak_va"],
+                "peak_at": datetime.combine(total["peak_date"], time())
+                + timedelta(minutes=total["peak_minute"]),
+                "peak_intensity": total["peak_intensity"],
+                "measured_minutes": total["measured_minutes"],
+                "load_duration": build_load_duration_curve(total["va_histogram"]),
+            }
+        )
+    return data
+
+
+def build_subscription_report(start: date, end: date) -> dict:
+    """
+    How often each subscribed intensity (ISOUSC) would have been exceeded
+    over [start, end] (both included), from the per-minute peak intensity.
+
+    A minute "trips" a subscription when its peak intensity is above it,
+    and forces load shedding when the power left, (ISOUSC - IINST) x
+    DEFAULT_VOLTAGE, is below POWER_SAFETY_MARGIN (the rule of
+    ensure_power_not_exceeded).
+
+    Returns:
+        {"days", "measured_minutes", "peak_intensity",
+        "subscribed_intensity" (the highest one recorded),
+        "recommended_subscribed_intensity" (the lowest one never tripped,
+        None if all were), "options": [{"subscribed_intensity",
+        "subscribed_power", "trip_minutes", "trip_days",
+        "load_shedding_minutes"}, ...]}.
+    """
+    intensity_histogram: list[int] = []
+    day_peak_intensities: Counter[int] = Counter()
+    measured_minutes = 0
+    subscribed_intensity = None
+    for day_peak in iter_day_power_peaks(start, end):
+        for intensity, minutes in enumerate(day_peak["intensity_histogram"]):
+            if minutes:
+                _add_to_histogram(intensity_histogram, intensity, minutes)
+        day_peak_intensities[day_peak["peak_intensity"]] += 1
+        measured_minutes += day_peak["measured_minutes"]
+        subscribed_intensity = _max_or_none(
+            subscribed_intensity, day_peak["subscribed_intensity"]
+        )
+
+    options = []
+    for isousc, subscribed_power in ISOUC_TO_SUBSCRIBED_POWER.items():
+        amps = int(isousc)
+        options.append(
+            {
+                "subscribed_intensity": amps,
+                "subscribed_power": subscribed_power,
+                "trip_minutes": sum(intensity_histogram[amps + 1 :]),
+                "trip_days": sum(
+                    days
+                    for peak_intensity, days in day_peak_intensities.items()
+                    if peak_intensity > amps
+                ),
+                "load_shedding_minutes": sum(
+                    minutes
+                    for intensity, minutes in enumerate(intensity_histogram)
+                    if (amps - intensity) * DEFAULT_VOLTAGE < POWER_SAFETY_MARGIN
+                ),
+            }
+        )
+
+    return {
+        "days": day_peak_intensities.total(),
+        "measured_minutes": measured_minutes,
+        "peak_intensity": max(day_peak_intensities, default=None),
+        "subscribed_intensity": subscribed_intensity,
+        "recommended_subscribed_intensity": next(
+            (
+                option["subscribed_intensity"]
+                for option in options
+                if measured_minutes and not option["trip_minutes"]
+            ),
+            None,
+        ),
+        "options": options,
+    }
@@ -0,0 +1,154 @@
+"""
+Tiered retention of the consumption history
+(settings.CONSUMPTION_RETENTION_TIERS, empty so off by default).
+
+DailyIndexes are recorded every minute; past a tier's age, a day is
+downsampled in place to that tier's resolution: its indexes are only kept
+every `resolution` minutes (plus the first and last known one of each
+label, so that the day's totals don't change), the dropped slots being
+stored as unknown, which the packed format and zlib shrink to almost
+nothing. The tarif periods are kept as is, they compress to a few dozen
+bytes and keep tariffs and reference days working. The repairs of the
+integrity scan (see consumption/repairs.py) are folded into the kept
+indexes.
+
+Reads need no special case: the reconstruction fills the dropped minutes
+by interpolation, and the API serves a downsampled day at a step multiple
+of its resolution (get_served_step), with an explicit `resolution` field.
+
+Hourly rollups, computed from the full day at compaction, stay exact for
+a resolution dividing the hour; they are deleted for days reduced to
+daily totals, their DailyConsumption rows being kept as they are.
+
+apply_retention_policy runs once a day, after compact_minute_samples has
+closed the previous day. A resolution is never refined back, which is why
+the policy has to be enabled explicitly.
+"""
+
+import logging
+import math
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from consumption.constants import (
+    DAY_MINUTE_SLOTS,
+    MINUTES_PER_DAY,
+    RETENTION_BATCH_DAYS,
+)
+from consumption.models import DailyIndexes, HourlyConsumption
+from consumption.packing import pack_index_series
+from consumption.utils import interpolate_index_series
+from core.constants import LoggerLabel
+
+logger = logging.getLogger("django")
+
+
+def get_served_step(step: int, resolution: int) -> int:
+    """
+    Step at which a day stored at `resolution` is served when `step` is
+    requested: the smallest multiple of both, which still divides the day.
+    """
+    return math.lcm(step, resolution)
+
+
+def downsample_index_series(
+    series: list[int | None], resolution: int
+) -> list[int | None]:
+    """
+    Keeps the index of every slot multiple of `resolution`, interpolated if
+    it was missing inside the day, and the first and last known indexes.
+    """
+    known_slots = [slot for slot, index in enumerate(series) if index is not None]
+    if not known_slots:
+        return series
+    filled, _ = interpolate_index_series(series)
+    kept_slots = set(range(0, DAY_MINUTE_SLOTS, resolution))
+    kept_slots.update((known_slots[0], known_slots[-1]))
+    return [filled[slot] if slot in kept_slots else None for slot in range(len(series))]
+
+
+def downsample_day(daily_indexes: DailyIndexes, resolution: int) -> None:
+    """
+    Downsamples a day's packed indexes in place (not saved), its repairs
+    being applied for good.
+    """
+    daily_indexes.packed_values = pack_index_series(
+        {
+            label: downsample_index_series(series, resolution)
+            for label, series in daily_indexes.get_index_series().items()
+        }
+    )
+    daily_indexes.values = None
+    daily_indexes.index_repairs = []
+    daily_indexes.resolution = resolution
+    daily_indexes.finalized_version = None
+
+
+def _downsample_batch(pks: list[int], resolution: int) -> None:
+    days = list(
+        DailyIndexes.objects.filter(pk__in=pks).only(
+            "pk", "date", "packed_values", "resolution", "index_repairs"
+        )
+    )
+    for daily_indexes in days:
+        downsample_day(daily_indexes, resolution)
+    with transaction.atomic():
+        DailyIndexes.objects.bulk_update(
+            days,
+            ["packed_values", "resolution", "index_repairs", "finalized_version"],
+        )
+        if resolution >= MINUTES_PER_DAY:
+            HourlyConsumption.objects.filter(
+                date__in=[daily_indexes.date for daily_indexes in days]
+            ).delete()
+
+
+def apply_retention_policy(
+    tiers: list[tuple[int, int]] | None = None, today: date | None = None
+) -> dict[int, int]:
+    """
+    Downsamples every day older than a tier's age to its resolution, the
+    oldest tiers first, RETENTION_BATCH_DAYS days per transaction (only
+    their ids are listed upfront, SQLite not isolating a query from the
+    writes made while iterating it).
+
+    Args:
+        tiers: (age in days, resolution in minutes) pairs, by increasing age,
+               settings.CONSUMPTION_RETENTION_TIERS by default.
+        today: Reference day of the ages, today by default.
+
+    Returns:
+        The number of days downsampled to each resolution.
+    """
+    if tiers is None:
+        tiers = settings.CONSUMPTION_RETENTION_TIERS
+    today = today or timezone.localdate()
+    counts = {}
+    for min_age, resolution in reversed(tiers):
+        pks = list(
+            DailyIndexes.objects.filter(
+                date__lte=today - timedelta(days=min_age), resolution__lt=resolution
+            )
+            .order_by("date")
+            .values_list("pk", flat=True)
+        )
+        for position in range(0, len(pks), RETENTION_BATCH_DAYS):
+            _downsample_batch(
+                pks[position : position + RETENTION_BATCH_DAYS], resolution
+            )
+        counts[resolution] = len(pks)
+        if pks:
+            logger.info(
+                f"{LoggerLabel.CONSUMPTION} {len(pks)} days downsampled to "
+                f"{resolution} min"
+            )
+
+    if tiers:
+        logger.info(
+            f"{LoggerLabel.CONSUMPTION} Retention policy: {sum(counts.values())} "
+            "days rewritten"
+        )
+    return counts
@@ -0,0 +1,417 @@
+"""
+Hourly and daily consumption rollups (HourlyConsumption / DailyConsumption).
+
+The energy of a minute interval [m, m+1) is the difference between the
+indexes of minutes m+1 and m of an index label. It is attributed to that
+label's tarif period, in the hour of its start minute m, and counted as
+interpolated when m itself was interpolated (same convention as
+build_consumption_data). Summed over a day, a label's rollups therefore
+match compute_totals_for_a_day.
+
+Rollups are incremented minute by minute from the new samples written by
+save_teleinfo_data (add_samples_to_rollups), then rebuilt exactly from the
+reconstructed day once it is compacted (rebuild_day_rollups), which also
+absorbs the rare approximations of the incremental path (e.g. a minute
+recorded twice).
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from consumption.constants import MINUTES_PER_DAY, ConsumptionBucket
+from consumption.edf_pricing import get_kwh_price, get_price_timeline
+from consumption.models import (
+    DailyConsumption,
+    DailyIndexes,
+    HourlyConsumption,
+    MinuteIndexSample,
+)
+from consumption.selectors import get_bucketed_rollups, get_daily_subscriptions
+from consumption.utils import (
+    get_human_readable_tarif_period,
+    get_tarif_period_label_from_index_label,
+    interpolate_index_series,
+)
+
+
+def _new_totals() -> dict[str, int]:
+    return {"wh": 0, "interpolated_minutes": 0}
+
+
+def compute_hourly_rollups(
+    daily_indexes: DailyIndexes,
+) -> dict[tuple[int, str], dict[str, int]]:
+    """
+    Computes the hourly rollups of a day from its indexes, gaps bordered by
+    known values being interpolated first.
+
+    Args:
+        daily_indexes: The day's DailyIndexes (saved or not).
+
+    Returns:
+        A dict mapping (hour, tarif_period) to {"wh", "interpolated_minutes"}.
+        Intervals whose consumption can't be computed are left out.
+    """
+    rollups: dict[tuple[int, str], dict[str, int]] = defaultdict(_new_totals)
+
+    for label, series in daily_indexes.get_index_series().items():
+        tarif_period = get_tarif_period_label_from_index_label(label)
+        if tarif_period is None:
+            continue
+        filled, interpolated = interpolate_index_series(series)
+
+        for hour_start in range(0, len(filled) - 1, 60):
+            hour_indexes = filled[hour_start : hour_start + 61]
+            if None not in hour_indexes:
+                # Every interval of the hour is known: their sum telescopes
+                totals = rollups[(hour_start // 60, tarif_period)]
+                totals["wh"] += hour_indexes[-1] - hour_indexes[0]
+                totals["interpolated_minutes"] += sum(
+                    interpolated[hour_start : hour_start + 60]
+                )
+                continue
+            for minute in range(hour_start, hour_start + len(hour_indexes) - 1):
+                current_index = filled[minute]
+                next_index = filled[minute + 1]
+                if current_index is None or next_index is None:
+                    continue
+                totals = rollups[(minute // 60, tarif_period)]
+                totals["wh"] += next_index - current_index
+                totals["interpolated_minutes"] += interpolated[minute]
+
+    return dict(rollups)
+
+
+def compute_rollup_euros(day: date, tarif_period: str, wh: int) -> float:
+    """
+    Cost of `wh` watt-hours on `day` for `tarif_period`. Unlike
+    compute_period_price, negative values are priced too, so that rollups
+    stay additive.
+    """
+    return wh / 1000 * get_kwh_price(day, tarif_period)
+
+
+def reprice_rollups(start: date, end: date | None = None) -> None:
+    """
+    Recomputes the euros of the rollups of [start, end) (unbounded when end
+    is None) from the current price grids, after one of them was edited.
+    Prices being constant within a grid, it takes one UPDATE per grid and
+    table, the tarif periods without a price costing nothing.
+    """
+    timeline = get_price_timeline()
+    boundaries = [start] + [
+        start_date
+        for start_date in timeline.start_dates
+        if start < start_date and (end is None or start_date < end)
+    ]
+    for position, segment_start in enumerate(boundaries):
+        segment_end = (
+            boundaries[position + 1] if position + 1 < len(boundaries) else end
+        )
+        euros = Case(
+            *(
+                When(tarif_period=tarif_period, then=F("wh") * (price / 1000))
+                for tarif_period, price in timeline.get_kwh_prices(
+                    segment_start
+                ).items()
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        date_filters = {"date__gte": segment_start}
+        if segment_end is not None:
+            date_filters["date__lt"] = segment_end
+        for model in (HourlyConsumption, DailyConsumption):
+            model.objects.filter(**date_filters).update(euros=euros)
+
+
+def rebuild_day_rollups(daily_indexes: DailyIndexes) -> None:
+    """
+    Replaces all the hourly and daily rollups of a day with the ones
+    computed from its indexes.
+    """
+    rebuild_rollups([daily_indexes])
+
+
+def rebuild_rollups(days: list[DailyIndexes]) -> None:
+    """
+    rebuild_day_rollups for several days at once, with a single delete and
+    insert per table (bulk imports). Days stored as daily totals only (see
+    consumption/services/retention.py) get no hourly rollups.
+    """
+    hourly_rows, daily_rows = [], []
+    for daily_indexes in days:
+        day = daily_indexes.date
+        hourly_rollups = compute_hourly_rollups(daily_indexes)
+
+        daily_rollups: dict[str, dict[str, int]] = defaultdict(_new_totals)
+        for (_, tarif_period), totals in hourly_rollups.items():
+            daily_rollups[tarif_period]["wh"] += totals["wh"]
+            daily_rollups[tarif_period]["interpolated_minutes"] += totals[
+                "interpolated_minutes"
+            ]
+
+        if daily_indexes.resolution < MINUTES_PER_DAY:
+            hourly_rows.extend(
+                HourlyConsumption(
+                    date=day,
+                    hour=hour,
+                    tarif_period=tarif_period,
+                    wh=totals["wh"],
+                    euros=compute_rollup_euros(day, tarif_period, totals["wh"]),
+                    interpolated_minutes=totals["interpolated_minutes"],
+                )
+                for (hour, tarif_period), totals in sorted(hourly_rollups.items())
+            )
+        daily_rows.extend(
+            DailyConsumption(
+                date=day,
+                tarif_period=tarif_period,
+                wh=totals["wh"],
+                euros=compute_rollup_euros(day, tarif_period, totals["wh"]),
+                interpolated_minutes=totals["interpolated_minutes"],
+            )
+            for tarif_period, totals in sorted(daily_rollups.items())
+        )
+
+    dates = [daily_indexes.date for daily_indexes in days]
+    with transaction.atomic():
+        HourlyConsumption.objects.filter(date__in=dates).delete()
+        DailyConsumption.objects.filter(date__in=dates).delete()
+        HourlyConsumption.objects.bulk_create(hourly_rows)
+        DailyConsumption.objects.bulk_create(daily_rows)
+
+
+def split_index_delta(
+    previous_minute: int,
+    previous_index: int,
+    minute: int,
+    index: int,
+) -> dict[int, dict[str, int]]:
+    """
+    Splits the consumption between two readings of the same label into
+    hourly increments, spreading it over the missing minutes exactly like
+    interpolate_missing_values does.
+
+    Returns:
+        A dict mapping each hour to {"wh", "interpolated_minutes"}.
+    """
+    intervals = minute - previous_minute
+    base_step, remainder = divmod(index - previous_index, intervals)
+    increments: dict[int, dict[str, int]] = defaultdict(_new_totals)
+
+    for i in range(intervals):
+        totals = increments[(previous_minute + i) // 60]
+        totals["wh"] += base_step + 1 if i < remainder else base_step
+        # The first interval starts on a real reading, the others on
+        # interpolated minutes.
+        totals["interpolated_minutes"] += i > 0
+
+    return dict(increments)
+
+
+def get_previous_samples(
+    samples: list[MinuteIndexSample],
+) -> dict[tuple[date, str], tuple[int, int]]:
+    """
+    Latest recorded sample of each (date, label) of `samples`, at or before
+    the sample's minute, in one query.
+
+    Returns:
+        {(date, label): (minute, index)}, (date, label) pairs without any
+        previous sample being left out.
+    """
+    query = Q()
+    for sample in samples:
+        query |= Q(date=sample.date, label=sample.label, minute__lte=sample.minute)
+    latest = (
+        MinuteIndexSample.objects.filter(query)
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("date"), F("label")],
+                order_by=F("minute").desc(),
+            )
+        )
+        .filter(rank=1)
+        .values_list("date", "label", "minute", "index")
+    )
+    return {(day, label): (minute, index) for day, label, minute, index in latest}
+
+
+def _upsert_increments(
+    model, key_fields: list[str], increments: dict[tuple, dict[str, int]]
+) -> None:
+    """
+    Adds `increments` ({key values: {"wh", "interpolated_minutes"}}) to the
+    rollup rows of `model`, with one read and one upsert.
+    """
+    increments = {
+        key: totals
+        for key, totals in increments.items()
+        if totals["wh"] or totals["interpolated_minutes"]
+    }
+    if not increments:
+        return
+
+    query = Q()
+    for key in increments:
+        query |= Q(**dict(zip(key_fields, key)))
+    existing = {
+        tuple(getattr(row, field) for field in key_fields): row
+        for row in model.objects.filter(query)
+    }
+
+    rows = []
+    for key, totals in increments.items():
+        fields = dict(zip(key_fields, key))
+        row = existing.get(key) or model(
+            **fields, wh=0, euros=0, interpolated_minutes=0
+        )
+        row.wh += totals["wh"]
+        row.euros += compute_rollup_euros(
+            fields["date"], fields["tarif_period"], totals["wh"]
+        )
+        row.interpolated_minutes += totals["interpolated_minutes"]
+        rows.append(row)
+    model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=key_fields,
+        update_fields=["wh", "euros", "interpolated_minutes"],
+    )
+
+
+def add_samples_to_rollups(samples: list[MinuteIndexSample]) -> None:
+    """
+    Adds the consumption measured by new minute samples (not inserted yet)
+    to the rollups of their day, from the previous sample of the same label
+    that day.
+
+    A sample with no previous reading that day (first minute of the day) or
+    whose minute is already recorded adds nothing: the day's rollups are
+    rebuilt exactly at compaction anyway. Whatever the number of labels, it
+    costs one query for the previous samples, then one read and one upsert
+    per rollup table.
+    """
+    samples = [
+        sample
+        for sample in samples
+        if get_tarif_period_label_from_index_label(sample.label) is not None
+    ]
+    if not samples:
+        return
+
+    previous_samples = get_previous_samples(samples)
+    hourly_increments: dict[tuple, dict[str, int]] = defaultdict(_new_totals)
+    daily_increments: dict[tuple, dict[str, int]] = defaultdict(_new_totals)
+    for sample in samples:
+        previous = previous_samples.get((sample.date, sample.label))
+        if previous is None or previous[0] == sample.minute:
+            continue
+
+        tarif_period = get_tarif_period_label_from_index_label(sample.label)
+        increments = split_index_delta(*previous, sample.minute, sample.index)
+        for hour, totals in increments.items():
+            for rollup_totals in (
+                hourly_increments[(sample.date, hour, tarif_period)],
+                daily_increments[(sample.date, tarif_period)],
+            ):
+                rollup_totals["wh"] += totals["wh"]
+                rollup_totals["interpolated_minutes"] += totals["interpolated_minutes"]
+
+    with transaction.atomic():
+        _upsert_increments(
+            HourlyConsumption, ["date", "hour", "tarif_period"], hourly_increments
+        )
+        _upsert_increments(DailyConsumption, ["date", "tarif_period"], daily_increments)
+
+
+def build_range_consumption(
+    start: date, end: date, bucket: ConsumptionBucket
+) -> dict[str, list | dict]:
+    """
+    Builds the consumption of [start, end] (both included) per bucket from
+    the stored rollups, without reconstructing any minute.
+
+    Only buckets with recorded consumption are returned. A bucket's "date"
+    is its first day within the range (a week or month overlapping `start`
+    is clipped to it), "hour" is only set for hourly buckets.
+
+    Returns:
+        {"data": [bucket, ...], "totals": {...}, "subscription_euros": ...,
+        "bill_euros": ...}, where each bucket holds its "wh", "euros",
+        "interpolated_minutes" and a "tarif_periods" breakdown
+        ({readable tarif period: {"wh", "euros"}}), totals follow the shape
+        of compute_totals_for_a_day (per readable label plus "Total"), and
+        bill_euros adds the subscription part (see
+        compute_subscription_cost) to the consumption cost.
+    """
+    data = []
+    totals: dict[str, dict[str, int | float]] = {}
+    current_key = None
+
+    for row in get_bucketed_rollups(start, end, bucket):
+        key = (row["bucket_date"], row.get("hour"))
+        if key != current_key:
+            current_key = key
+            data.append(
+                {
+                    "date": max(row["bucket_date"], start),
+                    "hour": row.get("hour"),
+                    "wh": 0,
+                    "euros": 0,
+                    "interpolated_minutes": 0,
+                    "tarif_periods": {},
+                }
+            )
+        element = data[-1]
+        element["wh"] += row["total_wh"]
+        element["euros"] += row["total_euros"]
+        element["interpolated_minutes"] += row["total_interpolated_minutes"]
+
+        readable_label = (
+            get_human_readable_tarif_period(row["tarif_period"]) or row["tarif_period"]
+        )
+        element["tarif_periods"][readable_label] = {
+            "wh": row["total_wh"],
+            "euros": row["total_euros"],
+        }
+        label_totals = totals.setdefault(readable_label, {"wh": 0, "euros": 0})
+        label_totals["wh"] += row["total_wh"]
+        label_totals["euros"] += row["total_euros"]
+
+    totals["Total"] = {
+        "wh": sum(element["wh"] for element in data),
+        "euros": sum(element["euros"] for element in data),
+    }
+
+    subscription_euros = compute_subscription_cost(start, end)
+
+    return {
+        "data": data,
+        "totals": totals,
+        "subscription_euros": subscription_euros,
+        "bill_euros": totals["Total"]["euros"] + subscription_euros,
+    }
+
+
+def compute_subscription_cost(start: date, end: date) -> float:
+    """
+    Subscription (abonnement) part of the bill of [start, end], both
+    included: the daily share of each recorded day, priced with the day's
+    tariff option and subscribed power. Days whose subscription price is
+    unknown count for nothing.
+    """
+    timeline = get_price_timeline()
+    return sum(
+        timeline.get_daily_subscription_cost(day, tarif_period_type, subscribed_power)
+        or 0
+        for day, tarif_period_type, subscribed_power in get_daily_subscriptions(
+            start, end
+        )
+    )
@@ -0,0 +1,408 @@
+"""
+Tariff option simulator: what the recorded consumption of a period would
+have cost under each EDF option (Base, HC/HP, Tempo, EJP).
+
+Each recorded day is reduced once to its consumption per half-hour (every
+index label combined): HC schedules are set by the half-hour, so this is
+exact while keeping a year down to 365 x 48 values. Every option is then
+priced over these profiles with the price timeline of each day:
+
+  - TH: a single price;
+  - HC_HP: HC during the half-hours of the HC schedule (the recorded one by
+    default, see get_default_hc_schedule), HP otherwise;
+  - TEMPO: HC from 22:00 to 06:00, the color of a Tempo day applying from
+    06:00 to 06:00 the next day;
+  - EJP: "pointe mobile" from 07:00 to 01:00 the next day on EJP days,
+    "heures normales" otherwise.
+
+Tempo colors and EJP days come from TariffCalendarDay, Tempo colors falling
+back to the ones recorded in DailyIndexes, then to blue. The subscription
+part uses the subscribed power recorded each day.
+
+Results are cached per (option, period, HC schedule), with the pricing
+version, a fingerprint of the calendar and one of the recorded days in the
+key. Like the daily responses (see consumption/services/consumption_cache.py),
+only periods whose every recorded day is finalized are cached: any rewrite
+of a day (Enedis import, integrity scan...) resets its finalization, and
+finalizing it again changes its fingerprint. Periods reaching today aren't
+cached.
+"""
+
+import zlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import pairwise
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from consumption.constants import (
+    FINALIZATION_VERSION,
+    MINUTES_PER_DAY,
+    TEMPO_COLOR_LABELS,
+    TarifPeriodType,
+)
+from consumption.edf_pricing import PriceTimeline, get_price_timeline
+from consumption.models import DailyIndexes, TariffCalendarDay
+from consumption.packing import SLOT_MINUTE_STRS, minute_str_to_slot
+from consumption.selectors import iter_day_indexes
+from consumption.utils import (
+    get_hc_hp_ref_day_series,
+    get_human_readable_tarif_period,
+    interpolate_index_series,
+)
+from teleinfo.constants import TarifPeriods
+
+HALF_HOUR_MINUTES = 30
+HALF_HOURS_PER_DAY = MINUTES_PER_DAY // HALF_HOUR_MINUTES
+DEFAULT_HC_SCHEDULE = "22:00-06:00"
+TEMPO_HC_SCHEDULE = "22:00-06:00"
+# Half-hour at which a Tempo day starts (06:00)
+TEMPO_DAY_START_HALF_HOUR = 12
+# EJP "pointe mobile": from 07:00 to 01:00 the next day
+EJP_PEAK_START_HALF_HOUR = 14
+EJP_PEAK_END_HALF_HOUR = 2
+TARIFF_SIMULATION_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def parse_hc_schedule(schedule: str) -> tuple[bool, ...]:
+    """
+    Parses an HC schedule such as "22:00-06:00" or "01:30-07:30,12:30-14:30".
+
+    Returns:
+        One flag per half-hour of the day, True during HC.
+
+    Raises:
+        ValueError: if a range is malformed, empty or not on the half-hour.
+    """
+    flags = [False] * HALF_HOURS_PER_DAY
+    for time_range in schedule.split(","):
+        try:
+            start_str, end_str = time_range.strip().split("-")
+        except ValueError:
+            raise ValueError(f"Invalid HC range {time_range!r}, expected HH:MM-HH:MM.")
+        start, end = minute_str_to_slot(start_str), minute_str_to_slot(end_str)
+        if start % HALF_HOUR_MINUTES or end % HALF_HOUR_MINUTES or start == end:
+            raise ValueError(
+                f"Invalid HC range {time_range!r}, must be a non-empty range on "
+                "the half-hour."
+            )
+        half_hour = start // HALF_HOUR_MINUTES
+        end_half_hour = end // HALF_HOUR_MINUTES % HALF_HOURS_PER_DAY
+        while True:
+            flags[half_hour] = True
+            half_hour = (half_hour + 1) % HALF_HOURS_PER_DAY
+            if half_hour == end_half_hour:
+                break
+    return tuple(flags)
+
+
+def format_hc_schedule(hc_flags: tuple[bool, ...]) -> str:
+    """Inverse of parse_hc_schedule, ranges wrapping around midnight merged."""
+    if all(hc_flags):
+        return "00:00-24:00"
+    # Start from an HP half-hour so that no range is split at midnight
+    offset = hc_flags.index(False)
+    ranges = []
+    start = None
+    for position in range(1, HALF_HOURS_PER_DAY + 1):
+        half_hour = (offset + position) % HALF_HOURS_PER_DAY
+        if hc_flags[half_hour] and start is None:
+            start = half_hour
+        elif not hc_flags[half_hour] and start is not None:
+            ranges.append((start, half_hour))
+            start = None
+    return ",".join(
+        f"{SLOT_MINUTE_STRS[start * HALF_HOUR_MINUTES]}-"
+        f"{SLOT_MINUTE_STRS[end * HALF_HOUR_MINUTES]}"
+        for start, end in sorted(ranges)
+    )
+
+
+TEMPO_HC_FLAGS = parse_hc_schedule(TEMPO_HC_SCHEDULE)
+
+
+def get_default_hc_schedule(today: date) -> tuple[bool, ...]:
+    """
+    The HC schedule of the most recent complete HC/HP day recorded, or
+    DEFAULT_HC_SCHEDULE if there is none.
+    """
+    series = get_hc_hp_ref_day_series(today)
+    if series is None:
+        return parse_hc_schedule(DEFAULT_HC_SCHEDULE)
+    return tuple(
+        series[half_hour * HALF_HOUR_MINUTES] == TarifPeriods.HC
+        for half_hour in range(HALF_HOURS_PER_DAY)
+    )
+
+
+@dataclass(frozen=True)
+class DayProfile:
+    day: date
+    half_hour_watt_hours: tuple[int, ...]
+    subscribed_power: float | None
+
+
+def compute_half_hour_watt_hours(daily_indexes: DailyIndexes) -> tuple[int, ...]:
+    """
+    Wh consumed during each half-hour of a day, every index label combined
+    (gaps interpolated, unknown minutes at the edges of the day left out).
+    """
+    totals = [0] * HALF_HOURS_PER_DAY
+    for series in daily_indexes.get_index_series().values():
+        filled, _ = interpolate_index_series(series)
+        for half_hour in range(HALF_HOURS_PER_DAY):
+            start = half_hour * HALF_HOUR_MINUTES
+            end = start + HALF_HOUR_MINUTES
+            if filled[start] is not None and filled[end] is not None:
+                totals[half_hour] += filled[end] - filled[start]
+            else:
+                totals[half_hour] += sum(
+                    next_index - index
+                    for index, next_index in pairwise(filled[start : end + 1])
+                    if index is not None and next_index is not None
+                )
+    return tuple(totals)
+
+
+def load_day_profiles(start: date, end: date) -> list[DayProfile]:
+    """Half-hour profiles of the recorded days of [start, end], one pass."""
+    return [
+        DayProfile(
+            day=daily_indexes.date,
+            half_hour_watt_hours=compute_half_hour_watt_hours(daily_indexes),
+            subscribed_power=daily_indexes.subscribed_power,
+        )
+        for daily_indexes in iter_day_indexes(start, end)
+    ]
+
+
+def load_calendar(start: date, end: date) -> dict[TarifPeriodType, dict[date, str]]:
+    """
+    Tempo colors and EJP days of [start - 1 day, end] (the day before start
+    is needed for its last hours): TariffCalendarDay first, then the Tempo
+    colors recorded in DailyIndexes.
+    """
+    first_day = start - timedelta(days=1)
+    calendar = {TarifPeriodType.TEMPO: {}, TarifPeriodType.EJP: {}}
+    calendar[TarifPeriodType.TEMPO].update(
+        DailyIndexes.objects.filter(
+            date__gte=first_day, date__lte=end, tempo_color__isnull=False
+        ).values_list("date", "tempo_color")
+    )
+    for day, tarif_period_type, color in TariffCalendarDay.objects.filter(
+        date__gte=first_day, date__lte=end
+    ).values_list("date", "tarif_period_type", "color"):
+        calendar[tarif_period_type][day] = color
+    return calendar
+
+
+def get_day_tarif_periods(
+    option: TarifPeriodType,
+    day: date,
+    hc_flags: tuple[bool, ...],
+    calendar: dict[TarifPeriodType, dict[date, str]],
+) -> tuple[list[str], bool]:
+    """
+    Tarif period of each half-hour of `day` under `option`.
+
+    Returns:
+        A (tarif periods, color known) tuple, color known being False for a
+        Tempo day whose color had to be assumed blue.
+    """
+    if option == TarifPeriodType.TH:
+        return [TarifPeriods.TH] * HALF_HOURS_PER_DAY, True
+
+    if option == TarifPeriodType.HC_HP:
+        return [TarifPeriods.HC if hc else TarifPeriods.HP for hc in hc_flags], True
+
+    previous_day = day - timedelta(days=1)
+    if option == TarifPeriodType.EJP:
+        ejp_days = calendar[TarifPeriodType.EJP]
+        peak_today = ejp_days.get(day) == "R"
+        peak_yesterday = ejp_days.get(previous_day) == "R"
+        return [
+            TarifPeriods.PM
+            if (half_hour >= EJP_PEAK_START_HALF_HOUR and peak_today)
+            or (half_hour < EJP_PEAK_END_HALF_HOUR and peak_yesterday)
+            else TarifPeriods.HN
+            for half_hour in range(HALF_HOURS_PER_DAY)
+        ], True
+
+    tempo_colors = calendar[TarifPeriodType.TEMPO]
+    today_color = tempo_colors.get(day)
+    yesterday_color = tempo_colors.get(previous_day)
+    tarif_periods = []
+    for half_hour in range(HALF_HOURS_PER_DAY):
+        color = (
+            yesterday_color if half_hour < TEMPO_DAY_START_HALF_HOUR else today_color
+        )
+        hc_label, hp_label = TEMPO_COLOR_LABELS[color or "B"]
+        tarif_periods.append(hc_label if TEMPO_HC_FLAGS[half_hour] else hp_label)
+    return tarif_periods, today_color is not None
+
+
+def simulate_option(
+    option: TarifPeriodType,
+    profiles: list[DayProfile],
+    hc_flags: tuple[bool, ...],
+    calendar: dict[TarifPeriodType, dict[date, str]],
+    timeline: PriceTimeline,
+) -> dict:
+    """
+    Prices the day profiles under one tariff option.
+
+    Returns:
+        {"option", "wh", "energy_euros", "subscription_euros",
+        "total_euros", "tarif_periods" ({readable tarif period: {"wh",
+        "euros"}}), "days", "subscription_missing_days",
+        "unknown_color_days"}.
+    """
+    period_totals: dict[str, dict[str, float]] = {}
+    subscription_euros = 0.0
+    subscription_missing_days = 0
+    unknown_color_days = 0
+
+    for profile in profiles:
+        tarif_periods, color_known = get_day_tarif_periods(
+            option, profile.day, hc_flags, calendar
+        )
+        unknown_color_days += not color_known
+        kwh_prices = timeline.get_kwh_prices(profile.day)
+        for tarif_period, wh in zip(tarif_periods, profile.half_hour_watt_hours):
+            totals = period_totals.setdefault(tarif_period, {"wh": 0, "euros": 0.0})
+            totals["wh"] += wh
+            totals["euros"] += wh / 1000 * kwh_prices.get(tarif_period, 0)
+
+        daily_subscription = timeline.get_daily_subscription_cost(
+            profile.day, option, profile.subscribed_power
+        )
+        if daily_subscription is None:
+            subscription_missing_days += 1
+        else:
+            subscription_euros += daily_subscription
+
+    energy_euros = sum(totals["euros"] for totals in period_totals.values())
+    return {
+        "option": option.value,
+        "wh": sum(totals["wh"] for totals in period_totals.values()),
+        "energy_euros": energy_euros,
+        "subscription_euros": subscription_euros,
+        "total_euros": energy_euros + subscription_euros,
+        "tarif_periods": {
+            get_human_readable_tarif_period(tarif_period): totals
+            for tarif_period, totals in period_totals.items()
+        },
+        "days": len(profiles),
+        "subscription_missing_days": subscription_missing_days,
+        "unknown_color_days": unknown_color_days,
+    }
+
+
+def get_days_fingerprint(start: date, end: date) -> int | None:
+    """
+    CRC32 of the (date, finalization fingerprint) pairs of the days
+    recorded in [start, end], None if one of them isn't finalized by the
+    current FINALIZATION_VERSION.
+    """
+    days = (
+        DailyIndexes.objects.filter(date__gte=start, date__lte=end)
+        .order_by("date")
+        .values_list("date", "finalized_version", "finalized_fingerprint")
+    )
+    pairs = []
+    for day, finalized_version, finalized_fingerprint in days:
+        if finalized_version != FINALIZATION_VERSION:
+            return None
+        pairs.append((day.isoformat(), finalized_fingerprint))
+    return zlib.crc32(repr(pairs).encode())
+
+
+def get_simulation_cache_key(
+    option: TarifPeriodType,
+    start: date,
+    end: date,
+    hc_schedule: str,
+    pricing_version: str,
+    calendar_fingerprint: int,
+    days_fingerprint: int,
+) -> str:
+    return (
+        f"tariff_simulation:{option}:{start.isoformat()}:{end.isoformat()}:"
+        f"{hc_schedule}:{pricing_version}:{calendar_fingerprint:08x}:"
+        f"{days_fingerprint:08x}"
+    )
+
+
+def run_tariff_simulation(
+    start: date,
+    end: date,
+    options: list[TarifPeriodType],
+    hc_flags: tuple[bool, ...] | None = None,
+) -> dict:
+    """
+    Simulates the cost of [start, end] (both included) under each option.
+
+    Args:
+        start: First day of the period.
+        end: Last day of the period, included.
+        options: The tariff options to simulate.
+        hc_flags: The HC schedule of the HC_HP option (see
+                  parse_hc_schedule), the recorded one by default.
+
+    Returns:
+        {"hc_schedule": "HH:MM-HH:MM,...", "results": [...]}, results being
+        the simulate_option dicts sorted from the cheapest option.
+    """
+    today = timezone.localdate()
+    if hc_flags is None:
+        hc_flags = get_default_hc_schedule(today)
+    hc_schedule = format_hc_schedule(hc_flags)
+
+    timeline = get_price_timeline()
+    calendar = load_calendar(start, end)
+    calendar_fingerprint = zlib.crc32(
+        repr(
+            sorted(
+                (str(type_), sorted(days.items())) for type_, days in calendar.items()
+            )
+        ).encode()
+    )
+    days_fingerprint = get_days_fingerprint(start, end) if end < today else None
+    cacheable = days_fingerprint is not None
+    cache_keys = (
+        {
+            option: get_simulation_cache_key(
+                option,
+                start,
+                end,
+                hc_schedule,
+                timeline.version,
+                calendar_fingerprint,
+                days_fingerprint,
+            )
+            for option in options
+        }
+        if cacheable
+        else {}
+    )
+    cached = cache.get_many(list(cache_keys.values()))
+
+    results = []
+    profiles = None
+    for option in options:
+        result = cached.get(cache_keys.get(option))
+        if result is None:
+            if profiles is None:
+                profiles = load_day_profiles(start, end)
+            result = simulate_option(option, profiles, hc_flags, calendar, timeline)
+            if cacheable:
+                cache.set(
+                    cache_keys[option], result, timeout=TARIFF_SIMULATION_CACHE_TIMEOUT
+                )
+        results.append(result)
+
+    return {
+        "hc_schedule": hc_schedule,
+        "results": sorted(results, key=lambda result: result["total_euros"]),
+    }
@@ -0,0 +1,62 @@
+from datetime import date
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from consumption.edf_pricing import invalidate_price_timeline
+from consumption.models import KwhPrice, PricingPeriod, SubscriptionPrice
+from consumption.services.rollups import reprice_rollups
+
+
+def get_next_start_date(start_date: date) -> date | None:
+    """Start date of the first price grid after `start_date`, None if none."""
+    return (
+        PricingPeriod.objects.filter(start_date__gt=start_date)
+        .order_by("start_date")
+        .values_list("start_date", flat=True)
+        .first()
+    )
+
+
+@receiver([post_save, post_delete], sender=SubscriptionPrice)
+def reset_price_timeline(**kwargs):
+    # Subscription costs are priced at read time, nothing stored to reprice
+    invalidate_price_timeline()
+
+
+@receiver(pre_save, sender=PricingPeriod)
+def remember_previous_start_date(instance, **kwargs):
+    instance._previous_start_date = (
+        PricingPeriod.objects.filter(pk=instance.pk)
+        .values_list("start_date", flat=True)
+        .first()
+    )
+
+
+@receiver([post_save, post_delete], sender=PricingPeriod)
+def reprice_pricing_period(instance, **kwargs):
+    """
+    Reprices the rollups of the days whose grid changed: from the earliest
+    of the previous and new start dates to the next grid.
+    """
+    invalidate_price_timeline()
+    start_dates = [instance.start_date]
+    if getattr(instance, "_previous_start_date", None) is not None:
+        start_dates.append(instance._previous_start_date)
+    reprice_rollups(min(start_dates), get_next_start_date(max(start_dates)))
+
+
+@receiver([post_save, post_delete], sender=KwhPrice)
+def reprice_kwh_price(instance, origin=None, **kwargs):
+    """Reprices the rollups of the days of the edited price's grid."""
+    invalidate_price_timeline()
+    if isinstance(origin, PricingPeriod):
+        # Deleted along with its grid, repriced by reprice_pricing_period
+        return
+    start_date = (
+        PricingPeriod.objects.filter(pk=instance.pricing_period_id)
+        .values_list("start_date", flat=True)
+        .first()
+    )
+    if start_date is not None:
+        reprice_rollups(start_date, get_next_start_date(start_date))
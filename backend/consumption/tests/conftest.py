@@ -0,0 +1,11 @@
+import pytest
+
+from consumption.edf_pricing import invalidate_price_timeline
+
+
+@pytest.fixture(autouse=True)
+def reset_price_timeline():
+    # The compiled timeline outlives the test database transaction
+    invalidate_price_timeline()
+    yield
+    invalidate_price_timeline()
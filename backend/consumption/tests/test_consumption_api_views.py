@@ -1,13 +1,39 @@
+import json
 from datetime import date
 
 import pytest
+from django.core.cache import cache
+from freezegun import freeze_time
 from rest_framework.test import APIClient
 
-from consumption.models import DailyIndexes
+from consumption.api import views
+from consumption.models import (
+    DailyBaseLoad,
+    DailyConsumption,
+    DailyIndexes,
+    DailyPowerPeak,
+    HourlyConsumption,
+    KwhPrice,
+    MinuteIndexSample,
+    MinutePowerSample,
+    PricingPeriod,
+    SubscriptionPrice,
+)
+from consumption.services.finalization import finalize_closed_days
 from consumption.utils import get_daily_index_structure
 from teleinfo.constants import TarifPeriods
 
 URL = "/api/consumption/daily/"
+RESAMPLED_URL = "/api/consumption/resampled/"
+RANGE_URL = "/api/consumption/range/"
+POWER_CURVE_URL = "/api/consumption/power-curve/"
+EXPORT_URL = "/api/consumption/export/"
+TARIFF_SIMULATION_URL = "/api/consumption/tariff-simulation/"
+BASE_LOAD_URL = "/api/consumption/base-load/"
+POWER_PEAKS_URL = "/api/consumption/power-peaks/"
+SUBSCRIPTION_REPORT_URL = "/api/consumption/subscription-report/"
+BILL_FORECAST_URL = "/api/consumption/bill-forecast/"
+HEATMAP_URL = "/api/consumption/heatmap/"
 
 
 @pytest.fixture
@@ -15,6 +41,13 @@ def api_client():
     return APIClient()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.mark.django_db
 def test_daily_consumption_requires_date_param(api_client):
     response = api_client.get(URL)
@@ -24,7 +57,7 @@ def test_daily_consumption_requires_date_param(api_client):
 
 @pytest.mark.django_db
 def test_daily_consumption_rejects_invalid_step(api_client):
-    response = api_client.get(URL, {"date": "2025-06-01", "step": 15})
+    response = api_client.get(URL, {"date": "2025-06-01", "step": 7})
 
     assert response.status_code == 400
 
@@ -36,8 +69,7 @@ def test_daily_consumption_returns_404_when_no_data_for_date(api_client):
     assert response.status_code == 404
 
 
-@pytest.mark.django_db
-def test_daily_consumption_returns_computed_data(api_client):
+def create_full_hc_day(day: date = date(2025, 6, 1)) -> DailyIndexes:
     hchc_values = get_daily_index_structure(1)
     hchc_values["00:00"] = 1000
     hchc_values["24:00"] = 2000
@@ -46,18 +78,862 @@ def test_daily_consumption_returns_computed_data(api_client):
     for time_str in tarif_periods:
         tarif_periods[time_str] = TarifPeriods.HC
 
-    DailyIndexes.objects.create(
-        date=date(2025, 6, 1),
+    return DailyIndexes.objects.create(
+        date=day,
         values={"HCHC": hchc_values},
         tarif_periods=tarif_periods,
         subscribed_power=6,
     )
 
+
+@pytest.mark.django_db
+def test_daily_consumption_returns_computed_data(api_client):
+    create_full_hc_day()
+
     response = api_client.get(URL, {"date": "2025-06-01", "step": 60})
 
     assert response.status_code == 200
     body = response.json()
     assert body["date"] == "2025-06-01"
     assert body["step"] == 60
+    assert body["resolution"] == 1
     assert len(body["data"]) == 24
     assert "Total" in body["totals"]
+
+
+@pytest.mark.django_db
+def test_daily_consumption_serves_downsampled_days_at_their_resolution(api_client):
+    daily_indexes = create_full_hc_day()
+    daily_indexes.resolution = 15
+    daily_indexes.save()
+
+    response = api_client.get(URL, {"date": "2025-06-01", "step": 1})
+    columnar = api_client.get(
+        URL, {"date": "2025-06-01", "step": 10, "format": "columnar"}
+    )
+    resampled = api_client.get(RESAMPLED_URL, {"date": "2025-06-01", "step": 5})
+
+    body = response.json()
+    assert (body["step"], body["resolution"]) == (15, 15)
+    assert len(body["data"]) == 96
+    assert body["totals"]["Total"]["wh"] == 1000
+    assert (columnar.json()["step"], columnar.json()["resolution"]) == (30, 15)
+    assert (resampled.json()["step"], resampled.json()["resolution"]) == (15, 15)
+
+
+@pytest.mark.django_db
+def test_daily_consumption_columnar_format(api_client):
+    create_full_hc_day()
+
+    rows = api_client.get(URL, {"date": "2025-06-01"})
+    response = api_client.get(URL, {"date": "2025-06-01", "format": "columnar"})
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    body = response.json()
+    entries = rows.json()["data"]
+    assert body["date"] == "2025-06-01"
+    assert body["format"] == "columnar"
+    assert body["start_minutes"] == list(range(1440))
+    assert body["wh"] == [entry["wh"] for entry in entries]
+    assert body["euros"] == [entry["euros"] for entry in entries]
+    assert body["tarif_periods"] == ["Heures Creuses"]
+    assert body["tarif_period_codes"] == [0] * 1440
+    assert body["totals"] == rows.json()["totals"]
+    # Every minute but 00:00 is interpolated
+    assert body["interpolated"].startswith("/v//")
+    assert len(response.content) < len(rows.content) / 3
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+def test_daily_consumption_caches_columnar_format_separately(api_client):
+    create_full_hc_day()
+    finalize_closed_days()
+
+    rows = api_client.get(URL, {"date": "2025-06-01"})
+    columnar = api_client.get(URL, {"date": "2025-06-01", "format": "columnar"})
+    cached = api_client.get(URL, {"date": "2025-06-01", "format": "columnar"})
+
+    assert rows["ETag"] != columnar["ETag"]
+    assert "data" in rows.json()
+    assert cached.json() == columnar.json()
+    assert "start_minutes" in cached.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"date": "2025-06-01", "since": "25:00"},
+        {"date": "2025-06-01", "since": "12:00", "step": 30},
+    ],
+)
+def test_daily_consumption_rejects_invalid_since(api_client, params):
+    response = api_client.get(URL, params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 12:00:00")
+def test_daily_consumption_delta_mode(api_client):
+    for minute in range(0, 11):
+        MinuteIndexSample.objects.create(
+            date=date(2025, 6, 1),
+            minute=minute,
+            label="HCHC",
+            index=1000 + minute * 10,
+            tarif_period_code=2,
+        )
+
+    response = api_client.get(URL, {"date": "2025-06-01", "since": "00:05"})
+
+    assert response.status_code == 200
+    assert "ETag" not in response
+    body = response.json()
+    assert body["since"] == "00:05"
+    assert body["next_since"] == "00:10"
+    assert [entry["start_time"] for entry in body["data"]] == [
+        "00:05",
+        "00:06",
+        "00:07",
+        "00:08",
+        "00:09",
+    ]
+    assert body["totals"]["Total"]["wh"] == 100
+
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 1), minute=11, label="HCHC", index=1115, tarif_period_code=2
+    )
+    response = api_client.get(
+        URL, {"date": "2025-06-01", "since": "00:10", "format": "columnar"}
+    )
+
+    body = response.json()
+    assert body["next_since"] == "00:11"
+    assert body["start_minutes"] == [10]
+    assert body["wh"] == [15]
+    assert body["totals"]["Total"]["wh"] == 115
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+def test_daily_consumption_caches_closed_days(api_client, mocker):
+    create_full_hc_day()
+    finalize_closed_days()
+    build_spy = mocker.spy(views, "build_consumption_data_from_series")
+
+    first = api_client.get(URL, {"date": "2025-06-01", "step": 60})
+    second = api_client.get(URL, {"date": "2025-06-01", "step": 60})
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert first["ETag"] == second["ETag"]
+    assert first["ETag"].startswith('"')
+    assert build_spy.call_count == 1
+
+    # Another step is another response
+    api_client.get(URL, {"date": "2025-06-01", "step": 30})
+    assert build_spy.call_count == 2
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+def test_daily_consumption_answers_304_on_matching_etag(api_client, mocker):
+    create_full_hc_day()
+    finalize_closed_days()
+    etag = api_client.get(URL, {"date": "2025-06-01"})["ETag"]
+    build_spy = mocker.spy(views, "build_consumption_data_from_series")
+
+    response = api_client.get(URL, {"date": "2025-06-01"}, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert build_spy.call_count == 0
+
+    response = api_client.get(
+        URL, {"date": "2025-06-01"}, HTTP_IF_NONE_MATCH='"outdated"'
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+def test_daily_consumption_cache_follows_row_repairs_and_pricing_changes(
+    api_client, mocker
+):
+    daily_indexes = create_full_hc_day()
+    finalize_closed_days()
+    first = api_client.get(URL, {"date": "2025-06-01", "step": 60})
+
+    daily_indexes.values["HCHC"]["24:00"] = 3000
+    daily_indexes.save()
+    finalize_closed_days()
+    second = api_client.get(URL, {"date": "2025-06-01", "step": 60})
+
+    assert second["ETag"] != first["ETag"]
+    assert second.json()["totals"]["Total"]["wh"] == 2000
+
+    daily_indexes.index_repairs = [
+        {
+            "label": "HCHC",
+            "kind": "jump",
+            "minute": 1440,
+            "dropped_minutes": 0,
+            "offset": -1000,
+        }
+    ]
+    daily_indexes.save()
+    finalize_closed_days()
+    repaired = api_client.get(URL, {"date": "2025-06-01", "step": 60})
+
+    assert repaired["ETag"] != second["ETag"]
+    assert repaired.json()["totals"]["Total"]["wh"] == 1000
+
+    mocker.patch(
+        "consumption.services.consumption_cache.get_pricing_version",
+        return_value="new-pricing",
+    )
+    third = api_client.get(URL, {"date": "2025-06-01", "step": 60})
+    assert third["ETag"] != repaired["ETag"]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+def test_daily_consumption_only_caches_finalized_days(api_client, mocker):
+    # Reconstructed on read, its tarif periods may come from other days
+    create_full_hc_day()
+    build_spy = mocker.spy(views, "build_consumption_data_from_series")
+
+    response = api_client.get(URL, {"date": "2025-06-01"})
+    assert response.status_code == 200
+    assert "ETag" not in response
+
+    finalize_closed_days()
+    first = api_client.get(URL, {"date": "2025-06-01"})
+    # Another day written later doesn't change the frozen reconstruction
+    create_full_hc_day(date(2025, 5, 31))
+    second = api_client.get(URL, {"date": "2025-06-01"})
+
+    assert first["ETag"] == second["ETag"]
+    assert build_spy.call_count == 2
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+@pytest.mark.parametrize("day", [date(2025, 6, 10), date(2025, 6, 9)])
+def test_daily_consumption_does_not_cache_open_days(api_client, mocker, day):
+    create_full_hc_day(day)
+    # 2025-06-09 is closed but still has minute samples to compact
+    MinuteIndexSample.objects.create(date=day, minute=0, label="HCHC", index=1000)
+    build_spy = mocker.spy(views, "build_consumption_data_from_series")
+
+    for _ in range(2):
+        response = api_client.get(URL, {"date": day.isoformat()})
+        assert response.status_code == 200
+        assert "ETag" not in response
+
+    assert build_spy.call_count == 2
+
+
+@pytest.mark.django_db
+def test_resampled_consumption_returns_quarter_hours(api_client):
+    create_full_hc_day()
+
+    response = api_client.get(RESAMPLED_URL, {"date": "2025-06-01", "step": 15})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["step"] == 15
+    assert len(body["data"]) == 96
+    first = body["data"][0]
+    assert (first["start_time"], first["end_time"]) == ("00:00", "00:15")
+    assert first["tarif_period"] == "Heures Creuses"
+    # Only the 00:00 index is known
+    assert first["interpolated_minutes"] == 14
+    assert sum(bucket["wh"] for bucket in body["data"]) == 1000
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params, expected_status",
+    [({"date": "2025-06-01", "step": 7}, 400), ({"date": "2025-06-02"}, 404)],
+)
+def test_resampled_consumption_errors(api_client, params, expected_status):
+    create_full_hc_day()
+
+    response = api_client.get(RESAMPLED_URL, params)
+
+    assert response.status_code == expected_status
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"start": "2025-06-01"},
+        {"start": "2025-06-02", "end": "2025-06-01"},
+        {"start": "2025-06-01", "end": "2025-06-30", "bucket": "minute"},
+        # Hourly buckets are limited to a month
+        {"start": "2025-06-01", "end": "2025-08-01", "bucket": "hour"},
+    ],
+)
+def test_range_consumption_rejects_invalid_params(api_client, params):
+    response = api_client.get(RANGE_URL, params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_range_consumption_returns_daily_buckets(api_client):
+    DailyConsumption.objects.create(
+        date=date(2025, 6, 1), tarif_period=TarifPeriods.HC, wh=1000, euros=0.2
+    )
+    DailyConsumption.objects.create(
+        date=date(2025, 6, 1), tarif_period=TarifPeriods.HP, wh=500, euros=0.1
+    )
+    DailyConsumption.objects.create(
+        date=date(2025, 6, 3),
+        tarif_period=TarifPeriods.HC,
+        wh=200,
+        euros=0.04,
+        interpolated_minutes=3,
+    )
+    # Out of range
+    DailyConsumption.objects.create(
+        date=date(2025, 6, 4), tarif_period=TarifPeriods.HC, wh=9999, euros=9
+    )
+
+    response = api_client.get(RANGE_URL, {"start": "2025-06-01", "end": "2025-06-03"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["bucket"] == "day"
+    assert [element["date"] for element in body["data"]] == [
+        "2025-06-01",
+        "2025-06-03",
+    ]
+    first_day = body["data"][0]
+    assert first_day["hour"] is None
+    assert first_day["wh"] == 1500
+    assert first_day["euros"] == pytest.approx(0.3)
+    assert first_day["tarif_periods"]["Heures Creuses"]["wh"] == 1000
+    assert first_day["tarif_periods"]["Heures Pleines"]["wh"] == 500
+    assert body["data"][1]["interpolated_minutes"] == 3
+    assert body["totals"]["Heures Creuses"]["wh"] == 1200
+    assert body["totals"]["Total"]["wh"] == 1700
+    assert body["totals"]["Total"]["euros"] == pytest.approx(0.34)
+    # No subscription price entered
+    assert body["subscription_euros"] == 0
+    assert body["bill_euros"] == pytest.approx(0.34)
+
+
+@pytest.mark.django_db
+def test_range_consumption_is_repriced_when_a_price_changes(api_client):
+    for day in (date(2025, 6, 1), date(2025, 7, 10)):
+        DailyConsumption.objects.create(
+            date=day, tarif_period=TarifPeriods.HC, wh=1000, euros=0.2
+        )
+        HourlyConsumption.objects.create(
+            date=day, hour=2, tarif_period=TarifPeriods.HC, wh=1000, euros=0.2
+        )
+    kwh_price = KwhPrice.objects.get(
+        pricing_period__start_date=date(2025, 2, 1), tarif_period=TarifPeriods.HC
+    )
+    kwh_price.cents_per_kwh = "30"
+    kwh_price.save()
+
+    response = api_client.get(RANGE_URL, {"start": "2025-06-01", "end": "2025-06-01"})
+
+    assert response.json()["totals"]["Total"]["euros"] == pytest.approx(0.3)
+    assert HourlyConsumption.objects.get(date=date(2025, 6, 1)).euros == (
+        pytest.approx(0.3)
+    )
+    # Priced by the next grid, untouched
+    assert DailyConsumption.objects.get(date=date(2025, 7, 10)).euros == 0.2
+
+
+@pytest.mark.django_db
+def test_range_consumption_bill_includes_subscription(api_client):
+    SubscriptionPrice.objects.create(
+        pricing_period=PricingPeriod.objects.get(start_date=date(2025, 2, 1)),
+        tarif_period_type="HC_HP",
+        subscribed_power=9,
+        euros_per_month="18.25",
+    )
+    for day in (date(2025, 6, 1), date(2025, 6, 2)):
+        DailyIndexes.objects.create(
+            date=day,
+            subscribed_power=9,
+            tarif_periods={"00:00": TarifPeriods.HC},
+        )
+        DailyConsumption.objects.create(
+            date=day, tarif_period=TarifPeriods.HC, wh=1000, euros=0.2
+        )
+
+    response = api_client.get(RANGE_URL, {"start": "2025-06-01", "end": "2025-06-30"})
+
+    body = response.json()
+    assert body["subscription_euros"] == pytest.approx(2 * 18.25 * 12 / 365)
+    assert body["bill_euros"] == pytest.approx(0.4 + 2 * 18.25 * 12 / 365)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "bucket, expected_buckets",
+    [
+        # Weeks start on Monday, the first one is clipped to the range
+        ("week", [("2025-06-01", 300), ("2025-06-02", 400), ("2025-06-30", 50)]),
+        ("month", [("2025-06-01", 700), ("2025-07-01", 50)]),
+    ],
+)
+def test_range_consumption_groups_days_into_weeks_and_months(
+    api_client, bucket, expected_buckets
+):
+    for day, wh in [
+        (date(2025, 6, 1), 300),  # Sunday
+        (date(2025, 6, 2), 100),
+        (date(2025, 6, 8), 300),
+        (date(2025, 7, 1), 50),
+    ]:
+        DailyConsumption.objects.create(
+            date=day, tarif_period=TarifPeriods.HC, wh=wh, euros=0
+        )
+
+    response = api_client.get(
+        RANGE_URL, {"start": "2025-06-01", "end": "2025-07-31", "bucket": bucket}
+    )
+
+    assert response.status_code == 200
+    assert [
+        (element["date"], element["wh"]) for element in response.json()["data"]
+    ] == expected_buckets
+
+
+@pytest.mark.django_db
+def test_range_consumption_returns_hourly_buckets(api_client):
+    HourlyConsumption.objects.create(
+        date=date(2025, 6, 1), hour=23, tarif_period=TarifPeriods.HC, wh=120
+    )
+    HourlyConsumption.objects.create(
+        date=date(2025, 6, 2), hour=0, tarif_period=TarifPeriods.HC, wh=80
+    )
+
+    response = api_client.get(
+        RANGE_URL, {"start": "2025-06-01", "end": "2025-06-02", "bucket": "hour"}
+    )
+
+    assert response.status_code == 200
+    assert [
+        (element["date"], element["hour"], element["wh"])
+        for element in response.json()["data"]
+    ] == [("2025-06-01", 23, 120), ("2025-06-02", 0, 80)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"start": "2025-06-01"},
+        {"start": "2025-06-02", "end": "2025-06-01"},
+        {"start": "2025-06-01", "end": "2025-06-02", "step": 7},
+        {"start": "2025-06-01", "end": "2025-06-02", "format": "ndjson", "step": 7},
+    ],
+)
+def test_consumption_export_rejects_invalid_params(api_client, params):
+    response = api_client.get(EXPORT_URL, params)
+
+    assert response.status_code == 400
+    assert response["Content-Type"] == "application/json"
+
+
+@pytest.mark.django_db
+def test_consumption_export_streams_csv(api_client):
+    create_full_hc_day(date(2025, 6, 1))
+    create_full_hc_day(date(2025, 6, 2))
+
+    response = api_client.get(
+        EXPORT_URL, {"start": "2025-06-01", "end": "2025-06-02", "step": 60}
+    )
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert "consumption_2025-06-01_2025-06-02.csv" in response["Content-Disposition"]
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0] == (
+        "date,start_time,end_time,wh,average_watt,euros,interpolated,tarif_period"
+    )
+    assert len(lines) == 1 + 2 * 24
+    assert lines[1].startswith("2025-06-01,00:00,01:00,")
+    assert lines[-1].startswith("2025-06-02,23:00,24:00,")
+
+
+@pytest.mark.django_db
+def test_consumption_export_streams_ndjson(api_client):
+    create_full_hc_day(date(2025, 6, 1))
+
+    response = api_client.get(
+        EXPORT_URL, {"start": "2025-06-01", "end": "2025-06-01", "format": "ndjson"}
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson; charset=utf-8"
+    rows = [
+        json.loads(line)
+        for line in b"".join(response.streaming_content).decode().splitlines()
+    ]
+    assert len(rows) == 1440
+    assert rows[0]["date"] == "2025-06-01"
+    assert rows[0]["start_time"] == "00:00"
+    assert rows[0]["tarif_period"] == "Heures Creuses"
+    assert sum(row["wh"] for row in rows) == 1000
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"start": "2025-06-02", "end": "2025-06-01"},
+        {"start": "2025-06-01", "end": "2025-07-15"},
+        {"start": "2025-06-01", "end": "2025-06-02", "points": 2},
+        {"start": "2025-06-01", "end": "2025-06-02", "mode": "average"},
+    ],
+)
+def test_power_curve_rejects_invalid_params(api_client, params):
+    response = api_client.get(POWER_CURVE_URL, params)
+
+    assert response.status_code == 400
+
+
+def create_day_with_peak(day: date, peak_minute: int) -> DailyIndexes:
+    # 600 W (10 Wh per minute), 6 kW during one minute
+    hchc = get_daily_index_structure(1)
+    index = 1000
+    for minute, time_str in enumerate(hchc):
+        hchc[time_str] = index
+        index += 100 if minute == peak_minute else 10
+    return DailyIndexes.objects.create(
+        date=day,
+        values={"HCHC": hchc},
+        tarif_periods=dict.fromkeys(get_daily_index_structure(1), TarifPeriods.HC),
+    )
+
+
+@pytest.mark.django_db
+def test_power_curve_lttb_keeps_peaks(api_client):
+    create_day_with_peak(date(2025, 6, 1), 600)
+    # 2025-06-02 missing
+    create_day_with_peak(date(2025, 6, 3), 1000)
+
+    response = api_client.get(
+        POWER_CURVE_URL, {"start": "2025-06-01", "end": "2025-06-03", "points": 50}
+    )
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data) == 50
+    peaks = [point for point in data if point["watt"] == 6000]
+    assert [point["datetime"][:16] for point in peaks] == [
+        "2025-06-01T10:00",
+        "2025-06-03T16:40",
+    ]
+    assert not any(point["datetime"].startswith("2025-06-02") for point in data)
+
+
+@pytest.mark.django_db
+def test_power_curve_minmax_envelope(api_client):
+    create_day_with_peak(date(2025, 6, 1), 600)
+
+    response = api_client.get(
+        POWER_CURVE_URL,
+        {"start": "2025-06-01", "end": "2025-06-01", "points": 24, "mode": "minmax"},
+    )
+
+    data = response.json()["data"]
+    assert len(data) == 24
+    assert data[10]["datetime"].startswith("2025-06-01T10:00")
+    assert data[10]["max_watt"] == 6000
+    assert data[10]["min_watt"] == 600
+    assert data[0]["average_watt"] == 600
+    assert "watt" not in data[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"start": "2025-06-01"},
+        {"start": "2025-06-02", "end": "2025-06-01"},
+        {"start": "2023-01-01", "end": "2025-01-01"},
+        {"start": "2025-06-01", "end": "2025-06-02", "options": "TH,GREEN"},
+        {"start": "2025-06-01", "end": "2025-06-02", "hc_schedule": "22:10-06:00"},
+    ],
+)
+def test_tariff_simulation_rejects_invalid_params(api_client, params):
+    response = api_client.get(TARIFF_SIMULATION_URL, params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_tariff_simulation(api_client):
+    create_day_with_peak(date(2025, 6, 1), 600)
+
+    response = api_client.get(
+        TARIFF_SIMULATION_URL,
+        {
+            "start": "2025-06-01",
+            "end": "2025-06-30",
+            "options": "HC_HP,TH",
+            "hc_schedule": "10:00-18:00",
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["hc_schedule"] == "10:00-18:00"
+    assert {result["option"] for result in body["results"]} == {"HC_HP", "TH"}
+    hc_hp = next(result for result in body["results"] if result["option"] == "HC_HP")
+    assert hc_hp["wh"] == 1440 * 10 + 90
+    assert hc_hp["days"] == 1
+    assert hc_hp["tarif_periods"]["Heures Creuses"]["wh"] == 8 * 60 * 10 + 90
+    assert hc_hp["total_euros"] == hc_hp["energy_euros"]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_tariff_simulation_defaults_to_every_option(api_client):
+    response = api_client.get(
+        TARIFF_SIMULATION_URL, {"start": "2025-06-01", "end": "2025-06-30"}
+    )
+
+    assert response.status_code == 200
+    assert sorted(result["option"] for result in response.json()["results"]) == [
+        "EJP",
+        "HC_HP",
+        "TEMPO",
+        "TH",
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [{"start": "2025-06-01"}, {"start": "2025-06-02", "end": "2025-06-01"}],
+)
+def test_base_load_rejects_invalid_params(api_client, params):
+    response = api_client.get(BASE_LOAD_URL, params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_base_load(api_client):
+    DailyBaseLoad.objects.create(
+        date=date(2025, 6, 2),
+        base_load_watt=180,
+        measured_minutes=1400,
+        step_change=True,
+    )
+    DailyBaseLoad.objects.create(date=date(2025, 6, 1), measured_minutes=12)
+    DailyBaseLoad.objects.create(date=date(2025, 6, 3), base_load_watt=170)
+
+    response = api_client.get(
+        BASE_LOAD_URL, {"start": "2025-06-01", "end": "2025-06-02"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {
+            "date": "2025-06-01",
+            "base_load_watt": None,
+            "measured_minutes": 12,
+            "step_change": False,
+        },
+        {
+            "date": "2025-06-02",
+            "base_load_watt": 180.0,
+            "measured_minutes": 1400,
+            "step_change": True,
+        },
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"start": "2025-06-01"},
+        {"start": "2025-06-02", "end": "2025-06-01"},
+        {"start": "2025-06-01", "end": "2025-06-02", "bucket": "week"},
+    ],
+)
+def test_power_peaks_rejects_invalid_params(api_client, params):
+    response = api_client.get(POWER_PEAKS_URL, params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-02 12:00:00")
+def test_power_peaks(api_client):
+    histogram = [0] * 31
+    histogram[4], histogram[30] = 1439, 1
+    DailyPowerPeak.objects.create(
+        date=date(2025, 6, 1),
+        peak_va=3050,
+        peak_minute=1200,
+        peak_intensity=14,
+        measured_minutes=1440,
+        va_histogram=histogram,
+        intensity_histogram=[0, 0, 1439] + [0] * 11 + [1],
+        subscribed_intensity=30,
+    )
+    MinutePowerSample.objects.create(
+        date=date(2025, 6, 2), minute=30, peak_va=520, peak_intensity=3
+    )
+
+    response = api_client.get(
+        POWER_PEAKS_URL, {"start": "2025-06-01", "end": "2025-06-02"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["bucket"] == "day"
+    assert response.json()["data"] == [
+        {
+            "date": "2025-06-01",
+            "peak_va": 3050,
+            "peak_at": "2025-06-01T20:00:00+02:00",
+            "peak_intensity": 14,
+            "measured_minutes": 1440,
+            "load_duration": [
+                {"va": 3000, "minutes": 1},
+                {"va": 400, "minutes": 1440},
+            ],
+        },
+        {
+            "date": "2025-06-02",
+            "peak_va": 520,
+            "peak_at": "2025-06-02T00:30:00+02:00",
+            "peak_intensity": 3,
+            "measured_minutes": 1,
+            "load_duration": [{"va": 500, "minutes": 1}],
+        },
+    ]
+
+    response = api_client.get(
+        POWER_PEAKS_URL,
+        {"start": "2025-06-01", "end": "2025-06-02", "bucket": "month"},
+    )
+
+    [month] = response.json()["data"]
+    assert (month["date"], month["peak_va"], month["measured_minutes"]) == (
+        "2025-06-01",
+        3050,
+        1441,
+    )
+
+
+@pytest.mark.django_db
+def test_subscription_report(api_client):
+    DailyPowerPeak.objects.create(
+        date=date(2025, 6, 1),
+        peak_va=7000,
+        peak_minute=600,
+        peak_intensity=31,
+        measured_minutes=2,
+        intensity_histogram=[0] * 10 + [1] + [0] * 20 + [1],
+        subscribed_intensity=45,
+    )
+
+    response = api_client.get(
+        SUBSCRIPTION_REPORT_URL, {"start": "2025-06-01", "end": "2025-06-30"}
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["start"] == "2025-06-01"
+    assert report["peak_intensity"] == 31
+    assert report["subscribed_intensity"] == 45
+    assert report["recommended_subscribed_intensity"] == 45
+    assert report["options"][1] == {
+        "subscribed_intensity": 30,
+        "subscribed_power": 6,
+        "trip_minutes": 1,
+        "trip_days": 1,
+        "load_shedding_minutes": 1,
+    }
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-15 22:30:00")
+def test_bill_forecast(api_client):
+    # Monday 00:30 in Paris: half a kWh so far, two Mondays of history
+    DailyConsumption.objects.create(
+        date=date(2025, 6, 16), tarif_period="HC..", wh=500, euros=0.1
+    )
+    for day in (date(2025, 6, 2), date(2025, 6, 9)):
+        HourlyConsumption.objects.create(date=day, hour=0, tarif_period="HC..", wh=1000)
+        HourlyConsumption.objects.create(
+            date=day, hour=20, tarif_period="HP..", wh=2000
+        )
+
+    response = api_client.get(BILL_FORECAST_URL)
+
+    assert response.status_code == 200
+    forecast = response.json()
+    assert forecast["month"] == "2025-06-01"
+    assert forecast["profile_days"] == 2
+    assert forecast["month_to_date"]["wh"] == 500
+    assert forecast["month_to_date"]["tarif_periods"]["Heures Creuses"] == {
+        "wh": 500,
+        "euros": 0.1,
+    }
+    # Half of today's 00:00 hour, today's evening and Monday the 23rd and 30th
+    assert forecast["forecast"]["tarif_periods"]["Heures Creuses"]["wh"] == 3000
+    assert forecast["forecast"]["tarif_periods"]["Heures Pleines"]["wh"] == 6000
+    assert forecast["forecast"]["subscription_euros"] == 0
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-16 10:00:00")
+def test_heatmap(api_client):
+    HourlyConsumption.objects.create(
+        date=date(2025, 6, 15), hour=23, tarif_period="HC..", wh=300
+    )
+    HourlyConsumption.objects.create(
+        date=date(2025, 4, 14), hour=8, tarif_period="HP..", wh=2000
+    )
+
+    response = api_client.get(HEATMAP_URL, {"by_tarif_period": "true"})
+
+    assert response.status_code == 200
+    heatmap = response.json()
+    assert (heatmap["start"], heatmap["end"]) == ("2025-04-21", "2025-06-15")
+    assert (heatmap["weeks"], heatmap["percentile"], heatmap["days"]) == (8, 90, 1)
+    assert len(heatmap["data"]) == 168
+    assert heatmap["data"][167] == {
+        "weekday": 6,
+        "hour": 23,
+        "hours": 1,
+        "average_watt": 300.0,
+        "percentile_watt": 300.0,
+        "tarif_periods": {
+            "Heures Creuses": {"average_watt": 300.0, "percentile_watt": 300.0}
+        },
+    }
+
+    response = api_client.get(HEATMAP_URL, {"weeks": 9})
+    assert response.json()["data"][8]["average_watt"] == 2000.0
+    assert "tarif_periods" not in response.json()["data"][8]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{"weeks": 0}, {"weeks": 157}, {"weeks": "a"}])
+def test_heatmap_rejects_invalid_params(api_client, params):
+    response = api_client.get(HEATMAP_URL, params)
+
+    assert response.status_code == 400
@@ -0,0 +1,91 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from consumption.benchmarking import generate_synthetic_history, measure
+from consumption.constants import MINUTES_PER_DAY, TarifPeriodType
+from consumption.models import DailyIndexes, MinuteIndexSample
+
+
+@pytest.mark.django_db
+def test_generate_synthetic_history():
+    start, end = date(2024, 1, 1), date(2024, 12, 31)
+
+    assert generate_synthetic_history(start, end, seed=1) == 366
+
+    days = list(DailyIndexes.objects.order_by("date"))
+    assert len(days) == 366
+    assert {days[0].tarif_period_type, days[-1].tarif_period_type} == {
+        TarifPeriodType.HC_HP,
+        TarifPeriodType.TEMPO,
+    }
+    assert {day.tempo_color for day in days[200:]} == {"B", "W", "R"}
+    # Teleinfo gaps leave most days to be filled from a reference day
+    assert 0 < sum(day.tarif_periods_complete for day in days) < 366
+    series = [next(iter(day.get_index_series().values())) for day in days]
+    assert any(None in day_series[:MINUTES_PER_DAY] for day_series in series)
+    # The "24:00" index is the next day's "00:00" one
+    midnights = [
+        (day_series[MINUTES_PER_DAY], next_series[0])
+        for day_series, next_series in zip(series[:100], series[1:101])
+        if day_series[MINUTES_PER_DAY] is not None
+    ]
+    assert len(midnights) > 80
+    assert all(index == next_index for index, next_index in midnights)
+
+
+def test_measure():
+    calls = []
+
+    result = measure(lambda: lambda: calls.append(1), runs=5)
+
+    assert len(calls) == 5
+    assert result["runs"] == 5
+    assert 0 <= result["min_ms"] <= result["median_ms"] <= result["p90_ms"]
+    assert result["p90_ms"] <= result["max_ms"]
+
+
+@pytest.mark.django_db
+def test_benchmark_consumption_command(tmp_path):
+    output = tmp_path / "benchmark.json"
+    # Real data of a day and a minute the suite writes to
+    yesterday = timezone.localdate() - timedelta(days=1)
+    DailyIndexes.objects.create(date=yesterday, values={"BASE": {"00:00": 1}})
+    MinuteIndexSample.objects.create(
+        date=timezone.localdate(), minute=0, label="BASE", index=1
+    )
+    cache.set("real", 1)
+
+    call_command(
+        "benchmark_consumption",
+        "--years=1",
+        "--runs=2",
+        f"--output={output}",
+        "--label=test",
+    )
+
+    report = json.loads(output.read_text())
+    assert report["label"] == "test"
+    assert report["history"]["days"] == 365
+    assert set(report["results"]) == {
+        "build_consumption_data_step_1",
+        "build_consumption_data_step_30",
+        "build_consumption_data_step_60",
+        "build_consumption_data_from_series_step_1",
+        "build_consumption_data_from_series_step_30",
+        "build_consumption_data_from_series_step_60",
+        "compute_totals_for_a_day",
+        "fill_missing_tarif_periods",
+        "save_teleinfo_data",
+        "daily_view",
+        "daily_view_finalized",
+    }
+    assert report["results"]["daily_view"]["runs"] == 2
+    # Run on a throwaway database and cache
+    assert DailyIndexes.objects.get().date == yesterday
+    assert MinuteIndexSample.objects.get().index == 1
+    assert cache.get("real") == 1
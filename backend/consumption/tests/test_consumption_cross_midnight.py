@@ -0,0 +1,141 @@
+from datetime import date
+
+import pytest
+from django.core.cache import cache
+
+from consumption.constants import MINUTES_PER_DAY
+from consumption.cross_midnight import (
+    bridge_reconstructed_day,
+    compute_day_edges,
+    iter_bridged_days,
+    load_day_edges,
+)
+from consumption.models import DailyIndexes
+from consumption.reconstruction import reconstruct_day
+from consumption.services.export import iter_consumption_rows
+from consumption.services.finalization import finalize_closed_days
+from consumption.utils import get_daily_index_structure, interpolate_index_series
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 6, 1)
+NEXT_DAY = date(2025, 6, 2)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def create_day(day: date, series: list[int | None]) -> DailyIndexes:
+    values = dict(zip(get_daily_index_structure(1), series))
+    tarif_periods = dict.fromkeys(get_daily_index_structure(1), TarifPeriods.TH)
+    return DailyIndexes.objects.create(
+        date=day, values={"BASE": values}, tarif_periods=tarif_periods
+    )
+
+
+def create_outage_days() -> list[int | None]:
+    """Two days recorded every minute but from 23:10 to 01:30, 7 Wh a minute."""
+    # Slot 1440 of the first day is slot 0 of the next one
+    combined = [10_000 + 7 * slot for slot in range(2 * MINUTES_PER_DAY + 1)]
+    known = list(combined)
+    known[1390 : MINUTES_PER_DAY + 90] = [None] * (MINUTES_PER_DAY + 90 - 1390)
+    known[1395] = 10_000 + 7 * 1395 + 3  # Not linear, the bridge is checked
+    create_day(DAY, known[: MINUTES_PER_DAY + 1])
+    create_day(NEXT_DAY, known[MINUTES_PER_DAY:])
+    return known
+
+
+def test_compute_day_edges():
+    series = [None, 10, None, 12, None]
+
+    assert compute_day_edges({"BASE": series, "HCHC": [None] * 5}) == {
+        "BASE": (1, 10, 3, 12)
+    }
+
+
+@pytest.mark.django_db
+def test_iter_bridged_days_interpolates_across_midnight():
+    known = create_outage_days()
+    expected, expected_flags = interpolate_index_series(known)
+
+    (_, first), (_, second) = list(iter_bridged_days(DAY, NEXT_DAY))
+
+    assert first.index_series["BASE"] == expected[: MINUTES_PER_DAY + 1]
+    assert second.index_series["BASE"] == expected[MINUTES_PER_DAY:]
+    assert first.interpolated["BASE"][1389:1391] == [False, True]
+    assert first.interpolated["BASE"][1396:] == [True] * (MINUTES_PER_DAY - 1395)
+    assert second.interpolated["BASE"][:91] == expected_flags[MINUTES_PER_DAY:][:91]
+    # The energy of the outage is split between the two days, none is lost
+    assert (
+        second.index_series["BASE"][MINUTES_PER_DAY] - first.index_series["BASE"][0]
+        == 14 * MINUTES_PER_DAY
+    )
+
+
+@pytest.mark.django_db
+def test_iter_bridged_days_loads_the_outer_neighbours():
+    known = create_outage_days()
+    expected, _ = interpolate_index_series(known)
+
+    [(_, first)] = list(iter_bridged_days(DAY, DAY))
+    [(_, second)] = list(iter_bridged_days(NEXT_DAY, NEXT_DAY))
+
+    assert first.index_series["BASE"] == expected[: MINUTES_PER_DAY + 1]
+    assert second.index_series["BASE"] == expected[MINUTES_PER_DAY:]
+
+
+@pytest.mark.django_db
+def test_iter_bridged_days_skips_missing_days():
+    create_outage_days()
+    DailyIndexes.objects.filter(date=NEXT_DAY).update(date=date(2025, 6, 3))
+
+    days = list(iter_bridged_days(DAY, date(2025, 6, 3)))
+
+    assert [daily_indexes.date for daily_indexes, _ in days] == [
+        DAY,
+        date(2025, 6, 3),
+    ]
+    for daily_indexes, reconstructed in days:
+        assert reconstructed == reconstruct_day(daily_indexes, daily_indexes.date)
+
+
+def test_bridge_reconstructed_day_without_neighbours():
+    reconstructed = reconstruct_day(
+        DailyIndexes(
+            date=DAY,
+            values={"BASE": {**get_daily_index_structure(1), "12:00": 1}},
+        ),
+        DAY,
+    )
+
+    assert bridge_reconstructed_day(reconstructed, None, {}) is reconstructed
+
+
+@pytest.mark.django_db
+def test_load_day_edges_caches_finalized_days(django_assert_num_queries):
+    create_outage_days()
+    finalize_closed_days()
+
+    with django_assert_num_queries(3):
+        edges = load_day_edges([DAY, NEXT_DAY, date(2025, 6, 3)])
+    with django_assert_num_queries(1):
+        assert load_day_edges([DAY, NEXT_DAY]) == edges
+
+    assert edges == {
+        DAY: {"BASE": (0, 10_000, 1395, 10_000 + 7 * 1395 + 3)},
+        NEXT_DAY: {"BASE": (90, 10_000 + 7 * 1530, 1440, 10_000 + 7 * 2880)},
+    }
+
+
+@pytest.mark.django_db
+def test_exported_rows_are_continuous_across_midnight():
+    create_outage_days()
+
+    rows = list(iter_consumption_rows(DAY, NEXT_DAY, 1))
+
+    assert len(rows) == 2 * MINUTES_PER_DAY
+    assert all(row["wh"] is not None for row in rows)
+    assert sum(row["wh"] for row in rows) == 14 * MINUTES_PER_DAY
+    # 23:59 of the first day and 00:00 of the next one
+    assert rows[1439]["interpolated"] and rows[1440]["interpolated"]
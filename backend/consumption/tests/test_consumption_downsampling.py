@@ -0,0 +1,63 @@
+import math
+import random
+
+import pytest
+
+from consumption.downsampling import lttb, min_max_envelope
+
+
+def test_lttb_keeps_short_peaks():
+    points = [(x, 500.0) for x in range(10_000)]
+    points[4321] = (4321, 9000.0)
+
+    sampled = lttb(points, 100)
+
+    assert len(sampled) == 100
+    assert (4321, 9000.0) in sampled
+
+
+def test_lttb_keeps_ends_and_order():
+    rng = random.Random(0)
+    points = [(x, math.sin(x / 50) * 1000 + rng.random()) for x in range(5000)]
+
+    sampled = lttb(points, 250)
+
+    assert len(sampled) == 250
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+    assert [x for x, _ in sampled] == sorted({x for x, _ in sampled})
+    assert set(sampled) <= set(points)
+
+
+@pytest.mark.parametrize("point_count", [0, 1, 3, 10])
+def test_lttb_returns_short_series_as_is(point_count):
+    points = [(x, float(x)) for x in range(point_count)]
+
+    assert lttb(points, 10) == points
+
+
+def test_lttb_rejects_threshold_below_three():
+    with pytest.raises(ValueError):
+        lttb([(0, 0), (1, 1), (2, 2), (3, 3)], 2)
+
+
+def test_min_max_envelope():
+    values = [100, 200, None, 5000, 100, 300, None, None, 50, 60]
+
+    assert min_max_envelope(values, 5) == [
+        (0, 100, 200, 150),
+        (2, 5000, 5000, 5000),
+        (4, 100, 300, 200),
+        (8, 50, 60, 55),
+    ]
+
+
+def test_min_max_envelope_with_more_buckets_than_values():
+    assert min_max_envelope([1, 2], 10) == [(0, 1, 1, 1), (1, 2, 2, 2)]
+
+
+def test_min_max_envelope_uneven_buckets_cover_every_value():
+    envelope = min_max_envelope(list(range(10)), 3)
+
+    assert [start for start, *_ in envelope] == [0, 3, 6]
+    assert envelope[-1][2] == 9
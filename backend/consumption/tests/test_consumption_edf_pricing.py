@@ -2,10 +2,17 @@ from datetime import date
 
 import pytest
 
-from consumption.edf_pricing import get_kwh_price
+from consumption.edf_pricing import (
+    compile_price_timeline,
+    get_kwh_price,
+    get_price_timeline,
+    get_pricing_version,
+)
+from consumption.models import KwhPrice, PricingPeriod, SubscriptionPrice
 from teleinfo.constants import TarifPeriods
 
 
+@pytest.mark.django_db
 @pytest.mark.parametrize(
     "target_date, period, expected_price",
     [
@@ -27,3 +34,64 @@ from teleinfo.constants import TarifPeriods
 def test_get_kwh_price(target_date, period, expected_price):
     result = get_kwh_price(target_date, period)
     assert result == expected_price
+
+
+@pytest.mark.django_db
+def test_price_timeline_is_sorted_and_in_euros():
+    timeline = compile_price_timeline()
+
+    assert list(timeline.start_dates) == sorted(timeline.start_dates)
+    assert timeline.get_kwh_prices(date(2025, 6, 1))[TarifPeriods.HP] == 0.2146
+    assert timeline.get_kwh_prices(date(2023, 1, 1)) == {}
+
+
+@pytest.mark.django_db
+def test_price_timeline_price_vector():
+    timeline = get_price_timeline()
+
+    assert timeline.get_price_vector(
+        date(2025, 6, 1), [TarifPeriods.HC, None, TarifPeriods.HP, "UNKNOWN"]
+    ) == [0.1696, 0, 0.2146, 0]
+
+
+@pytest.mark.django_db
+def test_price_timeline_daily_subscription_cost():
+    pricing_period = PricingPeriod.objects.get(start_date=date(2025, 2, 1))
+    SubscriptionPrice.objects.create(
+        pricing_period=pricing_period,
+        tarif_period_type="HC_HP",
+        subscribed_power=9,
+        euros_per_month="18.25",
+    )
+    timeline = get_price_timeline()
+
+    assert timeline.get_daily_subscription_cost(
+        date(2025, 6, 1), "HC_HP", 9.0
+    ) == pytest.approx(18.25 * 12 / 365)
+    # Unknown option, power or period
+    assert timeline.get_daily_subscription_cost(date(2025, 6, 1), "TEMPO", 9) is None
+    assert timeline.get_daily_subscription_cost(date(2025, 6, 1), "HC_HP", 6) is None
+    assert timeline.get_daily_subscription_cost(date(2025, 6, 1), "HC_HP", None) is None
+    assert timeline.get_daily_subscription_cost(date(2023, 6, 1), "HC_HP", 9) is None
+    # The next grid has no subscription price
+    assert timeline.get_daily_subscription_cost(date(2025, 8, 1), "HC_HP", 9) is None
+
+
+@pytest.mark.django_db
+def test_price_edits_are_picked_up_right_away():
+    version = get_pricing_version()
+    assert get_pricing_version() == version
+
+    pricing_period = PricingPeriod.objects.create(start_date=date(2030, 1, 1))
+    KwhPrice.objects.create(
+        pricing_period=pricing_period,
+        tarif_period=TarifPeriods.HC,
+        cents_per_kwh="20",
+    )
+
+    assert get_kwh_price(date(2030, 6, 1), TarifPeriods.HC) == 0.2
+    assert get_pricing_version() != version
+
+    pricing_period.delete()
+    assert get_kwh_price(date(2030, 6, 1), TarifPeriods.HC) == 0.1336920
+    assert get_pricing_version() == version
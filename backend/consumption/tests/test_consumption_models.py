@@ -2,7 +2,10 @@ from datetime import date
 
 import pytest
 
+from consumption.constants import TARIF_PERIOD_CODES
 from consumption.models import DailyIndexes
+from consumption.utils import get_daily_index_structure
+from teleinfo.constants import TarifPeriods
 
 
 @pytest.mark.django_db
@@ -10,3 +13,107 @@ def test_daily_indexes_str():
     daily_indexes = DailyIndexes.objects.create(date=date(2025, 6, 1))
 
     assert str(daily_indexes) == "Indexes du 2025-06-01"
+
+
+@pytest.mark.django_db
+def test_daily_indexes_values_and_tarif_periods_are_packed_on_save():
+    hchc = {**get_daily_index_structure(1), "00:00": 1000, "24:00": 2000}
+    tarif_periods = {**get_daily_index_structure(1), "00:00": TarifPeriods.HC}
+
+    DailyIndexes.objects.create(
+        date=date(2025, 6, 1), values={"HCHC": hchc}, tarif_periods=tarif_periods
+    )
+
+    daily_indexes = DailyIndexes.objects.get(date=date(2025, 6, 1))
+    assert daily_indexes.packed_values
+    assert daily_indexes.values == {"HCHC": hchc}
+    assert daily_indexes.tarif_periods == tarif_periods
+
+
+@pytest.mark.django_db
+def test_daily_indexes_in_place_changes_are_saved():
+    daily_indexes = DailyIndexes.objects.create(
+        date=date(2025, 6, 1), values={"HCHC": get_daily_index_structure(1)}
+    )
+
+    daily_indexes.values["HCHC"]["10:00"] = 1234
+    daily_indexes.save()
+    daily_indexes.refresh_from_db()
+
+    assert daily_indexes.values["HCHC"]["10:00"] == 1234
+
+
+@pytest.mark.django_db
+def test_daily_indexes_series_accessors():
+    hchc = {**get_daily_index_structure(1), "00:01": 1001}
+    tarif_periods = {**get_daily_index_structure(1), "00:01": TarifPeriods.HP}
+    DailyIndexes.objects.create(
+        date=date(2025, 6, 1), values={"HCHC": hchc}, tarif_periods=tarif_periods
+    )
+
+    daily_indexes = DailyIndexes.objects.get(date=date(2025, 6, 1))
+    index_series = daily_indexes.get_index_series()
+    tarif_period_series = daily_indexes.get_tarif_period_series()
+
+    assert list(index_series) == ["HCHC"]
+    assert index_series["HCHC"][1] == 1001
+    assert len(tarif_period_series) == 1441
+    assert tarif_period_series[1] == TarifPeriods.HP
+    assert (
+        daily_indexes.get_tarif_period_codes()[1] == TARIF_PERIOD_CODES[TarifPeriods.HP]
+    )
+
+
+@pytest.mark.django_db
+def test_daily_indexes_empty_day():
+    daily_indexes = DailyIndexes.objects.create(date=date(2025, 6, 1))
+    daily_indexes.refresh_from_db()
+
+    assert daily_indexes.values == {}
+    assert daily_indexes.tarif_periods == {}
+    assert daily_indexes.get_index_series() == {}
+    assert daily_indexes.get_tarif_period_series() == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "tarif_periods, expected_type, expected_color, expected_complete",
+    [
+        ({}, None, None, False),
+        (
+            {time_str: TarifPeriods.HC for time_str in get_daily_index_structure(1)},
+            "HC_HP",
+            None,
+            True,
+        ),
+        ({"00:00": None, "12:00": TarifPeriods.HPJR}, "TEMPO", "R", False),
+        ({"12:00": TarifPeriods.TH}, "TH", None, False),
+    ],
+)
+def test_daily_indexes_tarif_metadata_is_maintained_on_save(
+    tarif_periods, expected_type, expected_color, expected_complete
+):
+    DailyIndexes.objects.create(date=date(2025, 6, 1), tarif_periods=tarif_periods)
+
+    daily_indexes = DailyIndexes.objects.get(date=date(2025, 6, 1))
+    assert daily_indexes.tarif_period_type == expected_type
+    assert daily_indexes.tempo_color == expected_color
+    assert daily_indexes.tarif_periods_complete is expected_complete
+
+
+@pytest.mark.django_db
+def test_daily_indexes_tarif_metadata_follows_in_place_changes():
+    daily_indexes = DailyIndexes.objects.create(
+        date=date(2025, 6, 1),
+        tarif_periods={
+            time_str: TarifPeriods.HCJB for time_str in get_daily_index_structure(1)
+        },
+    )
+    assert daily_indexes.tarif_periods_complete is True
+
+    daily_indexes.tarif_periods["12:00"] = None
+    daily_indexes.save()
+
+    daily_indexes.refresh_from_db()
+    assert daily_indexes.tarif_periods_complete is False
+    assert daily_indexes.tempo_color == "B"
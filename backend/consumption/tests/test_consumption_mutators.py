@@ -1,8 +1,11 @@
+from datetime import date
+
 import pytest
 from freezegun import freeze_time
 
-from consumption.models import DailyIndexes
-from consumption.mutators import save_teleinfo_data
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.mutators import compact_minute_samples, save_teleinfo_data
+from consumption.selectors import get_day_indexes
 from teleinfo.constants import TarifPeriods, TeleinfoLabel
 
 
@@ -24,11 +27,14 @@ def test_save_teleinfo_data_does_nothing_if_cache_is_none(mocker):
 
     save_teleinfo_data()
 
+    assert MinuteIndexSample.objects.count() == 0
     assert DailyIndexes.objects.count() == 0
 
 
 @pytest.mark.django_db
-@freeze_time("2025-06-01 08:15:00")  # 10:15 heure locale Europe/Paris (CEST, UTC+2 en juin)
+@freeze_time(
+    "2025-06-01 08:15:00"
+)  # 10:15 heure locale Europe/Paris (CEST, UTC+2 en juin)
 def test_save_teleinfo_data_updates_current_day(mocker):
     mocker.patch(
         "consumption.mutators.get_teleinfo_data_in_cache_if_up_to_date",
@@ -37,8 +43,11 @@ def test_save_teleinfo_data_updates_current_day(mocker):
 
     save_teleinfo_data()
 
-    assert DailyIndexes.objects.count() == 1
-    today_indexes = DailyIndexes.objects.get()
+    # Hot write path: only minute samples are inserted
+    assert DailyIndexes.objects.count() == 0
+    assert MinuteIndexSample.objects.count() == 2
+
+    today_indexes = get_day_indexes(date(2025, 6, 1))
     assert today_indexes.date.isoformat() == "2025-06-01"
     assert today_indexes.subscribed_power == 6
     assert today_indexes.tarif_periods["10:15"] == TarifPeriods.HC
@@ -47,7 +56,9 @@ def test_save_teleinfo_data_updates_current_day(mocker):
 
 
 @pytest.mark.django_db
-@freeze_time("2025-06-01 22:00:00")  # 00:00 heure locale Europe/Paris le 2025-06-02 (CEST, UTC+2 en juin)
+@freeze_time(
+    "2025-06-01 22:00:00"
+)  # 00:00 heure locale Europe/Paris le 2025-06-02 (CEST, UTC+2 en juin)
 def test_save_teleinfo_data_also_updates_previous_day_at_midnight(mocker):
     mocker.patch(
         "consumption.mutators.get_teleinfo_data_in_cache_if_up_to_date",
@@ -56,13 +67,90 @@ def test_save_teleinfo_data_also_updates_previous_day_at_midnight(mocker):
 
     save_teleinfo_data()
 
-    assert DailyIndexes.objects.count() == 2
+    assert MinuteIndexSample.objects.count() == 4
 
-    today_indexes = DailyIndexes.objects.get(date="2025-06-02")
+    today_indexes = get_day_indexes(date(2025, 6, 2))
     assert today_indexes.tarif_periods["00:00"] == TarifPeriods.HC
     assert today_indexes.values["HCHC"]["00:00"] == 12345
 
-    previous_day_indexes = DailyIndexes.objects.get(date="2025-06-01")
+    previous_day_indexes = get_day_indexes(date(2025, 6, 1))
     assert previous_day_indexes.tarif_periods["24:00"] == TarifPeriods.HC
     assert previous_day_indexes.values["HCHC"]["24:00"] == 12345
     assert previous_day_indexes.subscribed_power == 6
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 08:15:00")
+def test_save_teleinfo_data_keeps_latest_reading_of_a_minute(mocker):
+    cache_data = fake_cache_teleinfo_data()
+    mocker.patch(
+        "consumption.mutators.get_teleinfo_data_in_cache_if_up_to_date",
+        return_value=cache_data,
+    )
+
+    save_teleinfo_data()
+    cache_data[TeleinfoLabel.HCHC] = "12350"
+    save_teleinfo_data()
+
+    assert MinuteIndexSample.objects.count() == 2
+    assert MinuteIndexSample.objects.get(label="HCHC").index == 12350
+
+
+def record_minute(mocker, utc_datetime: str, hchc: str, ptec: str) -> None:
+    cache_data = {**fake_cache_teleinfo_data(), TeleinfoLabel.HCHC: hchc}
+    cache_data[TeleinfoLabel.PTEC] = ptec
+    mocker.patch(
+        "consumption.mutators.get_teleinfo_data_in_cache_if_up_to_date",
+        return_value=cache_data,
+    )
+    with freeze_time(utc_datetime):
+        save_teleinfo_data()
+
+
+@pytest.mark.django_db
+def test_compact_minute_samples_folds_closed_days_only(mocker):
+    # 2025-06-01 05:00 / 05:01 (local), then midnight, then 2025-06-02 00:01
+    record_minute(mocker, "2025-06-01 03:00:00", "100", TarifPeriods.HC)
+    record_minute(mocker, "2025-06-01 03:01:00", "110", TarifPeriods.HP)
+    record_minute(mocker, "2025-06-01 22:00:00", "500", TarifPeriods.HC)
+    record_minute(mocker, "2025-06-01 22:01:00", "505", TarifPeriods.HC)
+
+    with freeze_time("2025-06-01 22:01:30"):
+        assert compact_minute_samples() == 1
+
+    # The closed day is folded into DailyIndexes, its samples are gone
+    previous_day = DailyIndexes.objects.get(date=date(2025, 6, 1))
+    assert previous_day.values["HCHC"]["05:00"] == 100
+    assert previous_day.values["HCHC"]["05:01"] == 110
+    assert previous_day.values["HCHC"]["24:00"] == 500
+    assert previous_day.values["HCHC"]["12:00"] is None
+    # 05:00 aligned on the new tarif period observed at 05:01
+    assert previous_day.tarif_periods["05:00"] == TarifPeriods.HP
+    assert previous_day.subscribed_power == 6
+    assert not MinuteIndexSample.objects.filter(date=date(2025, 6, 1)).exists()
+
+    # The current day stays in the sample table
+    assert not DailyIndexes.objects.filter(date=date(2025, 6, 2)).exists()
+    assert MinuteIndexSample.objects.filter(date=date(2025, 6, 2)).count() == 4
+
+    with freeze_time("2025-06-01 22:02:00"):
+        assert compact_minute_samples() == 0
+
+
+@pytest.mark.django_db
+def test_compact_minute_samples_merges_with_existing_row(mocker):
+    record_minute(mocker, "2025-06-01 03:00:00", "100", TarifPeriods.HC)
+    with freeze_time("2025-06-02 10:00:00"):
+        compact_minute_samples()
+    # A late sample of an already compacted day
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 1), minute=301, label="HCHC", index=101
+    )
+
+    with freeze_time("2025-06-02 10:01:00"):
+        compact_minute_samples()
+
+    previous_day = DailyIndexes.objects.get(date=date(2025, 6, 1))
+    assert previous_day.values["HCHC"]["05:00"] == 100
+    assert previous_day.values["HCHC"]["05:01"] == 101
+    assert previous_day.values["HCHP"]["05:00"] == 6789
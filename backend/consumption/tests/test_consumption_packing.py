@@ -0,0 +1,132 @@
+import zlib
+
+import pytest
+
+from consumption.constants import DAY_MINUTE_SLOTS, TARIF_PERIOD_CODES
+from consumption.packing import (
+    index_dict_to_series,
+    minute_str_to_slot,
+    pack_index_series,
+    pack_tarif_periods,
+    pack_values,
+    series_to_index_dict,
+    unpack_index_series,
+    unpack_tarif_period_codes,
+    unpack_tarif_period_series,
+    unpack_tarif_periods,
+    unpack_values,
+)
+from consumption.utils import get_daily_index_structure
+from teleinfo.constants import TarifPeriods
+
+
+@pytest.mark.parametrize(
+    "minute_str, expected",
+    [("00:00", 0), ("00:01", 1), ("12:30", 750), ("23:59", 1439), ("24:00", 1440)],
+)
+def test_minute_str_to_slot(minute_str, expected):
+    assert minute_str_to_slot(minute_str) == expected
+
+
+@pytest.mark.parametrize("invalid_minute", ["24:01", "7:00", "", None])
+def test_minute_str_to_slot_rejects_invalid_minutes(invalid_minute):
+    with pytest.raises(ValueError):
+        minute_str_to_slot(invalid_minute)
+
+
+def test_index_dict_to_series_and_back():
+    time_series = {**get_daily_index_structure(1), "00:00": 10, "24:00": 20}
+
+    series = index_dict_to_series(time_series)
+
+    assert len(series) == DAY_MINUTE_SLOTS
+    assert series[0] == 10
+    assert series[-1] == 20
+    assert series_to_index_dict(series) == time_series
+
+
+def test_index_dict_to_series_ignores_unknown_keys():
+    series = index_dict_to_series({"12:00": 5, "not a minute": 7})
+
+    assert series[720] == 5
+    assert series.count(None) == DAY_MINUTE_SLOTS - 1
+
+
+def test_pack_index_series_round_trip_keeps_gaps_and_regressions():
+    hchc = [None] * DAY_MINUTE_SLOTS
+    hchc[0] = 50_977_332
+    hchc[1] = 50_977_340
+    hchc[10] = 50_977_400
+    hchc[11] = 12  # meter swap: negative delta
+    hchc[1440] = 30
+    hchp = [56_567_645] * DAY_MINUTE_SLOTS
+
+    blob = pack_index_series({"HCHC": hchc, "HCHP": hchp})
+
+    assert unpack_index_series(blob) == {"HCHC": hchc, "HCHP": hchp}
+
+
+def test_pack_index_series_is_much_smaller_than_json():
+    values = {
+        "HCHC": {
+            time_str: 50_977_332 + minute * 3
+            for minute, time_str in enumerate(get_daily_index_structure(1))
+        }
+    }
+
+    blob = pack_values(values)
+
+    assert len(blob) < 2_000
+    assert unpack_values(blob) == values
+
+
+@pytest.mark.parametrize("empty", [{}, {"HCHC": None}, {"HCHC": {}}])
+def test_pack_values_empty_day_is_empty_blob(empty):
+    assert pack_values(empty) == b""
+    assert unpack_values(b"") == {}
+
+
+def test_unpack_index_series_rejects_unknown_version():
+    blob = zlib.compress(bytes([99, 0]))
+
+    with pytest.raises(ValueError):
+        unpack_index_series(blob)
+
+
+def test_unpack_index_series_accepts_memoryview():
+    series = [1] * DAY_MINUTE_SLOTS
+
+    blob = memoryview(pack_index_series({"BASE": series}))
+
+    assert unpack_index_series(blob) == {"BASE": series}
+
+
+def test_pack_tarif_periods_round_trip():
+    tarif_periods = {
+        time_str: TarifPeriods.HC if time_str < "07:00" else TarifPeriods.HP
+        for time_str in get_daily_index_structure(1)
+    }
+    tarif_periods["12:00"] = None
+
+    blob = pack_tarif_periods(tarif_periods)
+
+    assert unpack_tarif_periods(blob) == tarif_periods
+    codes = unpack_tarif_period_codes(blob)
+    assert len(codes) == DAY_MINUTE_SLOTS
+    assert codes[0] == TARIF_PERIOD_CODES[TarifPeriods.HC]
+    assert codes[720] == 0
+
+
+def test_pack_tarif_periods_unknown_period_is_stored_as_none():
+    blob = pack_tarif_periods({"00:00": TarifPeriods.TH, "00:01": "XXXX"})
+
+    series = unpack_tarif_period_series(blob)
+
+    assert series[0] == TarifPeriods.TH
+    assert series[1] is None
+
+
+def test_pack_tarif_periods_empty_day_is_empty_blob():
+    assert pack_tarif_periods(get_daily_index_structure(1)) == b""
+    assert unpack_tarif_periods(b"") == {}
+    assert unpack_tarif_period_series(b"") == []
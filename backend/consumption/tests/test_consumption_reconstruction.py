@@ -0,0 +1,191 @@
+import random
+from copy import deepcopy
+from datetime import date, timedelta
+
+import pytest
+from freezegun import freeze_time
+
+from consumption.models import DailyIndexes
+from consumption.reconstruction import (
+    build_columnar_consumption,
+    build_consumption_data_from_series,
+    compute_bucket_watt_hours,
+    fill_missing_tarif_period_series,
+)
+from consumption.utils import build_consumption_data, get_daily_index_structure
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 6, 1)
+
+# (index label, tarif period) pairs of each tariff family
+TARIFF_FAMILIES = {
+    "TH": [("BASE", TarifPeriods.TH)],
+    "HC_HP": [("HCHC", TarifPeriods.HC), ("HCHP", TarifPeriods.HP)],
+    "EJP": [("EJPHN", TarifPeriods.HN), ("EJPHPM", TarifPeriods.PM)],
+    "TEMPO": [("BBRHCJW", TarifPeriods.HCJW), ("BBRHPJW", TarifPeriods.HPJW)],
+}
+
+
+def make_random_day(
+    rng: random.Random, family: str, day: date = DAY
+) -> tuple[dict, dict]:
+    """
+    Builds a random (values, tarif_periods) day of a tariff family: periods
+    switching on the hour, increasing indexes, random gaps in both.
+    """
+    periods = TARIFF_FAMILIES[family]
+    minute_keys = list(get_daily_index_structure(1))
+
+    hour_periods = [rng.choice(periods) for _ in range(25)]
+    tarif_periods = {
+        time_str: hour_periods[int(time_str[:2])][1] for time_str in minute_keys
+    }
+    values = {label: {} for label, _ in periods}
+    indexes = {label: rng.randint(0, 10_000_000) for label, _ in periods}
+    for time_str in minute_keys:
+        active_label = hour_periods[int(time_str[:2])][0]
+        indexes[active_label] += rng.randint(0, 60)
+        for label, _ in periods:
+            values[label][time_str] = indexes[label]
+
+    # Random gaps, from a minute to a few hours, including at day edges
+    for _ in range(rng.randint(0, 6)):
+        start = rng.randrange(len(minute_keys))
+        length = rng.choice([1, 2, 5, 30, 200])
+        for time_str in minute_keys[start : start + length]:
+            for label in values:
+                values[label][time_str] = None
+            if rng.random() < 0.5:
+                tarif_periods[time_str] = None
+
+    return values, tarif_periods
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("family", list(TARIFF_FAMILIES))
+@pytest.mark.parametrize("step", [1, 30, 60])
+@pytest.mark.parametrize("seed", range(4))
+def test_build_consumption_data_from_series_matches_dict_engine(family, step, seed):
+    rng = random.Random(f"{family}-{step}-{seed}")
+    # A complete reference day for the tarif period reconstruction
+    ref_values, ref_tarif_periods = make_random_day(rng, family)
+    for time_str in ref_tarif_periods:
+        ref_tarif_periods[time_str] = TARIFF_FAMILIES[family][-1][1]
+    DailyIndexes.objects.create(
+        date=DAY - timedelta(days=1),
+        values=ref_values,
+        tarif_periods=ref_tarif_periods,
+    )
+    values, tarif_periods = make_random_day(rng, family)
+    daily_indexes = DailyIndexes.objects.create(
+        date=DAY, values=values, tarif_periods=tarif_periods
+    )
+
+    expected = build_consumption_data(DailyIndexes.objects.get(date=DAY), DAY, step)
+    result = build_consumption_data_from_series(daily_indexes, DAY, step)
+
+    assert result == expected
+    # Same floats, not just approximately equal
+    assert [(entry["euros"], entry["average_watt"]) for entry in result] == [
+        (entry["euros"], entry["average_watt"]) for entry in expected
+    ]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 12:00:00")
+def test_build_consumption_data_from_series_matches_dict_engine_on_today():
+    values, tarif_periods = make_random_day(random.Random(0), "HC_HP")
+    for time_str in tarif_periods:
+        if time_str >= "14:00":
+            tarif_periods[time_str] = None
+            values["HCHC"][time_str] = values["HCHP"][time_str] = None
+
+    # build_consumption_data fills the gaps of the values it's given in place
+    expected = build_consumption_data(
+        DailyIndexes(date=DAY, values=deepcopy(values), tarif_periods=tarif_periods),
+        DAY,
+        1,
+    )
+    result = build_consumption_data_from_series(
+        DailyIndexes(date=DAY, values=values, tarif_periods=tarif_periods), DAY, 1
+    )
+
+    assert result == expected
+
+
+@pytest.mark.django_db
+def test_build_consumption_data_from_series_without_tarif_periods():
+    daily_indexes = DailyIndexes(
+        date=DAY, values={"HCHC": {"00:00": 1, "24:00": 2}}, tarif_periods={}
+    )
+
+    data = build_consumption_data_from_series(daily_indexes, DAY, 60)
+
+    assert len(data) == 24
+    assert all(entry["wh"] is None for entry in data)
+
+
+def test_build_consumption_data_from_series_rejects_invalid_step():
+    with pytest.raises(ValueError):
+        build_consumption_data_from_series(DailyIndexes(date=DAY), DAY, 7)
+
+
+@pytest.mark.parametrize(
+    "series, step, expected",
+    [
+        ([0, 1, 3, 6, 10], 1, [1, 2, 3, 4]),
+        ([0, 1, 3, 6, 10], 2, [3, 7]),
+        ([0, None, 3, 6, None], 1, [None, None, 3, None]),
+    ],
+)
+def test_compute_bucket_watt_hours(series, step, expected):
+    assert compute_bucket_watt_hours(series, step) == expected
+
+
+@freeze_time("2025-06-01 12:00:00")
+def test_fill_missing_tarif_period_series_keeps_today_as_is():
+    series = [TarifPeriods.HC, None]
+    assert fill_missing_tarif_period_series(series, DAY) == series
+
+
+def test_fill_missing_tarif_period_series_fills_th():
+    assert fill_missing_tarif_period_series([TarifPeriods.TH, None], DAY) == [
+        TarifPeriods.TH,
+        TarifPeriods.TH,
+    ]
+
+
+def test_build_columnar_consumption():
+    entries = [
+        {
+            "date": DAY,
+            "start_time": start_time,
+            "end_time": end_time,
+            "wh": wh,
+            "average_watt": wh * 2 if wh is not None else None,
+            "euros": None,
+            "interpolated": interpolated,
+            "tarif_period": tarif_period,
+        }
+        for start_time, end_time, wh, interpolated, tarif_period in [
+            ("00:00", "00:30", 10, False, "Heures Creuses"),
+            ("00:30", "01:00", None, True, None),
+            ("01:00", "01:30", 30, True, "Heures Pleines"),
+            ("01:30", "02:00", 40, False, "Heures Creuses"),
+        ]
+    ]
+
+    assert build_columnar_consumption(entries) == {
+        "start_minutes": [0, 30, 60, 90],
+        "wh": [10, None, 30, 40],
+        "average_watt": [20, None, 60, 80],
+        "euros": [None] * 4,
+        # 0b0110
+        "interpolated": "Bg==",
+        "tarif_period_codes": [0, None, 1, 0],
+        "tarif_periods": ["Heures Creuses", "Heures Pleines"],
+    }
+
+
+def test_build_columnar_consumption_empty_day():
+    assert build_columnar_consumption([])["interpolated"] == ""
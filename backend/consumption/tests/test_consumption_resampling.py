@@ -0,0 +1,117 @@
+import random
+from datetime import date
+
+import pytest
+
+from consumption.models import DailyIndexes
+from consumption.reconstruction import build_consumption_data_from_series
+from consumption.resampling import compute_minute_consumption, resample_consumption
+from consumption.utils import compute_totals_for_a_day, get_daily_index_structure
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 6, 1)
+
+
+def make_hc_hp_day(rng: random.Random) -> DailyIndexes:
+    """A gap-free HC/HP day, HC before 06:00, the active index increasing."""
+    minute_keys = list(get_daily_index_structure(1))
+    tarif_periods = {
+        time_str: TarifPeriods.HC if time_str < "06:00" else TarifPeriods.HP
+        for time_str in minute_keys
+    }
+    values = {"HCHC": {}, "HCHP": {}}
+    indexes = {"HCHC": 1_000_000, "HCHP": 2_000_000}
+    for time_str in minute_keys:
+        for label in values:
+            values[label][time_str] = indexes[label]
+        # Consumption of the minute starting at time_str
+        indexes["HCHC" if time_str < "06:00" else "HCHP"] += rng.randint(0, 60)
+    return DailyIndexes(date=DAY, values=values, tarif_periods=tarif_periods)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("step", [5, 15, 30, 60])
+def test_resample_consumption_matches_reconstruction_on_full_day(step):
+    daily_indexes = make_hc_hp_day(random.Random(step))
+
+    resampled = resample_consumption(daily_indexes, DAY, step)
+    reconstructed = build_consumption_data_from_series(daily_indexes, DAY, step)
+
+    assert len(resampled) == 1440 // step
+    for bucket, entry in zip(resampled, reconstructed):
+        assert (bucket["start_time"], bucket["end_time"]) == (
+            entry["start_time"],
+            entry["end_time"],
+        )
+        assert bucket["wh"] == entry["wh"]
+        assert bucket["average_watt"] == pytest.approx(entry["average_watt"])
+        assert bucket["euros"] == pytest.approx(entry["euros"])
+        assert bucket["tarif_period"] == entry["tarif_period"]
+
+
+@pytest.mark.django_db
+def test_resample_consumption_totals_match_daily_totals():
+    daily_indexes = make_hc_hp_day(random.Random(0))
+    totals = compute_totals_for_a_day(DAY, daily_indexes.values)
+
+    resampled = resample_consumption(daily_indexes, DAY, 15)
+
+    assert sum(bucket["wh"] for bucket in resampled) == totals["Total"]["wh"]
+    assert sum(bucket["euros"] for bucket in resampled) == pytest.approx(
+        totals["Total"]["euros"]
+    )
+
+
+@pytest.mark.django_db
+def test_resample_consumption_peak_dominant_period_and_gaps():
+    hchc = get_daily_index_structure(1)
+    hchp = get_daily_index_structure(1)
+    tarif_periods = get_daily_index_structure(1)
+    for slot, time_str in enumerate(hchc):
+        # HC until 00:10, then HP
+        tarif_periods[time_str] = TarifPeriods.HC if slot < 10 else TarifPeriods.HP
+        hchc[time_str] = 1000 + min(slot, 10) * 10
+        hchp[time_str] = 5000 + max(slot - 10, 0) * 20
+    # A 50 Wh minute at 00:12
+    for time_str in list(hchp)[13:]:
+        hchp[time_str] += 30
+    # Unknown indexes from 23:40 on
+    for time_str in list(hchc)[1420:]:
+        hchc[time_str] = hchp[time_str] = None
+    daily_indexes = DailyIndexes(
+        date=DAY, values={"HCHC": hchc, "HCHP": hchp}, tarif_periods=tarif_periods
+    )
+
+    resampled = resample_consumption(daily_indexes, DAY, 15)
+
+    first = resampled[0]
+    assert first["wh"] == 10 * 10 + 5 * 20 + 30
+    assert first["peak_watt"] == 50 * 60
+    assert first["tarif_period"] == "Heures Creuses"
+    assert first["interpolated_minutes"] == 0
+    last = resampled[-1]
+    assert last["wh"] is None
+    assert last["average_watt"] is None
+    assert last["peak_watt"] is None
+    assert last["euros"] is None
+    # Known minutes only: 23:30 to 23:38
+    assert resampled[-2]["wh"] == 9 * 20
+    assert resampled[-2]["average_watt"] == 20 * 60
+
+
+@pytest.mark.django_db
+def test_compute_minute_consumption_flags_interpolated_minutes():
+    hchc = {**get_daily_index_structure(1), "00:00": 0, "00:03": 30, "24:00": 30}
+
+    watt_hours, euros, interpolated = compute_minute_consumption(
+        DailyIndexes(date=DAY, values={"HCHC": hchc}), DAY
+    )
+
+    assert watt_hours[:4] == [10, 10, 10, 0]
+    assert interpolated[:4] == [False, True, True, False]
+    assert euros[0] > 0
+
+
+def test_resample_consumption_rejects_invalid_step():
+    with pytest.raises(ValueError):
+        resample_consumption(DailyIndexes(date=DAY), DAY, 7)
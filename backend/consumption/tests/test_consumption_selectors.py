@@ -2,8 +2,10 @@ from datetime import date
 
 import pytest
 
-from consumption.models import DailyIndexes
-from consumption.selectors import get_daily_indexes
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.selectors import get_daily_indexes, get_day_indexes, iter_day_indexes
+from consumption.utils import get_daily_index_structure
+from teleinfo.constants import TarifPeriods
 
 
 @pytest.mark.django_db
@@ -25,3 +27,89 @@ def test_get_daily_indexes_returns_empty_list_when_nothing_matches():
     result = get_daily_indexes(date(2025, 7, 1), date(2025, 7, 2))
 
     assert result == []
+
+
+@pytest.mark.django_db
+def test_get_day_indexes_returns_none_when_nothing_recorded():
+    assert get_day_indexes(date(2025, 6, 1)) is None
+
+
+@pytest.mark.django_db
+def test_get_day_indexes_returns_compacted_row_without_samples():
+    daily_indexes = DailyIndexes.objects.create(date=date(2025, 6, 1))
+
+    assert get_day_indexes(date(2025, 6, 1)) == daily_indexes
+
+
+@pytest.mark.django_db
+def test_get_day_indexes_merges_compacted_row_with_samples_tail():
+    hchc = {**get_daily_index_structure(1), "00:00": 1000}
+    DailyIndexes.objects.create(
+        date=date(2025, 6, 1),
+        values={"HCHC": hchc},
+        tarif_periods={**get_daily_index_structure(1), "00:00": TarifPeriods.HC},
+    )
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 1), minute=1, label="HCHC", index=1005, tarif_period_code=2
+    )
+
+    result = get_day_indexes(date(2025, 6, 1))
+
+    assert result.values["HCHC"]["00:00"] == 1000
+    assert result.values["HCHC"]["00:01"] == 1005
+    assert result.tarif_periods["00:01"] == TarifPeriods.HC
+    # Nothing written back
+    stored = DailyIndexes.objects.get(date=date(2025, 6, 1))
+    assert stored.values["HCHC"]["00:01"] is None
+
+
+@pytest.mark.django_db
+def test_get_day_indexes_from_samples_only():
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 1), minute=600, label="BASE", index=42, tarif_period_code=1
+    )
+
+    result = get_day_indexes(date(2025, 6, 1))
+
+    assert result.pk is None
+    assert result.values["BASE"]["10:00"] == 42
+    assert result.tarif_periods["10:00"] == TarifPeriods.TH
+
+
+@pytest.mark.django_db
+def test_iter_day_indexes_merges_samples_in_date_order():
+    DailyIndexes.objects.create(date=date(2025, 5, 31))
+    DailyIndexes.objects.create(date=date(2025, 6, 2))
+    DailyIndexes.objects.create(date=date(2025, 6, 4))
+    # Sample-only days before, between and after the rows
+    for day in (date(2025, 6, 1), date(2025, 6, 3), date(2025, 6, 5)):
+        MinuteIndexSample.objects.create(date=day, minute=0, label="HCHC", index=1000)
+    # Tail of a compacted day
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 2), minute=0, label="HCHC", index=900
+    )
+
+    result = list(iter_day_indexes(date(2025, 6, 1), date(2025, 6, 5)))
+
+    assert [daily_indexes.date for daily_indexes in result] == [
+        date(2025, 6, 1),
+        date(2025, 6, 2),
+        date(2025, 6, 3),
+        date(2025, 6, 4),
+        date(2025, 6, 5),
+    ]
+    assert result[1].values["HCHC"]["00:00"] == 900
+    assert result[3].values == {}
+
+
+@pytest.mark.django_db
+def test_iter_day_indexes_without_bounds():
+    DailyIndexes.objects.create(date=date(2025, 6, 2))
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 1), minute=0, label="HCHC", index=1000
+    )
+
+    assert [daily_indexes.date for daily_indexes in iter_day_indexes()] == [
+        date(2025, 6, 1),
+        date(2025, 6, 2),
+    ]
@@ -0,0 +1,159 @@
+from datetime import date, timedelta
+
+import pytest
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from consumption.models import DailyBaseLoad, DailyIndexes, MinuteIndexSample
+from consumption.mutators import compact_minute_samples
+from consumption.services.base_load import (
+    compute_base_load,
+    detect_step_changes,
+    refresh_step_changes,
+    save_day_base_load,
+)
+from consumption.utils import get_daily_index_structure
+
+DAY = date(2025, 6, 1)
+
+
+def make_day(day: date = DAY, night_wh: int = 2, day_wh: int = 10) -> DailyIndexes:
+    """
+    HC/HP day consuming `night_wh` Wh per minute on HC before 06:00, then
+    `day_wh` Wh per minute on HP.
+    """
+    hchc = get_daily_index_structure(1)
+    hchp = get_daily_index_structure(1)
+    indexes = {"HCHC": 1000, "HCHP": 5000}
+    for slot, time_str in enumerate(hchc):
+        hchc[time_str] = indexes["HCHC"]
+        hchp[time_str] = indexes["HCHP"]
+        if slot < 360:
+            indexes["HCHC"] += night_wh
+        else:
+            indexes["HCHP"] += day_wh
+    return DailyIndexes(date=day, values={"HCHC": hchc, "HCHP": hchp})
+
+
+@pytest.mark.django_db
+def test_base_load_is_a_low_percentile_of_the_labels_combined():
+    # 6 h at 120 W, 18 h at 600 W: the lowest 10 % are all at 120 W
+    assert compute_base_load(make_day()) == (120.0, 1440)
+    # 1 h at 60 W (night_wh=1 until 01:00) is below the 10th percentile
+    daily_indexes = make_day(night_wh=10)
+    for slot, time_str in enumerate(daily_indexes.values["HCHC"]):
+        daily_indexes.values["HCHC"][time_str] = (
+            1000 + min(slot, 60) + max(min(slot, 360) - 60, 0) * 10
+        )
+    assert compute_base_load(daily_indexes) == (600.0, 1440)
+
+
+@pytest.mark.django_db
+def test_base_load_leaves_interpolated_minutes_out():
+    # The meter was unreachable for 5 h at night, an interpolated 0 W
+    # stretch would otherwise become the base load
+    daily_indexes = make_day(night_wh=0, day_wh=10)
+    for time_str in list(daily_indexes.values["HCHC"])[:200]:
+        daily_indexes.values["HCHC"][time_str] = None
+    for time_str in list(daily_indexes.values["HCHP"])[400:700]:
+        daily_indexes.values["HCHP"][time_str] = None
+
+    assert compute_base_load(daily_indexes) == (0.0, 1440 - 200 - 301)
+    # Without the night, every measured minute is at 600 W
+    for time_str in list(daily_indexes.values["HCHC"])[:360]:
+        daily_indexes.values["HCHC"][time_str] = None
+    assert compute_base_load(daily_indexes) == (600.0, 1440 - 360 - 301)
+
+
+@pytest.mark.django_db
+def test_base_load_needs_enough_measured_minutes():
+    daily_indexes = make_day()
+    for time_str in list(daily_indexes.values["HCHP"])[300:]:
+        daily_indexes.values["HCHP"][time_str] = None
+
+    assert compute_base_load(daily_indexes) == (None, 299)
+    assert compute_base_load(DailyIndexes(date=DAY)) == (None, 0)
+
+
+def series(*levels: tuple[int, float | None]) -> list[tuple[date, float | None]]:
+    """Consecutive (date, base load) pairs, `count` days at each level."""
+    watts = [watt for count, watt in levels for _ in range(count)]
+    return [(DAY + timedelta(days=offset), watt) for offset, watt in enumerate(watts)]
+
+
+@pytest.mark.parametrize(
+    "base_loads, expected_offsets",
+    [
+        # A new appliance left on from the 21st day
+        (series((20, 100), (5, 180)), [20]),
+        # Then switched off again
+        (series((20, 100), (30, 180), (5, 100)), [20, 50]),
+        # A few days off aren't a step change
+        (series((20, 100), (2, 40), (10, 100)), []),
+        # Not confirmed yet
+        (series((20, 100), (2, 180)), []),
+        # Below BASE_LOAD_STEP_MIN_WATT / BASE_LOAD_STEP_MIN_RATIO
+        (series((20, 100), (10, 115)), []),
+        (series((20, 400), (10, 450)), []),
+        # Days without a base load are skipped
+        (series((20, 100), (3, None), (1, 180), (1, None), (2, 180)), [23]),
+        # Not enough history
+        (series((10, 100), (10, 200)), []),
+    ],
+)
+def test_detect_step_changes(base_loads, expected_offsets):
+    assert detect_step_changes(base_loads) == {
+        DAY + timedelta(days=offset) for offset in expected_offsets
+    }
+
+
+@pytest.mark.django_db
+def test_refresh_step_changes_updates_the_stored_flags():
+    for day, watt in series((20, 100), (5, 180)):
+        DailyBaseLoad.objects.create(date=day, base_load_watt=watt, step_change=True)
+
+    assert refresh_step_changes() == 1
+
+    assert list(
+        DailyBaseLoad.objects.filter(step_change=True).values_list("date", flat=True)
+    ) == [DAY + timedelta(days=20)]
+
+
+@pytest.mark.django_db
+def test_save_day_base_load_keeps_the_step_change_flag():
+    DailyBaseLoad.objects.create(date=DAY, base_load_watt=50, step_change=True)
+
+    daily_base_load = save_day_base_load(make_day())
+
+    daily_base_load.refresh_from_db()
+    assert daily_base_load.base_load_watt == 120
+    assert daily_base_load.measured_minutes == 1440
+    assert daily_base_load.step_change
+
+
+@pytest.mark.django_db
+def test_compacted_days_get_their_base_load():
+    for minute in range(400):
+        MinuteIndexSample.objects.create(
+            date=DAY, minute=minute, label="BASE", index=1000 + 3 * minute
+        )
+
+    with freeze_time("2025-06-02 10:00:00"):
+        compact_minute_samples()
+
+    daily_base_load = DailyBaseLoad.objects.get(date=DAY)
+    assert daily_base_load.base_load_watt == 180
+    assert daily_base_load.measured_minutes == 399
+
+
+@pytest.mark.django_db
+def test_backfill_base_load_command():
+    for offset in range(25):
+        make_day(DAY + timedelta(days=offset), night_wh=2 if offset < 20 else 4).save()
+
+    call_command("backfill_base_load", "--start", "2025-06-01")
+
+    assert DailyBaseLoad.objects.count() == 25
+    assert list(
+        DailyBaseLoad.objects.filter(step_change=True).values_list("date", flat=True)
+    ) == [DAY + timedelta(days=20)]
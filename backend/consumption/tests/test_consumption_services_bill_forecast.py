@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from django.utils import timezone
+from freezegun import freeze_time
+
+from consumption.edf_pricing import get_price_timeline
+from consumption.models import (
+    DailyConsumption,
+    DailyIndexes,
+    HourlyConsumption,
+    PricingPeriod,
+    SubscriptionPrice,
+)
+from consumption.packing import series_to_index_dict
+from consumption.services.bill_forecast import (
+    build_bill_forecast,
+    compute_weekday_profiles,
+    project_remaining_watt_hours,
+)
+from teleinfo.constants import TarifPeriods
+
+# A Monday
+TODAY = date(2025, 6, 16)
+
+
+def create_rollups(day: date, hours: range = range(24), wh: int = 100) -> None:
+    """`wh` Wh of HP every hour of `hours`, the daily rollup matching."""
+    HourlyConsumption.objects.bulk_create(
+        HourlyConsumption(date=day, hour=hour, tarif_period="HP..", wh=wh)
+        for hour in hours
+    )
+    DailyConsumption.objects.create(
+        date=day,
+        tarif_period="HP..",
+        wh=wh * len(hours),
+        euros=wh * len(hours) / 1000 * get_price_timeline().get_kwh_price(day, "HP.."),
+    )
+
+
+@pytest.mark.django_db
+def test_compute_weekday_profiles_averages_same_weekdays():
+    create_rollups(TODAY - timedelta(weeks=1), range(2), wh=100)
+    create_rollups(TODAY - timedelta(weeks=2), range(1), wh=300)
+    create_rollups(TODAY - timedelta(days=1), range(1), wh=50)
+    # Out of the window
+    create_rollups(TODAY - timedelta(weeks=9))
+    create_rollups(TODAY)
+
+    profiles, profile_days = compute_weekday_profiles(TODAY)
+
+    assert profiles == {0: {0: {"HP..": 200}, 1: {"HP..": 50}}, 6: {0: {"HP..": 50}}}
+    assert profile_days == 3
+
+
+def test_project_remaining_watt_hours_prorates_the_current_hour():
+    profiles = {0: {9: {"HP..": 60}, 10: {"HP..": 60}, 11: {"HC..": 30}}}
+    now = datetime(2025, 6, 16, 10, 15)
+
+    projection = project_remaining_watt_hours(profiles, now, date(2025, 6, 23))
+
+    assert projection[TODAY] == {"HP..": 45, "HC..": 30}
+    # No profile for the other weekdays
+    assert projection[date(2025, 6, 17)] == {}
+    assert projection[date(2025, 6, 23)] == {"HP..": 120, "HC..": 30}
+    assert len(projection) == 8
+
+
+@pytest.mark.django_db
+# 12:00 in Paris
+@freeze_time("2025-06-16 10:00:00")
+def test_build_bill_forecast():
+    for days_ago in range(1, 8 * 7 + 1):
+        create_rollups(TODAY - timedelta(days=days_ago))
+    create_rollups(TODAY, range(12))
+    SubscriptionPrice.objects.create(
+        pricing_period=PricingPeriod.objects.get(start_date=date(2025, 2, 1)),
+        tarif_period_type="HC_HP",
+        subscribed_power=6,
+        euros_per_month="15.50",
+    )
+    DailyIndexes.objects.create(
+        date=TODAY - timedelta(days=1),
+        values={},
+        tarif_periods=series_to_index_dict([TarifPeriods.HP] * 1441),
+        subscribed_power=6,
+    )
+    timeline = get_price_timeline()
+    hp_price = timeline.get_kwh_price(TODAY, "HP..")
+    daily_subscription = timeline.get_daily_subscription_cost(TODAY, "HC_HP", 6)
+
+    forecast = build_bill_forecast(timezone.localtime())
+
+    assert forecast["month"] == date(2025, 6, 1)
+    assert forecast["profile_days"] == 56
+    month_to_date = forecast["month_to_date"]
+    assert month_to_date["wh"] == 15 * 2400 + 1200
+    assert month_to_date["tarif_periods"]["Heures Pleines"]["wh"] == 37200
+    assert month_to_date["euros"] == pytest.approx(37.2 * hp_price)
+    assert month_to_date["subscription_euros"] == pytest.approx(daily_subscription)
+    # The rest of today, then 14 full days
+    assert forecast["forecast"]["wh"] == 30 * 2400
+    assert forecast["forecast"]["euros"] == pytest.approx(72 * hp_price)
+    assert forecast["forecast"]["subscription_euros"] == pytest.approx(
+        16 * daily_subscription
+    )
+    assert forecast["forecast"]["bill_euros"] == pytest.approx(
+        72 * hp_price + 16 * daily_subscription
+    )
@@ -0,0 +1,217 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from freezegun import freeze_time
+
+from consumption.constants import MINUTES_PER_DAY, EnedisCsvKind
+from consumption.models import DailyConsumption, DailyIndexes, HourlyConsumption
+from consumption.services.enedis_import import import_enedis_csv
+from consumption.services.retention import get_served_step
+from consumption.services.tariff_simulator import parse_hc_schedule
+from consumption.utils import get_daily_index_structure, interpolate_index_series
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 1, 1)
+PREAMBLE = [
+    "Identifiant PRM;Type de donnees;Date de debut;Date de fin;Grandeur physique",
+    "12345678901234;Courbe de charge;01/01/2025;03/01/2025;Energie active",
+]
+
+
+def load_curve_lines(day: date, watts: list[int | None], step: int = 30) -> list[str]:
+    """Enedis load curve export, one `step`-min reading per value from `day`."""
+    start = datetime(day.year, day.month, day.day)
+    lines = [*PREAMBLE, "Horodate;Valeur"]
+    for position, watt in enumerate(watts, start=1):
+        moment = start + timedelta(minutes=step * position)
+        lines.append(f"{moment.isoformat()}+01:00;{'' if watt is None else watt}")
+    return [f"{line}\r\n" for line in lines]
+
+
+def get_day_series(day: date) -> dict[str, list[int | None]]:
+    return DailyIndexes.objects.get(date=day).get_index_series()
+
+
+@pytest.mark.django_db
+@freeze_time("2025-02-01")
+def test_import_load_curve_writes_indexes_at_the_reading_times():
+    # The last index recorded before the import is carried on
+    base = get_daily_index_structure(1)
+    base["23:59"] = 5000
+    DailyIndexes.objects.create(date=DAY - timedelta(days=1), values={"BASE": base})
+
+    counts = import_enedis_csv(
+        load_curve_lines(DAY, [600] * 48), EnedisCsvKind.LOAD_CURVE
+    )
+
+    assert counts == {"created": 1, "updated": 0, "skipped": 0}
+    series = get_day_series(DAY)["BASE"]
+    assert [slot for slot, index in enumerate(series) if index is not None] == list(
+        range(0, 1441, 30)
+    )
+    assert (series[0], series[30], series[1440]) == (5000, 5300, 5000 + 48 * 300)
+    # The minutes in between are reconstructed, flagged as interpolated
+    filled, interpolated = interpolate_index_series(series)
+    assert filled[15] == 5150
+    assert sum(interpolated) == 1440 - 48
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.tarif_period_type == "TH"
+    assert daily_indexes.tarif_periods_complete
+    assert daily_indexes.resolution == 30
+    daily_consumption = DailyConsumption.objects.get(date=DAY)
+    assert (daily_consumption.tarif_period, daily_consumption.wh) == (
+        TarifPeriods.TH,
+        14400,
+    )
+    assert daily_consumption.interpolated_minutes == 1440 - 48
+
+
+@pytest.mark.django_db
+@freeze_time("2025-02-01")
+@pytest.mark.parametrize("step, resolution", [(10, 10), (60, 60), (7, 1)])
+def test_import_load_curve_days_get_the_interval_of_their_readings(step, resolution):
+    import_enedis_csv(
+        load_curve_lines(DAY, [600] * (2 * MINUTES_PER_DAY // step), step),
+        EnedisCsvKind.LOAD_CURVE,
+    )
+
+    # The start point of the first reading, at the default step, doesn't count
+    assert list(
+        DailyIndexes.objects.order_by("date").values_list("date", "resolution")
+    ) == [(DAY, resolution), (DAY + timedelta(days=1), resolution)]
+    if resolution > 1:
+        # Served at the step of the export, every reading on the grid
+        assert get_served_step(step, resolution) == step
+        series = get_day_series(DAY + timedelta(days=1))["BASE"]
+        assert [slot for slot, index in enumerate(series) if index is not None] == (
+            list(range(0, MINUTES_PER_DAY + 1, step))
+        )
+
+
+@pytest.mark.django_db
+@freeze_time("2025-02-01")
+def test_import_load_curve_splits_hc_hp_along_the_schedule():
+    import_enedis_csv(
+        load_curve_lines(DAY, [600] * 96),
+        EnedisCsvKind.LOAD_CURVE,
+        parse_hc_schedule("22:00-06:00"),
+        batch_size=1,
+    )
+
+    assert DailyIndexes.objects.count() == 2
+    series = get_day_series(DAY)
+    assert (series["HCHC"][1440], series["HCHP"][1440]) == (16 * 300, 32 * 300)
+    assert series["HCHC"][360] == series["HCHC"][1320] == 12 * 300
+    assert get_day_series(DAY + timedelta(days=1))["HCHP"][0] == 32 * 300
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.tarif_period_type == "HC_HP"
+    assert daily_indexes.get_tarif_period_series()[359:361] == [
+        TarifPeriods.HC,
+        TarifPeriods.HP,
+    ]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-02-01")
+def test_import_load_curve_keeps_gaps_flat():
+    # Readings missing from 02:30 to 03:30, then an empty one at 05:30
+    watts = [600] * 4 + [None] * 3 + [1200] * 3 + [None] + [600] * 37
+
+    import_enedis_csv(load_curve_lines(DAY, watts), EnedisCsvKind.LOAD_CURVE)
+
+    series = get_day_series(DAY)["BASE"]
+    # Nothing is known of the gap, the 04:00 reading only covers 03:30-04:00
+    assert series[120] == series[210] == 1200
+    assert series[150] is None
+    assert series[240] == 1800
+    # The 06:00 reading covers the hour since the 05:00 one
+    assert (series[300], series[330], series[360]) == (3000, None, 3600)
+    assert series[1440] == 3600 + 36 * 300
+
+
+@pytest.mark.django_db
+@freeze_time("2025-02-01")
+def test_import_daily_indexes():
+    lines = [
+        "Horodate;EAS F1;EAS F2",
+        "2025-01-01T00:00:00+01:00;10000;20000",
+        "2025-01-02T00:00:00+01:00;13000;26000",
+        "2025-01-03T00:00:00+01:00;;",
+        "2025-01-04T00:00:00+01:00;15000;31000",
+    ]
+
+    counts = import_enedis_csv(
+        lines, EnedisCsvKind.DAILY_INDEXES, parse_hc_schedule("22:00-06:00")
+    )
+
+    assert counts["created"] == 1
+    series = get_day_series(DAY)
+    assert (series["HCHC"][0], series["HCHC"][1440]) == (10000, 13000)
+    assert (series["HCHP"][0], series["HCHP"][1440]) == (20000, 26000)
+    assert sum(index is not None for index in series["HCHC"]) == 2
+    assert DailyIndexes.objects.get(date=DAY).resolution == 1440
+    assert not HourlyConsumption.objects.exists()
+    # The empty reading leaves January 2nd and 3rd without two readings
+    assert not DailyIndexes.objects.filter(date__gt=DAY).exists()
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-02 12:00:00")
+def test_import_skips_recorded_days_unless_overwritten():
+    base = get_daily_index_structure(1)
+    base["00:00"], base["12:00"] = 1, 2
+    DailyIndexes.objects.create(date=DAY, values={"BASE": base}, subscribed_power=6)
+    lines = load_curve_lines(DAY, [600] * 96)
+
+    # January 2nd is today, recorded by the teleinfo
+    assert import_enedis_csv(lines, EnedisCsvKind.LOAD_CURVE) == {
+        "created": 0,
+        "updated": 0,
+        "skipped": 2,
+    }
+    assert get_day_series(DAY)["BASE"][720] == 2
+
+    counts = import_enedis_csv(lines, EnedisCsvKind.LOAD_CURVE, overwrite=True)
+
+    assert counts == {"created": 0, "updated": 1, "skipped": 1}
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.get_index_series()["BASE"][1440] == 14400
+    assert daily_indexes.subscribed_power == 6
+    assert daily_indexes.tarif_period_type == "TH"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "lines, error",
+    [
+        (["Date;Valeur", "2025-01-01T00:30:00+01:00;600"], "header"),
+        (["Horodate;Valeur", "2025-01-01T00:30:00+01:00;abc"], "line 2"),
+        (
+            [
+                "Horodate;Valeur",
+                "2025-01-01T01:00:00+01:00;600",
+                "2025-01-01T00:30:00+01:00;600",
+            ],
+            "chronological",
+        ),
+    ],
+)
+def test_import_rejects_malformed_exports(lines, error):
+    with pytest.raises(ValueError, match=error):
+        import_enedis_csv(lines, EnedisCsvKind.LOAD_CURVE)
+
+
+@pytest.mark.django_db
+@freeze_time("2025-02-01")
+def test_import_enedis_csv_command(tmp_path):
+    path = tmp_path / "enedis.csv"
+    path.write_text("".join(load_curve_lines(DAY, [600] * 48)), encoding="utf-8-sig")
+
+    call_command("import_enedis_csv", str(path), "--hc-schedule", "22:00-06:00")
+
+    assert set(get_day_series(DAY)) == {"HCHC", "HCHP"}
+    with pytest.raises(CommandError):
+        call_command("import_enedis_csv", str(path), "--hc-schedule", "22:15-06:00")
+    with pytest.raises(CommandError):
+        call_command("import_enedis_csv", str(tmp_path / "missing.csv"))
@@ -0,0 +1,96 @@
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from consumption.models import DailyIndexes
+from consumption.services.export import (
+    iter_consumption_rows,
+    iter_csv_lines,
+    iter_ndjson_lines,
+)
+from consumption.utils import get_daily_index_structure
+from teleinfo.constants import TarifPeriods
+
+ROW = {
+    "date": date(2025, 6, 1),
+    "start_time": "00:00",
+    "end_time": "00:01",
+    "wh": None,
+    "average_watt": None,
+    "euros": None,
+    "interpolated": False,
+    "tarif_period": "Heures Creuses",
+}
+
+
+def create_hc_day(day: date) -> DailyIndexes:
+    values = {**get_daily_index_structure(1), "00:00": 1000, "24:00": 2440}
+    tarif_periods = dict.fromkeys(get_daily_index_structure(1), TarifPeriods.HC)
+    return DailyIndexes.objects.create(
+        date=day, values={"HCHC": values}, tarif_periods=tarif_periods
+    )
+
+
+def test_iter_csv_lines():
+    assert list(iter_csv_lines([ROW])) == [
+        "date,start_time,end_time,wh,average_watt,euros,interpolated,tarif_period\r\n",
+        "2025-06-01,00:00,00:01,,,,False,Heures Creuses\r\n",
+    ]
+
+
+def test_iter_ndjson_lines():
+    assert list(iter_ndjson_lines([ROW])) == [
+        '{"date": "2025-06-01", "start_time": "00:00", "end_time": "00:01", '
+        '"wh": null, "average_watt": null, "euros": null, "interpolated": false, '
+        '"tarif_period": "Heures Creuses"}\n'
+    ]
+
+
+@pytest.mark.django_db
+def test_iter_consumption_rows_is_lazy():
+    create_hc_day(date(2025, 6, 1))
+
+    rows = iter_consumption_rows(date(2025, 6, 1), date(2025, 6, 1), 60)
+    create_hc_day(date(2025, 6, 2))  # Nothing is queried before iterating
+
+    assert len(list(rows)) == 24
+
+
+@pytest.mark.django_db
+def test_iter_consumption_rows_spans_days():
+    for day in (date(2025, 6, 1), date(2025, 6, 2), date(2025, 6, 3)):
+        create_hc_day(day)
+
+    rows = list(iter_consumption_rows(date(2025, 6, 2), date(2025, 6, 3), 30))
+
+    assert len(rows) == 2 * 48
+    assert rows[0]["date"] == date(2025, 6, 2)
+    assert rows[-1]["date"] == date(2025, 6, 3)
+    assert sum(row["wh"] for row in rows) == 2 * 1440
+
+
+@pytest.mark.django_db
+def test_export_consumption_command(tmp_path):
+    create_hc_day(date(2025, 6, 1))
+
+    stdout = StringIO()
+    call_command(
+        "export_consumption",
+        "--start=2025-06-01",
+        "--end=2025-06-01",
+        "--step=60",
+        stdout=stdout,
+    )
+    assert len(stdout.getvalue().splitlines()) == 1 + 24
+
+    output = tmp_path / "export.ndjson"
+    call_command(
+        "export_consumption",
+        "--start=2025-06-01",
+        "--end=2025-06-01",
+        "--format=ndjson",
+        f"--output={output}",
+    )
+    assert len(output.read_text().splitlines()) == 1440
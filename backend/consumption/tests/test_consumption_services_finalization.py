@@ -0,0 +1,176 @@
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from consumption.constants import FINALIZATION_VERSION
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.mutators import compact_minute_samples
+from consumption.packing import (
+    pack_flag_series,
+    series_to_index_dict,
+    unpack_flag_series,
+)
+from consumption.reconstruction import (
+    build_consumption_data_from_series,
+    compute_day_totals,
+    compute_reconstructed_day,
+    reconstruct_day,
+)
+from consumption.services.finalization import (
+    FINALIZED_FIELDS,
+    finalize_closed_days,
+    finalize_day,
+)
+from consumption.utils import compute_totals_for_a_day
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 3, 10)
+
+
+def create_day(day: date = DAY) -> DailyIndexes:
+    """HC/HP day with a few gaps, tarif periods missing in the evening."""
+    hchc = [10_000 + 5 * slot for slot in range(1441)]
+    hchp = [20_000 + 3 * slot for slot in range(1441)]
+    hchc[100:160] = [None] * 60
+    hchp[900:905] = [None] * 5
+    tarif_periods = [TarifPeriods.HC] * 360 + [TarifPeriods.HP] * 1000 + [None] * 81
+    return DailyIndexes.objects.create(
+        date=day,
+        values={
+            "HCHC": series_to_index_dict(hchc),
+            "HCHP": series_to_index_dict(hchp),
+        },
+        tarif_periods=series_to_index_dict(tarif_periods),
+    )
+
+
+def test_pack_flag_series_round_trip():
+    flags = {"BASE": [slot % 7 == 0 for slot in range(1441)], "HCHC": [False] * 1441}
+
+    assert unpack_flag_series(pack_flag_series(flags)) == flags
+    assert pack_flag_series({}) == b""
+    assert unpack_flag_series(b"") == {}
+
+
+@pytest.mark.django_db
+def test_finalized_day_reads_the_frozen_reconstruction(mocker):
+    create_day()
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    expected_entries = build_consumption_data_from_series(daily_indexes, DAY, 30)
+    expected_totals = compute_totals_for_a_day(DAY, daily_indexes.values)
+    expected = compute_reconstructed_day(DailyIndexes.objects.get(date=DAY), DAY)
+
+    with freeze_time("2025-03-11"):
+        assert finalize_closed_days() == 1
+
+    interpolate_spy = mocker.patch(
+        "consumption.reconstruction.interpolate_index_series"
+    )
+    fill_spy = mocker.patch(
+        "consumption.reconstruction.fill_missing_tarif_period_series"
+    )
+
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.is_finalized()
+    assert reconstruct_day(daily_indexes, DAY) == expected
+    assert build_consumption_data_from_series(daily_indexes, DAY, 30) == (
+        expected_entries
+    )
+    assert compute_day_totals(daily_indexes, DAY) == expected_totals
+    interpolate_spy.assert_not_called()
+    fill_spy.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_the_finalization():
+    create_day()
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    finalize_day(daily_indexes)
+    DailyIndexes.objects.bulk_update([daily_indexes], FINALIZED_FIELDS)
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.is_finalized()
+
+    # Any save() unfinalizes the row
+    daily_indexes.save()
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.finalized_version is None
+    assert not daily_indexes.is_finalized()
+
+    # A write behind its back is caught by the fingerprint
+    finalize_day(daily_indexes)
+    DailyIndexes.objects.bulk_update([daily_indexes], FINALIZED_FIELDS)
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    daily_indexes.index_repairs = [
+        {
+            "label": "HCHC",
+            "kind": "jump",
+            "minute": 720,
+            "dropped_minutes": 0,
+            "offset": -5,
+        }
+    ]
+    assert not daily_indexes.is_finalized()
+    assert reconstruct_day(daily_indexes, DAY) == compute_reconstructed_day(
+        daily_indexes, DAY
+    )
+
+    # As is any in-memory edit of the decoded values
+    daily_indexes.index_repairs = []
+    assert daily_indexes.is_finalized()
+    daily_indexes.values["HCHC"]["12:00"] = 0
+    assert not daily_indexes.is_finalized()
+
+
+@pytest.mark.django_db
+def test_finalize_closed_days_skips_open_days():
+    create_day()
+    create_day(date(2025, 3, 11))
+    create_day(date(2025, 3, 12))
+    MinuteIndexSample.objects.create(
+        date=date(2025, 3, 11), minute=0, label="HCHC", index=1
+    )
+
+    with freeze_time("2025-03-12 12:00:00"):
+        assert finalize_closed_days() == 1
+        # Already finalized by the current version
+        assert finalize_closed_days() == 0
+        assert finalize_closed_days(recheck=True) == 0
+        DailyIndexes.objects.filter(date=DAY).update(packed_tarif_periods=b"")
+        assert finalize_closed_days() == 0
+        assert finalize_closed_days(recheck=True) == 1
+
+    finalized_versions = dict(
+        DailyIndexes.objects.values_list("date", "finalized_version")
+    )
+    assert finalized_versions == {
+        DAY: FINALIZATION_VERSION,
+        date(2025, 3, 11): None,
+        date(2025, 3, 12): None,
+    }
+
+
+@pytest.mark.django_db
+def test_compaction_finalizes_the_closed_day():
+    for minute in range(5):
+        MinuteIndexSample.objects.create(
+            date=DAY, minute=minute, label="BASE", index=1000 + 10 * minute
+        )
+
+    with freeze_time("2025-03-11 00:05:00"):
+        compact_minute_samples()
+
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert daily_indexes.is_finalized()
+    assert daily_indexes.finalized_totals == [["BASE", 40]]
+
+
+@pytest.mark.django_db
+def test_finalize_consumption_days_command(capsys):
+    create_day()
+
+    with freeze_time("2025-04-01"):
+        call_command("finalize_consumption_days", "--start", "2025-03-01")
+
+    assert "1 jours finalisés" in capsys.readouterr().out
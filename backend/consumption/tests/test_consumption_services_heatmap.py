@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+
+from consumption.models import HourlyConsumption
+from consumption.services.heatmap import (
+    compute_heatmap,
+    get_heatmap,
+    percentile,
+)
+
+# A Monday
+TODAY = date(2025, 6, 16)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def create_hour(day: date, hour: int, tarif_period: str, wh: int) -> None:
+    HourlyConsumption.objects.create(
+        date=day, hour=hour, tarif_period=tarif_period, wh=wh
+    )
+
+
+@pytest.mark.parametrize(
+    "values, percent, expected",
+    [([], 90, None), ([5], 90, 5), (list(range(1, 11)), 90, 9), ([3, 1, 2], 0, 1)],
+)
+def test_percentile(values, percent, expected):
+    assert percentile(values, percent) == expected
+
+
+@pytest.mark.django_db
+def test_compute_heatmap_folds_same_hours_of_the_week():
+    # Monday 08h of the last three weeks, the second one split by a tarif change
+    create_hour(TODAY - timedelta(weeks=1), 8, "HP..", 1000)
+    create_hour(TODAY - timedelta(weeks=2), 8, "HC..", 200)
+    create_hour(TODAY - timedelta(weeks=2), 8, "HP..", 400)
+    create_hour(TODAY - timedelta(weeks=3), 8, "HP..", 200)
+    # Sunday 23h
+    create_hour(TODAY - timedelta(days=1), 23, "HC..", 300)
+    # Out of the window
+    create_hour(TODAY - timedelta(weeks=4), 8, "HP..", 9000)
+    create_hour(TODAY, 8, "HP..", 9000)
+
+    heatmap = compute_heatmap(TODAY, 3, by_tarif_period=False)
+
+    assert (heatmap["start"], heatmap["end"]) == (
+        date(2025, 5, 26),
+        date(2025, 6, 15),
+    )
+    assert heatmap["days"] == 4
+    assert len(heatmap["data"]) == 168
+    assert heatmap["data"][8] == {
+        "weekday": 0,
+        "hour": 8,
+        "hours": 3,
+        "average_watt": 600,
+        "percentile_watt": 1000,
+    }
+    assert heatmap["data"][167] == {
+        "weekday": 6,
+        "hour": 23,
+        "hours": 1,
+        "average_watt": 300,
+        "percentile_watt": 300,
+    }
+    assert heatmap["data"][9] == {
+        "weekday": 0,
+        "hour": 9,
+        "hours": 0,
+        "average_watt": None,
+        "percentile_watt": None,
+    }
+
+
+@pytest.mark.django_db
+def test_compute_heatmap_by_tarif_period():
+    create_hour(TODAY - timedelta(weeks=1), 8, "HP..", 900)
+    create_hour(TODAY - timedelta(weeks=2), 8, "HC..", 300)
+    create_hour(TODAY - timedelta(weeks=2), 8, "HP..", 300)
+
+    heatmap = compute_heatmap(TODAY, 2, by_tarif_period=True)
+
+    cell = heatmap["data"][8]
+    # A tarif period counts 0 W in the hours it doesn't appear in
+    assert cell["tarif_periods"] == {
+        "Heures Creuses": {"average_watt": 150, "percentile_watt": 300},
+        "Heures Pleines": {"average_watt": 600, "percentile_watt": 900},
+    }
+    assert cell["average_watt"] == sum(
+        power["average_watt"] for power in cell["tarif_periods"].values()
+    )
+    assert heatmap["data"][0]["tarif_periods"] == {}
+
+
+@pytest.mark.django_db
+def test_get_heatmap_is_cached_per_window(django_assert_num_queries):
+    create_hour(TODAY - timedelta(days=1), 23, "HC..", 300)
+
+    with django_assert_num_queries(1):
+        heatmap = get_heatmap(TODAY, 8, False)
+    with django_assert_num_queries(0):
+        assert get_heatmap(TODAY, 8, False) == heatmap
+    with django_assert_num_queries(1):
+        get_heatmap(TODAY, 52, False)
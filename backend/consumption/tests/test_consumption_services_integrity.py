@@ -0,0 +1,188 @@
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from consumption.constants import IndexRepairKind
+from consumption.models import (
+    DailyConsumption,
+    DailyIndexes,
+    HourlyConsumption,
+    MinuteIndexSample,
+)
+from consumption.mutators import compact_minute_samples
+from consumption.packing import series_to_index_dict
+from consumption.reconstruction import build_consumption_data_from_series
+from consumption.repairs import apply_index_repairs
+from consumption.services.integrity import (
+    get_max_wh_per_minute,
+    scan_consumption_integrity,
+    scan_day,
+    scan_index_series,
+)
+from consumption.utils import compute_totals_for_a_day
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 3, 10)
+# 6 kVA: 30 A x 220 V x 1.5 / 60
+MAX_WH_PER_MINUTE = 165
+
+
+def steady_series(start: int = 50_000, wh_per_minute: int = 10) -> list[int]:
+    return [start + wh_per_minute * slot for slot in range(1441)]
+
+
+def create_day(series: list[int | None], day: date = DAY) -> DailyIndexes:
+    return DailyIndexes.objects.create(
+        date=day,
+        values={"BASE": series_to_index_dict(series)},
+        tarif_periods=series_to_index_dict([TarifPeriods.TH] * 1441),
+        subscribed_power=6,
+    )
+
+
+def test_get_max_wh_per_minute():
+    assert get_max_wh_per_minute(6) == MAX_WH_PER_MINUTE
+    assert get_max_wh_per_minute(6.0) == MAX_WH_PER_MINUTE
+    # Unknown subscription: the largest one (90 A)
+    assert get_max_wh_per_minute(None) == 495
+
+
+def test_scan_index_series_accepts_a_sound_series():
+    series = steady_series()
+    series[100:200] = [None] * 100
+    # Full power over the gap is still possible
+    series[200:] = [index + 90 * MAX_WH_PER_MINUTE for index in series[200:]]
+
+    assert scan_index_series("BASE", series, MAX_WH_PER_MINUTE) == []
+
+
+def test_scan_index_series_repairs_a_counter_reset():
+    series = steady_series()
+    # New meter from 08:00, counting from 3 Wh
+    series[480:] = [3 + 10 * position for position in range(961)]
+
+    repairs = scan_index_series("BASE", series, MAX_WH_PER_MINUTE)
+
+    assert repairs == [
+        {
+            "label": "BASE",
+            "kind": IndexRepairKind.RESET,
+            "minute": 480,
+            "dropped_minutes": 0,
+            "offset": series[479] - 3,
+        }
+    ]
+    repaired = apply_index_repairs({"BASE": series}, repairs)["BASE"]
+    # The index goes on from where it was, the swap minute counting for nothing
+    assert repaired[480] == repaired[479]
+    assert repaired[1440] - repaired[0] == 10 * 1439
+
+
+@pytest.mark.parametrize(
+    "glitch, kind",
+    [(-500, IndexRepairKind.REGRESSION), (10**6, IndexRepairKind.JUMP)],
+)
+def test_scan_index_series_drops_glitches(glitch, kind):
+    series = steady_series()
+    series[600] += glitch
+    series[601] += glitch
+
+    repairs = scan_index_series("BASE", series, MAX_WH_PER_MINUTE)
+
+    assert repairs == [
+        {
+            "label": "BASE",
+            "kind": kind,
+            "minute": 600,
+            "dropped_minutes": 2,
+            "offset": 0,
+        }
+    ]
+    repaired = apply_index_repairs({"BASE": list(series)}, repairs)["BASE"]
+    assert repaired[599:603] == [series[599], None, None, series[602]]
+
+
+def test_scan_index_series_offsets_lasting_jumps():
+    series = steady_series()
+    # Corrupted from 12:00 to the end of the day
+    series[720:] = [index + 10**6 for index in series[720:]]
+
+    repairs = scan_index_series("BASE", series, MAX_WH_PER_MINUTE)
+
+    assert [(repair["kind"], repair["offset"]) for repair in repairs] == [
+        (IndexRepairKind.JUMP, -(10**6) - 10)
+    ]
+
+
+@pytest.mark.django_db
+def test_repairs_are_applied_at_read_time():
+    series = steady_series()
+    series[480:] = [3 + 10 * position for position in range(961)]
+    daily_indexes = create_day(series)
+    daily_indexes.index_repairs = scan_day(daily_indexes)
+    daily_indexes.save()
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+
+    # The recorded indexes are kept as is
+    assert daily_indexes.get_index_series(repaired=False)["BASE"] == series
+    assert daily_indexes.values["BASE"]["08:00"] == 3
+    entries = build_consumption_data_from_series(daily_indexes, DAY, 60)
+    assert [entry["wh"] for entry in entries] == [600] * 7 + [590] + [600] * 16
+    totals = compute_totals_for_a_day(DAY, daily_indexes.get_repaired_values())
+    assert totals["Total"]["wh"] == 10 * 1439
+
+
+@pytest.mark.django_db
+@freeze_time("2025-04-01")
+def test_scan_consumption_integrity_stores_repairs_and_rebuilds_rollups():
+    glitched = steady_series()
+    glitched[600] -= 500
+    create_day(glitched)
+    create_day(steady_series(), date(2025, 3, 11))
+    assert DailyConsumption.objects.count() == 0
+
+    counts = scan_consumption_integrity()
+
+    assert counts == {
+        "scanned_days": 2,
+        "changed_days": 1,
+        "reset": 0,
+        "regression": 1,
+        "jump": 0,
+    }
+    assert DailyIndexes.objects.get(date=DAY).index_repairs[0]["minute"] == 600
+    assert DailyConsumption.objects.get(date=DAY).wh == 14400
+    assert HourlyConsumption.objects.get(date=DAY, hour=10).interpolated_minutes == 1
+    # Rescanning finds the same repairs, nothing to rewrite
+    assert scan_consumption_integrity()["changed_days"] == 0
+
+
+@pytest.mark.django_db
+def test_compaction_scans_the_closed_day():
+    for minute, index in enumerate([1000, 1010, 5, 15, 25]):
+        MinuteIndexSample.objects.create(
+            date=DAY, minute=minute, label="BASE", index=index, subscribed_power=6
+        )
+
+    with freeze_time("2025-03-11 00:05:00"):
+        compact_minute_samples()
+
+    daily_indexes = DailyIndexes.objects.get(date=DAY)
+    assert [repair["kind"] for repair in daily_indexes.index_repairs] == [
+        IndexRepairKind.RESET
+    ]
+    assert DailyConsumption.objects.get(date=DAY).wh == 30
+
+
+@pytest.mark.django_db
+def test_scan_consumption_integrity_command(capsys):
+    glitched = steady_series()
+    glitched[600] += 10**6
+    create_day(glitched)
+
+    call_command("scan_consumption_integrity", "--start", "2025-03-10")
+
+    assert "1 jours analysés, 1 modifiés" in capsys.readouterr().out
+    assert DailyIndexes.objects.get(date=DAY).index_repairs[0]["kind"] == "jump"
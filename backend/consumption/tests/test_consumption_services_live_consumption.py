@@ -0,0 +1,125 @@
+import random
+from datetime import date
+
+import pytest
+from django.core.cache import cache
+from freezegun import freeze_time
+
+from consumption.models import MinuteIndexSample
+from consumption.packing import tarif_period_to_code
+from consumption.reconstruction import build_consumption_data_from_series
+from consumption.selectors import get_day_indexes
+from consumption.services import live_consumption
+from consumption.services.live_consumption import (
+    get_live_consumption,
+    get_live_state_cache_key,
+)
+from consumption.utils import compute_totals_for_a_day
+from teleinfo.constants import TarifPeriods
+
+TODAY = date(2025, 6, 1)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def record_minutes(rng: random.Random, indexes: dict, minutes: range) -> None:
+    """
+    Records HC/HP samples (HC before 06:00) with the teleinfo quirks: missed
+    minutes, a label missing at some minutes, the new period seen at 06:01.
+    """
+    for minute in minutes:
+        if rng.random() < 0.1:
+            continue
+        tarif_period = TarifPeriods.HC if minute <= 360 else TarifPeriods.HP
+        label = "HCHC" if tarif_period == TarifPeriods.HC else "HCHP"
+        indexes[label] += rng.randint(0, 40)
+        for sample_label, index in indexes.items():
+            if rng.random() < 0.05:
+                continue
+            MinuteIndexSample.objects.create(
+                date=TODAY,
+                minute=minute,
+                label=sample_label,
+                index=index,
+                tarif_period_code=tarif_period_to_code(tarif_period),
+            )
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 12:00:00")
+@pytest.mark.parametrize("seed", range(3))
+def test_live_consumption_deltas_match_full_day(seed, mocker):
+    rng = random.Random(seed)
+    indexes = {"HCHC": 1_000_000, "HCHP": 2_000_000}
+    record_minutes(rng, indexes, range(0, 300))
+
+    first = get_live_consumption(TODAY, 0)
+    entries = list(first["data"])
+    since = first["next_since"]
+    full_build_spy = mocker.spy(live_consumption, "build_consumption_data_from_series")
+
+    start = 300
+    for chunk in (1, 5, 60, 2, 100):
+        record_minutes(rng, indexes, range(start, start + chunk))
+        start += chunk
+        delta = get_live_consumption(TODAY, since)
+        entries += delta["data"]
+        since = delta["next_since"]
+
+    assert full_build_spy.call_count == 0
+    daily_indexes = get_day_indexes(TODAY)
+    expected = build_consumption_data_from_series(daily_indexes, TODAY, 1)
+    assert entries == expected[: len(entries)]
+    assert len(entries) == since
+    assert delta["totals"] == compute_totals_for_a_day(TODAY, daily_indexes.values)
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 12:00:00")
+def test_live_consumption_rebuilds_when_since_is_before_the_state(mocker):
+    indexes = {"HCHC": 1000}
+    record_minutes(random.Random(0), indexes, range(0, 30))
+    latest = get_live_consumption(TODAY, 0)
+    full_build_spy = mocker.spy(live_consumption, "build_consumption_data_from_series")
+
+    result = get_live_consumption(TODAY, 10)
+
+    assert full_build_spy.call_count == 1
+    assert result["data"] == latest["data"][10:]
+    assert result["next_since"] == latest["next_since"]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 12:00:00")
+def test_live_consumption_rebuilds_on_new_label(mocker):
+    record_minutes(random.Random(0), {"HCHC": 1000}, range(0, 30))
+    since = get_live_consumption(TODAY, 0)["next_since"]
+    record_minutes(random.Random(1), {"HCHC": 2000, "HCHP": 3000}, range(30, 40))
+    full_build_spy = mocker.spy(live_consumption, "build_consumption_data_from_series")
+
+    get_live_consumption(TODAY, since)
+
+    assert full_build_spy.call_count == 1
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 12:00:00")
+def test_live_consumption_keeps_no_state_for_other_days():
+    MinuteIndexSample.objects.create(
+        date=date(2025, 5, 31), minute=0, label="HCHC", index=1000
+    )
+
+    result = get_live_consumption(date(2025, 5, 31), 0)
+
+    assert result["data"] == []
+    assert cache.get(get_live_state_cache_key(date(2025, 5, 31))) is None
+
+
+@pytest.mark.django_db
+def test_live_consumption_returns_none_without_data():
+    assert get_live_consumption(TODAY, 0) is None
@@ -0,0 +1,120 @@
+import json
+import sys
+from datetime import date
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from consumption.constants import MINUTES_PER_DAY
+from consumption.models import DailyIndexes
+from consumption.services.finalization import finalize_closed_days
+from consumption.services.parquet_archive import (
+    archive_closed_days,
+    build_day_columns,
+    find_months_to_archive,
+    read_archive,
+    read_archive_state,
+)
+from consumption.utils import get_daily_index_structure
+from teleinfo.constants import TarifPeriods
+
+TODAY = date(2025, 7, 2)
+
+
+def create_day(day: date) -> DailyIndexes:
+    """10 Wh a minute, 12:00 missing."""
+    values = {
+        time_str: 1000 + 10 * slot
+        for slot, time_str in enumerate(get_daily_index_structure(1))
+    }
+    values["12:00"] = None
+    tarif_periods = dict.fromkeys(get_daily_index_structure(1), TarifPeriods.TH)
+    return DailyIndexes.objects.create(
+        date=day, values={"BASE": values}, tarif_periods=tarif_periods
+    )
+
+
+@pytest.mark.django_db
+def test_build_day_columns():
+    columns = build_day_columns(create_day(date(2025, 6, 1)))
+
+    assert len(columns["minute"]) == MINUTES_PER_DAY
+    assert columns["minute"][:2] == [0, 1]
+    assert set(columns["date"]) == {date(2025, 6, 1)}
+    assert set(columns["label"]) == {"BASE"}
+    assert set(columns["tarif_period"]) == {TarifPeriods.TH}
+    assert columns["index"][720] == 1000 + 10 * 720
+    assert set(columns["wh"]) == {10}
+    assert [slot for slot, flag in enumerate(columns["interpolated"]) if flag] == [720]
+
+
+@pytest.mark.django_db
+def test_find_months_to_archive_skips_archived_and_open_days():
+    for day in (date(2025, 5, 31), date(2025, 6, 1), date(2025, 7, 1), TODAY):
+        create_day(day)
+    create_day(date(2025, 6, 2))  # Not finalized
+    finalize_closed_days()
+    DailyIndexes.objects.filter(date=date(2025, 6, 2)).update(finalized_version=None)
+    versions = {
+        daily_indexes.date.isoformat(): (
+            f"{daily_indexes.finalized_version}:{daily_indexes.finalized_fingerprint}"
+        )
+        for daily_indexes in DailyIndexes.objects.all()
+    }
+
+    months = find_months_to_archive({"2025-05-31": versions["2025-05-31"]}, TODAY)
+
+    assert months == {
+        date(2025, 6, 1): {"2025-06-01": versions["2025-06-01"]},
+        date(2025, 7, 1): {"2025-07-01": versions["2025-07-01"]},
+    }
+    # A day archived from other data is archived again
+    assert list(find_months_to_archive({"2025-05-31": "1:0"}, date(2025, 6, 1))) == [
+        date(2025, 5, 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_archive_command_needs_pyarrow(monkeypatch, tmp_path):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    with pytest.raises(CommandError, match="pyarrow"):
+        call_command("archive_consumption_parquet", str(tmp_path))
+
+    assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.django_db
+def test_archive_closed_days_is_incremental(tmp_path):
+    pytest.importorskip("pyarrow")
+    create_day(date(2025, 5, 31))
+    create_day(date(2025, 6, 1))
+    finalize_closed_days()
+
+    assert archive_closed_days(tmp_path, TODAY) == {
+        "months": 2,
+        "days": 2,
+        "rows": 2 * MINUTES_PER_DAY,
+    }
+    assert (tmp_path / "month=2025-06" / "data.parquet").exists()
+    assert archive_closed_days(tmp_path, TODAY) == {"months": 0, "days": 0, "rows": 0}
+
+    create_day(date(2025, 6, 2))
+    finalize_closed_days()
+    assert archive_closed_days(tmp_path, TODAY) == {
+        "months": 1,
+        "days": 1,
+        "rows": 2 * MINUTES_PER_DAY,
+    }
+    assert list(read_archive_state(tmp_path)) == [
+        "2025-05-31",
+        "2025-06-01",
+        "2025-06-02",
+    ]
+    assert json.loads((tmp_path / "_archive_state.json").read_text())["days"]
+
+    table = read_archive(tmp_path, date(2025, 5, 31), date(2025, 6, 1), ["date", "wh"])
+    assert table.column_names == ["date", "wh"]
+    assert table.num_rows == 2 * MINUTES_PER_DAY
+    assert sum(table.column("wh").to_pylist()) == 2 * 10 * MINUTES_PER_DAY
+    assert read_archive(tmp_path, date(2025, 8, 1), date(2025, 8, 31)).num_rows == 0
@@ -0,0 +1,204 @@
+from datetime import date, datetime
+
+import pytest
+from django.core.cache import cache
+from freezegun import freeze_time
+
+from consumption.constants import PowerPeakBucket
+from consumption.models import DailyPowerPeak, MinutePowerSample
+from consumption.mutators import compact_minute_samples, save_teleinfo_data
+from consumption.services.power_peaks import (
+    build_load_duration_curve,
+    build_power_peaks,
+    build_subscription_report,
+    compact_power_samples,
+    record_power_sample,
+)
+from teleinfo.constants import TarifPeriods, TeleinfoLabel
+from teleinfo.utils.cache_teleinfo_data import set_power_peaks_in_cache
+
+DAY = date(2025, 6, 1)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_samples(day: date, peaks: dict[int, tuple[int, int]], isousc=45) -> None:
+    """Minute power samples of a day, {minute: (peak VA, peak A)}."""
+    MinutePowerSample.objects.bulk_create(
+        MinutePowerSample(
+            date=day,
+            minute=minute,
+            peak_va=peak_va,
+            peak_intensity=peak_intensity,
+            subscribed_intensity=isousc,
+        )
+        for minute, (peak_va, peak_intensity) in peaks.items()
+    )
+
+
+@pytest.mark.django_db
+def test_record_power_sample_records_the_previous_minute():
+    peaks = {
+        "current": {"minute": "2025-06-01T00:00:00+02:00", "papp": 900, "iinst": 4},
+        "previous": {"minute": "2025-05-31T23:59:00+02:00", "papp": 3200, "iinst": 14},
+    }
+
+    record_power_sample(peaks, 45)
+    # Recorded again by an overlapping run
+    record_power_sample(peaks, 45)
+
+    sample = MinutePowerSample.objects.get()
+    assert (sample.date, sample.minute) == (date(2025, 5, 31), 1439)
+    assert (sample.peak_va, sample.peak_intensity) == (3200, 14)
+    assert sample.subscribed_intensity == 45
+    assert record_power_sample({"current": peaks["current"]}, 45) is None
+    assert record_power_sample({}, 45) is None
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-01 08:15:00")
+def test_save_teleinfo_data_records_the_power_peaks(mocker):
+    mocker.patch(
+        "consumption.mutators.get_teleinfo_data_in_cache_if_up_to_date",
+        return_value={
+            TeleinfoLabel.ISOUSC: "30",
+            TeleinfoLabel.PTEC: TarifPeriods.HC,
+            TeleinfoLabel.HCHC: "12345",
+        },
+    )
+    set_power_peaks_in_cache(
+        {
+            "current": {"minute": "2025-06-01T10:15:00+02:00", "papp": 1, "iinst": 1},
+            "previous": {
+                "minute": "2025-06-01T10:14:00+02:00",
+                "papp": 4100,
+                "iinst": 18,
+            },
+        }
+    )
+
+    save_teleinfo_data()
+
+    sample = MinutePowerSample.objects.get()
+    assert (sample.date, sample.minute, sample.peak_va) == (DAY, 614, 4100)
+    assert sample.subscribed_intensity == 30
+
+
+@pytest.mark.django_db
+def test_compact_power_samples_folds_closed_days():
+    create_samples(DAY, {0: (450, 2), 1: (470, 2), 600: (6230, 28), 601: (480, 3)})
+    create_samples(date(2025, 6, 2), {0: (500, 2)})
+
+    with freeze_time("2025-06-02 10:00:00"):
+        assert compact_power_samples() == 1
+
+    daily_power_peak = DailyPowerPeak.objects.get()
+    assert daily_power_peak.date == DAY
+    assert (daily_power_peak.peak_va, daily_power_peak.peak_minute) == (6230, 600)
+    assert daily_power_peak.peak_intensity == 28
+    assert daily_power_peak.measured_minutes == 4
+    assert daily_power_peak.va_histogram[4] == 3
+    assert daily_power_peak.va_histogram[62] == 1
+    assert sum(daily_power_peak.va_histogram) == 4
+    assert daily_power_peak.intensity_histogram[2] == 2
+    assert daily_power_peak.subscribed_intensity == 45
+    assert list(MinutePowerSample.objects.values_list("date", flat=True)) == [
+        date(2025, 6, 2)
+    ]
+
+    # A late sample of the compacted day is merged into its row
+    create_samples(DAY, {900: (7000, 31)})
+    with freeze_time("2025-06-02 10:01:00"):
+        compact_minute_samples()
+
+    daily_power_peak.refresh_from_db()
+    assert (daily_power_peak.peak_va, daily_power_peak.peak_minute) == (7000, 900)
+    assert daily_power_peak.measured_minutes == 5
+
+
+def test_build_load_duration_curve():
+    assert build_load_duration_curve([0, 0, 3, 0, 5, 1]) == [
+        {"va": 500, "minutes": 1},
+        {"va": 400, "minutes": 6},
+        {"va": 200, "minutes": 9},
+    ]
+    assert build_load_duration_curve([]) == []
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-02 12:00:00")
+def test_build_power_peaks_per_day_and_month():
+    create_samples(DAY, {10: (2000, 9), 11: (2500, 11)})
+    create_samples(date(2025, 6, 20), {700: (5100, 23)})
+    create_samples(date(2025, 7, 1), {5: (300, 1)})
+    compact_power_samples()
+    # Today, not compacted yet
+    create_samples(date(2025, 7, 2), {100: (900, 4)})
+
+    daily = build_power_peaks(DAY, date(2025, 7, 2), PowerPeakBucket.DAY)
+    monthly = build_power_peaks(DAY, date(2025, 7, 2), PowerPeakBucket.MONTH)
+
+    assert [(day["date"], day["peak_va"]) for day in daily] == [
+        (DAY, 2500),
+        (date(2025, 6, 20), 5100),
+        (date(2025, 7, 1), 300),
+        (date(2025, 7, 2), 900),
+    ]
+    assert daily[0]["peak_at"] == datetime(2025, 6, 1, 0, 11)
+    assert [
+        (month["date"], month["peak_va"], month["peak_at"], month["measured_minutes"])
+        for month in monthly
+    ] == [
+        (DAY, 5100, datetime(2025, 6, 20, 11, 40), 3),
+        (date(2025, 7, 1), 900, datetime(2025, 7, 2, 1, 40), 2),
+    ]
+    assert monthly[0]["load_duration"] == [
+        {"va": 5100, "minutes": 1},
+        {"va": 2500, "minutes": 2},
+        {"va": 2000, "minutes": 3},
+    ]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-10 12:00:00")
+def test_build_subscription_report():
+    # 45 A subscribed, 3 minutes above 30 A on two days, 1 above 45 A
+    create_samples(DAY, {0: (1000, 5), 1: (7000, 31), 2: (11000, 50)})
+    create_samples(date(2025, 6, 2), {0: (800, 4), 1: (6900, 32), 2: (4400, 20)})
+    compact_power_samples()
+
+    report = build_subscription_report(DAY, date(2025, 6, 9))
+
+    assert report["days"] == 2
+    assert report["measured_minutes"] == 6
+    assert report["peak_intensity"] == 50
+    assert report["subscribed_intensity"] == 45
+    assert report["recommended_subscribed_intensity"] == 60
+    options = {option["subscribed_intensity"]: option for option in report["options"]}
+    assert options[15]["trip_minutes"] == 4
+    assert options[30] == {
+        "subscribed_intensity": 30,
+        "subscribed_power": 6,
+        "trip_minutes": 3,
+        "trip_days": 2,
+        # 2000 W left under 30 A: 21 A and above
+        "load_shedding_minutes": 3,
+    }
+    assert options[45]["trip_minutes"] == 1
+    assert options[45]["trip_days"] == 1
+    assert options[60]["trip_minutes"] == 0
+    assert options[60]["load_shedding_minutes"] == 0
+
+
+@pytest.mark.django_db
+def test_build_subscription_report_without_data():
+    report = build_subscription_report(DAY, DAY)
+
+    assert report["days"] == 0
+    assert report["peak_intensity"] is None
+    assert report["recommended_subscribed_intensity"] is None
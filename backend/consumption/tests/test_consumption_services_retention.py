@@ -0,0 +1,150 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from freezegun import freeze_time
+
+from consumption.constants import MINUTES_PER_DAY
+from consumption.models import (
+    DailyConsumption,
+    DailyIndexes,
+    HourlyConsumption,
+    MinuteIndexSample,
+)
+from consumption.mutators import compact_minute_samples
+from consumption.services.retention import (
+    apply_retention_policy,
+    downsample_index_series,
+    get_served_step,
+)
+from consumption.services.rollups import rebuild_day_rollups
+from consumption.utils import compute_totals_for_a_day, get_daily_index_structure
+from teleinfo.constants import TarifPeriods
+
+TODAY = date(2026, 6, 1)
+TIERS = [(30, 15), (365, MINUTES_PER_DAY)]
+
+
+def create_recorded_day(day: date) -> DailyIndexes:
+    """A day recorded every minute from 00:07 to 23:52, 0 to 100 Wh a minute."""
+    increments = random.Random(day.toordinal())
+    base = get_daily_index_structure(1)
+    tarif_periods = get_daily_index_structure(1)
+    index = 10_000
+    for minute, time_str in enumerate(base):
+        if 7 <= minute <= 1432:
+            index += increments.randint(0, 100)
+            base[time_str] = index
+        tarif_periods[time_str] = TarifPeriods.TH
+    daily_indexes = DailyIndexes.objects.create(
+        date=day, values={"BASE": base}, tarif_periods=tarif_periods
+    )
+    rebuild_day_rollups(daily_indexes)
+    return daily_indexes
+
+
+@pytest.mark.parametrize(
+    "step, resolution, expected",
+    [(1, 1, 1), (1, 15, 15), (30, 15, 30), (20, 15, 60), (60, 1440, 1440)],
+)
+def test_get_served_step(step, resolution, expected):
+    assert get_served_step(step, resolution) == expected
+
+
+def test_downsample_index_series_keeps_the_day_totals():
+    series = [None] * 5 + list(range(100, 1531)) + [None] * 5
+    series[700] = None
+
+    downsampled = downsample_index_series(series, 15)
+
+    known = [slot for slot, index in enumerate(downsampled) if index is not None]
+    assert known == [5, *range(15, 1426, 15), 1435]
+    assert (downsampled[5], downsampled[1435]) == (series[5], series[1435])
+    # A missing aligned slot is interpolated from its neighbours
+    assert downsampled[705] == series[705]
+    assert downsample_index_series([None] * 1441, 15) == [None] * 1441
+
+
+@pytest.mark.django_db
+def test_apply_retention_policy_downsamples_by_age():
+    recent = create_recorded_day(TODAY - timedelta(days=29))
+    middle = create_recorded_day(TODAY - timedelta(days=30))
+    old = create_recorded_day(TODAY - timedelta(days=400))
+    totals_before = compute_totals_for_a_day(old.date, old.values)
+
+    assert apply_retention_policy(TIERS, TODAY) == {MINUTES_PER_DAY: 1, 15: 1}
+
+    recent.refresh_from_db()
+    middle.refresh_from_db()
+    old.refresh_from_db()
+    assert (recent.resolution, middle.resolution, old.resolution) == (1, 15, 1440)
+    series = middle.get_index_series()["BASE"]
+    assert sum(index is not None for index in series) == 2 + 1425 // 15
+    assert old.get_index_series()["BASE"].count(None) == 1439
+    assert (
+        len(old.packed_values) < len(middle.packed_values) < len(recent.packed_values)
+    )
+    # Reads reconstruct the same totals, tarif periods are kept
+    assert compute_totals_for_a_day(old.date, old.values) == totals_before
+    assert old.tarif_periods_complete
+    # Hourly rollups are kept while the resolution divides the hour
+    assert HourlyConsumption.objects.filter(date=middle.date).exists()
+    assert not HourlyConsumption.objects.filter(date=old.date).exists()
+    daily_consumption = DailyConsumption.objects.get(date=old.date)
+    assert daily_consumption.wh == totals_before["Total"]["wh"]
+
+    # Already downsampled days are left alone, a resolution is never refined
+    assert apply_retention_policy(TIERS, TODAY) == {MINUTES_PER_DAY: 0, 15: 0}
+    assert apply_retention_policy(TIERS, TODAY + timedelta(days=400)) == {
+        MINUTES_PER_DAY: 2,
+        15: 0,
+    }
+
+
+@pytest.mark.django_db
+def test_apply_retention_policy_is_off_by_default(settings, caplog):
+    old = create_recorded_day(TODAY - timedelta(days=4000))
+
+    assert apply_retention_policy(today=TODAY) == {}
+    old.refresh_from_db()
+    assert old.resolution == 1
+
+    settings.CONSUMPTION_RETENTION_TIERS = TIERS
+    assert apply_retention_policy(today=TODAY) == {MINUTES_PER_DAY: 1, 15: 0}
+    assert "Retention policy: 1 days rewritten" in caplog.text
+
+
+@pytest.mark.django_db
+def test_apply_retention_policy_folds_index_repairs():
+    old = create_recorded_day(TODAY - timedelta(days=400))
+    old.index_repairs = [
+        {
+            "label": "BASE",
+            "kind": "jump",
+            "minute": 720,
+            "dropped_minutes": 0,
+            "offset": -100,
+        }
+    ]
+    old.save()
+    repaired_series = old.get_index_series()["BASE"]
+
+    apply_retention_policy(TIERS, TODAY)
+
+    old.refresh_from_db()
+    assert old.index_repairs == []
+    assert old.get_index_series()["BASE"][1432] == repaired_series[1432]
+
+
+@pytest.mark.django_db
+def test_compaction_applies_the_retention_policy(mocker):
+    apply_spy = mocker.patch("consumption.mutators.apply_retention_policy")
+    MinuteIndexSample.objects.create(
+        date=date(2026, 5, 31), minute=0, label="BASE", index=1
+    )
+
+    with freeze_time("2026-06-01 00:05:00"):
+        compact_minute_samples()
+        compact_minute_samples()
+
+    apply_spy.assert_called_once_with()
@@ -0,0 +1,226 @@
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from consumption.edf_pricing import get_kwh_price
+from consumption.models import (
+    DailyConsumption,
+    DailyIndexes,
+    HourlyConsumption,
+    MinuteIndexSample,
+)
+from consumption.mutators import compact_minute_samples, save_teleinfo_data
+from consumption.services.rollups import (
+    add_samples_to_rollups,
+    compute_hourly_rollups,
+    rebuild_day_rollups,
+    split_index_delta,
+)
+from consumption.utils import compute_totals_for_a_day
+from teleinfo.constants import TarifPeriods, TeleinfoLabel
+
+DAY = date(2025, 6, 1)
+
+
+def make_daily_indexes(values: dict) -> DailyIndexes:
+    return DailyIndexes(date=DAY, values=values, tarif_periods={})
+
+
+def hourly_rows(day: date = DAY) -> dict:
+    return {
+        (row.hour, row.tarif_period): (row.wh, row.interpolated_minutes)
+        for row in HourlyConsumption.objects.filter(date=day)
+    }
+
+
+def daily_rows(day: date = DAY) -> dict:
+    return {
+        row.tarif_period: (row.wh, row.interpolated_minutes)
+        for row in DailyConsumption.objects.filter(date=day)
+    }
+
+
+def record_minute(mocker, utc_datetime: str, hchc: str, hchp: str) -> None:
+    mocker.patch(
+        "consumption.mutators.get_teleinfo_data_in_cache_if_up_to_date",
+        return_value={
+            TeleinfoLabel.ISOUSC: "30",
+            TeleinfoLabel.PTEC: TarifPeriods.HC,
+            TeleinfoLabel.HCHC: hchc,
+            TeleinfoLabel.HCHP: hchp,
+        },
+    )
+    with freeze_time(utc_datetime):
+        save_teleinfo_data()
+
+
+@pytest.mark.parametrize(
+    "previous_minute, previous_index, minute, index, expected",
+    [
+        # Consecutive minutes
+        (10, 100, 11, 105, {0: {"wh": 5, "interpolated_minutes": 0}}),
+        # Gap: remainder on the first minutes, first interval is measured
+        (10, 100, 13, 105, {0: {"wh": 5, "interpolated_minutes": 2}}),
+        # Gap across an hour boundary
+        (
+            58,
+            100,
+            62,
+            108,
+            {
+                0: {"wh": 4, "interpolated_minutes": 1},
+                1: {"wh": 4, "interpolated_minutes": 2},
+            },
+        ),
+    ],
+)
+def test_split_index_delta(previous_minute, previous_index, minute, index, expected):
+    assert split_index_delta(previous_minute, previous_index, minute, index) == expected
+
+
+def test_compute_hourly_rollups():
+    daily_indexes = make_daily_indexes(
+        {
+            "HCHC": {"00:00": 100, "00:59": 159, "01:00": 160, "01:03": 166},
+            "HCHP": {"12:00": 50, "12:01": 52},
+        }
+    )
+
+    assert compute_hourly_rollups(daily_indexes) == {
+        (0, TarifPeriods.HC): {"wh": 60, "interpolated_minutes": 58},
+        (1, TarifPeriods.HC): {"wh": 6, "interpolated_minutes": 2},
+        (12, TarifPeriods.HP): {"wh": 2, "interpolated_minutes": 0},
+    }
+
+
+@pytest.mark.django_db
+def test_compute_hourly_rollups_matches_daily_totals():
+    values = {
+        "HCHC": {"00:00": 1000, "03:17": 1450, "23:59": 2010, "24:00": 2011},
+        "HCHP": {"06:30": 500, "06:31": 503, "22:00": 4210},
+    }
+    daily_indexes = make_daily_indexes(values)
+
+    rollups = compute_hourly_rollups(daily_indexes)
+    totals = compute_totals_for_a_day(DAY, values)
+
+    for tarif_period, readable_label in [
+        (TarifPeriods.HC, "Heures Creuses"),
+        (TarifPeriods.HP, "Heures Pleines"),
+    ]:
+        assert (
+            sum(
+                hour_totals["wh"]
+                for (_, period), hour_totals in rollups.items()
+                if period == tarif_period
+            )
+            == totals[readable_label]["wh"]
+        )
+
+
+@pytest.mark.django_db
+def test_rebuild_day_rollups_replaces_existing_rows():
+    HourlyConsumption.objects.create(
+        date=DAY, hour=5, tarif_period=TarifPeriods.HP, wh=999
+    )
+    daily_indexes = make_daily_indexes({"HCHC": {"10:00": 100, "10:02": 110}})
+
+    rebuild_day_rollups(daily_indexes)
+
+    assert hourly_rows() == {(10, TarifPeriods.HC): (10, 1)}
+    assert daily_rows() == {TarifPeriods.HC: (10, 1)}
+    daily = DailyConsumption.objects.get(date=DAY)
+    assert daily.euros == pytest.approx(10 / 1000 * get_kwh_price(DAY, TarifPeriods.HC))
+
+
+@pytest.mark.django_db
+def test_save_teleinfo_data_increments_rollups(mocker):
+    # 10:00, 10:01 then 10:04 local time (CEST)
+    record_minute(mocker, "2025-06-01 08:00:00", "1000", "500")
+    record_minute(mocker, "2025-06-01 08:01:00", "1004", "500")
+    record_minute(mocker, "2025-06-01 08:04:00", "1010", "501")
+
+    assert hourly_rows() == {
+        (10, TarifPeriods.HC): (10, 2),
+        (10, TarifPeriods.HP): (1, 2),
+    }
+    assert daily_rows() == {
+        TarifPeriods.HC: (10, 2),
+        TarifPeriods.HP: (1, 2),
+    }
+    daily = DailyConsumption.objects.get(date=DAY, tarif_period=TarifPeriods.HC)
+    assert daily.euros == pytest.approx(10 / 1000 * get_kwh_price(DAY, TarifPeriods.HC))
+
+
+@pytest.mark.django_db
+def test_add_samples_to_rollups_batches_the_labels(django_assert_num_queries):
+    labels = ["BBRHCJB", "BBRHPJB", "BBRHCJW", "BBRHPJW", "BBRHCJR", "BBRHPJR"]
+    MinuteIndexSample.objects.bulk_create(
+        MinuteIndexSample(date=DAY, minute=599, label=label, index=1000)
+        for label in labels
+    )
+    samples = [
+        MinuteIndexSample(date=DAY, minute=601, label=label, index=1000 + position)
+        for position, label in enumerate(labels)
+    ]
+
+    get_kwh_price(DAY, TarifPeriods.HCJB)  # Loads the price timeline
+
+    # Previous samples, then one read and one upsert per rollup table (plus
+    # the savepoint and its release)
+    with django_assert_num_queries(7):
+        add_samples_to_rollups(samples)
+
+    assert hourly_rows() == {
+        (10, TarifPeriods.HCJB): (0, 1),
+        (9, TarifPeriods.HPJB): (1, 0),
+        (10, TarifPeriods.HPJB): (0, 1),
+        (9, TarifPeriods.HCJW): (1, 0),
+        (10, TarifPeriods.HCJW): (1, 1),
+        (9, TarifPeriods.HPJW): (2, 0),
+        (10, TarifPeriods.HPJW): (1, 1),
+        (9, TarifPeriods.HCJR): (2, 0),
+        (10, TarifPeriods.HCJR): (2, 1),
+        (9, TarifPeriods.HPJR): (3, 0),
+        (10, TarifPeriods.HPJR): (2, 1),
+    }
+
+
+@pytest.mark.django_db
+def test_incremental_rollups_match_rebuild_at_compaction(mocker):
+    record_minute(mocker, "2025-06-01 08:00:00", "1000", "500")
+    record_minute(mocker, "2025-06-01 08:59:00", "1100", "500")
+    record_minute(mocker, "2025-06-01 09:03:00", "1107", "520")
+    # Midnight: closes the day with "24:00"
+    record_minute(mocker, "2025-06-01 22:00:00", "1200", "530")
+    incremental_hourly, incremental_daily = hourly_rows(), daily_rows()
+
+    with freeze_time("2025-06-01 22:00:30"):
+        compact_minute_samples()
+
+    assert hourly_rows() == incremental_hourly
+    assert daily_rows() == incremental_daily
+
+
+@pytest.mark.django_db
+def test_backfill_consumption_rollups_command():
+    DailyIndexes.objects.create(
+        date=date(2025, 5, 31), values={"HCHC": {"08:00": 0, "08:01": 3}}
+    )
+    DailyIndexes.objects.create(date=DAY, values={"HCHC": {"08:00": 10, "08:01": 20}})
+    # Current day, only recorded as minute samples
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 2), minute=60, label="HCHC", index=100
+    )
+    MinuteIndexSample.objects.create(
+        date=date(2025, 6, 2), minute=61, label="HCHC", index=107
+    )
+
+    call_command("backfill_consumption_rollups", "--start", "2025-06-01")
+
+    assert not DailyConsumption.objects.filter(date=date(2025, 5, 31)).exists()
+    assert daily_rows(DAY) == {TarifPeriods.HC: (10, 0)}
+    assert daily_rows(date(2025, 6, 2)) == {TarifPeriods.HC: (7, 0)}
+    assert hourly_rows(date(2025, 6, 2)) == {(1, TarifPeriods.HC): (7, 0)}
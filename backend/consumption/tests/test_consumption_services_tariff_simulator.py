@@ -0,0 +1,288 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+from freezegun import freeze_time
+
+from consumption.constants import EnedisCsvKind, TarifPeriodType
+from consumption.edf_pricing import get_price_timeline
+from consumption.models import (
+    DailyIndexes,
+    PricingPeriod,
+    SubscriptionPrice,
+    TariffCalendarDay,
+)
+from consumption.services import tariff_simulator
+from consumption.services.enedis_import import import_enedis_csv
+from consumption.services.finalization import finalize_closed_days
+from consumption.services.tariff_simulator import (
+    compute_half_hour_watt_hours,
+    format_hc_schedule,
+    parse_hc_schedule,
+    run_tariff_simulation,
+)
+from consumption.utils import (
+    compute_totals_for_a_day,
+    get_daily_index_structure,
+    get_human_readable_tarif_period,
+)
+from teleinfo.constants import TarifPeriods
+
+DAY = date(2025, 6, 1)
+NEXT_DAY = date(2025, 6, 2)
+# 22:00-06:00 in half-hours
+NIGHT = set(range(44, 48)) | set(range(0, 12))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_flat_day(day: date, wh_per_minute: int = 1, **kwargs) -> DailyIndexes:
+    """A Base day consuming the same energy every minute."""
+    base = get_daily_index_structure(1)
+    for slot, time_str in enumerate(base):
+        base[time_str] = 1_000_000 + slot * wh_per_minute
+    return DailyIndexes.objects.create(
+        date=day,
+        values={"BASE": base},
+        tarif_periods=dict.fromkeys(base, TarifPeriods.TH),
+        **kwargs,
+    )
+
+
+def get_result(simulation: dict, option: TarifPeriodType) -> dict:
+    [result] = [
+        result for result in simulation["results"] if result["option"] == option
+    ]
+    return result
+
+
+@pytest.mark.parametrize(
+    "schedule, hc_half_hours",
+    [
+        ("22:00-06:00", NIGHT),
+        ("01:30-07:30,12:30-14:30", set(range(3, 15)) | set(range(25, 29))),
+        ("00:00-24:00", set(range(48))),
+        ("23:30-00:00", {47}),
+    ],
+)
+def test_parse_hc_schedule(schedule, hc_half_hours):
+    hc_flags = parse_hc_schedule(schedule)
+
+    assert {half_hour for half_hour, hc in enumerate(hc_flags) if hc} == hc_half_hours
+    assert format_hc_schedule(hc_flags) == schedule
+
+
+@pytest.mark.parametrize(
+    "schedule", ["22:00", "22:15-06:00", "06:00-06:00", "25:00-01:00", "a-b"]
+)
+def test_parse_hc_schedule_rejects_invalid_ranges(schedule):
+    with pytest.raises(ValueError):
+        parse_hc_schedule(schedule)
+
+
+@pytest.mark.django_db
+def test_half_hour_watt_hours_match_daily_totals():
+    rng = random.Random(0)
+    minute_keys = list(get_daily_index_structure(1))
+    values = {"HCHC": get_daily_index_structure(1), "HCHP": {}}
+    indexes = {"HCHC": 1_000_000, "HCHP": 2_000_000}
+    for slot, time_str in enumerate(minute_keys):
+        for label in indexes:
+            values[label][time_str] = indexes[label]
+        indexes["HCHC" if slot < 360 else "HCHP"] += rng.randint(0, 60)
+    # Unknown HC indexes until 00:45, a gap inside the day
+    for time_str in minute_keys[:45] + minute_keys[600:640]:
+        values["HCHC"][time_str] = None
+    daily_indexes = DailyIndexes(date=DAY, values=values)
+
+    half_hour_watt_hours = compute_half_hour_watt_hours(daily_indexes)
+
+    assert len(half_hour_watt_hours) == 48
+    assert (
+        sum(half_hour_watt_hours)
+        == compute_totals_for_a_day(DAY, values)["Total"]["wh"]
+    )
+    hchp = [values["HCHP"][time_str] for time_str in minute_keys]
+    assert half_hour_watt_hours[30] == hchp[930] - hchp[900]
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_simulation_prices_each_option():
+    create_flat_day(DAY, subscribed_power=9)
+    create_flat_day(NEXT_DAY, subscribed_power=9)
+    TariffCalendarDay.objects.create(date=DAY, tarif_period_type="TEMPO", color="R")
+    TariffCalendarDay.objects.create(date=DAY, tarif_period_type="EJP", color="R")
+    SubscriptionPrice.objects.create(
+        pricing_period=PricingPeriod.objects.get(start_date=date(2025, 2, 1)),
+        tarif_period_type="TEMPO",
+        subscribed_power=9,
+        euros_per_month="15.50",
+    )
+    prices = get_price_timeline().get_kwh_prices(DAY)
+
+    simulation = run_tariff_simulation(
+        DAY, NEXT_DAY, list(TarifPeriodType), parse_hc_schedule("22:00-06:00")
+    )
+
+    assert simulation["hc_schedule"] == "22:00-06:00"
+    assert [result["total_euros"] for result in simulation["results"]] == sorted(
+        result["total_euros"] for result in simulation["results"]
+    )
+    for result in simulation["results"]:
+        assert result["wh"] == 2880
+        assert result["days"] == 2
+
+    base = get_result(simulation, TarifPeriodType.TH)
+    assert base["energy_euros"] == pytest.approx(2.88 * prices[TarifPeriods.TH])
+    assert base["subscription_missing_days"] == 2
+
+    hc_hp = get_result(simulation, TarifPeriodType.HC_HP)
+    assert hc_hp["tarif_periods"] == {
+        "Heures Creuses": {"wh": 960, "euros": pytest.approx(0.96 * prices["HC.."])},
+        "Heures Pleines": {"wh": 1920, "euros": pytest.approx(1.92 * prices["HP.."])},
+    }
+
+    # The red day runs from 06:00 on June 1st to 06:00 on June 2nd, the
+    # night before it and June 2nd are of unknown color
+    tempo = get_result(simulation, TarifPeriodType.TEMPO)
+    assert {
+        tarif_period: totals["wh"]
+        for tarif_period, totals in tempo["tarif_periods"].items()
+    } == {
+        get_human_readable_tarif_period(TarifPeriods.HCJB): 360 + 120,
+        get_human_readable_tarif_period(TarifPeriods.HPJR): 960,
+        get_human_readable_tarif_period(TarifPeriods.HCJR): 120 + 360,
+        get_human_readable_tarif_period(TarifPeriods.HPJB): 960,
+    }
+    assert tempo["unknown_color_days"] == 1
+    assert tempo["subscription_euros"] == pytest.approx(2 * 15.50 * 12 / 365)
+    assert tempo["subscription_missing_days"] == 0
+
+    # Pointe mobile from 07:00 on June 1st to 01:00 on June 2nd
+    ejp = get_result(simulation, TarifPeriodType.EJP)
+    assert {
+        tarif_period: totals["wh"]
+        for tarif_period, totals in ejp["tarif_periods"].items()
+    } == {
+        get_human_readable_tarif_period(TarifPeriods.PM): 17 * 60 + 60,
+        get_human_readable_tarif_period(TarifPeriods.HN): 2880 - 18 * 60,
+    }
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_simulation_tempo_colors_fall_back_to_recorded_days():
+    base = get_daily_index_structure(1)
+    for slot, time_str in enumerate(base):
+        base[time_str] = 1_000_000 + slot
+    DailyIndexes.objects.create(
+        date=DAY,
+        values={"BBRHCJW": base},
+        tarif_periods=dict.fromkeys(base, TarifPeriods.HCJW),
+    )
+
+    simulation = run_tariff_simulation(DAY, DAY, [TarifPeriodType.TEMPO])
+
+    [tempo] = simulation["results"]
+    assert tempo["unknown_color_days"] == 0
+    assert (
+        tempo["tarif_periods"][get_human_readable_tarif_period(TarifPeriods.HPJW)]["wh"]
+        == (22 - 6) * 60
+    )
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_simulation_defaults_to_the_recorded_hc_schedule():
+    tarif_periods = {
+        time_str: TarifPeriods.HC if "01:30" <= time_str < "07:30" else TarifPeriods.HP
+        for time_str in get_daily_index_structure(1)
+    }
+    DailyIndexes.objects.create(
+        date=date(2025, 6, 30), values={}, tarif_periods=tarif_periods
+    )
+
+    simulation = run_tariff_simulation(DAY, DAY, [TarifPeriodType.HC_HP])
+
+    assert simulation["hc_schedule"] == "01:30-07:30"
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_simulation_results_are_cached_per_option(mocker):
+    create_flat_day(DAY)
+    finalize_closed_days()
+    load_day_profiles = mocker.spy(tariff_simulator, "load_day_profiles")
+    hc_flags = parse_hc_schedule("22:00-06:00")
+
+    first = run_tariff_simulation(DAY, DAY, [TarifPeriodType.EJP], hc_flags)
+    again = run_tariff_simulation(DAY, DAY, [TarifPeriodType.EJP], hc_flags)
+    assert again == first
+    assert load_day_profiles.call_count == 1
+
+    # Only the missing option is computed
+    run_tariff_simulation(DAY, DAY, [TarifPeriodType.EJP, TarifPeriodType.TH], hc_flags)
+    assert load_day_profiles.call_count == 2
+
+    # A calendar edit changes the key
+    TariffCalendarDay.objects.create(date=DAY, tarif_period_type="EJP", color="R")
+    updated = run_tariff_simulation(DAY, DAY, [TarifPeriodType.EJP], hc_flags)
+    assert load_day_profiles.call_count == 3
+    assert (
+        updated["results"][0]["tarif_periods"] != first["results"][0]["tarif_periods"]
+    )
+
+
+@pytest.mark.django_db
+@freeze_time("2025-06-02 12:00:00")
+def test_simulation_of_a_period_reaching_today_is_not_cached(mocker):
+    create_flat_day(DAY)
+    load_day_profiles = mocker.spy(tariff_simulator, "load_day_profiles")
+
+    for _ in range(2):
+        run_tariff_simulation(DAY, DAY + timedelta(days=1), [TarifPeriodType.TH])
+
+    assert load_day_profiles.call_count == 2
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_simulation_of_days_not_finalized_is_not_cached(mocker):
+    create_flat_day(DAY)
+    create_flat_day(NEXT_DAY)
+    finalize_closed_days(end=DAY)
+    load_day_profiles = mocker.spy(tariff_simulator, "load_day_profiles")
+
+    for _ in range(2):
+        run_tariff_simulation(DAY, NEXT_DAY, [TarifPeriodType.TH])
+
+    assert load_day_profiles.call_count == 2
+
+
+@pytest.mark.django_db
+@freeze_time("2025-07-01")
+def test_simulation_follows_an_import_over_the_period():
+    create_flat_day(DAY)
+    finalize_closed_days()
+    recorded = run_tariff_simulation(DAY, DAY, [TarifPeriodType.TH])
+    assert recorded["results"][0]["wh"] == 1440
+
+    # 600 W all day long, every 30 minutes
+    lines = ["Horodate;Valeur"] + [
+        f"{DAY.isoformat()}T{minute // 60:02d}:{minute % 60:02d}:00+02:00;600"
+        for minute in range(30, 1440, 30)
+    ]
+    lines.append(f"{NEXT_DAY.isoformat()}T00:00:00+02:00;600")
+    import_enedis_csv(lines, EnedisCsvKind.LOAD_CURVE, overwrite=True)
+
+    imported = run_tariff_simulation(DAY, DAY, [TarifPeriodType.TH])
+    assert imported["results"][0]["wh"] == 14400
+    finalize_closed_days()
+    assert run_tariff_simulation(DAY, DAY, [TarifPeriodType.TH]) == imported
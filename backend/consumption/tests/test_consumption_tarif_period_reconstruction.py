@@ -2,10 +2,14 @@ from datetime import date, timedelta
 
 import pytest
 
-from consumption.constants import TarifPeriodType
+from consumption.constants import (
+    TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS,
+    TarifPeriodType,
+)
 from consumption.models import DailyIndexes
 from consumption.utils import (
     fill_missing_tarif_periods,
+    get_daily_index_structure,
     get_hc_hp_ref_day,
     get_tarif_period_type,
     get_tempo_color,
@@ -21,6 +25,20 @@ def make_tarif_periods(**overrides: str | None) -> dict[str, str | None]:
     return base
 
 
+def make_full_day_tarif_periods(
+    morning: str | None, afternoon: str | None
+) -> dict[str, str | None]:
+    """
+    Builds a full-day (1441 slots) tarif_periods dict: `morning` before
+    12:00, `afternoon` from 12:00. Days read back from the database are
+    always full-day, whatever was stored.
+    """
+    return {
+        time_str: morning if time_str < "12:00" else afternoon
+        for time_str in get_daily_index_structure(1)
+    }
+
+
 # --- get_tarif_period_type ---
 
 
@@ -66,8 +84,8 @@ def test_get_tempo_color_none_when_not_tempo():
 
 @pytest.mark.django_db
 def test_get_hc_hp_ref_day_finds_most_recent_complete_day():
-    older_complete = {"00:00": TarifPeriods.HC, "12:00": TarifPeriods.HP}
-    newer_complete = {"00:00": TarifPeriods.HP, "12:00": TarifPeriods.HC}
+    older_complete = make_full_day_tarif_periods(TarifPeriods.HC, TarifPeriods.HP)
+    newer_complete = make_full_day_tarif_periods(TarifPeriods.HP, TarifPeriods.HC)
     DailyIndexes.objects.create(date=date(2025, 5, 29), tarif_periods=older_complete)
     DailyIndexes.objects.create(date=date(2025, 5, 31), tarif_periods=newer_complete)
 
@@ -78,8 +96,9 @@ def test_get_hc_hp_ref_day_finds_most_recent_complete_day():
 
 @pytest.mark.django_db
 def test_get_hc_hp_ref_day_skips_incomplete_day():
-    incomplete = {"00:00": TarifPeriods.HC, "12:00": None}
-    complete = {"00:00": TarifPeriods.HP, "12:00": TarifPeriods.HC}
+    incomplete = make_full_day_tarif_periods(TarifPeriods.HC, TarifPeriods.HC)
+    incomplete["12:00"] = None
+    complete = make_full_day_tarif_periods(TarifPeriods.HP, TarifPeriods.HC)
     DailyIndexes.objects.create(date=date(2025, 5, 31), tarif_periods=incomplete)
     DailyIndexes.objects.create(date=date(2025, 5, 30), tarif_periods=complete)
 
@@ -95,9 +114,11 @@ def test_get_hc_hp_ref_day_returns_none_when_no_candidate():
 
 @pytest.mark.django_db
 def test_get_hc_hp_ref_day_ignores_day_outside_search_window():
-    too_old = {"00:00": TarifPeriods.HC, "12:00": TarifPeriods.HP}
+    too_old = make_full_day_tarif_periods(TarifPeriods.HC, TarifPeriods.HP)
     DailyIndexes.objects.create(
-        date=date(2025, 6, 1) - timedelta(days=10), tarif_periods=too_old
+        date=date(2025, 6, 1)
+        - timedelta(days=TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS + 1),
+        tarif_periods=too_old,
     )
 
     assert get_hc_hp_ref_day(date(2025, 6, 1)) is None
@@ -108,8 +129,8 @@ def test_get_hc_hp_ref_day_ignores_day_outside_search_window():
 
 @pytest.mark.django_db
 def test_get_tempo_ref_day_filters_by_color():
-    red_day = {"00:00": TarifPeriods.HCJR, "12:00": TarifPeriods.HPJR}
-    blue_day = {"00:00": TarifPeriods.HCJB, "12:00": TarifPeriods.HPJB}
+    red_day = make_full_day_tarif_periods(TarifPeriods.HCJR, TarifPeriods.HPJR)
+    blue_day = make_full_day_tarif_periods(TarifPeriods.HCJB, TarifPeriods.HPJB)
     DailyIndexes.objects.create(date=date(2025, 5, 30), tarif_periods=blue_day)
     DailyIndexes.objects.create(date=date(2025, 5, 31), tarif_periods=red_day)
 
@@ -118,6 +139,21 @@ def test_get_tempo_ref_day_filters_by_color():
     assert result == red_day
 
 
+@pytest.mark.django_db
+def test_get_tempo_ref_day_finds_rare_color_weeks_back():
+    red_day = make_full_day_tarif_periods(TarifPeriods.HCJR, TarifPeriods.HPJR)
+    DailyIndexes.objects.create(date=date(2025, 2, 10), tarif_periods=red_day)
+    for days_before in range(1, 8):
+        DailyIndexes.objects.create(
+            date=date(2025, 3, 15) - timedelta(days=days_before),
+            tarif_periods=make_full_day_tarif_periods(
+                TarifPeriods.HCJB, TarifPeriods.HPJB
+            ),
+        )
+
+    assert get_tempo_ref_day(date(2025, 3, 15), "R") == red_day
+
+
 @pytest.mark.django_db
 def test_get_tempo_ref_day_returns_none_when_color_is_none():
     assert get_tempo_ref_day(date(2025, 6, 1), None) is None
@@ -161,11 +197,7 @@ def test_fill_missing_tarif_periods_undetermined_leaves_gaps():
 
 @pytest.mark.django_db
 def test_fill_missing_tarif_periods_hc_hp_reuses_ref_day():
-    ref_day = {
-        "00:00": TarifPeriods.HP,
-        "12:00": TarifPeriods.HC,
-        "24:00": TarifPeriods.HP,
-    }
+    ref_day = make_full_day_tarif_periods(TarifPeriods.HP, TarifPeriods.HC)
     DailyIndexes.objects.create(date=date(2025, 5, 31), tarif_periods=ref_day)
     tarif_periods = make_tarif_periods(**{"12:00": TarifPeriods.HC})
 
@@ -188,11 +220,7 @@ def test_fill_missing_tarif_periods_complete_day_skips_ref_day_lookup():
     # A reference day exists in DB and would be returned if the lookup ran;
     # since the target day is already complete, it must not run, and the
     # original data must be returned unchanged.
-    ref_day = {
-        "00:00": TarifPeriods.HP,
-        "12:00": TarifPeriods.HC,
-        "24:00": TarifPeriods.HP,
-    }
+    ref_day = make_full_day_tarif_periods(TarifPeriods.HP, TarifPeriods.HC)
     DailyIndexes.objects.create(date=date(2025, 5, 31), tarif_periods=ref_day)
     complete_tarif_periods = {
         "00:00": TarifPeriods.HC,
@@ -207,16 +235,8 @@ def test_fill_missing_tarif_periods_complete_day_skips_ref_day_lookup():
 
 @pytest.mark.django_db
 def test_fill_missing_tarif_periods_tempo_reuses_same_color_ref_day():
-    red_ref_day = {
-        "00:00": TarifPeriods.HCJR,
-        "12:00": TarifPeriods.HPJR,
-        "24:00": TarifPeriods.HCJR,
-    }
-    blue_ref_day = {
-        "00:00": TarifPeriods.HCJB,
-        "12:00": TarifPeriods.HPJB,
-        "24:00": TarifPeriods.HCJB,
-    }
+    red_ref_day = make_full_day_tarif_periods(TarifPeriods.HCJR, TarifPeriods.HPJR)
+    blue_ref_day = make_full_day_tarif_periods(TarifPeriods.HCJB, TarifPeriods.HPJB)
     DailyIndexes.objects.create(date=date(2025, 5, 30), tarif_periods=blue_ref_day)
     DailyIndexes.objects.create(date=date(2025, 5, 31), tarif_periods=red_ref_day)
     tarif_periods = make_tarif_periods(**{"12:00": TarifPeriods.HPJR})
@@ -19,10 +19,12 @@ from consumption.utils import (
     get_human_readable_tarif_period,
     get_index_label,
     get_indexes_in_teleinfo,
+    get_subscribed_intensity,
     get_subscribed_power,
     get_tarif_period,
     get_tarif_period_label_from_index_label,
     get_wh_of_index_label,
+    interpolate_index_series,
     interpolate_missing_values,
     is_interpolated,
 )
@@ -47,7 +49,16 @@ def test_get_daily_index_structure_valid_steps(step, expected_dict):
     assert result == expected_dict
 
 
-@pytest.mark.parametrize("invalid_step", ["1", 15, 0, 61, 1.0, None, [], {}])
+@pytest.mark.parametrize("step", [5, 15, 20, 1440])
+def test_get_daily_index_structure_derives_any_divisor_step(step):
+    result = get_daily_index_structure(step)
+
+    assert len(result) == 1440 // step + 1
+    assert list(result)[:2] == ["00:00", f"{step // 60:02d}:{step % 60:02d}"]
+    assert list(result)[-1] == "24:00"
+
+
+@pytest.mark.parametrize("invalid_step", ["1", 7, 0, 61, 1.0, None, [], {}])
 def test_get_daily_index_structure_invalid_steps(invalid_step):
     with pytest.raises(ValueError):
         get_daily_index_structure(invalid_step)
@@ -132,6 +143,7 @@ def test_compute_watt_hours(indexes, expected):
     assert result == expected
 
 
+@pytest.mark.django_db
 @pytest.mark.parametrize(
     "values, expected",
     [
@@ -476,6 +488,32 @@ def test_compute_indexes_missing_values(input_data, expected_output):
     assert result == expected_output
 
 
+@pytest.mark.parametrize(
+    "series, expected_filled, expected_interpolated",
+    [
+        # Nothing to fill
+        ([100, 110, 120], [100, 110, 120], [False, False, False]),
+        # Remainder spread on the first steps, like interpolate_missing_values
+        (
+            [100, None, None, 105],
+            [100, 102, 104, 105],
+            [False, True, True, False],
+        ),
+        # Leading and trailing gaps aren't bordered, they stay None
+        (
+            [None, 100, None, 120, None],
+            [None, 100, 110, 120, None],
+            [False, False, True, False, False],
+        ),
+        ([None, None], [None, None], [False, False]),
+    ],
+)
+def test_interpolate_index_series(series, expected_filled, expected_interpolated):
+    filled, interpolated = interpolate_index_series(series)
+    assert filled == expected_filled
+    assert interpolated == expected_interpolated
+
+
 @pytest.mark.parametrize(
     "original, to_fill, expected",
     [
@@ -755,6 +793,20 @@ def test_get_subscribed_power(cache_data, expected):
     assert result == expected
 
 
+@pytest.mark.parametrize(
+    "cache_data, expected",
+    [
+        ({TeleinfoLabel.ISOUSC: "45"}, 45),
+        ({TeleinfoLabel.ISOUSC: "015"}, 15),
+        ({}, None),
+        ({TeleinfoLabel.ISOUSC: None}, None),
+        ({TeleinfoLabel.ISOUSC: "abc"}, None),
+    ],
+)
+def test_get_subscribed_intensity(cache_data, expected):
+    assert get_subscribed_intensity(cache_data) == expected
+
+
 @pytest.mark.parametrize(
     "cache_data, expected",
     [
@@ -905,6 +957,7 @@ def test_add_new_values_invalid_inputs(today_indexes, new_data, minute):
     assert result == today_indexes
 
 
+@pytest.mark.django_db
 @pytest.mark.parametrize(
     "day, tarif_period, wh, expected",
     [
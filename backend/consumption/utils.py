@@ -1,19 +1,28 @@
 import logging
+from collections.abc import Iterable
 from copy import deepcopy
 from datetime import date, timedelta
+from itertools import groupby
+from operator import attrgetter
 
 from consumption.constants import (
     ALLOWED_CONSUMPTION_STEPS,
-    STEP_1MIN_DICT,
-    STEP_30MIN_DICT,
-    STEP_60MIN_DICT,
+    MINUTES_PER_DAY,
     TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS,
-    TARIF_PERIOD_TYPE_LABELS,
-    TEMPO_COLOR_LABELS,
+    TARIF_PERIOD_TYPE_BY_TARIF_PERIOD,
+    TARIF_PERIODS_BY_CODE,
+    TEMPO_COLOR_BY_TARIF_PERIOD,
     TarifPeriodType,
 )
 from consumption.edf_pricing import get_kwh_price
-from consumption.models import DailyIndexes
+from consumption.models import DailyIndexes, MinuteIndexSample
+from consumption.packing import (
+    SLOT_MINUTE_STRS,
+    minute_str_to_slot,
+    series_to_index_dict,
+    tarif_period_to_code,
+    unpack_tarif_period_series,
+)
 from core.constants import LoggerLabel
 from core.utils.energy_utils import wh_to_watt
 from teleinfo.constants import (
@@ -31,19 +40,16 @@ logger = logging.getLogger("django")
 
 
 def get_daily_index_structure(step: int) -> dict[str, None]:
-    error = f"Step {step} is not allowed. Must be an integer in Allowed steps: {ALLOWED_CONSUMPTION_STEPS}."
-
-    match step:
-        case _ if not isinstance(step, int):
-            raise ValueError(error)
-        case 1:
-            return STEP_1MIN_DICT.copy()
-        case 30:
-            return STEP_30MIN_DICT.copy()
-        case 60:
-            return STEP_60MIN_DICT.copy()
-        case _:
-            raise ValueError(error)
+    """
+    Returns {"HH:MM": None} for every `step` minutes of the day, "00:00" to
+    "24:00" included. `step` can be any integer dividing MINUTES_PER_DAY.
+    """
+    if not isinstance(step, int) or step not in ALLOWED_CONSUMPTION_STEPS:
+        raise ValueError(
+            f"Step {step!r} is not allowed. Must be an integer dividing "
+            f"{MINUTES_PER_DAY} minutes."
+        )
+    return dict.fromkeys(SLOT_MINUTE_STRS[::step])
 
 
 def compute_watt_hours(
@@ -121,13 +127,21 @@ def compute_totals_for_a_day(
             - "wh": sum of all individual "wh" where the value is not None,
             - "euros": sum of all individual "euros" if all are defined, else None.
     """
-    totals = {}
+    return price_day_totals(day, compute_index_label_watt_hours(values))
 
-    for index_label, indexes in values.items():
-        readable_index_label = get_human_readable_index_label(index_label)
-        totals[readable_index_label] = {"wh": None, "euros": None}
 
+def compute_index_label_watt_hours(
+    values: dict[str, dict[str, int | None]],
+) -> list[tuple[str, int | None]]:
+    """
+    Wh of each index label of a day, between its first and last known
+    indexes (None with fewer than two), in the order of `values`.
+    """
+    label_watt_hours = []
+
+    for index_label, indexes in values.items():
         if not indexes:
+            label_watt_hours.append((index_label, None))
             continue
 
         sorted_times = sorted(indexes.keys())
@@ -151,8 +165,27 @@ def compute_totals_for_a_day(
                 break
 
         if first_val is not None and last_val is not None and first_key != last_key:
-            wh = last_val - first_val
-            totals[readable_index_label]["wh"] = wh
+            label_watt_hours.append((index_label, last_val - first_val))
+        else:
+            label_watt_hours.append((index_label, None))
+
+    return label_watt_hours
+
+
+def price_day_totals(
+    day: date,
+    label_watt_hours: Iterable[tuple[str, int | None]],
+) -> dict[str, dict[str, int | None]]:
+    """
+    Prices the (index label, Wh) totals of a day into the totals of
+    compute_totals_for_a_day.
+    """
+    totals = {}
+
+    for index_label, wh in label_watt_hours:
+        readable_index_label = get_human_readable_index_label(index_label)
+        totals[readable_index_label] = {"wh": wh, "euros": None}
+        if wh is not None:
             totals[readable_index_label]["euros"] = compute_period_price(
                 day, get_tarif_period_label_from_index_label(index_label), wh
             )
@@ -294,6 +327,70 @@ def compute_indexes_missing_values(
     return missing_values
 
 
+def interpolate_index_series(
+    series: list[int | None],
+) -> tuple[list[int | None], list[bool]]:
+    """
+    Minute-series counterpart of compute_indexes_missing_values +
+    fill_missing_values: fills every gap bordered by known values with the
+    same integer linear interpolation (interpolate_missing_values), without
+    going through "HH:MM" dicts.
+
+    Args:
+        series: A minute-indexed list of index values (int or None).
+
+    Returns:
+        A (filled_series, interpolated) tuple: a new list where bordered gaps
+        are filled (leading/trailing gaps stay None), and a list of flags set
+        to True for each slot that was interpolated.
+    """
+    filled = list(series)
+    interpolated = [False] * len(series)
+    previous_slot = None
+
+    for slot, value in enumerate(series):
+        if value is None:
+            continue
+        if previous_slot is not None and slot - previous_slot > 1:
+            intervals = slot - previous_slot
+            base_step, remainder = divmod(value - series[previous_slot], intervals)
+            current_value = series[previous_slot]
+            for i in range(1, intervals):
+                current_value += base_step + 1 if i - 1 < remainder else base_step
+                filled[previous_slot + i] = current_value
+                interpolated[previous_slot + i] = True
+        previous_slot = slot
+
+    return filled, interpolated
+
+
+def detect_tarif_period_type(
+    tarif_periods: Iterable[str | None],
+) -> TarifPeriodType | None:
+    """
+    Detects the tariff family from a sequence of tarif periods (None values
+    are skipped). Works on any iterable, so packed minute series can be
+    checked without building a dict first.
+    """
+    for value in tarif_periods:
+        tarif_period_type = TARIF_PERIOD_TYPE_BY_TARIF_PERIOD.get(value)
+        if tarif_period_type is not None:
+            return tarif_period_type
+    return None
+
+
+def detect_tempo_color(tarif_periods: Iterable[str | None]) -> str | None:
+    """
+    Detects the Tempo color (B/W/R) from a sequence of tarif periods (None
+    values are skipped), see detect_tarif_period_type.
+    """
+    for value in tarif_periods:
+        color = TEMPO_COLOR_BY_TARIF_PERIOD.get(value)
+        if color is not None:
+            return color
+    return None
+
+
 def get_tarif_period_type(
     tarif_periods: dict[str, str | None],
 ) -> TarifPeriodType | None:
@@ -309,13 +406,7 @@ def get_tarif_period_type(
         The matching TarifPeriodType, or None if the day is entirely empty
         (no known value) or no known value matches a known family.
     """
-    for value in tarif_periods.values():
-        if value is None:
-            continue
-        for tarif_period_type, labels in TARIF_PERIOD_TYPE_LABELS.items():
-            if value in labels:
-                return tarif_period_type
-    return None
+    return detect_tarif_period_type(tarif_periods.values())
 
 
 def get_tempo_color(tarif_periods: dict[str, str | None]) -> str | None:
@@ -331,64 +422,64 @@ def get_tempo_color(tarif_periods: dict[str, str | None]) -> str | None:
         The matching color code ('B', 'W' or 'R'), or None if no known
         value matches a known Tempo color.
     """
-    for value in tarif_periods.values():
-        if value is None:
-            continue
-        for color, labels in TEMPO_COLOR_LABELS.items():
-            if value in labels:
-                return color
-    return None
+    return detect_tempo_color(tarif_periods.values())
 
 
-def get_hc_hp_ref_day(current_day: date) -> dict[str, str | None] | None:
+def get_hc_hp_ref_day_series(current_day: date) -> list[str] | None:
     """
-    Searches, among the days preceding current_day (within
-    TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS days, most recent first), for the
-    first DailyIndexes whose tarif_periods is of type HC_HP and entirely
-    complete (no None left).
+    Returns the tarif periods of the most recent day preceding current_day
+    (within TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS days) whose tarif
+    periods are of type HC_HP and entirely complete (no None left).
 
-    Only the tarif_periods column is fetched (via values_list) since it's
-    the only field this lookup needs — the values column can hold a large
-    JSON blob per row and loading it here would be wasted I/O.
+    A single query on the indexed tarif metadata columns of DailyIndexes:
+    only the winning day's packed tarif periods are fetched and decoded.
 
     Args:
         current_day: The day being reconstructed.
 
     Returns:
-        The reference day's tarif_periods dict, or None if no suitable
-        candidate is found.
+        The reference day's minute-indexed tarif periods, or None if no
+        suitable candidate is found.
     """
-    candidates = (
+    packed_tarif_periods = (
         DailyIndexes.objects.filter(
             date__gte=current_day
             - timedelta(days=TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS),
             date__lt=current_day,
+            tarif_period_type=TarifPeriodType.HC_HP,
+            tarif_periods_complete=True,
         )
         .order_by("-date")
-        .values_list("tarif_periods", flat=True)
+        .values_list("packed_tarif_periods", flat=True)
+        .first()
     )
+    if packed_tarif_periods is None:
+        return None
+    return unpack_tarif_period_series(packed_tarif_periods)
 
-    for candidate_tarif_periods in candidates:
-        if None in candidate_tarif_periods.values():
-            continue
-        if get_tarif_period_type(candidate_tarif_periods) == TarifPeriodType.HC_HP:
-            return candidate_tarif_periods
 
-    return None
+def get_hc_hp_ref_day(current_day: date) -> dict[str, str | None] | None:
+    """
+    Dict counterpart of get_hc_hp_ref_day_series.
+
+    Returns:
+        The reference day's tarif_periods dict, or None if no suitable
+        candidate is found.
+    """
+    series = get_hc_hp_ref_day_series(current_day)
+    return series_to_index_dict(series) if series is not None else None
 
 
-def get_tempo_ref_day(
+def get_tempo_ref_day_series(
     current_day: date,
     color: str | None,
-) -> dict[str, str | None] | None:
+) -> list[str] | None:
     """
-    Searches, among the days preceding current_day (within
-    TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS days, most recent first), for the
-    first DailyIndexes whose tarif_periods is of type TEMPO, entirely
-    complete (no None left), and of the same Tempo color as `color`.
-
-    Only the tarif_periods column is fetched (via values_list), for the same
-    reason as get_hc_hp_ref_day.
+    Returns the tarif periods of the most recent day preceding current_day
+    (within TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS days) whose tarif
+    periods are of type TEMPO, entirely complete (no None left), and of the
+    same Tempo color as `color`. Single indexed query, see
+    get_hc_hp_ref_day_series.
 
     Args:
         current_day: The day being reconstructed.
@@ -396,32 +487,43 @@ def get_tempo_ref_day(
                reconstructed, or None if it could not be determined.
 
     Returns:
-        The reference day's tarif_periods dict, or None if `color` is None
-        or no suitable candidate is found.
+        The reference day's minute-indexed tarif periods, or None if `color`
+        is None or no suitable candidate is found.
     """
     if color is None:
         return None
 
-    candidates = (
+    packed_tarif_periods = (
         DailyIndexes.objects.filter(
             date__gte=current_day
             - timedelta(days=TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS),
             date__lt=current_day,
+            tarif_period_type=TarifPeriodType.TEMPO,
+            tarif_periods_complete=True,
+            tempo_color=color,
         )
         .order_by("-date")
-        .values_list("tarif_periods", flat=True)
+        .values_list("packed_tarif_periods", flat=True)
+        .first()
     )
+    if packed_tarif_periods is None:
+        return None
+    return unpack_tarif_period_series(packed_tarif_periods)
 
-    for candidate_tarif_periods in candidates:
-        if None in candidate_tarif_periods.values():
-            continue
-        if (
-            get_tarif_period_type(candidate_tarif_periods) == TarifPeriodType.TEMPO
-            and get_tempo_color(candidate_tarif_periods) == color
-        ):
-            return candidate_tarif_periods
 
-    return None
+def get_tempo_ref_day(
+    current_day: date,
+    color: str | None,
+) -> dict[str, str | None] | None:
+    """
+    Dict counterpart of get_tempo_ref_day_series.
+
+    Returns:
+        The reference day's tarif_periods dict, or None if `color` is None
+        or no suitable candidate is found.
+    """
+    series = get_tempo_ref_day_series(current_day, color)
+    return series_to_index_dict(series) if series is not None else None
 
 
 def fill_missing_tarif_periods(
@@ -461,8 +563,7 @@ def fill_missing_tarif_periods(
     tarif_period_type = get_tarif_period_type(tarif_periods)
 
     if None not in tarif_periods.values():
-        # Nothing to fill: skip the reference-day lookup, which is expensive
-        # (scans up to TARIF_PERIOD_REF_DAY_SEARCH_WINDOW_DAYS days in DB).
+        # Nothing to fill: skip the reference-day lookup (a DB query).
         # Safe to skip: HC/HP hours and Tempo colors are fixed by contract,
         # so a reference day would yield the same boundaries anyway.
         return tarif_periods
@@ -636,8 +737,9 @@ def build_consumption_data(
     computes watt-hour consumption, and structures the data per time step.
 
     Args:
-        daily_indexes: An object containing raw index values (daily_indexes.values)
-                       and tariff periods (daily_indexes.tarif_periods).
+        daily_indexes: An object containing raw index values (daily_indexes.values,
+                       read repaired, see get_repaired_values) and tariff
+                       periods (daily_indexes.tarif_periods).
         day: The date of the day
         step: The step size in minutes (e.g. 1, 15, 30) used to aggregate data.
 
@@ -654,7 +756,7 @@ def build_consumption_data(
             - tarif_period: human-readable tariff period (e.g. 'Heures Creuses')
     """
     data = []
-    raw_indexes = daily_indexes.values
+    raw_indexes = daily_indexes.get_repaired_values()
     missing_indexes = compute_indexes_missing_values(raw_indexes)
     reconstructed_indexes = fill_missing_values(raw_indexes, missing_indexes)
 
@@ -723,6 +825,24 @@ def get_subscribed_power(cache_teleinfo_data: dict) -> int | None:
         return
 
 
+def get_subscribed_intensity(cache_teleinfo_data: dict) -> int | None:
+    """
+    Retrieves the subscribed intensity (ISOUSC, in amps) from teleinfo cache
+    data.
+
+    Args:
+        cache_teleinfo_data: A dictionary containing teleinfo fields, including
+                             the 'ISOUSC' value.
+
+    Returns:
+        The subscribed intensity in amps, or None if ISOUSC is missing or invalid.
+    """
+    try:
+        return int(cache_teleinfo_data[TeleinfoLabel.ISOUSC])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 def get_tarif_period(cache_teleinfo_data: dict) -> str | None:
     """
     Retrieves the current tarif period from teleinfo cache data.
@@ -863,6 +983,78 @@ def add_new_values(
     return today_indexes
 
 
+def build_minute_samples(
+    day: date,
+    minute_str: str,
+    indexes_in_teleinfo: dict[str, int],
+    tarif_period: str | None,
+    subscribed_power: float | None,
+) -> list[MinuteIndexSample]:
+    """
+    Builds the (unsaved) MinuteIndexSample rows recording one minute of
+    teleinfo data, one row per index label.
+
+    Args:
+        day: The date the minute belongs to.
+        minute_str: The minute, in 'HH:MM' format ("24:00" for the end of day).
+        indexes_in_teleinfo: A dictionary of label -> index value.
+        tarif_period: The tarif period in progress, or None if unknown.
+        subscribed_power: The subscribed power in kVA, or None if unknown.
+
+    Returns:
+        The list of MinuteIndexSample to insert, empty if there is no index.
+    """
+    minute = minute_str_to_slot(minute_str)
+    tarif_period_code = tarif_period_to_code(tarif_period)
+
+    return [
+        MinuteIndexSample(
+            date=day,
+            minute=minute,
+            label=label,
+            index=index,
+            tarif_period_code=tarif_period_code,
+            subscribed_power=subscribed_power,
+        )
+        for label, index in (indexes_in_teleinfo or {}).items()
+    ]
+
+
+def apply_minute_samples(
+    daily_indexes: DailyIndexes,
+    samples: Iterable[MinuteIndexSample],
+) -> DailyIndexes:
+    """
+    Replays minute samples onto a day's DailyIndexes, exactly as if each
+    minute had been written directly into it (same 07:00/07:01 tarif period
+    correction, same full-day structures for new labels).
+
+    Args:
+        daily_indexes: The DailyIndexes of the samples' day (saved or not).
+        samples: The samples of that day, ordered by minute.
+
+    Returns:
+        The updated DailyIndexes object (not saved).
+    """
+    for minute, minute_samples in groupby(samples, key=attrgetter("minute")):
+        minute_samples = list(minute_samples)
+        minute_str = SLOT_MINUTE_STRS[minute]
+
+        daily_indexes.subscribed_power = minute_samples[-1].subscribed_power
+        daily_indexes.tarif_periods = add_new_tarif_period(
+            daily_indexes.tarif_periods,
+            minute_str,
+            TARIF_PERIODS_BY_CODE.get(minute_samples[0].tarif_period_code),
+        )
+        add_new_values(
+            daily_indexes,
+            {sample.label: sample.index for sample in minute_samples},
+            minute_str,
+        )
+
+    return daily_indexes
+
+
 def get_human_readable_index_label(index_label: str) -> str | None:
     """
     Get the human-readable string for a given index label code.
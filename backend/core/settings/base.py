@@ -179,6 +179,18 @@ SIMPLE_JWT = {
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 
+# ============================================
+# CONSUMPTION
+# ============================================
+# Tiered retention of the consumption history (see
+# consumption/services/retention.py): (age in days from which a day is
+# downsampled, resolution in minutes) pairs, by increasing age, e.g.
+# [(366, 15), (1827, 1440)] to keep a year at 1 minute, 5 years every 15
+# minutes and daily totals beyond. Empty, so off, by default: the minutes
+# dropped by a downsampling are lost for good.
+CONSUMPTION_RETENTION_TIERS: list[tuple[int, int]] = []
+
+
 # ============================================
 # SHELLY
 # ============================================
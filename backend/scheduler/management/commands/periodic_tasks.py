@@ -3,7 +3,7 @@ import logging
 from django.core.management.base import BaseCommand
 
 from actuators.services.radiator_synchronization import RadiatorSyncService
-from consumption.mutators import save_teleinfo_data
+from consumption.mutators import compact_minute_samples, save_teleinfo_data
 from core.constants import LoggerLabel
 from core.services.system_metrics import log_system_metrics
 from heating.services.heating_synchronization import (
@@ -23,6 +23,10 @@ class Command(BaseCommand):
         save_teleinfo_data()
         logger.info(f"{label} save_teleinfo_data: done")
 
+        logger.info(f"{label} compact_minute_samples: start")
+        compact_minute_samples()
+        logger.info(f"{label} compact_minute_samples: done")
+
         logger.info(f"{label} sync_requested_heating_states: start")
         synchronize_room_requested_heating_states_with_room_heating_day_plan()
         logger.info(f"{label} sync_requested_heating_states: done")
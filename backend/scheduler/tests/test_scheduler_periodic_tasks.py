@@ -9,6 +9,10 @@ def test_periodic_tasks_calls_all_steps_in_order(mocker):
         "scheduler.management.commands.periodic_tasks.save_teleinfo_data",
         side_effect=lambda: call_order.append("save_teleinfo_data"),
     )
+    mocker.patch(
+        "scheduler.management.commands.periodic_tasks.compact_minute_samples",
+        side_effect=lambda: call_order.append("compact_minute_samples"),
+    )
     mocker.patch(
         "scheduler.management.commands.periodic_tasks."
         "synchronize_room_requested_heating_states_with_room_heating_day_plan",
@@ -34,6 +38,7 @@ def test_periodic_tasks_calls_all_steps_in_order(mocker):
 
     assert call_order == [
         "save_teleinfo_data",
+        "compact_minute_samples",
         "sync_requested_heating_states",
         "sync_heating_states_with_radiators",
         "radiator_hardware_sync",
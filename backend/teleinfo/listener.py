@@ -15,8 +15,12 @@ from teleinfo.services import (
     buffer_is_complete,
     ensure_power_not_exceeded,
     get_data_in_line,
+    update_power_peaks,
+)
+from teleinfo.utils.cache_teleinfo_data import (
+    set_power_peaks_in_cache,
+    set_teleinfo_data_in_cache,
 )
-from teleinfo.utils.cache_teleinfo_data import set_teleinfo_data_in_cache
 
 logger = logging.getLogger("django")
 
@@ -25,6 +29,7 @@ class TeleinfoListener:
     def __init__(self) -> None:
         self.buffer = {}
         self.teleinfo = {}
+        self.power_peaks = {}
         self.should_manage_radiator_power = False
         self._last_watchdog_notify = time.monotonic()
         set_teleinfo_data_in_cache({"last_read": None})
@@ -94,11 +99,16 @@ class TeleinfoListener:
         if buffer_can_accept_new_data(key, self.buffer):
             self.buffer[key] = value
         if buffer_is_complete(self.buffer):
+            now = timezone.now()
             self.teleinfo.clear()
             self.teleinfo = self.buffer.copy()
-            self.teleinfo.update({"last_read": timezone.now().isoformat()})
+            self.teleinfo.update({"last_read": now.isoformat()})
             self.buffer.clear()
             set_teleinfo_data_in_cache(self.teleinfo)
+            # The cached frame is only a snapshot: per-minute peaks are kept
+            # here, from every frame, for save_teleinfo_data to record
+            self.power_peaks = update_power_peaks(self.power_peaks, self.teleinfo, now)
+            set_power_peaks_in_cache(self.power_peaks)
             # Alternate power management cycles to allow teleinfo
             # to reflect changes before applying new modifications
             if self.should_manage_radiator_power:
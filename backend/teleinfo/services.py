@@ -1,3 +1,7 @@
+from datetime import datetime
+
+from django.utils import timezone
+
 from actuators.constants import POWER_SAFETY_MARGIN
 from actuators.services.load_shedding import manage_load_shedding
 from core.utils.bytes_utils import decode_byte
@@ -5,6 +9,7 @@ from teleinfo.constants import (
     FIRST_TELEINFO_FRAME_KEY,
     REQUIRED_TELEINFO_KEYS,
     UNUSED_CHARS_IN_TELEINFO,
+    TeleinfoLabel,
 )
 from teleinfo.utils.cache_teleinfo_data import get_instant_available_power
 
@@ -118,3 +123,37 @@ def ensure_power_not_exceeded() -> None:
     available_power = get_instant_available_power()
     if available_power is None or available_power < POWER_SAFETY_MARGIN:
         manage_load_shedding(available_power)
+
+
+def update_power_peaks(peaks: dict, teleinfo: dict, now: datetime) -> dict:
+    """
+    Keeps the highest apparent power (PAPP, VA) and intensity (IINST, A) of
+    the frames received during the current minute, and the ones of the
+    previous minute once it's over, to be recorded by save_teleinfo_data.
+
+    Returns:
+        {"current": {"minute", "papp", "iinst"}, "previous": {...} or None},
+        "minute" being the local minute as an ISO string. `peaks` unchanged
+        if the frame has no valid PAPP or IINST.
+    """
+    try:
+        papp = int(teleinfo[TeleinfoLabel.PAPP])
+        iinst = int(teleinfo[TeleinfoLabel.IINST])
+    except (KeyError, TypeError, ValueError):
+        return peaks
+
+    minute = timezone.localtime(now).replace(second=0, microsecond=0).isoformat()
+    current = peaks.get("current")
+    if current is None or current["minute"] != minute:
+        return {
+            "current": {"minute": minute, "papp": papp, "iinst": iinst},
+            "previous": current,
+        }
+    return {
+        "current": {
+            "minute": minute,
+            "papp": max(current["papp"], papp),
+            "iinst": max(current["iinst"], iinst),
+        },
+        "previous": peaks["previous"],
+    }
@@ -3,10 +3,12 @@ from unittest.mock import patch
 
 import pytest
 import serial
+from django.core.cache import cache
 from freezegun import freeze_time
 
 from teleinfo.constants import REQUIRED_TELEINFO_KEYS
 from teleinfo.listener import TeleinfoListener
+from teleinfo.utils.cache_teleinfo_data import get_power_peaks_in_cache
 
 NOW_DATETIME = datetime(2025, 5, 12, 10, tzinfo=timezone.utc)
 START_BUFFER = {"ADCO": "021728123456"}
@@ -14,6 +16,13 @@ COMPLETE_BUFFER = {key: "value" for key in REQUIRED_TELEINFO_KEYS}
 INCOMPLETE_BUFFER = {key: "value" for key in REQUIRED_TELEINFO_KEYS if key != "ISOUSC"}
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.mark.parametrize(
     "new_serial, excepted_buffer",
     [
@@ -95,6 +104,24 @@ def test_process_data_when_buffer_is_only_missing_one_key_to_be_complete(
     assert listener.teleinfo == excepted_teleinfo
 
 
+@freeze_time(NOW_DATETIME)
+@patch("teleinfo.listener.turn_on_radiators_according_to_the_available_power")
+@patch("teleinfo.listener.ensure_power_not_exceeded")
+@patch("teleinfo.listener.notify_watchdog")
+def test_process_data_tracks_the_power_peaks_of_the_minute(
+    mock_notify_watchdog, mock_ensure_power_not_exceeded, mock_turn_on_radiators
+):
+    listener = TeleinfoListener()
+    frame = {**COMPLETE_BUFFER, "PAPP": "02500", "IINST": "011"}
+    for papp in (b"PAPP 02500 (\r\n", b'PAPP 01000 "\r\n'):
+        listener.buffer = {key: value for key, value in frame.items() if key != "PAPP"}
+        listener._process_data(papp)
+
+    assert listener.power_peaks["current"]["papp"] == 2500
+    assert listener.power_peaks["current"]["iinst"] == 11
+    assert get_power_peaks_in_cache() == listener.power_peaks
+
+
 @pytest.mark.parametrize(
     "readline, excepted_buffer",
     [
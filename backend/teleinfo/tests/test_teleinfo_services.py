@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 from unittest.mock import patch
 
 import pytest
@@ -13,6 +14,7 @@ from teleinfo.services import (
     ensure_power_not_exceeded,
     get_data_in_line,
     split_data,
+    update_power_peaks,
 )
 
 
@@ -200,3 +202,46 @@ def test_load_shedding_none_power():
     ):
         ensure_power_not_exceeded()
         mock_shed.assert_called_once_with(None)
+
+
+# 2025-06-01 10:15 heure locale (CEST)
+FRAME_TIME = datetime(2025, 6, 1, 8, 15, 12, tzinfo=timezone.utc)
+FRAME_MINUTE = "2025-06-01T10:15:00+02:00"
+
+
+def test_update_power_peaks_keeps_the_highest_values_of_the_minute():
+    peaks = update_power_peaks({}, {"PAPP": "01200", "IINST": "006"}, FRAME_TIME)
+    peaks = update_power_peaks(
+        peaks, {"PAPP": "03400", "IINST": "005"}, FRAME_TIME.replace(second=30)
+    )
+    peaks = update_power_peaks(
+        peaks, {"PAPP": "00800", "IINST": "015"}, FRAME_TIME.replace(second=59)
+    )
+
+    assert peaks == {
+        "current": {"minute": FRAME_MINUTE, "papp": 3400, "iinst": 15},
+        "previous": None,
+    }
+
+
+def test_update_power_peaks_moves_to_the_next_minute():
+    peaks = update_power_peaks({}, {"PAPP": "01200", "IINST": "006"}, FRAME_TIME)
+
+    peaks = update_power_peaks(
+        peaks, {"PAPP": "00500", "IINST": "002"}, FRAME_TIME.replace(minute=16)
+    )
+
+    assert peaks == {
+        "current": {"minute": "2025-06-01T10:16:00+02:00", "papp": 500, "iinst": 2},
+        "previous": {"minute": FRAME_MINUTE, "papp": 1200, "iinst": 6},
+    }
+
+
+@pytest.mark.parametrize(
+    "teleinfo",
+    [{}, {"PAPP": "01200"}, {"PAPP": "value", "IINST": "006"}, {"PAPP": None}],
+)
+def test_update_power_peaks_ignores_invalid_frames(teleinfo):
+    peaks = {"current": {"minute": FRAME_MINUTE, "papp": 1, "iinst": 1}}
+
+    assert update_power_peaks(peaks, teleinfo, FRAME_TIME) is peaks
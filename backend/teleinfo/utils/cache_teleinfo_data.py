@@ -26,6 +26,14 @@ def set_teleinfo_data_in_cache(data: dict) -> None:
     cache.set("teleinfo_data", data, timeout=None)
 
 
+def get_power_peaks_in_cache() -> dict:
+    return cache.get("teleinfo_power_peaks", {})
+
+
+def set_power_peaks_in_cache(peaks: dict) -> None:
+    cache.set("teleinfo_power_peaks", peaks, timeout=None)
+
+
 def get_instant_available_power() -> int:
     teleinfo_data = get_teleinfo_data_in_cache_if_up_to_date()
 